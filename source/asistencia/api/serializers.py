@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from rest_framework.validators import UniqueTogetherValidator
 from ..models import EventoAsistencia  
 
 class EventoAsistenciaSerializer(serializers.ModelSerializer):
@@ -8,4 +9,12 @@ class EventoAsistenciaSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = EventoAsistencia
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+        # DRF 3.14 no deriva validadores de UniqueConstraint: sin esto, un duplicado sería un 500
+        validators = [
+            UniqueTogetherValidator(
+                queryset=EventoAsistencia.objects.all(),
+                fields=('empleado', 'registrado_el', 'tipo'),
+                message='Ya existe una marca de este tipo para el empleado en ese instante.',
+            )
+        ]
\ No newline at end of file
@@ -1,7 +1,30 @@
 from rest_framework import viewsets
 from asistencia.models import EventoAsistencia  
+from asistencia.services.jornada_service import JornadaService
 from .serializers import EventoAsistenciaSerializer
 
 class EventoAsistenciaViewSet(viewsets.ModelViewSet):
     queryset = EventoAsistencia.objects.all().order_by('-registrado_el')
-    serializer_class = EventoAsistenciaSerializer
\ No newline at end of file
+    serializer_class = EventoAsistenciaSerializer
+
+    # cada cambio en las marcas se refleja en la jornada calculada
+    def perform_create(self, serializer):
+        evento = serializer.save()
+        JornadaService.aplicar_evento(evento)
+
+    def perform_update(self, serializer):
+        anterior = self.get_object()
+        fecha_anterior = JornadaService.horario(anterior.empleado).fecha_jornada(anterior.registrado_el)
+        empleado_anterior = anterior.empleado
+
+        evento = serializer.save()
+        fecha_nueva = JornadaService.horario(evento.empleado).fecha_jornada(evento.registrado_el)
+        JornadaService.recalcular(evento.empleado, fecha_nueva)
+        if (empleado_anterior.pk, fecha_anterior) != (evento.empleado_id, fecha_nueva):
+            JornadaService.recalcular(empleado_anterior, fecha_anterior)
+
+    def perform_destroy(self, instance):
+        empleado = instance.empleado
+        fecha = JornadaService.horario(empleado).fecha_jornada(instance.registrado_el)
+        instance.delete()
+        JornadaService.recalcular(empleado, fecha)
@@ -0,0 +1,70 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from asistencia.services.cierre_service import CierreJornadaService
+from core.models import Empresa
+
+
+def _fecha(valor):
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise CommandError(f"Fecha inválida: {valor} (formato AAAA-MM-DD)")
+
+
+class Command(BaseCommand):
+    help = (
+        "Cierra la asistencia de uno o varios días: marca FALTA, LIBRE o PERMISO "
+        "a los empleados sin marcas. Por defecto cierra el día anterior."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--empresa", type=int, help="ID de la empresa (por defecto: todas las activas).")
+        parser.add_argument("--fecha", help="Día a cerrar (AAAA-MM-DD).")
+        parser.add_argument("--desde", help="Inicio del rango a reprocesar (AAAA-MM-DD).")
+        parser.add_argument("--hasta", help="Fin del rango a reprocesar (AAAA-MM-DD).")
+        parser.add_argument(
+            "--tam-lote",
+            type=int,
+            default=500,
+            help="Empleados procesados por bloque (por defecto: %(default)s).",
+        )
+        parser.add_argument(
+            "--notificar",
+            action="store_true",
+            help="Notifica a los empleados con falta (se recomienda solo para el cierre diario).",
+        )
+
+    def handle(self, *args, **options):
+        ayer = timezone.localdate() - timedelta(days=1)
+
+        if options["fecha"]:
+            desde = hasta = _fecha(options["fecha"])
+        else:
+            desde = _fecha(options["desde"]) if options["desde"] else ayer
+            hasta = _fecha(options["hasta"]) if options["hasta"] else ayer
+
+        if desde > hasta:
+            raise CommandError("El inicio del rango es posterior al fin.")
+        if hasta > ayer:
+            raise CommandError("Solo pueden cerrarse días ya terminados.")
+
+        if options["empresa"]:
+            empresas = Empresa.objects.filter(pk=options["empresa"])
+            if not empresas.exists():
+                raise CommandError(f"No existe la empresa {options['empresa']}.")
+        else:
+            empresas = Empresa.objects.filter(estado=True)
+
+        for empresa in empresas:
+            resumen = CierreJornadaService.cerrar_rango(
+                empresa, desde, hasta, tam_lote=options["tam_lote"], notificar=options["notificar"]
+            )
+            self.stdout.write(
+                f"{empresa}: {resumen['empleados']} empleados, {resumen['creadas']} jornadas creadas, "
+                f"{resumen['actualizadas']} actualizadas, {resumen['recalculadas']} recalculadas."
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Cierre de asistencia completado ({desde} a {hasta})."))
@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Min
+
+from asistencia.models import EventoAsistencia
+from asistencia.services.jornada_service import JornadaService
+from empleados.models import Empleado
+
+
+class Command(BaseCommand):
+    help = (
+        "Detecta marcas repetidas (mismo empleado, instante y tipo), que impiden aplicar la "
+        "restricción unique_evento_empleado_momento_tipo. Sin --aplicar solo informa; con "
+        "--aplicar conserva la primera de cada grupo, borra el resto y recalcula las jornadas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--aplicar",
+            action="store_true",
+            help="Elimina los duplicados (por defecto solo se listan).",
+        )
+
+    def handle(self, *args, **options):
+        grupos = list(
+            EventoAsistencia.objects.values("empleado_id", "registrado_el", "tipo")
+            .annotate(n=Count("id"), primero=Min("id"))
+            .filter(n__gt=1)
+            .order_by("empleado_id", "registrado_el")
+        )
+        sobrantes = sum(grupo["n"] - 1 for grupo in grupos)
+
+        for grupo in grupos:
+            self.stdout.write(
+                f"Empleado {grupo['empleado_id']}, {grupo['tipo']} {grupo['registrado_el']:%Y-%m-%d %H:%M:%S}: "
+                f"{grupo['n']} marcas (se conserva la {grupo['primero']})."
+            )
+
+        if not options["aplicar"]:
+            self.stdout.write(
+                f"{len(grupos)} grupos con {sobrantes} marcas repetidas. Ejecute con --aplicar para eliminarlas."
+            )
+            return
+
+        empleados = Empleado.objects.select_related("turno").in_bulk({grupo["empleado_id"] for grupo in grupos})
+        afectadas = set()
+        with transaction.atomic():
+            for grupo in grupos:
+                EventoAsistencia.objects.filter(
+                    empleado_id=grupo["empleado_id"], registrado_el=grupo["registrado_el"], tipo=grupo["tipo"]
+                ).exclude(id=grupo["primero"]).delete()
+                empleado = empleados[grupo["empleado_id"]]
+                afectadas.add((empleado.pk, JornadaService.horario(empleado).fecha_jornada(grupo["registrado_el"])))
+
+        for empleado_id, fecha in sorted(afectadas):
+            JornadaService.recalcular(empleados[empleado_id], fecha)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{sobrantes} marcas repetidas eliminadas en {len(grupos)} grupos; "
+                f"{len(afectadas)} jornadas recalculadas."
+            )
+        )
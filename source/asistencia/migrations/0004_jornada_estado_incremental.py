@@ -0,0 +1,43 @@
+# Generated by Django 5.0.3 on 2026-10-18 12:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asistencia', '0003_alter_jornadacalculada_estado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jornadacalculada',
+            name='inicio_pausa',
+            field=models.DateTimeField(blank=True, help_text='Pausa abierta', null=True),
+        ),
+        migrations.AddField(
+            model_name='jornadacalculada',
+            name='inicio_tramo',
+            field=models.DateTimeField(blank=True, help_text='Tramo de trabajo abierto', null=True),
+        ),
+        migrations.AddField(
+            model_name='jornadacalculada',
+            name='segundos_pausa',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='jornadacalculada',
+            name='segundos_trabajados',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='jornadacalculada',
+            name='ultimo_evento_el',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='jornadacalculada',
+            name='ultimo_evento_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
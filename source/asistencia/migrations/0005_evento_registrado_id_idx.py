@@ -0,0 +1,18 @@
+# Generated by Django 5.0.3 on 2026-10-18 12:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asistencia', '0004_jornada_estado_incremental'),
+        ('empleados', '0009_empleado_turno'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='eventoasistencia',
+            index=models.Index(fields=['registrado_el', 'id'], name='evento_registrado_id_idx'),
+        ),
+    ]
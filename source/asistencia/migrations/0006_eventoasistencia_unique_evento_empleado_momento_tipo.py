@@ -0,0 +1,37 @@
+# Generated by Django 5.0.3 on 2026-10-18 13:51
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def verificar_duplicados(apps, schema_editor):
+    # Las marcas repetidas (mismo empleado, instante y tipo) impedirían crear la
+    # restricción. No se borran aquí: se revisan y eliminan con el comando explícito.
+    EventoAsistencia = apps.get_model("asistencia", "EventoAsistencia")
+    grupos = (
+        EventoAsistencia.objects.values("empleado_id", "registrado_el", "tipo")
+        .annotate(n=Count("id"))
+        .filter(n__gt=1)
+        .count()
+    )
+    if grupos:
+        raise RuntimeError(
+            f"Hay {grupos} grupos de marcas repetidas en evento_asistencia. Revíselos con "
+            "'python manage.py deduplicar_marcaciones' y elimínelos con '--aplicar' antes de migrar."
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asistencia', '0005_evento_registrado_id_idx'),
+        ('empleados', '0009_empleado_turno'),
+    ]
+
+    operations = [
+        migrations.RunPython(verificar_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='eventoasistencia',
+            constraint=models.UniqueConstraint(fields=('empleado', 'registrado_el', 'tipo'), name='unique_evento_empleado_momento_tipo'),
+        ),
+    ]
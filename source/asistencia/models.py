@@ -54,6 +54,14 @@ class EventoAsistencia(models.Model):
         db_table = "evento_asistencia"
         indexes = [
             models.Index(fields=["empleado", "registrado_el"]),
+            # Recorrido keyset de la exportación por rango de fechas
+            models.Index(fields=["registrado_el", "id"], name="evento_registrado_id_idx"),
+        ]
+        constraints = [
+            # Clave de deduplicación de la ingesta: una marca por empleado, instante y tipo
+            models.UniqueConstraint(
+                fields=["empleado", "registrado_el", "tipo"], name="unique_evento_empleado_momento_tipo"
+            ),
         ]
 
 # resumen diario de asistencia para análisis y reportes
@@ -86,6 +94,14 @@ class JornadaCalculada(models.Model):
     
     fecha_calculo = models.DateTimeField(auto_now=True)
 
+    # estado del plegado incremental de eventos (ver JornadaService)
+    segundos_trabajados = models.IntegerField(default=0)
+    segundos_pausa = models.IntegerField(default=0)
+    inicio_tramo = models.DateTimeField(null=True, blank=True, help_text=_("Tramo de trabajo abierto"))
+    inicio_pausa = models.DateTimeField(null=True, blank=True, help_text=_("Pausa abierta"))
+    ultimo_evento_el = models.DateTimeField(null=True, blank=True)
+    ultimo_evento_id = models.BigIntegerField(null=True, blank=True)
+
     class Meta:
         db_table = "jornada_calculada"
         constraints = [
@@ -0,0 +1,201 @@
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from asistencia.models import EventoAsistencia, JornadaCalculada
+from asistencia.services.jornada_service import JornadaService
+from empleados.models import Empleado
+from notificaciones.constants import TiposNotificacion
+from notificaciones.models import Notificacion
+from notificaciones.services.notificacion_service import NotificacionService
+from solicitudes.models import SolicitudAusencia
+
+EstadoJornada = JornadaCalculada.EstadoJornada
+
+# Códigos de Empleado.dias_laborales indexados por date.weekday()
+CODIGOS_DIA = [codigo for codigo, _ in Empleado.DIAS_SEMANA]
+
+# Estados que asigna el cierre; los demás provienen de marcas y no se tocan
+ESTADOS_CIERRE = (EstadoJornada.FALTA, EstadoJornada.LIBRE, EstadoJornada.PERMISO)
+
+
+def _dias(desde, hasta):
+    dia = desde
+    while dia <= hasta:
+        yield dia
+        dia += timedelta(days=1)
+
+
+class CierreJornadaService:
+    """
+    Cierre de asistencia: completa las jornadas de los días sin marcas con
+    FALTA, LIBRE (día no laboral) o PERMISO (solicitud aprobada o licencia).
+
+    Trabaja por bloques de empleados y con pocas consultas por bloque, sin importar
+    cuántos días abarque el rango: lee en bloque jornadas, permisos y días con
+    marcas, inserta con bulk_create y corrige los estados previos con un UPDATE
+    por estado. Es idempotente, por lo que sirve también para reprocesar historia.
+    """
+
+    @staticmethod
+    def cerrar_dia(empresa, fecha, notificar=False):
+        return CierreJornadaService.cerrar_rango(empresa, fecha, fecha, notificar=notificar)
+
+    @staticmethod
+    def cerrar_rango(empresa, desde, hasta, tam_lote=500, notificar=False):
+        """Cierra [desde, hasta] para la empresa (o todas si es None). Devuelve un resumen."""
+        resumen = {"creadas": 0, "actualizadas": 0, "recalculadas": 0, "empleados": 0}
+
+        empleados = Empleado.objects.filter(
+            estado__in=[Empleado.Estado.ACTIVO, Empleado.Estado.LICENCIA],
+            fecha_ingreso__lte=hasta,
+        ).order_by("id")
+        if empresa is not None:
+            empleados = empleados.filter(empresa=empresa)
+
+        columnas = ("id", "dias_laborales", "fecha_ingreso", "estado")
+        bloque = []
+        for fila in empleados.values_list(*columnas).iterator(chunk_size=tam_lote):
+            bloque.append(fila)
+            if len(bloque) >= tam_lote:
+                CierreJornadaService._cerrar_bloque(bloque, desde, hasta, resumen, notificar)
+                bloque = []
+        if bloque:
+            CierreJornadaService._cerrar_bloque(bloque, desde, hasta, resumen, notificar)
+        return resumen
+
+    @staticmethod
+    def _cerrar_bloque(bloque, desde, hasta, resumen, notificar):
+        ids = [fila[0] for fila in bloque]
+        resumen["empleados"] += len(ids)
+
+        # Jornadas existentes: (empleado, fecha) -> (pk, estado, tiene_marcas)
+        existentes = {
+            (empleado_id, fecha): (pk, estado, ultimo_evento_id is not None or entrada is not None)
+            for pk, empleado_id, fecha, estado, ultimo_evento_id, entrada in JornadaCalculada.objects.filter(
+                empleado_id__in=ids, fecha__range=(desde, hasta)
+            ).values_list("pk", "empleado_id", "fecha", "estado", "ultimo_evento_id", "hora_primera_entrada")
+        }
+
+        # Permisos aprobados que se solapan con el rango
+        permisos = set()
+        for empleado_id, inicio, fin in SolicitudAusencia.objects.filter(
+            empleado_id__in=ids,
+            estado=SolicitudAusencia.Estado.APROBADO,
+            fecha_inicio__lte=hasta,
+            fecha_fin__gte=desde,
+        ).values_list("empleado_id", "fecha_inicio", "fecha_fin"):
+            for dia in _dias(max(inicio, desde), min(fin, hasta)):
+                permisos.add((empleado_id, dia))
+
+        # Días (locales) con marcas; un día adicional cubre salidas de turnos nocturnos.
+        # El rango se expresa sobre registrado_el para recorrer el índice (empleado, registrado_el)
+        zona = timezone.get_current_timezone()
+        con_marcas = set(
+            EventoAsistencia.objects.filter(
+                empleado_id__in=ids,
+                registrado_el__gte=timezone.make_aware(datetime.combine(desde, time.min), zona),
+                registrado_el__lt=timezone.make_aware(datetime.combine(hasta + timedelta(days=2), time.min), zona),
+            )
+            .annotate(dia=TruncDate("registrado_el", tzinfo=zona))
+            .values_list("empleado_id", "dia")
+            .distinct()
+        )
+
+        nuevas = []
+        por_estado = {estado: [] for estado in ESTADOS_CIERRE}
+        pendientes_motor = []
+
+        for empleado_id, dias_laborales, fecha_ingreso, estado_empleado in bloque:
+            laborables = set((dias_laborales or "").split(","))
+            for dia in _dias(max(desde, fecha_ingreso), hasta):
+                clave = (empleado_id, dia)
+                existente = existentes.get(clave)
+                if existente and existente[2]:
+                    continue  # jornada calculada a partir de marcas
+
+                if clave in permisos or estado_empleado == Empleado.Estado.LICENCIA:
+                    estado = EstadoJornada.PERMISO
+                elif CODIGOS_DIA[dia.weekday()] not in laborables:
+                    estado = EstadoJornada.LIBRE
+                else:
+                    estado = EstadoJornada.FALTA
+
+                if existente is None and clave in con_marcas:
+                    # Hay marcas sin jornada (p. ej. carga directa): la calcula el motor
+                    pendientes_motor.append((clave, estado))
+                    continue
+
+                if existente is None:
+                    nuevas.append(JornadaCalculada(empleado_id=empleado_id, fecha=dia, estado=estado))
+                elif existente[1] != estado and existente[1] in ESTADOS_CIERRE:
+                    por_estado[estado].append(existente[0])
+
+        # Inserción masiva; si el motor (u otro cierre) creó la jornada entre tanto, prevalece la suya
+        insertadas = []
+        if nuevas:
+            # ignore_conflicts no informa qué filas omitió: se comparan las claves
+            # (empleado, fecha) presentes antes y después de insertar
+            previas = CierreJornadaService._claves_existentes(nuevas)
+            JornadaCalculada.objects.bulk_create(nuevas, batch_size=1000, ignore_conflicts=True)
+            posteriores = CierreJornadaService._claves_existentes(nuevas)
+            insertadas = [j for j in nuevas if (j.empleado_id, j.fecha) in posteriores - previas]
+        resumen["creadas"] += len(insertadas)
+
+        # Corrección de estados previos (p. ej. permiso aprobado después del cierre),
+        # condicionada a que la jornada siga sin marcas
+        for estado, pks in por_estado.items():
+            if pks:
+                resumen["actualizadas"] += JornadaCalculada.objects.filter(
+                    pk__in=pks, ultimo_evento_id__isnull=True, hora_primera_entrada__isnull=True
+                ).update(estado=estado, fecha_calculo=timezone.now())
+
+        if pendientes_motor:
+            por_id = Empleado.objects.select_related("turno").in_bulk({clave[0] for clave, _ in pendientes_motor})
+            for (empleado_id, dia), estado in pendientes_motor:
+                jornada = JornadaService.recalcular(por_id[empleado_id], dia)
+                if jornada.ultimo_evento_id is None:
+                    # Las marcas de ese día calendario pertenecían a otra jornada (turno nocturno)
+                    JornadaCalculada.objects.filter(pk=jornada.pk).update(estado=estado)
+                resumen["recalculadas"] += 1
+
+        if notificar:
+            CierreJornadaService._notificar_faltas(
+                [(j.empleado_id, j.fecha) for j in insertadas if j.estado == EstadoJornada.FALTA]
+            )
+
+    @staticmethod
+    def _claves_existentes(jornadas):
+        """Claves (empleado, fecha) de las jornadas dadas que ya existen en la base."""
+        return set(
+            JornadaCalculada.objects.filter(
+                empleado_id__in={j.empleado_id for j in jornadas},
+                fecha__range=(min(j.fecha for j in jornadas), max(j.fecha for j in jornadas)),
+            ).values_list("empleado_id", "fecha")
+        )
+
+    @staticmethod
+    def _notificar_faltas(faltas):
+        """Aviso de falta a cada empleado con usuario (inserción masiva con contadores)."""
+        if not faltas:
+            return
+        usuarios = dict(
+            get_user_model().objects.filter(
+                empleado_id__in={empleado_id for empleado_id, _ in faltas}
+            ).values_list("empleado_id", "id")
+        )
+        NotificacionService.crear_lote(
+            [
+                Notificacion(
+                    usuario_id=usuarios[empleado_id],
+                    titulo="Ausencia Registrada",
+                    mensaje=f"No se registraron marcaciones para el día {fecha}. Por favor justifica tu falta.",
+                    tipo=TiposNotificacion.ERROR,
+                    url_destino="/solicitudes/crear/",
+                )
+                for empleado_id, fecha in faltas
+                if empleado_id in usuarios
+            ]
+        )
@@ -0,0 +1,128 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from asistencia.models import EventoAsistencia
+from core.paginacion import codificar_cursor, decodificar_cursor, filtro_despues_de
+
+# Filas leídas por viaje al cursor de servidor
+EXPORTACION_CHUNK = getattr(settings, "EXPORTACION_CHUNK", 2000)
+
+# Orden estable y único del export (índice evento_registrado_id_idx)
+CAMPOS_ORDEN = ("registrado_el", "id")
+
+COLUMNAS = (
+    "id",
+    "registrado_el",
+    "cedula",
+    "empleado",
+    "unidad",
+    "tipo",
+    "origen",
+    "latitud",
+    "longitud",
+)
+
+
+class _Eco:
+    """Buffer mínimo para csv.writer: devuelve la línea en lugar de acumularla."""
+
+    def write(self, valor):
+        return valor
+
+
+class ExportacionAsistenciaService:
+    """
+    Exportación de marcaciones en streaming (CSV o JSON Lines).
+
+    Recorre la consulta con `.iterator(chunk_size)` (cursor de servidor en
+    PostgreSQL) y emite cada fila según se lee, por lo que la memoria es constante
+    sin importar el volumen. Con `limite` la salida se corta en páginas; la
+    siguiente se pide con el cursor keyset que devuelve `cursor_siguiente()`.
+    """
+
+    FORMATOS = ("csv", "jsonl")
+
+    @staticmethod
+    def consulta(desde, hasta, empresa_id=None, unidad_id=None, cursor=None):
+        """Marcaciones del rango de fechas locales [desde, hasta], en orden (registrado_el, id)."""
+        zona = timezone.get_current_timezone()
+        qs = EventoAsistencia.objects.filter(
+            registrado_el__gte=timezone.make_aware(datetime.combine(desde, time.min), zona),
+            registrado_el__lt=timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min), zona),
+        )
+        if empresa_id:
+            qs = qs.filter(empleado__empresa_id=empresa_id)
+        if unidad_id:
+            qs = qs.filter(empleado__unidad_org_id=unidad_id)
+
+        if cursor:
+            # Un cursor inválido se propaga como CursorInvalido (ValueError)
+            _, valores = decodificar_cursor(cursor, EventoAsistencia, CAMPOS_ORDEN)
+            qs = qs.filter(filtro_despues_de(CAMPOS_ORDEN, valores, descendente=False))
+
+        return qs.order_by(*CAMPOS_ORDEN)
+
+    @staticmethod
+    def cursor_siguiente(qs, limite):
+        """
+        Cursor de la página siguiente, calculado antes de emitir la página actual
+        (así puede viajar en las cabeceras). None si no quedan filas.
+        """
+        if not limite:
+            return None
+        claves = list(qs.values_list(*CAMPOS_ORDEN)[limite - 1:limite + 1])
+        if len(claves) < 2:
+            return None
+        return codificar_cursor(claves[0], "s")
+
+    @staticmethod
+    def filas(qs, limite=None):
+        """Genera diccionarios planos sin instanciar modelos."""
+        qs = qs.values(
+            "id",
+            "registrado_el",
+            "tipo",
+            "origen",
+            "latitud",
+            "longitud",
+            "empleado__cedula",
+            "empleado__nombres",
+            "empleado__apellidos",
+            "empleado__unidad_org__nombre",
+        )
+        if limite:
+            qs = qs[:limite]
+
+        etiquetas = dict(EventoAsistencia.TipoEvento.choices)
+        for fila in qs.iterator(chunk_size=EXPORTACION_CHUNK):
+            yield {
+                "id": fila["id"],
+                "registrado_el": timezone.localtime(fila["registrado_el"]).isoformat(),
+                "cedula": fila["empleado__cedula"],
+                "empleado": f"{fila['empleado__nombres']} {fila['empleado__apellidos']}",
+                "unidad": fila["empleado__unidad_org__nombre"],
+                "tipo": str(etiquetas.get(fila["tipo"], fila["tipo"])),
+                "origen": fila["origen"] or "",
+                "latitud": fila["latitud"],
+                "longitud": fila["longitud"],
+            }
+
+    @staticmethod
+    def generar(qs, formato="csv", limite=None):
+        """Iterador de líneas de texto listo para StreamingHttpResponse."""
+        filas = ExportacionAsistenciaService.filas(qs, limite)
+
+        if formato == "jsonl":
+            for fila in filas:
+                yield json.dumps(fila, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+            return
+
+        escritor = csv.writer(_Eco())
+        yield escritor.writerow(COLUMNAS)
+        for fila in filas:
+            yield escritor.writerow([fila[columna] if fila[columna] is not None else "" for columna in COLUMNAS])
@@ -0,0 +1,255 @@
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from asistencia.models import EventoAsistencia
+from asistencia.services.jornada_service import JornadaService
+from auditoria.services.auditoria_service import AuditoriaService
+from empleados.models import Empleado
+
+TipoEvento = EventoAsistencia.TipoEvento
+
+# Límite de filas por llamada (protege memoria y duración de la petición)
+INGESTA_MAX_FILAS = getattr(settings, "INGESTA_MAX_FILAS", 50000)
+
+# Alias aceptados para el tipo de marca (dispositivos suelen enviar otros nombres)
+ALIAS_TIPO = {
+    "entrada": TipoEvento.CHECK_IN,
+    "salida": TipoEvento.CHECK_OUT,
+    "in": TipoEvento.CHECK_IN,
+    "out": TipoEvento.CHECK_OUT,
+    **{tipo.value: tipo.value for tipo in TipoEvento},
+}
+
+
+class FormatoIngestaInvalido(ValueError):
+    """El cuerpo recibido no se puede interpretar como CSV/JSON lines."""
+
+
+class IngestaMarcacionesService:
+    """
+    Ingesta masiva de marcaciones (biométricos, relojes, archivos).
+
+    Por lote: resuelve empleados por cédula con una consulta, descarta duplicados
+    (empleado, registrado_el, tipo) contra el propio lote y contra la base con otra,
+    inserta con INSERT ... ON CONFLICT DO NOTHING (la restricción única sobre esa clave cubre los lotes
+    concurrentes) y recalcula una sola vez cada (empleado, fecha) afectada.
+    Los errores se informan por fila sin abortar el lote.
+    """
+
+    @staticmethod
+    def leer_filas(contenido, formato):
+        """Convierte el cuerpo en una lista de (numero_fila, dict). `formato`: 'csv' o 'jsonl'."""
+        if isinstance(contenido, bytes):
+            contenido = contenido.decode("utf-8-sig")
+
+        if formato == "csv":
+            lector = csv.DictReader(io.StringIO(contenido))
+            if not lector.fieldnames:
+                raise FormatoIngestaInvalido("El CSV no tiene encabezados.")
+            return [(numero, fila) for numero, fila in enumerate(lector, start=1)]
+
+        if formato == "jsonl":
+            filas = []
+            for numero, linea in enumerate(contenido.splitlines(), start=1):
+                if not linea.strip():
+                    continue
+                try:
+                    filas.append((numero, json.loads(linea)))
+                except json.JSONDecodeError as exc:
+                    filas.append((numero, {"__error__": f"JSON inválido: {exc.msg}"}))
+            return filas
+
+        raise FormatoIngestaInvalido(f"Formato no soportado: {formato}")
+
+    @staticmethod
+    @AuditoriaService.lote()
+    def importar(filas, empresa_id=None, origen="biometrico"):
+        """
+        Importa las filas [(numero, dict)] con claves cedula, registrado_el, tipo
+        (y opcionales latitud, longitud, observacion). Devuelve un resumen.
+        """
+        resumen = {"recibidas": len(filas), "insertadas": 0, "duplicadas": 0, "jornadas": 0, "errores": []}
+
+        if len(filas) > INGESTA_MAX_FILAS:
+            resumen["errores"].append({"fila": None, "error": f"Máximo {INGESTA_MAX_FILAS} filas por lote."})
+            return resumen
+
+        validas = IngestaMarcacionesService._validar(filas, resumen["errores"])
+        empleados = IngestaMarcacionesService._resolver_empleados(validas, empresa_id, resumen["errores"])
+
+        # Duplicados dentro del lote y contra lo ya registrado
+        candidatos = []
+        vistos = set()
+        for numero, cedula, momento, tipo, datos in validas:
+            empleado = empleados.get(cedula)
+            if empleado is None:
+                continue
+            clave = (empleado.pk, momento, tipo)
+            if clave in vistos:
+                resumen["duplicadas"] += 1
+                continue
+            vistos.add(clave)
+            candidatos.append((clave, empleado, datos))
+
+        existentes = IngestaMarcacionesService._existentes(candidatos)
+
+        eventos = []
+        for clave, empleado, datos in candidatos:
+            if clave in existentes:
+                resumen["duplicadas"] += 1
+                continue
+            _, momento, tipo = clave
+            eventos.append(
+                EventoAsistencia(
+                    empleado=empleado,
+                    tipo=tipo,
+                    registrado_el=momento,
+                    origen=origen,
+                    latitud=datos["latitud"],
+                    longitud=datos["longitud"],
+                    observacion=datos["observacion"],
+                )
+            )
+
+        insertados = []
+        if eventos:
+            with transaction.atomic():
+                # La restricción única descarta las marcas que otro lote insertó entre tanto
+                insertados = IngestaMarcacionesService._insertar(eventos)
+        resumen["duplicadas"] += len(eventos) - len(insertados)
+        resumen["insertadas"] = len(insertados)
+        eventos = insertados
+
+        # Un recálculo incremental por (empleado, fecha) afectada
+        resumen["jornadas"] = len(JornadaService.procesar_eventos(eventos))
+        resumen["errores"].sort(key=lambda error: error["fila"] or 0)
+        return resumen
+
+    # --- Internos ---
+
+    @staticmethod
+    def _validar(filas, errores):
+        validas = []
+        zona = timezone.get_current_timezone()
+        for numero, fila in filas:
+            if not isinstance(fila, dict):
+                errores.append({"fila": numero, "error": "La fila debe ser un objeto."})
+                continue
+            if "__error__" in fila:
+                errores.append({"fila": numero, "error": fila["__error__"]})
+                continue
+
+            cedula = str(fila.get("cedula") or "").strip()
+            tipo = ALIAS_TIPO.get(str(fila.get("tipo") or "").strip().lower())
+            try:
+                momento = parse_datetime(str(fila.get("registrado_el") or "").strip())
+            except ValueError:
+                momento = None
+
+            if not cedula:
+                errores.append({"fila": numero, "error": "Cédula obligatoria."})
+            elif tipo is None:
+                errores.append({"fila": numero, "error": f"Tipo de marca inválido: {fila.get('tipo')!r}."})
+            elif momento is None:
+                errores.append({"fila": numero, "error": f"Fecha/hora inválida: {fila.get('registrado_el')!r}."})
+            else:
+                try:
+                    datos = {
+                        "latitud": IngestaMarcacionesService._decimal(fila.get("latitud")),
+                        "longitud": IngestaMarcacionesService._decimal(fila.get("longitud")),
+                        "observacion": (str(fila.get("observacion") or "")[:255] or None),
+                    }
+                except InvalidOperation:
+                    errores.append({"fila": numero, "error": "Coordenadas inválidas."})
+                    continue
+                if timezone.is_naive(momento):
+                    momento = timezone.make_aware(momento, zona)
+                validas.append((numero, cedula, momento, tipo, datos))
+        return validas
+
+    @staticmethod
+    def _decimal(valor):
+        if valor in (None, ""):
+            return None
+        return Decimal(str(valor))
+
+    @staticmethod
+    def _resolver_empleados(validas, empresa_id, errores):
+        """Mapa cédula -> Empleado con una sola consulta; reporta cédulas desconocidas o ambiguas."""
+        cedulas = {cedula for _, cedula, _, _, _ in validas}
+        qs = Empleado.objects.filter(cedula__in=cedulas).select_related("turno")
+        if empresa_id:
+            qs = qs.filter(empresa_id=empresa_id)
+
+        encontrados = {}
+        for empleado in qs:
+            encontrados.setdefault(empleado.cedula, []).append(empleado)
+
+        empleados = {}
+        for numero, cedula, _, _, _ in validas:
+            coincidencias = encontrados.get(cedula, [])
+            if len(coincidencias) == 1:
+                empleados[cedula] = coincidencias[0]
+            elif not coincidencias:
+                errores.append({"fila": numero, "error": f"Empleado con cédula {cedula} no encontrado."})
+            else:
+                errores.append({"fila": numero, "error": f"Cédula {cedula} ambigua: indique la empresa."})
+        return empleados
+
+    @staticmethod
+    def _insertar(eventos):
+        """
+        INSERT ... ON CONFLICT DO NOTHING RETURNING id: solo devuelve las filas que
+        este lote insertó realmente (bulk_create con ignore_conflicts no informa cuáles
+        omitió). Asigna el pk a esos eventos y los devuelve.
+        """
+        campos = [f for f in EventoAsistencia._meta.concrete_fields if not f.primary_key]
+        tabla = connection.ops.quote_name(EventoAsistencia._meta.db_table)
+        columnas = ", ".join(connection.ops.quote_name(f.column) for f in campos)
+        fila = "(" + ", ".join(["%s"] * len(campos)) + ")"
+        tam_lote = min(1000, connection.ops.bulk_batch_size(campos, eventos) or 1000)
+
+        ids = []
+        with connection.cursor() as cursor:
+            for inicio in range(0, len(eventos), tam_lote):
+                lote = eventos[inicio:inicio + tam_lote]
+                parametros = [f.get_db_prep_save(getattr(e, f.attname), connection) for e in lote for f in campos]
+                cursor.execute(
+                    f"INSERT INTO {tabla} ({columnas}) VALUES {', '.join([fila] * len(lote))} "
+                    f"ON CONFLICT (empleado_id, registrado_el, tipo) DO NOTHING RETURNING id",
+                    parametros,
+                )
+                ids.extend(pk for pk, in cursor.fetchall())
+        if not ids:
+            return []
+
+        # Relectura por pk para emparejar cada id con su evento por la clave natural
+        por_clave = {(e.empleado_id, e.registrado_el, e.tipo): e for e in eventos}
+        insertados = []
+        for pk, empleado_id, momento, tipo in EventoAsistencia.objects.filter(pk__in=ids).values_list(
+            "pk", "empleado_id", "registrado_el", "tipo"
+        ):
+            evento = por_clave[(empleado_id, momento, tipo)]
+            evento.pk = pk
+            insertados.append(evento)
+        return insertados
+
+    @staticmethod
+    def _existentes(candidatos):
+        if not candidatos:
+            return set()
+        momentos = [clave[1] for clave, _, _ in candidatos]
+        return set(
+            EventoAsistencia.objects.filter(
+                empleado_id__in={clave[0] for clave, _, _ in candidatos},
+                registrado_el__gte=min(momentos),
+                registrado_el__lte=max(momentos),
+            ).values_list("empleado_id", "registrado_el", "tipo")
+        )
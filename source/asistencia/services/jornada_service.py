@@ -0,0 +1,298 @@
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta, tzinfo
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from asistencia.models import EventoAsistencia, JornadaCalculada
+
+TipoEvento = EventoAsistencia.TipoEvento
+EstadoJornada = JornadaCalculada.EstadoJornada
+
+UN_DIA = timedelta(days=1)
+
+
+def _a_time(valor):
+    # Los defaults del modelo ("09:00") llegan como texto en instancias aún no recargadas
+    return time.fromisoformat(valor) if isinstance(valor, str) else valor
+
+
+@dataclass(frozen=True)
+class Horario:
+    """
+    Horario teórico de un empleado: el de su turno (con tolerancia y tiempo de comida)
+    o, si no tiene turno, sus horas teóricas de entrada/salida.
+
+    Cada jornada ocupa una ventana de 24 h centrada en el turno: empieza a mitad del
+    descanso entre la salida anterior y la entrada. Así, una marca de madrugada de un
+    turno nocturno (p. ej. 22:00-06:00) pertenece a la jornada del día en que empezó.
+    """
+
+    inicio: time
+    fin: time
+    tolerancia_minutos: int = 0
+    comida_minutos: int = 0
+    zona: tzinfo = None
+
+    @classmethod
+    def para_empleado(cls, empleado):
+        zona = timezone.get_current_timezone()
+        if empleado.zona_horaria:
+            try:
+                zona = ZoneInfo(empleado.zona_horaria)
+            except (ZoneInfoNotFoundError, ValueError):
+                pass
+
+        turno = empleado.turno if empleado.turno_id else None
+        if turno and turno.estado:
+            return cls(
+                inicio=_a_time(turno.hora_inicio),
+                fin=_a_time(turno.hora_fin),
+                tolerancia_minutos=turno.tolerancia_minutos,
+                comida_minutos=turno.tiempo_comida_minutos,
+                zona=zona,
+            )
+        return cls(
+            inicio=_a_time(empleado.hora_entrada_teorica),
+            fin=_a_time(empleado.hora_salida_teorica),
+            zona=zona,
+        )
+
+    @property
+    def nocturno(self):
+        return self.fin <= self.inicio
+
+    @property
+    def duracion(self):
+        inicio = datetime.combine(datetime.min, self.inicio)
+        fin = datetime.combine(datetime.min, self.fin)
+        if self.nocturno:
+            fin += UN_DIA
+        return fin - inicio
+
+    @property
+    def minutos_objetivo(self):
+        return max(0, int(self.duracion.total_seconds() // 60) - self.comida_minutos)
+
+    @property
+    def _antelacion(self):
+        # Mitad del descanso entre turnos: margen previo a la entrada que abre la ventana
+        return (UN_DIA - self.duracion) / 2
+
+    def inicio_en(self, fecha):
+        """Entrada teórica (aware) de la jornada `fecha`."""
+        return timezone.make_aware(datetime.combine(fecha, self.inicio), self.zona)
+
+    def ventana(self, fecha):
+        """Intervalo [desde, hasta) de marcas que pertenecen a la jornada `fecha`."""
+        desde = self.inicio_en(fecha) - self._antelacion
+        return desde, desde + UN_DIA
+
+    def fecha_jornada(self, momento):
+        """Fecha de la jornada a la que pertenece una marca."""
+        local = timezone.localtime(momento, self.zona)
+        fecha = local.date()
+        desde, hasta = self.ventana(fecha)
+        if local < desde:
+            return fecha - UN_DIA
+        if local >= hasta:
+            return fecha + UN_DIA
+        return fecha
+
+
+class JornadaService:
+    """
+    Motor de cálculo de jornadas a partir del flujo de EventoAsistencia.
+
+    La jornada guarda el estado del plegado (tramo o pausa abiertos, segundos acumulados
+    y la marca de agua del último evento aplicado), de modo que cada evento nuevo se
+    aplica en O(1) sin releer el día. Un evento igual o anterior a la marca de agua
+    (repetición o llegada fuera de orden) provoca un recálculo completo del día, lo que
+    hace la operación idempotente.
+
+    Uso: `registrar_evento` (vista/API), `aplicar_evento` (evento ya guardado),
+    `procesar_eventos` (importadores por lote) y `recalcular` (corrección/backfill).
+    """
+
+    @staticmethod
+    def horario(empleado):
+        return Horario.para_empleado(empleado)
+
+    @staticmethod
+    def registrar_evento(empleado, tipo, momento=None, **datos):
+        """
+        Crea la marca y la aplica a su jornada. Devuelve (evento, jornada).
+        Si la marca ya existe (mismo empleado, instante y tipo) se reutiliza la guardada.
+        """
+        momento = momento or timezone.now()
+        try:
+            with transaction.atomic():
+                evento = EventoAsistencia.objects.create(
+                    empleado=empleado, tipo=tipo, registrado_el=momento, **datos
+                )
+        except IntegrityError:
+            evento = EventoAsistencia.objects.get(
+                empleado=empleado, tipo=tipo, registrado_el=momento
+            )
+        return evento, JornadaService.aplicar_evento(evento)
+
+    @staticmethod
+    def aplicar_evento(evento, horario=None):
+        horario = horario or Horario.para_empleado(evento.empleado)
+        fecha = horario.fecha_jornada(evento.registrado_el)
+
+        with transaction.atomic():
+            jornada = JornadaService._bloquear(evento.empleado_id, fecha)
+            if JornadaService._requiere_recalculo(jornada, evento):
+                return JornadaService._reconstruir(jornada, horario)
+
+            JornadaService._plegar(jornada, evento, horario)
+            JornadaService._derivar(jornada, horario)
+            jornada.save()
+        return jornada
+
+    @staticmethod
+    def procesar_eventos(eventos):
+        """
+        Aplica un lote de eventos ya guardados (p. ej. de un importador) con una sola
+        escritura por (empleado, fecha). Devuelve {(empleado_id, fecha): jornada}.
+        Conviene pasar eventos con select_related("empleado__turno").
+        """
+        horarios = {}
+        grupos = {}
+        for evento in eventos:
+            horario = horarios.get(evento.empleado_id)
+            if horario is None:
+                horario = horarios[evento.empleado_id] = Horario.para_empleado(evento.empleado)
+            clave = (evento.empleado_id, horario.fecha_jornada(evento.registrado_el))
+            grupos.setdefault(clave, []).append(evento)
+
+        jornadas = {}
+        for (empleado_id, fecha), grupo in grupos.items():
+            horario = horarios[empleado_id]
+            grupo.sort(key=lambda e: (e.registrado_el, e.id))
+
+            with transaction.atomic():
+                jornada = JornadaService._bloquear(empleado_id, fecha)
+                if JornadaService._requiere_recalculo(jornada, grupo[0]):
+                    JornadaService._reconstruir(jornada, horario)
+                else:
+                    for evento in grupo:
+                        JornadaService._plegar(jornada, evento, horario)
+                    JornadaService._derivar(jornada, horario)
+                    jornada.save()
+            jornadas[(empleado_id, fecha)] = jornada
+        return jornadas
+
+    @staticmethod
+    def recalcular(empleado, fecha):
+        """Reconstruye la jornada releyendo todas sus marcas (idempotente)."""
+        horario = Horario.para_empleado(empleado)
+        with transaction.atomic():
+            jornada = JornadaService._bloquear(empleado.pk, fecha)
+            return JornadaService._reconstruir(jornada, horario)
+
+    # --- Internos ---
+
+    @staticmethod
+    def _bloquear(empleado_id, fecha):
+        jornada, _ = JornadaCalculada.objects.select_for_update().get_or_create(
+            empleado_id=empleado_id, fecha=fecha
+        )
+        return jornada
+
+    @staticmethod
+    def _requiere_recalculo(jornada, evento):
+        """True si el evento no puede plegarse sobre el estado guardado de la jornada."""
+        if jornada.ultimo_evento_el is None:
+            # Jornada con marcas pero sin estado de plegado (calculada antes de la
+            # migración 0004): se reconstruye releyendo el día
+            return jornada.hora_primera_entrada is not None or jornada.hora_ultima_salida is not None
+        return (evento.registrado_el, evento.id) <= (jornada.ultimo_evento_el, jornada.ultimo_evento_id)
+
+    @staticmethod
+    def _reconstruir(jornada, horario):
+        jornada.hora_primera_entrada = None
+        jornada.hora_ultima_salida = None
+        jornada.segundos_trabajados = 0
+        jornada.segundos_pausa = 0
+        jornada.inicio_tramo = None
+        jornada.inicio_pausa = None
+        jornada.ultimo_evento_el = None
+        jornada.ultimo_evento_id = None
+        jornada.minutos_tardanza = 0
+        jornada.estado = EstadoJornada.FALTA
+
+        desde, hasta = horario.ventana(jornada.fecha)
+        eventos = EventoAsistencia.objects.filter(
+            empleado_id=jornada.empleado_id,
+            registrado_el__gte=desde,
+            registrado_el__lt=hasta,
+        ).order_by("registrado_el", "id")
+
+        for evento in eventos:
+            JornadaService._plegar(jornada, evento, horario)
+        JornadaService._derivar(jornada, horario)
+        jornada.save()
+        return jornada
+
+    @staticmethod
+    def _segundos(desde, hasta):
+        return max(0, int((hasta - desde).total_seconds()))
+
+    @staticmethod
+    def _plegar(jornada, evento, horario):
+        """Transición de estado de la jornada para un único evento."""
+        momento = evento.registrado_el
+
+        if evento.tipo in (TipoEvento.CHECK_IN, TipoEvento.PAUSA_OUT):
+            if jornada.inicio_pausa:
+                jornada.segundos_pausa += JornadaService._segundos(jornada.inicio_pausa, momento)
+                jornada.inicio_pausa = None
+            if jornada.inicio_tramo is None:
+                jornada.inicio_tramo = momento
+
+            if evento.tipo == TipoEvento.CHECK_IN and jornada.hora_primera_entrada is None:
+                jornada.hora_primera_entrada = momento
+                retraso = int((momento - horario.inicio_en(jornada.fecha)).total_seconds() // 60)
+                jornada.minutos_tardanza = retraso if retraso > horario.tolerancia_minutos else 0
+
+        elif evento.tipo in (TipoEvento.PAUSA_IN, TipoEvento.CHECK_OUT):
+            if jornada.inicio_tramo:
+                jornada.segundos_trabajados += JornadaService._segundos(jornada.inicio_tramo, momento)
+                jornada.inicio_tramo = None
+
+            if evento.tipo == TipoEvento.PAUSA_IN:
+                if jornada.inicio_pausa is None:
+                    jornada.inicio_pausa = momento
+            else:
+                if jornada.inicio_pausa:
+                    jornada.segundos_pausa += JornadaService._segundos(jornada.inicio_pausa, momento)
+                    jornada.inicio_pausa = None
+                jornada.hora_ultima_salida = momento
+
+        jornada.ultimo_evento_el = momento
+        jornada.ultimo_evento_id = evento.id
+
+    @staticmethod
+    def _derivar(jornada, horario):
+        """Recalcula los campos de reporte a partir del estado acumulado."""
+        # El tiempo de comida no registrado como pausa se descuenta del trabajado
+        comida_pendiente = max(0, horario.comida_minutos * 60 - jornada.segundos_pausa)
+        trabajados = jornada.segundos_trabajados - min(comida_pendiente, jornada.segundos_trabajados)
+
+        objetivo = horario.minutos_objetivo
+        jornada.minutos_trabajados = trabajados // 60
+        jornada.minutos_extra = max(0, jornada.minutos_trabajados - objetivo)
+
+        abierta = jornada.inicio_tramo is not None or jornada.inicio_pausa is not None
+        if jornada.hora_primera_entrada is None:
+            if jornada.ultimo_evento_id is not None:
+                jornada.estado = EstadoJornada.INCOMPLETO
+        elif not abierta and jornada.minutos_trabajados < objetivo - 1:
+            jornada.estado = EstadoJornada.INCOMPLETO
+        elif jornada.minutos_tardanza > 0:
+            jornada.estado = EstadoJornada.ATRASO
+        else:
+            jornada.estado = EstadoJornada.PUNTUAL
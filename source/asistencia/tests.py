@@ -1,14 +1,21 @@
 import json
 from datetime import datetime, time, timedelta
+from io import StringIO
 from unittest.mock import patch
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.urls import reverse
 
 from core.models import Empresa, UnidadOrganizacional
 from empleados.models import Empleado, Puesto
-from asistencia.models import JornadaCalculada, EventoAsistencia
+from asistencia.models import JornadaCalculada, EventoAsistencia, Turno
+from asistencia.services.cierre_service import CierreJornadaService
+from asistencia.services.jornada_service import JornadaService
+from solicitudes.models import SolicitudAusencia, TipoAusencia
 
 User = get_user_model()
 
@@ -44,6 +51,278 @@ class AsistenciaWhiteBoxTests(TestCase):
         self.assertEqual(jornada.estado, JornadaCalculada.EstadoJornada.ATRASO)
         print("     Éxito: Atraso detectado correctamente.")
 
+class JornadaServiceWhiteBoxTests(TestCase):
+    """
+    Tests del motor incremental de jornadas:
+    - pausas, tolerancia y tiempo de comida del turno
+    - turnos nocturnos que cruzan la medianoche
+    - idempotencia ante repeticiones y eventos fuera de orden
+    """
+
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nombre_comercial="Mango Turnos", ruc="222")
+        self.unidad = UnidadOrganizacional.objects.create(nombre="Planta", empresa=self.empresa)
+        self.puesto = Puesto.objects.create(nombre="Operario", empresa=self.empresa)
+        self.turno_dia = Turno.objects.create(
+            empresa=self.empresa, nombre="Diurno", hora_inicio=time(8, 0), hora_fin=time(17, 0),
+            tolerancia_minutos=10, tiempo_comida_minutos=60
+        )
+        self.turno_noche = Turno.objects.create(
+            empresa=self.empresa, nombre="Nocturno", hora_inicio=time(22, 0), hora_fin=time(6, 0),
+            tolerancia_minutos=0, tiempo_comida_minutos=0
+        )
+        self.empleado = Empleado.objects.create(
+            nombres="Luis", apellidos="Mora", cedula="0202", email="luis@mango.com",
+            empresa=self.empresa, unidad_org=self.unidad, puesto=self.puesto,
+            fecha_ingreso="2024-01-01", turno=self.turno_dia
+        )
+        self.dia = datetime(2025, 3, 10).date()
+
+    def _momento(self, hora, minuto, dias=0):
+        local = datetime.combine(self.dia + timedelta(days=dias), time(hora, minuto))
+        return timezone.make_aware(local, timezone.get_current_timezone())
+
+    def _marcar(self, tipo, hora, minuto, dias=0):
+        return JornadaService.registrar_evento(self.empleado, tipo, momento=self._momento(hora, minuto, dias))
+
+    def test_pausas_tolerancia_y_comida_del_turno(self):
+        print("\n⏱️ [TEST] Iniciando: test_pausas_tolerancia_y_comida_del_turno")
+        T = EventoAsistencia.TipoEvento
+        self._marcar(T.CHECK_IN, 8, 5)     # dentro de la tolerancia (10 min)
+        self._marcar(T.PAUSA_IN, 12, 0)
+        self._marcar(T.PAUSA_OUT, 12, 45)  # 45 min de pausa: faltan 15 de comida
+        _, jornada = self._marcar(T.CHECK_OUT, 17, 10)
+
+        # Tramos: 235 + 265 = 500 min, menos 15 min de comida no registrada
+        self.assertEqual(jornada.minutos_tardanza, 0)
+        self.assertEqual(jornada.minutos_trabajados, 485)
+        self.assertEqual(jornada.minutos_extra, 5)
+        self.assertEqual(jornada.estado, JornadaCalculada.EstadoJornada.PUNTUAL)
+        print("     ✅ Éxito: Pausas, tolerancia y comida aplicadas.")
+
+    def test_turno_nocturno_cruza_medianoche(self):
+        print("\n🌙 [TEST] Iniciando: test_turno_nocturno_cruza_medianoche")
+        self.empleado.turno = self.turno_noche
+        self.empleado.save()
+        T = EventoAsistencia.TipoEvento
+
+        self._marcar(T.CHECK_IN, 22, 15)
+        _, jornada = self._marcar(T.CHECK_OUT, 6, 20, dias=1)
+
+        self.assertEqual(jornada.fecha, self.dia, "La salida de madrugada pertenece a la jornada de inicio")
+        self.assertEqual(JornadaCalculada.objects.filter(empleado=self.empleado).count(), 1)
+        self.assertEqual(jornada.minutos_trabajados, 485)
+        self.assertEqual(jornada.minutos_tardanza, 15)
+        self.assertEqual(jornada.estado, JornadaCalculada.EstadoJornada.ATRASO)
+        print("     ✅ Éxito: La jornada nocturna se consolida en un solo día.")
+
+    def test_evento_nuevo_no_relee_el_dia(self):
+        print("\n⚡ [TEST] Iniciando: test_evento_nuevo_no_relee_el_dia")
+        T = EventoAsistencia.TipoEvento
+        self._marcar(T.CHECK_IN, 8, 0)
+        evento = EventoAsistencia.objects.create(
+            empleado=self.empleado, tipo=T.CHECK_OUT, registrado_el=self._momento(17, 0)
+        )
+
+        with CaptureQueriesContext(connection) as consultas:
+            JornadaService.aplicar_evento(evento)
+
+        lecturas = [q['sql'] for q in consultas if 'FROM "evento_asistencia"' in q['sql']]
+        self.assertEqual(lecturas, [], "Un evento en orden no debe releer las marcas del día")
+        print("     ✅ Éxito: Aplicación incremental en O(1).")
+
+    def test_idempotente_ante_repeticion_y_desorden(self):
+        print("\n🔁 [TEST] Iniciando: test_idempotente_ante_repeticion_y_desorden")
+        T = EventoAsistencia.TipoEvento
+        self._marcar(T.CHECK_IN, 8, 30)
+        self._marcar(T.CHECK_OUT, 17, 30)
+        # Pausa que llega tarde (fuera de orden), p. ej. desde un biométrico
+        tardio = EventoAsistencia.objects.create(
+            empleado=self.empleado, tipo=T.PAUSA_IN, registrado_el=self._momento(12, 0)
+        )
+        EventoAsistencia.objects.create(
+            empleado=self.empleado, tipo=T.PAUSA_OUT, registrado_el=self._momento(13, 0)
+        )
+        JornadaService.aplicar_evento(tardio)
+        referencia = JornadaService.recalcular(self.empleado, self.dia)
+
+        # Repetir todo el flujo no altera el resultado
+        eventos = EventoAsistencia.objects.filter(empleado=self.empleado).select_related('empleado__turno')
+        JornadaService.procesar_eventos(list(eventos))
+        for evento in eventos:
+            JornadaService.aplicar_evento(evento)
+
+        jornada = JornadaCalculada.objects.get(empleado=self.empleado, fecha=self.dia)
+        self.assertEqual(jornada.minutos_trabajados, referencia.minutos_trabajados)
+        self.assertEqual(jornada.minutos_trabajados, 480)
+        self.assertEqual(jornada.minutos_tardanza, 30)
+        self.assertEqual(jornada.segundos_pausa, 3600)
+        print("     ✅ Éxito: El motor es idempotente.")
+
+    def test_registrar_evento_repetido_reutiliza_la_marca(self):
+        print("\n🔁 [TEST] Iniciando: test_registrar_evento_repetido_reutiliza_la_marca")
+        T = EventoAsistencia.TipoEvento
+        evento, _ = self._marcar(T.CHECK_IN, 8, 0)
+        repetido, jornada = self._marcar(T.CHECK_IN, 8, 0)
+
+        print(f"   ↳ Eventos: {evento.pk} / {repetido.pk}")
+        self.assertEqual(repetido.pk, evento.pk)
+        self.assertEqual(EventoAsistencia.objects.filter(empleado=self.empleado).count(), 1)
+        self.assertEqual(jornada.hora_primera_entrada, evento.registrado_el)
+        print("     ✅ Éxito: la marca repetida no provoca un IntegrityError.")
+
+    def test_jornada_sin_estado_de_plegado_se_recalcula(self):
+        print("\n🔁 [TEST] Iniciando: test_jornada_sin_estado_de_plegado_se_recalcula")
+        T = EventoAsistencia.TipoEvento
+        self._marcar(T.CHECK_IN, 8, 0)
+        # Jornada calculada antes de la migración 0004: con marcas pero sin marca de agua
+        JornadaCalculada.objects.filter(empleado=self.empleado, fecha=self.dia).update(
+            ultimo_evento_el=None, ultimo_evento_id=None, inicio_tramo=None, segundos_trabajados=0
+        )
+
+        _, jornada = self._marcar(T.CHECK_OUT, 17, 0)
+
+        print(f"   ↳ Minutos trabajados: {jornada.minutos_trabajados}")
+        self.assertEqual(jornada.minutos_trabajados, 480)
+        self.assertEqual(jornada.hora_primera_entrada, self._momento(8, 0))
+        print("     ✅ Éxito: la jornada heredada se reconstruye desde sus marcas.")
+
+    def test_deduplicar_marcaciones_solo_informa_sin_aplicar(self):
+        print("\n🧹 [TEST] Iniciando: test_deduplicar_marcaciones_solo_informa_sin_aplicar")
+        self._marcar(EventoAsistencia.TipoEvento.CHECK_IN, 8, 0)
+        salida = StringIO()
+        call_command('deduplicar_marcaciones', stdout=salida)
+
+        print(f"   ↳ Salida: {salida.getvalue().strip()}")
+        self.assertIn("0 grupos con 0 marcas repetidas", salida.getvalue())
+        self.assertEqual(EventoAsistencia.objects.filter(empleado=self.empleado).count(), 1)
+        print("     ✅ Éxito: la revisión no borra marcas.")
+
+
+class CierreJornadaWhiteBoxTests(TestCase):
+    """
+    Tests del cierre masivo de asistencia:
+    - FALTA / LIBRE / PERMISO según días laborales y solicitudes aprobadas
+    - idempotencia y consultas independientes del tamaño del rango
+    """
+
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nombre_comercial="Mango Cierre", ruc="333")
+        self.unidad = UnidadOrganizacional.objects.create(nombre="Planta", empresa=self.empresa)
+        self.puesto = Puesto.objects.create(nombre="Operario", empresa=self.empresa)
+        self.empleado = Empleado.objects.create(
+            nombres="Eva", apellidos="Paz", cedula="0303", email="eva@mango.com",
+            empresa=self.empresa, unidad_org=self.unidad, puesto=self.puesto,
+            fecha_ingreso="2024-01-01", dias_laborales="LUN,MAR,MIE,JUE,VIE"
+        )
+        self.tipo = TipoAusencia.objects.create(empresa=self.empresa, nombre="Permiso")
+        self.lunes = datetime(2025, 3, 10).date()
+
+    def _dia(self, n):
+        return self.lunes + timedelta(days=n)
+
+    def _aprobar(self, desde, hasta):
+        SolicitudAusencia.objects.create(
+            empresa=self.empresa, empleado=self.empleado, ausencia=self.tipo,
+            fecha_inicio=desde, fecha_fin=hasta, motivo="Trámite",
+            estado=SolicitudAusencia.Estado.APROBADO
+        )
+
+    def _estados(self):
+        return dict(JornadaCalculada.objects.filter(empleado=self.empleado).values_list('fecha', 'estado'))
+
+    def test_cierre_semana_clasifica_dias(self):
+        print("\n📆 [TEST] Iniciando: test_cierre_semana_clasifica_dias")
+        E = JornadaCalculada.EstadoJornada
+        entrada = timezone.make_aware(datetime.combine(self.lunes, time(8, 55)))
+        JornadaService.registrar_evento(self.empleado, EventoAsistencia.TipoEvento.CHECK_IN, momento=entrada)
+        self._aprobar(self._dia(2), self._dia(2))
+
+        resumen = CierreJornadaService.cerrar_rango(self.empresa, self.lunes, self._dia(6))
+        estados = self._estados()
+
+        self.assertEqual(estados[self.lunes], E.PUNTUAL, "Las jornadas con marcas no se tocan")
+        self.assertEqual(estados[self._dia(1)], E.FALTA)
+        self.assertEqual(estados[self._dia(2)], E.PERMISO)
+        self.assertEqual(estados[self._dia(5)], E.LIBRE)
+        self.assertEqual(estados[self._dia(6)], E.LIBRE)
+        self.assertEqual(resumen['creadas'], 6)
+
+        # Reprocesar es idempotente y recoge permisos aprobados después del cierre
+        self._aprobar(self._dia(1), self._dia(1))
+        resumen = CierreJornadaService.cerrar_rango(self.empresa, self.lunes, self._dia(6))
+        self.assertEqual(resumen['creadas'], 0)
+        self.assertEqual(resumen['actualizadas'], 1)
+        self.assertEqual(self._estados()[self._dia(1)], E.PERMISO)
+        print("     ✅ Éxito: FALTA, LIBRE y PERMISO asignados en bloque.")
+
+    def test_creadas_cuenta_solo_filas_insertadas(self):
+        print("\n🧮 [TEST] Iniciando: test_creadas_cuenta_solo_filas_insertadas")
+        E = JornadaCalculada.EstadoJornada
+        claves_originales = CierreJornadaService._claves_existentes
+        llamadas = []
+
+        def cierre_concurrente(jornadas):
+            # Otro proceso inserta la jornada del martes justo antes que este cierre
+            if not llamadas:
+                JornadaCalculada.objects.create(empleado=self.empleado, fecha=self._dia(1), estado=E.FALTA)
+            llamadas.append(1)
+            return claves_originales(jornadas)
+
+        with patch.object(CierreJornadaService, "_claves_existentes", side_effect=cierre_concurrente):
+            resumen = CierreJornadaService.cerrar_rango(self.empresa, self.lunes, self._dia(2))
+
+        print(f"   ↳ Resumen: {resumen}")
+        self.assertEqual(resumen['creadas'], 2, "La fila omitida por conflicto no se cuenta")
+        self.assertEqual(JornadaCalculada.objects.filter(empleado=self.empleado).count(), 3)
+        print("     ✅ Éxito: el resumen refleja las filas realmente insertadas.")
+
+    def test_aviso_de_falta_actualiza_contador(self):
+        print("\n🔔 [TEST] Iniciando: test_aviso_de_falta_actualiza_contador")
+        from notificaciones.models import Notificacion
+        from notificaciones.services.notificacion_service import NotificacionService
+
+        usuario = User.objects.get(empleado=self.empleado)
+        previas = usuario.notificaciones_no_leidas
+
+        # Martes laborable sin marcas -> FALTA con aviso
+        CierreJornadaService.cerrar_dia(self.empresa, self._dia(1), notificar=True)
+
+        usuario.refresh_from_db()
+        print(f"   ↳ No leídas: {previas} -> {usuario.notificaciones_no_leidas}")
+        self.assertEqual(usuario.notificaciones_no_leidas, previas + 1)
+        self.assertEqual(
+            usuario.notificaciones_no_leidas, Notificacion.objects.filter(usuario=usuario, leido=False).count()
+        )
+        resumen = NotificacionService.obtener_resumen_navbar(usuario)
+        self.assertIn("Ausencia Registrada", [n.titulo for n in resumen["ultimas"]])
+        print("     ✅ Éxito: el aviso de falta llega a la campana.")
+
+    def test_consultas_no_dependen_del_rango(self):
+        print("\n📊 [TEST] Iniciando: test_consultas_no_dependen_del_rango")
+        with CaptureQueriesContext(connection) as un_dia:
+            CierreJornadaService.cerrar_rango(self.empresa, self.lunes, self.lunes)
+        with CaptureQueriesContext(connection) as dos_meses:
+            CierreJornadaService.cerrar_rango(self.empresa, self._dia(1), self._dia(60))
+
+        self.assertEqual(len(un_dia), len(dos_meses))
+        self.assertEqual(JornadaCalculada.objects.filter(empleado=self.empleado).count(), 61)
+        print(f"   ↳ Consultas por cierre: {len(dos_meses)}")
+        print("     ✅ Éxito: El backfill es set-based.")
+
+    def test_comando_cierre_rechaza_dias_futuros(self):
+        print("\n🛑 [TEST] Iniciando: test_comando_cierre_rechaza_dias_futuros")
+        from django.core.management.base import CommandError
+        with self.assertRaises(CommandError):
+            call_command('cerrar_jornadas', fecha=timezone.localdate().isoformat(), stdout=StringIO())
+
+        salida = StringIO()
+        call_command('cerrar_jornadas', empresa=self.empresa.id, desde='2025-03-10', hasta='2025-03-16', stdout=salida)
+        self.assertIn("Cierre de asistencia completado", salida.getvalue())
+        self.assertEqual(JornadaCalculada.objects.filter(empleado=self.empleado).count(), 7)
+        print("     ✅ Éxito: El comando valida el rango y cierra los días.")
+
+
 class AsistenciaApiWhiteBoxTests(TestCase):
     def setUp(self):
         self.empresa_A = Empresa.objects.create(nombre_comercial="Empresa A", ruc="A")
@@ -72,4 +351,17 @@ class AsistenciaApiWhiteBoxTests(TestCase):
         response = self.client.get(url, {'empleado_id': self.emp_B.id, 'fecha': '2025-01-01'})
         data = response.json()
         self.assertEqual(len(data.get('eventos', [])), 0)
-        print("      Éxito: Aislamiento de API verificado.")
\ No newline at end of file
+        print("      Éxito: Aislamiento de API verificado.")
+    def test_api_marca_duplicada_responde_400(self):
+        print("\n🧮 [TEST] Iniciando: test_api_marca_duplicada_responde_400")
+        url = reverse('eventoasistencia-list')
+        datos = {'empleado': self.emp_A.id, 'tipo': 'check_in', 'registrado_el': '2025-01-02T08:00:00Z'}
+
+        primera = self.client.post(url, datos)
+        segunda = self.client.post(url, datos)
+
+        print(f"   ↳ Códigos: {primera.status_code} -> {segunda.status_code}")
+        self.assertEqual(primera.status_code, 201)
+        self.assertEqual(segunda.status_code, 400)
+        self.assertEqual(EventoAsistencia.objects.filter(empleado=self.emp_A).count(), 1)
+        print("     ✅ Éxito: el duplicado se rechaza con un error de validación.")
@@ -9,6 +9,7 @@ from django.http import JsonResponse
 
 from empleados.models import Empleado
 from .models import JornadaCalculada, EventoAsistencia
+from .services.jornada_service import JornadaService
 
 # redirección inicial según el rol del usuario
 @login_required
@@ -42,7 +43,6 @@ def registrar_marca_view(request):
     empleado = usuario.empleado
     accion = request.POST.get('tipo_marca')
     ahora = timezone.localtime(timezone.now())
-    hoy = ahora.date()
 
     tipo_map = {
         'entrada': EventoAsistencia.TipoEvento.CHECK_IN,
@@ -55,65 +55,36 @@ def registrar_marca_view(request):
         messages.error(request, "Acción no válida.")
         return redirect('asistencia:zona_marcaje')
 
-    EventoAsistencia.objects.create(
+    evento, jornada = JornadaService.registrar_evento(
         empleado=empleado,
         tipo=tipo_map[accion],
-        registrado_el=ahora,
+        momento=ahora,
         origen='web',
         ip_address=request.META.get('REMOTE_ADDR')
     )
+    _notificar_resultado_marca(request, accion, evento, jornada, JornadaService.horario(empleado))
 
-    jornada, created = JornadaCalculada.objects.get_or_create(
-        empleado=empleado,
-        fecha=hoy
-    )
+    return redirect('asistencia:zona_marcaje')
 
-    if accion == 'entrada':
-        if not jornada.hora_primera_entrada:
-            jornada.hora_primera_entrada = ahora
-            
-            hora_teorica_naive = datetime.combine(hoy, empleado.hora_entrada_teorica)
-            hora_teorica_aware = timezone.make_aware(hora_teorica_naive, timezone.get_current_timezone())
-            margen = timedelta(minutes=0) 
+# mensajes al usuario según el resultado calculado por el motor de jornadas
+def _notificar_resultado_marca(request, accion, evento, jornada, horario):
+    Estado = JornadaCalculada.EstadoJornada
 
-            if ahora > (hora_teorica_aware + margen):
-                diferencia = ahora - hora_teorica_aware
-                minutos_tarde = int(diferencia.total_seconds() / 60)
-                jornada.minutos_tardanza = minutos_tarde
-                jornada.estado = JornadaCalculada.EstadoJornada.ATRASO
-                messages.warning(request, f"Entrada con {minutos_tarde} min de atraso.")
-            else:
-                jornada.minutos_tardanza = 0
-                jornada.estado = JornadaCalculada.EstadoJornada.PUNTUAL
-                messages.success(request, "Entrada puntual registrada.")
-        else:
+    if accion == 'entrada':
+        if jornada.hora_primera_entrada != evento.registrado_el:
             messages.info(request, "Entrada registrada (ya existía).")
-
-    elif accion == 'salida':
-        jornada.hora_ultima_salida = ahora
-        
-        if jornada.hora_primera_entrada:
-            tiempo_trabajado = ahora - jornada.hora_primera_entrada
-            jornada.minutos_trabajados = int(tiempo_trabajado.total_seconds() / 60)
+        elif jornada.minutos_tardanza > 0:
+            messages.warning(request, f"Entrada con {jornada.minutos_tardanza} min de atraso.")
         else:
-            jornada.minutos_trabajados = 0
+            messages.success(request, "Entrada puntual registrada.")
 
-        inicio_teorico = datetime.combine(hoy, empleado.hora_entrada_teorica)
-        fin_teorico = datetime.combine(hoy, empleado.hora_salida_teorica)
-        if fin_teorico < inicio_teorico:
-            fin_teorico += timedelta(days=1)
-        duracion_teorica = fin_teorico - inicio_teorico
-        minutos_objetivo = int(duracion_teorica.total_seconds() / 60)
-
-        if jornada.minutos_trabajados < (minutos_objetivo - 1):
-            jornada.estado = JornadaCalculada.EstadoJornada.FALTA
-            faltan = minutos_objetivo - jornada.minutos_trabajados
+    elif accion == 'salida':
+        if jornada.estado == Estado.INCOMPLETO:
+            faltan = horario.minutos_objetivo - jornada.minutos_trabajados
             messages.error(request, f"JORNADA INCOMPLETA (Faltaron {faltan} min).")
-        elif jornada.minutos_tardanza > 0:
-            jornada.estado = JornadaCalculada.EstadoJornada.ATRASO
+        elif jornada.estado == Estado.ATRASO:
             messages.warning(request, "Horas cumplidas, pero mantienes el atraso de entrada.")
         else:
-            jornada.estado = JornadaCalculada.EstadoJornada.PUNTUAL
             messages.success(request, "¡Jornada perfecta! Salida registrada.")
 
     elif accion == 'pausa_in':
@@ -121,9 +92,6 @@ def registrar_marca_view(request):
     elif accion == 'pausa_out':
         messages.info(request, "Fin de descanso registrado.")
 
-    jornada.save()
-    return redirect('asistencia:zona_marcaje')
-
 # panel de control y calendario de asistencia
 @login_required
 @require_safe
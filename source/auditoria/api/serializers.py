@@ -24,4 +24,5 @@ class LogAuditoriaSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = LogAuditoria
-        fields = "__all__"
+        # El tsvector de búsqueda es una columna interna
+        exclude = ["busqueda"]
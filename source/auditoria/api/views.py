@@ -1,9 +1,21 @@
 from rest_framework import viewsets
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import IsAdminUser
 from auditoria.models import LogAuditoria
 from .serializers import LogAuditoriaSerializer
 
 
+class LogAuditoriaCursorPagination(CursorPagination):
+    """
+    Paginación por cursor (keyset) sobre el índice (fecha, id).
+    Evita COUNT y OFFSET, cuyo coste crece con el tamaño de la tabla.
+    """
+    ordering = ("-fecha", "-id")
+    page_size = 50
+    max_page_size = 500
+    page_size_query_param = "page_size"
+
+
 class LogAuditoriaViewSet(viewsets.ReadOnlyModelViewSet):
     """
     Endpoint de solo lectura para consultar el historial de auditoría.
@@ -15,9 +27,10 @@ class LogAuditoriaViewSet(viewsets.ReadOnlyModelViewSet):
         LogAuditoria.objects
         .select_related("usuario")
         .all()
-        .order_by("-fecha")
+        .order_by("-fecha", "-id")
     )
     serializer_class = LogAuditoriaSerializer
+    pagination_class = LogAuditoriaCursorPagination
 
     # Acceso restringido a usuarios administradores
     permission_classes = [IsAdminUser]
@@ -0,0 +1,92 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from auditoria.services.particion_service import (
+    AUDITORIA_PARTICIONES_ADELANTE,
+    AUDITORIA_RETENCION_MESES,
+    ParticionService,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Gestiona el almacenamiento particionado por mes de LogAuditoria (PostgreSQL) "
+        "y aplica la política de retención/archivado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--convertir",
+            action="store_true",
+            help="Convierte la tabla actual en una tabla particionada por mes (operación única).",
+        )
+        parser.add_argument(
+            "--meses-adelante",
+            type=int,
+            default=AUDITORIA_PARTICIONES_ADELANTE,
+            help="Particiones a crear por adelantado (por defecto: %(default)s).",
+        )
+        parser.add_argument(
+            "--retencion-meses",
+            type=int,
+            default=AUDITORIA_RETENCION_MESES,
+            help="Meses de historial a conservar; 0 desactiva la retención (por defecto: %(default)s).",
+        )
+        parser.add_argument(
+            "--eliminar",
+            action="store_true",
+            help="Elimina los datos vencidos en lugar de archivarlos.",
+        )
+        parser.add_argument(
+            "--tam-lote",
+            type=int,
+            default=5000,
+            help="Filas por lote al borrar en tablas no particionadas.",
+        )
+
+    def handle(self, *args, **options):
+        if options["convertir"]:
+            try:
+                convertida = ParticionService.convertir_a_particionada(options["meses_adelante"])
+            except RuntimeError as exc:
+                raise CommandError(str(exc))
+            if convertida:
+                self.stdout.write(self.style.SUCCESS("Tabla de auditoría convertida a particionada por mes."))
+            else:
+                self.stdout.write("La tabla de auditoría ya estaba particionada.")
+
+        if ParticionService.esta_particionada():
+            sentencias = ParticionService.crear_particiones(options["meses_adelante"])
+            self.stdout.write(f"Particiones verificadas: {len(sentencias)} meses.")
+        else:
+            self.stdout.write("Tabla no particionada: se omite la creación de particiones.")
+
+        retencion = options["retencion_meses"]
+        if retencion <= 0:
+            self.stdout.write("Retención desactivada.")
+            return
+
+        resumen = ParticionService.aplicar_retencion(
+            retencion_meses=retencion,
+            eliminar=options["eliminar"],
+            tam_lote=options["tam_lote"],
+        )
+
+        if resumen["particiones"]:
+            accion = "eliminadas" if options["eliminar"] else "archivadas"
+            self.stdout.write(f"Particiones {accion}: {', '.join(resumen['particiones'])}")
+        elif not ParticionService.esta_particionada() and not options["eliminar"]:
+            self.stdout.write(
+                "Tabla no particionada: el archivado requiere particiones. "
+                "Use --eliminar para borrar por lotes los registros anteriores a "
+                f"{resumen['limite']:%Y-%m-%d}."
+            )
+
+        if resumen["filas_eliminadas"]:
+            self.stdout.write(f"Registros eliminados: {resumen['filas_eliminadas']}")
+        if resumen["filas_default"]:
+            self.stdout.write(
+                f"La partición DEFAULT conserva {resumen['filas_default']} registros anteriores a "
+                f"{resumen['limite']:%Y-%m-%d}: no se archivan por mes; use --eliminar para borrarlos."
+            )
+
+        self.stdout.write(self.style.SUCCESS("Política de retención aplicada correctamente."))
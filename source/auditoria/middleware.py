@@ -13,6 +13,9 @@ class AuditoriaMiddleware:
     """
     Middleware que guarda el usuario autenticado en thread-local
     durante el ciclo de vida de la petición y lo limpia al finalizar.
+
+    Además abre un lote de auditoría: los registros generados por la petición
+    se escriben juntos (bulk_create) al terminarla.
     """
 
     def __init__(self, get_response):
@@ -22,8 +25,12 @@ class AuditoriaMiddleware:
         # Entrada: asociar el usuario al hilo actual
         _thread_locals.user = getattr(request, "user", None)
 
+        # Importación tardía: el servicio depende de los modelos de la app
+        from auditoria.services.auditoria_service import AuditoriaService
+
         try:
-            response = self.get_response(request)
+            with AuditoriaService.lote():
+                response = self.get_response(request)
         finally:
             # Salida: limpiar el thread-local para evitar fugas entre peticiones
             _thread_locals.user = None
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.3 on 2026-10-18 12:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='logauditoria',
+            index=models.Index(fields=['fecha', 'id'], name='log_aud_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logauditoria',
+            index=models.Index(fields=['modulo', 'modelo', 'objeto_id'], name='log_aud_objeto_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logauditoria',
+            index=models.Index(fields=['usuario', 'fecha'], name='log_aud_usuario_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.0.3 on 2026-10-18 12:46
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# SQL fijo al momento de esta migración (no se importan servicios de la app,
+# cuyo contenido puede cambiar después). Solo PostgreSQL: trigger que mantiene el
+# tsvector, relleno de las filas existentes e índices GIN (tsvector y pg_trgm).
+SQL_INSTALAR = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE OR REPLACE FUNCTION log_aud_detalle_busqueda_trg() RETURNS trigger AS $$
+    BEGIN
+        NEW.busqueda := to_tsvector('spanish', coalesce(NEW.detalle, ''));
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS log_aud_detalle_busqueda_trg ON auditoria_logauditoria",
+    "CREATE TRIGGER log_aud_detalle_busqueda_trg BEFORE INSERT OR UPDATE OF detalle "
+    "ON auditoria_logauditoria "
+    "FOR EACH ROW EXECUTE FUNCTION log_aud_detalle_busqueda_trg()",
+    "UPDATE auditoria_logauditoria SET busqueda = to_tsvector('spanish', coalesce(detalle, ''))",
+    "CREATE INDEX IF NOT EXISTS log_aud_detalle_vector_gin ON auditoria_logauditoria USING gin (busqueda)",
+    "CREATE INDEX IF NOT EXISTS log_aud_detalle_trgm_gin ON auditoria_logauditoria "
+    "USING gin (UPPER(detalle::text) gin_trgm_ops)",
+]
+
+SQL_DESINSTALAR = [
+    "DROP INDEX IF EXISTS log_aud_detalle_trgm_gin",
+    "DROP INDEX IF EXISTS log_aud_detalle_vector_gin",
+    "DROP TRIGGER IF EXISTS log_aud_detalle_busqueda_trg ON auditoria_logauditoria",
+    "DROP FUNCTION IF EXISTS log_aud_detalle_busqueda_trg()",
+]
+
+
+def _ejecutar(schema_editor, sentencias):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for sql in sentencias:
+        schema_editor.execute(sql, params=None)
+
+
+def instalar_busqueda(apps, schema_editor):
+    _ejecutar(schema_editor, SQL_INSTALAR)
+
+
+def desinstalar_busqueda(apps, schema_editor):
+    _ejecutar(schema_editor, SQL_DESINSTALAR)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria', '0002_indices_logauditoria'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='logauditoria',
+            name='busqueda',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        # PostgreSQL: trigger tsvector + índices GIN (tsvector y pg_trgm sobre detalle)
+        migrations.RunPython(instalar_busqueda, desinstalar_busqueda),
+    ]
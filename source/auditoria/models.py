@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from auditoria.constants import AccionesLog
 
 
@@ -22,10 +23,21 @@ class LogAuditoria(models.Model):
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     fecha = models.DateTimeField(auto_now_add=True)
 
+    # tsvector de `detalle`, mantenido por trigger en PostgreSQL (ver BusquedaService)
+    busqueda = SearchVectorField(null=True, editable=False)
+
     class Meta:
         verbose_name = "Registro de Auditoría"
         verbose_name_plural = "Registros de Auditoría"
         ordering = ["-fecha"]
+        indexes = [
+            # Listados y paginación por cursor (fecha, id)
+            models.Index(fields=["fecha", "id"], name="log_aud_fecha_idx"),
+            # Historial de un objeto concreto
+            models.Index(fields=["modulo", "modelo", "objeto_id"], name="log_aud_objeto_idx"),
+            # Actividad de un usuario en el tiempo
+            models.Index(fields=["usuario", "fecha"], name="log_aud_usuario_fecha_idx"),
+        ]
 
     def __str__(self):
         return f"[{self.fecha}] {self.usuario} - {self.accion} {self.modelo}"
@@ -0,0 +1,126 @@
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+
+from auditoria.models import LogAuditoria
+from auditoria.services.escritor_asincrono import EscritorAuditoriaAsincrono
+
+logger = logging.getLogger("auditoria_app")
+
+# Configuración del pipeline de auditoría
+AUDITORIA_TAM_LOTE = getattr(settings, "AUDITORIA_TAM_LOTE", 500)
+AUDITORIA_ASINCRONA = getattr(settings, "AUDITORIA_ASINCRONA", False)
+AUDITORIA_COLA_CAPACIDAD = getattr(settings, "AUDITORIA_COLA_CAPACIDAD", 10000)
+
+# Estado por hilo: profundidad de lotes abiertos y registros confirmados pendientes de volcar
+_estado = threading.local()
+
+
+def _escribir_en_bd(logs):
+    LogAuditoria.objects.bulk_create(logs, batch_size=AUDITORIA_TAM_LOTE)
+
+
+class AuditoriaService:
+    """
+    Pipeline de escritura de auditoría.
+
+    - Fuera de un lote el registro se guarda al instante (comportamiento clásico).
+    - Dentro de un lote (`AuditoriaService.lote()`, abierto por el middleware en cada
+      petición) cada registro espera al commit de su transacción: si la transacción
+      se revierte, el registro se descarta. Los registros confirmados se acumulan y
+      se escriben con un único bulk_create al cerrar el lote (o al llenar un bloque).
+    - Con AUDITORIA_ASINCRONA=True el volcado se delega a un hilo de fondo con cola
+      acotada (ver EscritorAuditoriaAsincrono).
+    """
+
+    _escritor_asincrono = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def registrar(usuario, accion, modelo, instance, detalle):
+        log = LogAuditoria(
+            usuario=usuario if (usuario and usuario.is_authenticated) else None,
+            accion=accion,
+            modulo=modelo._meta.app_label.upper(),
+            modelo=modelo._meta.model_name.upper(),
+            objeto_id=str(instance.pk),
+            detalle=detalle,
+        )
+
+        if not AuditoriaService.en_lote():
+            log.save()
+            return
+
+        transaction.on_commit(partial(AuditoriaService._confirmado, log))
+
+    @staticmethod
+    def en_lote():
+        return getattr(_estado, "profundidad", 0) > 0
+
+    @staticmethod
+    @contextmanager
+    def lote():
+        """
+        Agrupa los registros de auditoría hasta el cierre del bloque.
+        Admite anidamiento; solo el bloque más externo vuelca los registros.
+        También puede usarse como decorador: @AuditoriaService.lote()
+        """
+        _estado.profundidad = getattr(_estado, "profundidad", 0) + 1
+        try:
+            yield
+        finally:
+            _estado.profundidad -= 1
+            if _estado.profundidad == 0:
+                AuditoriaService.volcar()
+
+    @staticmethod
+    def volcar():
+        """Persiste los registros confirmados pendientes del hilo actual."""
+        logs = getattr(_estado, "confirmados", None)
+        if not logs:
+            return
+        _estado.confirmados = []
+
+        if AUDITORIA_ASINCRONA:
+            AuditoriaService._obtener_escritor_asincrono().encolar(logs)
+            return
+
+        try:
+            _escribir_en_bd(logs)
+        except Exception:
+            logger.exception("No se pudieron persistir %s registros de auditoría", len(logs))
+
+    @staticmethod
+    def metricas():
+        """Métricas de la cola asíncrona (vacío si el modo asíncrono no está en uso)."""
+        escritor = AuditoriaService._escritor_asincrono
+        return escritor.metricas() if escritor else {}
+
+    @staticmethod
+    def _confirmado(log):
+        # Callback on_commit: la transacción del registro se confirmó
+        if not hasattr(_estado, "confirmados"):
+            _estado.confirmados = []
+        _estado.confirmados.append(log)
+
+        # Fuera de lote (p. ej. commit posterior al cierre) o bloque lleno: volcar ya
+        if not AuditoriaService.en_lote() or len(_estado.confirmados) >= AUDITORIA_TAM_LOTE:
+            AuditoriaService.volcar()
+
+    @staticmethod
+    def _obtener_escritor_asincrono():
+        with AuditoriaService._lock:
+            if AuditoriaService._escritor_asincrono is None:
+                escritor = EscritorAuditoriaAsincrono(
+                    escritor=_escribir_en_bd,
+                    capacidad=AUDITORIA_COLA_CAPACIDAD,
+                    tam_lote=AUDITORIA_TAM_LOTE,
+                )
+                atexit.register(escritor.detener)
+                AuditoriaService._escritor_asincrono = escritor
+        return AuditoriaService._escritor_asincrono
@@ -0,0 +1,125 @@
+import logging
+import queue
+import threading
+
+from django.db import close_old_connections
+
+logger = logging.getLogger("auditoria_app")
+
+
+class EscritorAuditoriaAsincrono:
+    """
+    Hilo de fondo que persiste registros de auditoría en lotes. `escritor` recibe
+    cada lote, por lo que también sirve para otros registros (p. ej. notificaciones).
+
+    - La cola está acotada (`capacidad`): si se llena, el productor espera hasta
+      `timeout_encolado` y, si sigue llena, escribe el resto de forma síncrona
+      (backpressure). Nunca se pierden registros.
+    - `metricas()` expone contadores para monitorear la presión sobre la cola.
+    """
+
+    def __init__(self, escritor, capacidad=10000, tam_lote=500, timeout_encolado=0.05, intervalo=1.0, nombre="auditoria"):
+        self.escritor = escritor
+        self.nombre = nombre
+        self.tam_lote = tam_lote
+        self.timeout_encolado = timeout_encolado
+        self.intervalo = intervalo
+
+        self._cola = queue.Queue(maxsize=capacidad)
+        self._hilo = None
+        self._detener = threading.Event()
+        self._lock = threading.Lock()
+        self._metricas = {
+            "encolados": 0,
+            "escritos": 0,
+            "lotes": 0,
+            "escrituras_sincronas": 0,
+            "errores": 0,
+            "profundidad_max": 0,
+        }
+
+    # --- Productor ---
+
+    def encolar(self, logs):
+        """Encola los registros; los que no caben se escriben en el hilo llamador."""
+        self.iniciar()
+
+        for indice, log in enumerate(logs):
+            try:
+                self._cola.put(log, timeout=self.timeout_encolado)
+            except queue.Full:
+                restantes = list(logs[indice:])
+                self._sumar("escrituras_sincronas", len(restantes))
+                self._escribir(restantes)
+                break
+            else:
+                self._sumar("encolados", 1)
+
+        profundidad = self._cola.qsize()
+        with self._lock:
+            if profundidad > self._metricas["profundidad_max"]:
+                self._metricas["profundidad_max"] = profundidad
+
+    # --- Ciclo de vida ---
+
+    def iniciar(self):
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._hilo is not None and self._hilo.is_alive():
+                return
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._bucle, name=f"{self.nombre}-escritor", daemon=True)
+            self._hilo.start()
+
+    def detener(self, timeout=5.0):
+        """Solicita la parada y espera a que la cola se vacíe."""
+        if self._hilo is None:
+            return
+        self._detener.set()
+        self._hilo.join(timeout)
+        self._hilo = None
+
+    def metricas(self):
+        with self._lock:
+            datos = dict(self._metricas)
+        datos["profundidad_actual"] = self._cola.qsize()
+        datos["capacidad"] = self._cola.maxsize
+        return datos
+
+    # --- Consumidor ---
+
+    def _bucle(self):
+        while True:
+            try:
+                primero = self._cola.get(timeout=self.intervalo)
+            except queue.Empty:
+                if self._detener.is_set():
+                    break
+                continue
+
+            lote = [primero]
+            while len(lote) < self.tam_lote:
+                try:
+                    lote.append(self._cola.get_nowait())
+                except queue.Empty:
+                    break
+
+            close_old_connections()
+            self._escribir(lote)
+            self._sumar("lotes", 1)
+
+        close_old_connections()
+
+    def _escribir(self, logs):
+        try:
+            self.escritor(logs)
+        except Exception:
+            self._sumar("errores", len(logs))
+            logger.exception("No se pudieron persistir %s registros (%s)", len(logs), self.nombre)
+        else:
+            self._sumar("escritos", len(logs))
+
+    def _sumar(self, clave, cantidad):
+        with self._lock:
+            self._metricas[clave] += cantidad
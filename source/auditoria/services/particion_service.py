@@ -0,0 +1,240 @@
+import re
+from datetime import date, datetime, time, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from auditoria.models import LogAuditoria
+from core.services.busqueda_service import BusquedaService
+
+# Política por defecto (sobrescribible en settings)
+AUDITORIA_RETENCION_MESES = getattr(settings, "AUDITORIA_RETENCION_MESES", 12)
+AUDITORIA_PARTICIONES_ADELANTE = getattr(settings, "AUDITORIA_PARTICIONES_ADELANTE", 3)
+
+# Prefijo del trigger e índices de búsqueda sobre `detalle` (migración 0003_busqueda)
+PREFIJO_BUSQUEDA = "log_aud_detalle"
+
+
+def sumar_meses(fecha, meses):
+    """Primer día del mes desplazado `meses` respecto a `fecha`."""
+    indice = fecha.year * 12 + (fecha.month - 1) + meses
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def mes_utc(momento=None):
+    """Primer día del mes UTC de `momento` (por defecto ahora): la columna fecha es timestamptz."""
+    return (momento or timezone.now()).astimezone(dt_timezone.utc).date().replace(day=1)
+
+
+def inicio_utc(dia):
+    """Medianoche UTC del día: límite de partición y de retención."""
+    return datetime.combine(dia, time.min, tzinfo=dt_timezone.utc)
+
+
+class ParticionService:
+    """
+    Almacenamiento particionado por mes de LogAuditoria (solo PostgreSQL) y
+    política de retención.
+
+    - `convertir_a_particionada()` transforma la tabla en una tabla PARTITION BY
+      RANGE (fecha) con una partición por mes UTC más una partición DEFAULT.
+    - `crear_particiones()` crea por adelantado las particiones de los próximos meses.
+    - `aplicar_retencion()` separa (archiva) o elimina las particiones vencidas;
+      sin particionado, borra en lotes cortos por id para no mantener bloqueos largos.
+    """
+
+    @staticmethod
+    def tabla():
+        return LogAuditoria._meta.db_table
+
+    @staticmethod
+    def nombre_particion(mes):
+        return f"{ParticionService.tabla()}_p{mes.year}{mes.month:02d}"
+
+    @staticmethod
+    def es_postgresql():
+        return connection.vendor == "postgresql"
+
+    @staticmethod
+    def esta_particionada():
+        if not ParticionService.es_postgresql():
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT c.relkind FROM pg_class c WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+                [ParticionService.tabla()],
+            )
+            fila = cursor.fetchone()
+        return bool(fila) and fila[0] == "p"
+
+    @staticmethod
+    def _sql_crear_particion(mes):
+        qn = connection.ops.quote_name
+        return (
+            f"CREATE TABLE IF NOT EXISTS {qn(ParticionService.nombre_particion(mes))} "
+            f"PARTITION OF {qn(ParticionService.tabla())} "
+            f"FOR VALUES FROM ('{inicio_utc(mes).isoformat()}') "
+            f"TO ('{inicio_utc(sumar_meses(mes, 1)).isoformat()}')"
+        )
+
+    @staticmethod
+    def crear_particiones(meses_adelante=AUDITORIA_PARTICIONES_ADELANTE, desde=None, ejecutar=True):
+        """Crea (si faltan) las particiones desde `desde` hasta el mes actual + `meses_adelante`."""
+        mes_actual = mes_utc()
+        mes = (desde or mes_actual).replace(day=1)
+        ultimo = sumar_meses(mes_actual, meses_adelante)
+
+        sentencias = []
+        while mes <= ultimo:
+            sentencias.append(ParticionService._sql_crear_particion(mes))
+            mes = sumar_meses(mes, 1)
+
+        if ejecutar:
+            with connection.cursor() as cursor:
+                for sql in sentencias:
+                    cursor.execute(sql)
+        return sentencias
+
+    @staticmethod
+    def convertir_a_particionada(meses_adelante=AUDITORIA_PARTICIONES_ADELANTE):
+        """
+        Migra la tabla existente a una tabla particionada por mes.
+        Operación única y bloqueante: ejecutar en una ventana de mantenimiento.
+        """
+        if not ParticionService.es_postgresql():
+            raise RuntimeError("El particionado solo está disponible en PostgreSQL.")
+        if ParticionService.esta_particionada():
+            return False
+
+        qn = connection.ops.quote_name
+        tabla = ParticionService.tabla()
+        legado = f"{tabla}_legado"
+        tabla_usuario = LogAuditoria._meta.get_field("usuario").related_model._meta.db_table
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(f"ALTER TABLE {qn(tabla)} RENAME TO {qn(legado)}")
+                cursor.execute(
+                    f"CREATE TABLE {qn(tabla)} (LIKE {qn(legado)} INCLUDING DEFAULTS INCLUDING IDENTITY) "
+                    f"PARTITION BY RANGE (fecha)"
+                )
+                # En PostgreSQL la clave primaria debe incluir la columna de partición
+                cursor.execute(f"ALTER TABLE {qn(tabla)} ADD PRIMARY KEY (id, fecha)")
+
+                cursor.execute(f"SELECT MIN(fecha) FROM {qn(legado)}")
+                minimo = cursor.fetchone()[0]
+                desde = mes_utc(minimo) if minimo else None
+                for sql in ParticionService.crear_particiones(meses_adelante, desde=desde, ejecutar=False):
+                    cursor.execute(sql)
+                cursor.execute(f"CREATE TABLE {qn(tabla + '_default')} PARTITION OF {qn(tabla)} DEFAULT")
+
+                cursor.execute(f"INSERT INTO {qn(tabla)} SELECT * FROM {qn(legado)}")
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE((SELECT MAX(id) FROM {qn(tabla)}), 0) + 1, false)",
+                    [tabla],
+                )
+                cursor.execute(f"DROP TABLE {qn(legado)}")
+
+                cursor.execute(
+                    f"ALTER TABLE {qn(tabla)} ADD CONSTRAINT {qn(tabla + '_usuario_id_fk')} "
+                    f"FOREIGN KEY (usuario_id) REFERENCES {qn(tabla_usuario)} (id) DEFERRABLE INITIALLY DEFERRED"
+                )
+
+            # Los índices declarados en el modelo se recrean sobre la tabla padre
+            with connection.schema_editor(atomic=False) as editor:
+                for indice in LogAuditoria._meta.indexes:
+                    editor.add_index(LogAuditoria, indice)
+                # El trigger y los índices de búsqueda no se copian con LIKE: se reinstalan
+                # (las filas copiadas ya traen su tsvector)
+                BusquedaService.ejecutar_sql(
+                    editor, BusquedaService.sql_instalar(tabla, "detalle", PREFIJO_BUSQUEDA, rellenar=False)
+                )
+        return True
+
+    @staticmethod
+    def _particiones_existentes():
+        patron = re.compile(rf"^{re.escape(ParticionService.tabla())}_p(\d{{4}})(\d{{2}})$")
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = %s",
+                [ParticionService.tabla()],
+            )
+            nombres = [fila[0] for fila in cursor.fetchall()]
+
+        particiones = []
+        for nombre in nombres:
+            coincidencia = patron.match(nombre)
+            if coincidencia:
+                mes = date(int(coincidencia.group(1)), int(coincidencia.group(2)), 1)
+                particiones.append((mes, nombre))
+        return sorted(particiones)
+
+    @staticmethod
+    def limite_retencion(retencion_meses=AUDITORIA_RETENCION_MESES):
+        """Primer día (UTC) del mes más antiguo que se conserva."""
+        return sumar_meses(mes_utc(), -retencion_meses)
+
+    @staticmethod
+    def aplicar_retencion(retencion_meses=AUDITORIA_RETENCION_MESES, eliminar=False, tam_lote=5000):
+        """
+        Aplica la política de retención y devuelve un resumen.
+
+        - Tabla particionada: las particiones anteriores al límite se separan (DETACH)
+          y se renombran como archivo; con `eliminar=True` se borran (DROP). La
+          partición DEFAULT no puede separarse por meses: con `eliminar=True` sus
+          filas vencidas se borran en lotes; si no, solo se cuentan (`filas_default`).
+        - Tabla simple: con `eliminar=True` se borran filas antiguas en lotes por id.
+        """
+        limite = ParticionService.limite_retencion(retencion_meses)
+        resumen = {"limite": limite, "particiones": [], "filas_eliminadas": 0, "filas_default": 0}
+
+        if ParticionService.esta_particionada():
+            qn = connection.ops.quote_name
+            tabla = ParticionService.tabla()
+            for mes, nombre in ParticionService._particiones_existentes():
+                if sumar_meses(mes, 1) > limite:
+                    continue
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.execute(f"ALTER TABLE {qn(tabla)} DETACH PARTITION {qn(nombre)}")
+                    if eliminar:
+                        cursor.execute(f"DROP TABLE {qn(nombre)}")
+                    else:
+                        archivo = f"{tabla}_archivo_p{mes.year}{mes.month:02d}"
+                        cursor.execute(f"ALTER TABLE {qn(nombre)} RENAME TO {qn(archivo)}")
+                resumen["particiones"].append(nombre)
+
+            # Tras separar los meses vencidos, lo anterior al límite solo puede estar en DEFAULT
+            if eliminar:
+                resumen["filas_eliminadas"] = ParticionService._eliminar_en_lotes(limite, tam_lote)
+            else:
+                resumen["filas_default"] = LogAuditoria.objects.filter(fecha__lt=inicio_utc(limite)).count()
+            return resumen
+
+        if eliminar:
+            resumen["filas_eliminadas"] = ParticionService._eliminar_en_lotes(limite, tam_lote)
+        return resumen
+
+    @staticmethod
+    def _eliminar_en_lotes(limite, tam_lote):
+        # DELETE directo por lotes de id: evita cargar instancias y disparar señales
+        tabla = connection.ops.quote_name(ParticionService.tabla())
+        corte = inicio_utc(limite)
+        total = 0
+        while True:
+            ids = list(
+                LogAuditoria.objects
+                .filter(fecha__lt=corte)
+                .order_by("id")
+                .values_list("id", flat=True)[:tam_lote]
+            )
+            if not ids:
+                break
+            with transaction.atomic(), connection.cursor() as cursor:
+                marcadores = ", ".join(["%s"] * len(ids))
+                cursor.execute(f"DELETE FROM {tabla} WHERE id IN ({marcadores})", ids)
+                total += cursor.rowcount
+        return total
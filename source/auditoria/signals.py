@@ -4,6 +4,7 @@ from django.apps import apps
 from auditoria.models import LogAuditoria
 from auditoria.middleware import get_current_user
 from auditoria.constants import AccionesLog
+from auditoria.services.auditoria_service import AuditoriaService
 
 # Configuración de apps cuyos modelos serán auditados
 APPS_DEL_PROYECTO = [
@@ -18,15 +19,24 @@ APPS_DEL_PROYECTO = [
     'notificaciones',
 ]
 
-# Carga dinámica y segura de modelos a vigilar
-modelos_vigilados = []
-for app_label in APPS_DEL_PROYECTO:
-    try:
-        app_config = apps.get_app_config(app_label)
-        modelos_vigilados.extend(app_config.get_models())
-    except LookupError:
-        # La app no está instalada; se ignora
-        pass
+
+def _cargar_modelos_vigilados():
+    """Carga dinámica y segura de modelos a vigilar (conjunto inmutable, búsqueda O(1))."""
+    modelos = set()
+    for app_label in APPS_DEL_PROYECTO:
+        try:
+            app_config = apps.get_app_config(app_label)
+            modelos.update(app_config.get_models())
+        except LookupError:
+            # La app no está instalada; se ignora
+            pass
+
+    # Evita auditar el propio modelo de logs
+    modelos.discard(LogAuditoria)
+    return frozenset(modelos)
+
+
+modelos_vigilados = _cargar_modelos_vigilados()
 
 
 def obtener_detalle(instance):
@@ -37,37 +47,28 @@ def obtener_detalle(instance):
 @receiver(post_save)
 def registrar_cambio(sender, instance, created, **kwargs):
     """Registra creación o edición de modelos vigilados."""
-    if sender in modelos_vigilados:
-        # Evita auditar el propio modelo de logs
-        if sender == LogAuditoria:
-            return
-
-        usuario = get_current_user()
+    if sender not in modelos_vigilados:
+        return
 
-        LogAuditoria.objects.create(
-            usuario=usuario if (usuario and usuario.is_authenticated) else None,
-            accion=AccionesLog.CREAR if created else AccionesLog.EDITAR,
-            modulo=sender._meta.app_label.upper(),
-            modelo=sender._meta.model_name.upper(),
-            objeto_id=str(instance.pk),
-            detalle=obtener_detalle(instance),
-        )
+    AuditoriaService.registrar(
+        usuario=get_current_user(),
+        accion=AccionesLog.CREAR if created else AccionesLog.EDITAR,
+        modelo=sender,
+        instance=instance,
+        detalle=obtener_detalle(instance),
+    )
 
 
 @receiver(post_delete)
 def registrar_eliminacion(sender, instance, **kwargs):
     """Registra eliminación de modelos vigilados."""
-    if sender in modelos_vigilados:
-        if sender == LogAuditoria:
-            return
-
-        usuario = get_current_user()
+    if sender not in modelos_vigilados:
+        return
 
-        LogAuditoria.objects.create(
-            usuario=usuario if (usuario and usuario.is_authenticated) else None,
-            accion=AccionesLog.ELIMINAR,
-            modulo=sender._meta.app_label.upper(),
-            modelo=sender._meta.model_name.upper(),
-            objeto_id=str(instance.pk),
-            detalle=obtener_detalle(instance),
-        )
+    AuditoriaService.registrar(
+        usuario=get_current_user(),
+        accion=AccionesLog.ELIMINAR,
+        modelo=sender,
+        instance=instance,
+        detalle=obtener_detalle(instance),
+    )
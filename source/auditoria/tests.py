@@ -1,9 +1,21 @@
+import threading
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.utils import timezone
 from django.test import TestCase, Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from auditoria.models import LogAuditoria
 from auditoria.middleware import AuditoriaMiddleware, _thread_locals
 from auditoria.constants import AccionesLog
+from auditoria.services.auditoria_service import AuditoriaService
+from auditoria.services.escritor_asincrono import EscritorAuditoriaAsincrono
+from auditoria.signals import modelos_vigilados
+from core.models import Empresa
 
 # Modelo de usuario configurado en el proyecto
 User = get_user_model()
@@ -70,6 +82,78 @@ class AuditoriaCoreWhiteBoxTests(TestCase):
         print("  OK: log creado y atribuido correctamente.")
 
 
+class AuditoriaPipelineWhiteBoxTests(TestCase):
+    """
+    Tests de caja blanca para el pipeline de escritura por lotes.
+    """
+
+    def test_modelos_vigilados_conjunto_inmutable(self):
+        print("\n[TEST] test_modelos_vigilados_conjunto_inmutable")
+        self.assertIsInstance(modelos_vigilados, frozenset)
+        self.assertIn(Empresa, modelos_vigilados)
+        self.assertNotIn(LogAuditoria, modelos_vigilados)
+        print("  OK: búsqueda O(1) y el propio log queda excluido.")
+
+    def test_lote_escribe_con_un_solo_bulk_create(self):
+        print("\n[TEST] test_lote_escribe_con_un_solo_bulk_create")
+        print("  Objetivo: N cambios dentro de un lote generan un único INSERT de auditoría.")
+        tabla = LogAuditoria._meta.db_table
+
+        with CaptureQueriesContext(connection) as consultas:
+            with AuditoriaService.lote():
+                with self.captureOnCommitCallbacks(execute=True):
+                    for i in range(5):
+                        Empresa.objects.create(nombre_comercial=f"E{i}", ruc=f"R{i}")
+
+                # Confirmado pero aún no volcado: se escribe al cerrar el lote
+                self.assertEqual(LogAuditoria.objects.filter(modelo="EMPRESA").count(), 0)
+
+        inserts = [q for q in consultas.captured_queries if q["sql"].startswith("INSERT") and tabla in q["sql"]]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(LogAuditoria.objects.filter(modelo="EMPRESA", accion=AccionesLog.CREAR).count(), 5)
+        print("  OK: 5 registros en 1 INSERT.")
+
+    def test_lote_descarta_transaccion_revertida(self):
+        print("\n[TEST] test_lote_descarta_transaccion_revertida")
+
+        with AuditoriaService.lote():
+            with self.captureOnCommitCallbacks(execute=True):
+                try:
+                    with transaction.atomic():
+                        Empresa.objects.create(nombre_comercial="Fantasma", ruc="000")
+                        raise RuntimeError("rollback")
+                except RuntimeError:
+                    pass
+
+        self.assertFalse(LogAuditoria.objects.filter(modelo="EMPRESA").exists())
+        print("  OK: sin registros de cambios revertidos.")
+
+    def test_escritor_asincrono_backpressure(self):
+        print("\n[TEST] test_escritor_asincrono_backpressure")
+        print("  Objetivo: con la cola llena se escribe en el hilo llamador sin perder registros.")
+
+        escritos = []
+        liberar = threading.Event()
+
+        def escritor(logs):
+            # El hilo de fondo queda bloqueado hasta que se libere
+            if threading.current_thread().name == "auditoria-escritor":
+                liberar.wait(5)
+            escritos.extend(logs)
+
+        cola = EscritorAuditoriaAsincrono(escritor, capacidad=1, tam_lote=1, timeout_encolado=0.01, intervalo=0.05)
+        cola.encolar(list(range(5)))
+        liberar.set()
+        cola.detener()
+
+        metricas = cola.metricas()
+        print(f"  Métricas: {metricas}")
+        self.assertEqual(sorted(escritos), list(range(5)))
+        self.assertGreaterEqual(metricas["escrituras_sincronas"], 3)
+        self.assertEqual(metricas["escritos"], 5)
+        print("  OK: backpressure sin pérdida.")
+
+
 class AuditoriaViewWhiteBoxTests(TestCase):
     """
     Tests de caja blanca para la vista del dashboard.
@@ -122,3 +206,83 @@ class AuditoriaViewWhiteBoxTests(TestCase):
             print("  OK: acceso restringido.")
         else:
             self.fail(f"Fallo de seguridad: usuario normal entró con status {response.status_code}")
+
+    def test_dashboard_paginacion_por_cursor(self):
+        print("\n[TEST] test_dashboard_paginacion_por_cursor")
+        print("  Objetivo: recorrer páginas con cursor (sin COUNT/OFFSET) ida y vuelta.")
+
+        for i in range(25):
+            LogAuditoria.objects.create(modulo='TEST', modelo='X', accion='X', detalle=f'evento {i}')
+
+        url = reverse('auditoria:dashboard')
+        # Se filtra por detalle para aislar los eventos del test (setUp también genera logs)
+        pagina_1 = self.client.get(url, {'q': 'evento'}).context['page_obj']
+        self.assertEqual(len(pagina_1.object_list), 20)
+        self.assertTrue(pagina_1.has_next)
+        self.assertFalse(pagina_1.has_previous)
+
+        pagina_2 = self.client.get(url, {'q': 'evento', 'cursor': pagina_1.cursor_siguiente}).context['page_obj']
+        self.assertEqual(len(pagina_2.object_list), 5)
+        self.assertFalse(pagina_2.has_next)
+        self.assertTrue(pagina_2.has_previous)
+
+        ids_1 = {log.id for log in pagina_1}
+        ids_2 = {log.id for log in pagina_2}
+        self.assertFalse(ids_1 & ids_2, "Las páginas no deben solaparse")
+
+        regreso = self.client.get(url, {'q': 'evento', 'cursor': pagina_2.cursor_anterior}).context['page_obj']
+        self.assertEqual([log.id for log in regreso], [log.id for log in pagina_1])
+        print("  OK: navegación por cursor consistente.")
+
+    def test_dashboard_busqueda_ordena_por_relevancia(self):
+        print("\n[TEST] test_dashboard_busqueda_ordena_por_relevancia")
+        print("  Objetivo: la frase exacta aparece antes que coincidencias parciales más recientes.")
+
+        exacto = LogAuditoria.objects.create(modulo='TEST', accion='X', detalle='Servidor caído en producción')
+        LogAuditoria.objects.create(modulo='TEST', accion='X', detalle='Servidor reiniciado tras corte: caído')
+        LogAuditoria.objects.create(modulo='TEST', accion='X', detalle='Servidor en mantenimiento')
+
+        url = reverse('auditoria:dashboard')
+        logs = self.client.get(url, {'q': 'servidor caído'}).context['page_obj'].object_list
+
+        self.assertEqual(len(logs), 2, "Todas las palabras deben aparecer en el detalle")
+        self.assertEqual(logs[0].id, exacto.id)
+        self.assertGreater(logs[0].rango, logs[1].rango)
+        print("  OK: resultados ordenados por rango.")
+
+
+class AuditoriaRetencionWhiteBoxTests(TestCase):
+    """
+    Tests de caja blanca para la política de retención (modo no particionado).
+    """
+
+    def test_retencion_elimina_por_lotes_registros_vencidos(self):
+        print("\n[TEST] test_retencion_elimina_por_lotes_registros_vencidos")
+
+        for i in range(7):
+            LogAuditoria.objects.create(modulo='TEST', modelo='X', accion='X', detalle=f'viejo {i}')
+        LogAuditoria.objects.update(fecha=timezone.now() - timedelta(days=400))
+        LogAuditoria.objects.create(modulo='TEST', modelo='X', accion='X', detalle='reciente')
+
+        salida = StringIO()
+        call_command('auditoria_particiones', '--retencion-meses', '6', '--eliminar', '--tam-lote', '3', stdout=salida)
+
+        self.assertEqual(LogAuditoria.objects.count(), 1)
+        self.assertEqual(LogAuditoria.objects.get().detalle, 'reciente')
+        self.assertIn("Registros eliminados: 7", salida.getvalue())
+        print("  OK: registros vencidos eliminados en lotes.")
+
+    def test_limites_de_particion_en_utc(self):
+        print("\n[TEST] test_limites_de_particion_en_utc")
+        from datetime import datetime
+        from zoneinfo import ZoneInfo
+        from auditoria.services.particion_service import ParticionService, mes_utc
+
+        # 31/03 22:00 en Guayaquil ya es abril en UTC
+        local = datetime(2025, 3, 31, 22, 0, tzinfo=ZoneInfo("America/Guayaquil"))
+        self.assertEqual(mes_utc(local).isoformat(), "2025-04-01")
+
+        sql = ParticionService._sql_crear_particion(mes_utc(local))
+        self.assertIn("FROM ('2025-04-01T00:00:00+00:00') TO ('2025-05-01T00:00:00+00:00')", sql)
+        print("  OK: meses y límites de partición expresados en UTC.")
+
@@ -1,7 +1,8 @@
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render
-from django.core.paginator import Paginator
 from auditoria.models import LogAuditoria
+from core.paginacion import paginar_keyset
+from core.services.busqueda_service import BusquedaService
 from usuarios.decorators import solo_superusuario
 
 
@@ -11,19 +12,22 @@ def auditoria_dashboard_view(request):
     query = request.GET.get("q", "")
 
     # Se usa select_related para evitar consultas N+1 al acceder al usuario
-    logs_list = (
-        LogAuditoria.objects
-        .select_related("usuario")
-        .all()
-        .order_by("-fecha")
-    )
+    logs_list = LogAuditoria.objects.select_related("usuario").all()
+
+    # Paginación por cursor sobre el índice (fecha, id): sin COUNT ni OFFSET
+    campos = ("fecha", "id")
 
     if query:
-        logs_list = logs_list.filter(detalle__icontains=query)
+        # Búsqueda indexada (tsvector + trigramas); los resultados se ordenan por relevancia
+        logs_list = BusquedaService.buscar(logs_list, query, campo_texto="detalle")
+        campos = ("rango",) + campos
 
-    paginator = Paginator(logs_list, 20)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginar_keyset(
+        logs_list,
+        cursor=request.GET.get("cursor"),
+        campos=campos,
+        por_pagina=20,
+    )
 
     return render(
         request,
@@ -0,0 +1,145 @@
+import base64
+import datetime
+import json
+import uuid
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+
+
+class CursorInvalido(ValueError):
+    """El cursor recibido no se pudo decodificar."""
+
+
+class PaginaKeyset:
+    """
+    Página obtenida con paginación por cursor (keyset).
+
+    Expone una interfaz compatible con las plantillas que iteran `page_obj`
+    (object_list, has_next, has_previous), pero sin COUNT ni OFFSET: cada página
+    cuesta lo mismo sin importar su posición en la tabla.
+    """
+
+    def __init__(self, object_list, cursor_siguiente=None, cursor_anterior=None):
+        self.object_list = object_list
+        self.cursor_siguiente = cursor_siguiente
+        self.cursor_anterior = cursor_anterior
+
+    @property
+    def has_next(self):
+        return self.cursor_siguiente is not None
+
+    @property
+    def has_previous(self):
+        return self.cursor_anterior is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class _CursorEncoder(json.JSONEncoder):
+    # A diferencia de DjangoJSONEncoder, conserva los microsegundos (necesarios para el keyset)
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.date, datetime.time)):
+            return o.isoformat()
+        if isinstance(o, (Decimal, uuid.UUID)):
+            return str(o)
+        return super().default(o)
+
+
+def codificar_cursor(valores, direccion="s"):
+    """Codifica los valores de ordenamiento de una fila en un token opaco para la URL."""
+    crudo = json.dumps({"d": direccion, "v": list(valores)}, cls=_CursorEncoder)
+    return base64.urlsafe_b64encode(crudo.encode()).decode().rstrip("=")
+
+
+def _a_python(modelo, campo, valor):
+    try:
+        return modelo._meta.get_field(campo).to_python(valor)
+    except FieldDoesNotExist:
+        # Anotación (p. ej. el rango de una búsqueda): el valor JSON se usa tal cual
+        return valor
+
+
+def decodificar_cursor(cursor, modelo, campos):
+    """Devuelve (direccion, valores) convirtiendo cada valor al tipo de su campo."""
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(cursor + relleno).decode())
+        valores = datos["v"]
+        direccion = datos.get("d", "s")
+        if len(valores) != len(campos) or direccion not in ("s", "a"):
+            raise ValueError
+        valores = [_a_python(modelo, campo, valor) for campo, valor in zip(campos, valores)]
+    except Exception as exc:
+        raise CursorInvalido(str(exc)) from exc
+    return direccion, valores
+
+
+def filtro_despues_de(campos, valores, descendente=True):
+    """
+    Construye el predicado keyset "(c1, c2, ...) < (v1, v2, ...)" (o ">" si es ascendente)
+    de forma portable: c1 < v1 OR (c1 = v1 AND c2 < v2) OR ...
+    """
+    lookup = "lt" if descendente else "gt"
+    filtro = Q()
+    for i, campo in enumerate(campos):
+        condicion = Q(**{f"{campo}__{lookup}": valores[i]})
+        for previo, valor in zip(campos[:i], valores[:i]):
+            condicion &= Q(**{previo: valor})
+        filtro |= condicion
+
+    # Cota redundante sobre el primer campo: permite al planificador usar un rango de índice
+    cota = Q(**{f"{campos[0]}__{lookup}e": valores[0]})
+    return cota & filtro
+
+
+def valores_de(obj, campos):
+    return [getattr(obj, campo) for campo in campos]
+
+
+def paginar_keyset(queryset, cursor=None, campos=("fecha", "id"), por_pagina=20, descendente=True):
+    """
+    Pagina `queryset` por cursor sobre `campos` (el último debe ser único, p. ej. "id").
+
+    Requiere un índice compuesto sobre `campos` para que cada página sea un
+    recorrido de índice acotado. Un cursor inválido devuelve la primera página.
+    """
+    campos = tuple(campos)
+    modelo = queryset.model
+    direccion = "s"
+    valores = None
+
+    if cursor:
+        try:
+            direccion, valores = decodificar_cursor(cursor, modelo, campos)
+        except CursorInvalido:
+            valores = None
+
+    # Retroceder equivale a avanzar en el orden inverso y luego invertir la página
+    hacia_atras = valores is not None and direccion == "a"
+    orden_desc = descendente != hacia_atras
+    orden = [f"-{c}" if orden_desc else c for c in campos]
+
+    qs = queryset.order_by(*orden)
+    if valores is not None:
+        qs = qs.filter(filtro_despues_de(campos, valores, descendente=orden_desc))
+
+    filas = list(qs[: por_pagina + 1])
+    hay_mas = len(filas) > por_pagina
+    filas = filas[:por_pagina]
+
+    if hacia_atras:
+        filas.reverse()
+        tiene_siguiente, tiene_anterior = True, hay_mas
+    else:
+        tiene_siguiente, tiene_anterior = hay_mas, valores is not None
+
+    cursor_siguiente = codificar_cursor(valores_de(filas[-1], campos), "s") if filas and tiene_siguiente else None
+    cursor_anterior = codificar_cursor(valores_de(filas[0], campos), "a") if filas and tiene_anterior else None
+
+    return PaginaKeyset(filas, cursor_siguiente, cursor_anterior)
@@ -0,0 +1,140 @@
+from django.conf import settings
+from django.db import connections
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.functions import Cast
+
+# Configuración de texto de PostgreSQL usada por los tsvector y las consultas
+BUSQUEDA_CONFIG = getattr(settings, "BUSQUEDA_CONFIG", "spanish")
+
+
+class BackendPostgres:
+    """
+    Búsqueda indexada en PostgreSQL.
+
+    - Coincidencia por palabras: columna tsvector (índice GIN) mantenida por triggers.
+    - Coincidencia parcial: `icontains` sobre la columna de texto, que PostgreSQL
+      resuelve con el índice GIN pg_trgm creado sobre UPPER(columna).
+    - Ranking: ts_rank del tsvector más la similitud por trigramas de la palabra.
+    """
+
+    nombre = "postgresql"
+
+    @staticmethod
+    def buscar(queryset, texto, campo_texto, campo_vector):
+        from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+
+        consulta = SearchQuery(texto, config=BUSQUEDA_CONFIG, search_type="websearch")
+        rango = SearchRank(F(campo_vector), consulta) + TrigramWordSimilarity(texto, campo_texto)
+
+        return queryset.annotate(
+            # Doble precisión: el valor debe sobrevivir intacto al cursor de paginación
+            rango=Cast(rango, output_field=FloatField()),
+        ).filter(
+            Q(**{campo_vector: consulta}) | Q(**{f"{campo_texto}__icontains": texto})
+        )
+
+
+class BackendSimple:
+    """
+    Respaldo portable (SQLite en pruebas): todas las palabras deben aparecer en la
+    columna de texto; la frase completa puntúa más alto.
+    """
+
+    nombre = "simple"
+
+    @staticmethod
+    def buscar(queryset, texto, campo_texto, campo_vector):
+        filtro = Q()
+        for palabra in texto.split():
+            filtro &= Q(**{f"{campo_texto}__icontains": palabra})
+
+        return queryset.filter(filtro).annotate(
+            rango=Case(
+                When(**{f"{campo_texto}__icontains": texto}, then=Value(1.0)),
+                default=Value(0.5),
+                output_field=FloatField(),
+            ),
+        )
+
+
+class BusquedaService:
+    """
+    Punto único de búsqueda de texto sobre modelos con columna desnormalizada.
+
+    `buscar()` filtra y anota `rango` (mayor = más relevante); el backend se elige
+    según el motor de la base de datos del queryset.
+    """
+
+    BACKENDS = {
+        "postgresql": BackendPostgres,
+    }
+
+    @staticmethod
+    def backend_para(queryset):
+        vendor = connections[queryset.db].vendor
+        return BusquedaService.BACKENDS.get(vendor, BackendSimple)
+
+    @staticmethod
+    def buscar(queryset, texto, campo_texto, campo_vector="busqueda"):
+        texto = (texto or "").strip()
+        if not texto:
+            return queryset
+        backend = BusquedaService.backend_para(queryset)
+        return backend.buscar(queryset, texto, campo_texto, campo_vector)
+
+    # --- Esquema (solo PostgreSQL) ---
+
+    @staticmethod
+    def sql_instalar(tabla, columna_texto, prefijo, columna_vector="busqueda", rellenar=True):
+        """
+        Sentencias que crean el trigger que mantiene `columna_vector` al día, rellenan
+        las filas existentes y crean los índices GIN (tsvector y trigramas).
+        El índice de trigramas se define sobre UPPER(columna::text), la misma expresión
+        que genera Django para `icontains`, de modo que ese filtro también lo usa.
+        """
+        funcion = f"{prefijo}_busqueda_trg"
+        vector = f"to_tsvector('{BUSQUEDA_CONFIG}', coalesce(%s, ''))"
+        sentencias = [
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            (
+                f"CREATE OR REPLACE FUNCTION {funcion}() RETURNS trigger AS $$\n"
+                f"BEGIN\n"
+                f"    NEW.{columna_vector} := {vector % f'NEW.{columna_texto}'};\n"
+                f"    RETURN NEW;\n"
+                f"END\n"
+                f"$$ LANGUAGE plpgsql"
+            ),
+            f"DROP TRIGGER IF EXISTS {funcion} ON {tabla}",
+            (
+                f"CREATE TRIGGER {funcion} BEFORE INSERT OR UPDATE OF {columna_texto} ON {tabla} "
+                f"FOR EACH ROW EXECUTE FUNCTION {funcion}()"
+            ),
+        ]
+        if rellenar:
+            sentencias.append(f"UPDATE {tabla} SET {columna_vector} = {vector % columna_texto}")
+        sentencias += [
+            f"CREATE INDEX IF NOT EXISTS {prefijo}_vector_gin ON {tabla} USING gin ({columna_vector})",
+            (
+                f"CREATE INDEX IF NOT EXISTS {prefijo}_trgm_gin ON {tabla} "
+                f"USING gin (UPPER({columna_texto}::text) gin_trgm_ops)"
+            ),
+        ]
+        return sentencias
+
+    @staticmethod
+    def sql_desinstalar(tabla, prefijo):
+        funcion = f"{prefijo}_busqueda_trg"
+        return [
+            f"DROP INDEX IF EXISTS {prefijo}_trgm_gin",
+            f"DROP INDEX IF EXISTS {prefijo}_vector_gin",
+            f"DROP TRIGGER IF EXISTS {funcion} ON {tabla}",
+            f"DROP FUNCTION IF EXISTS {funcion}()",
+        ]
+
+    @staticmethod
+    def ejecutar_sql(schema_editor, sentencias):
+        """Ejecuta las sentencias solo en PostgreSQL (en otros motores no hay nada que instalar)."""
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for sql in sentencias:
+            schema_editor.execute(sql, params=None)
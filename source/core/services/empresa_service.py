@@ -0,0 +1,154 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from core.models import Empresa
+
+# Claves de sesión para la empresa seleccionada (la de legado se migra al leerla)
+SESION_EMPRESA_ID = "empresa_actual_id"
+SESION_EMPRESA_ID_LEGADO = "empresa_entorno_id"
+
+# Parámetros de la caché LRU de empresas (por proceso)
+EMPRESA_CACHE_MAX_ITEMS = getattr(settings, "EMPRESA_CACHE_MAX_ITEMS", 256)
+EMPRESA_CACHE_TTL = getattr(settings, "EMPRESA_CACHE_TTL", 300)
+
+
+class CacheLRU:
+    """
+    Caché LRU en memoria del proceso con expiración por TTL.
+
+    Es segura entre hilos. Cada proceso mantiene su propia copia; la coherencia
+    entre procesos queda acotada por el TTL.
+    """
+
+    def __init__(self, max_items, ttl):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+
+            valor, expira = entrada
+            if expira < time.monotonic():
+                del self._datos[clave]
+                return None
+
+            # Marca la entrada como usada recientemente
+            self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = (valor, time.monotonic() + self.ttl)
+            self._datos.move_to_end(clave)
+
+            # Desaloja las entradas menos usadas al superar el límite
+            while len(self._datos) > self.max_items:
+                self._datos.popitem(last=False)
+
+    def invalidar(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+
+class EmpresaService:
+    """
+    Resolución de la empresa activa (multitenencia) con caché LRU de filas Empresa.
+    """
+
+    _cache = CacheLRU(EMPRESA_CACHE_MAX_ITEMS, EMPRESA_CACHE_TTL)
+
+    @staticmethod
+    def obtener(empresa_id, solo_activas=True):
+        """
+        Devuelve la Empresa con el ID indicado (por defecto solo si está activa) o None.
+        Se entrega una copia para que ninguna vista altere la instancia cacheada.
+        """
+        try:
+            empresa_id = int(empresa_id)
+        except (TypeError, ValueError):
+            return None
+
+        empresa = EmpresaService._cache.get(empresa_id)
+        if empresa is None:
+            empresa = Empresa.objects.filter(pk=empresa_id).first()
+            if empresa is None:
+                return None
+            EmpresaService._cache.set(empresa_id, empresa)
+
+        if solo_activas and not empresa.estado:
+            return None
+        return copy.copy(empresa)
+
+    @staticmethod
+    def invalidar(empresa_id):
+        # Se invoca desde las señales de Empresa (save/delete)
+        EmpresaService._cache.invalidar(empresa_id)
+
+    @staticmethod
+    def limpiar_cache():
+        EmpresaService._cache.limpiar()
+
+    @staticmethod
+    def fijar_en_sesion(request, empresa):
+        # Persiste la empresa seleccionada por un superadmin
+        request.session[SESION_EMPRESA_ID] = empresa.id
+        request.session.pop(SESION_EMPRESA_ID_LEGADO, None)
+
+    @staticmethod
+    def resolver_para_request(request):
+        """
+        Determina la empresa activa de la petición:
+
+        - Usuario anónimo: None.
+        - Superadmin (superuser o rol de negocio): ?empresa_id= > sesión > empresa propia.
+        - Usuario estándar: la empresa de su ficha de empleado.
+        """
+        user = getattr(request, "user", None)
+        if user is None or not user.is_authenticated:
+            return None
+
+        es_superadmin = user.is_superuser or getattr(user, "es_superadmin_negocio", False)
+
+        if es_superadmin:
+            session = request.session
+
+            # Prioridad 1: empresa indicada explícitamente en la URL.
+            empresa_id_url = request.GET.get("empresa_id")
+            if empresa_id_url:
+                empresa = EmpresaService.obtener(empresa_id_url)
+                if empresa:
+                    EmpresaService.fijar_en_sesion(request, empresa)
+                    return empresa
+
+            # Prioridad 2: empresa almacenada en la sesión (migra la clave de legado).
+            empresa_id_sesion = session.get(SESION_EMPRESA_ID) or session.get(SESION_EMPRESA_ID_LEGADO)
+            if empresa_id_sesion:
+                empresa = EmpresaService.obtener(empresa_id_sesion)
+                if empresa:
+                    if SESION_EMPRESA_ID not in session:
+                        EmpresaService.fijar_en_sesion(request, empresa)
+                    return empresa
+
+                # Limpiar sesión si la empresa ya no existe o está inactiva.
+                session.pop(SESION_EMPRESA_ID, None)
+                session.pop(SESION_EMPRESA_ID_LEGADO, None)
+
+        # Caso estándar (y respaldo del superadmin): empresa fija de su perfil.
+        empleado = getattr(user, "empleado", None)
+        if empleado and empleado.empresa_id:
+            return EmpresaService.obtener(empleado.empresa_id, solo_activas=False)
+
+        return None
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from core.models import Empresa
+from core.services.empresa_service import EmpresaService
+
+
+@receiver(post_save, sender=Empresa)
+@receiver(post_delete, sender=Empresa)
+def invalidar_cache_empresa(sender, instance, **kwargs):
+    """Descarta la fila cacheada de la empresa al modificarla o eliminarla."""
+    EmpresaService.invalidar(instance.pk)
@@ -1,10 +1,11 @@
 import os
 from django.conf import settings
 from django.core.files.storage import FileSystemStorage
+from django.utils.functional import cached_property
 
 # Ruta base para almacenamiento privado:
-# BASE_DIR / private_media
-PRIVATE_MEDIA_ROOT = os.path.join(settings.BASE_DIR, "private_media")
+# BASE_DIR / private_media (configurable con settings.PRIVATE_MEDIA_ROOT)
+PRIVATE_MEDIA_ROOT = getattr(settings, "PRIVATE_MEDIA_ROOT", os.path.join(settings.BASE_DIR, "private_media"))
 
 # Crear automáticamente el directorio de almacenamiento privado si no existe.
 if not os.path.exists(PRIVATE_MEDIA_ROOT):
@@ -20,13 +21,23 @@ class PrivateMediaStorage(FileSystemStorage):
     """
 
     def __init__(self, location=None, base_url=None):
-        # Si no se especifica una ubicación, se usa PRIVATE_MEDIA_ROOT.
-        if location is None:
-            location = PRIVATE_MEDIA_ROOT
-
         # base_url=None evita que Django genere URLs públicas automáticamente.
         super().__init__(location, base_url)
 
+    @cached_property
+    def base_location(self):
+        # Si no se especifica una ubicación, se usa PRIVATE_MEDIA_ROOT
+        # (leído en cada uso para que override_settings lo respete en los tests).
+        return self._value_or_setting(
+            self._location, getattr(settings, "PRIVATE_MEDIA_ROOT", PRIVATE_MEDIA_ROOT)
+        )
+
+    def _clear_cached_properties(self, setting, **kwargs):
+        super()._clear_cached_properties(setting, **kwargs)
+        if setting == "PRIVATE_MEDIA_ROOT":
+            self.__dict__.pop("base_location", None)
+            self.__dict__.pop("location", None)
+
 
 # Instancia reutilizable para asignar directamente en modelos (storage=private_storage)
 private_storage = PrivateMediaStorage()
@@ -6,6 +6,7 @@ from django.views.generic import ListView
 from core.models import Empresa, UnidadOrganizacional
 from core.middleware import EmpresaContextMiddleware
 from core.mixins import FiltradoEmpresaMixin
+from core.services.empresa_service import EmpresaService
 
 User = get_user_model()
 
@@ -83,6 +84,52 @@ class CoreMiddlewareWhiteBoxTests(TestCase):
         )
         print("   Exito: la prioridad URL > Sesión funciona correctamente.")
 
+    def test_middleware_resolucion_diferida_y_cache(self):
+        print("\n[TEST] Iniciando: test_middleware_resolucion_diferida_y_cache")
+        print("   Objetivo: sin lectura no hay consultas; con caché caliente tampoco.")
+        EmpresaService.limpiar_cache()
+
+        request_1 = self._preparar_request()
+        request_1.session["empresa_actual_id"] = self.empresa_A.id
+
+        # Una petición que nunca lee empresa_actual (API/estáticos) no consulta la BD.
+        with self.assertNumQueries(0):
+            self.middleware.process_request(request_1)
+
+        # Primera lectura: una sola consulta para cargar la fila Empresa.
+        with self.assertNumQueries(1):
+            self.assertEqual(request_1.empresa_actual, self.empresa_A)
+            self.assertEqual(request_1.empresa_actual, self.empresa_A)
+
+        # Petición siguiente: la fila sale de la caché LRU.
+        request_2 = self._preparar_request()
+        request_2.session["empresa_actual_id"] = self.empresa_A.id
+        self.middleware.process_request(request_2)
+        with self.assertNumQueries(0):
+            self.assertEqual(request_2.empresa_actual, self.empresa_A)
+
+        # Guardar la empresa invalida la caché: desactivarla deja al superadmin sin contexto.
+        self.empresa_A.estado = False
+        self.empresa_A.save()
+        request_3 = self._preparar_request()
+        request_3.session["empresa_actual_id"] = self.empresa_A.id
+        self.middleware.process_request(request_3)
+        self.assertIsNone(request_3.empresa_actual)
+        self.assertNotIn("empresa_actual_id", request_3.session)
+        print("   Exito: resolución diferida, caché e invalidación correctas.")
+
+    def test_middleware_migra_clave_sesion_legado(self):
+        print("\n[TEST] Iniciando: test_middleware_migra_clave_sesion_legado")
+
+        request = self._preparar_request()
+        request.session["empresa_entorno_id"] = self.empresa_B.id
+        self.middleware.process_request(request)
+
+        self.assertEqual(request.empresa_actual, self.empresa_B)
+        self.assertEqual(request.session["empresa_actual_id"], self.empresa_B.id)
+        self.assertNotIn("empresa_entorno_id", request.session)
+        print("   Exito: la clave de sesión de legado se unifica.")
+
 
 class CoreMixinWhiteBoxTests(TestCase):
     """
@@ -1,10 +1,10 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.apps import apps
 from django.contrib import messages
 
 from empleados.models import Empleado
 from core.models import UnidadOrganizacional, Empresa
+from core.services.empresa_service import EmpresaService
 
 @login_required
 def fijar_entorno_modal(request, empresa_id):
@@ -14,7 +14,7 @@ def fijar_entorno_modal(request, empresa_id):
     if request.user.is_superuser:
         empresa = get_object_or_404(Empresa, pk=empresa_id)
         
-        request.session['empresa_entorno_id'] = empresa.id
+        EmpresaService.fijar_en_sesion(request, empresa)
         
         request.session.modified = True
         request.session.save()
@@ -32,15 +32,11 @@ def dashboard_view(request):
     contadores filtrados por la empresa seleccionada a nivel global.
     """
 
-    # Modelo cargado dinámicamente para evitar dependencias circulares.
-    Notificacion = apps.get_model("notificaciones", "Notificacion")
+    # Import local para evitar dependencias circulares entre apps.
+    from notificaciones.services.notificacion_service import NotificacionService
 
-    # Notificaciones recientes del usuario.
-    ultimas_notif = (
-        Notificacion.objects
-        .filter(usuario=request.user)
-        .order_by("-fecha_creacion")[:5]
-    )
+    # Notificaciones recientes del usuario (misma consulta que la campana del navbar).
+    ultimas_notif = NotificacionService.recientes_de_request(request)
 
     # Roles asociados al usuario (relación UsuarioRol -> Rol).
     mis_roles = [ur.rol.nombre for ur in request.user.usuariorol_set.all()]
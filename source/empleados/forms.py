@@ -3,6 +3,7 @@ from django.core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
 from .models import Empleado, Puesto, Contrato
 from core.models import UnidadOrganizacional 
+from asistencia.models import Turno
 
 User = get_user_model()
 
@@ -61,6 +62,7 @@ class EmpleadoForm(forms.ModelForm):
         self.fields['manager'].empty_label = "Sin manager asignado (Nadie)"
         self.fields['empresa'].empty_label = "Seleccione una Empresa..."
         self.fields['puesto'].empty_label = "Seleccione un Puesto..."
+        self.fields['turno'].empty_label = "Sin turno (usar horas teóricas)"
         
         # Detección y configuración dinámica del campo de unidad organizacional
         campo_unidad = None
@@ -93,6 +95,8 @@ class EmpleadoForm(forms.ModelForm):
             if 'puesto' in self.fields:
                 self.fields['puesto'].queryset = Puesto.objects.filter(empresa_id=empresa_id, estado=True).order_by('nombre')
 
+            self.fields['turno'].queryset = Turno.objects.filter(empresa_id=empresa_id, estado=True).order_by('nombre')
+
         # Precarga de días laborales seleccionados (string -> list)
         if self.instance.pk and self.instance.dias_laborales:
             self.fields['dias_laborales_select'].initial = self.instance.dias_laborales.split(',')
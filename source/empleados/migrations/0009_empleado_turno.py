@@ -0,0 +1,20 @@
+# Generated by Django 5.0.3 on 2026-10-18 12:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asistencia', '0004_jornada_estado_incremental'),
+        ('empleados', '0008_alter_contrato_archivo_pdf'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='empleado',
+            name='turno',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='empleados', to='asistencia.turno'),
+        ),
+    ]
@@ -132,6 +132,16 @@ class Empleado(models.Model):
     # configuración de asistencia y puntualidad
     hora_entrada_teorica = models.TimeField(default="09:00", help_text="Hora esperada de entrada")
     hora_salida_teorica = models.TimeField(default="18:00", help_text="Hora esperada de salida")
+
+    # turno asignado: si existe, su horario, tolerancia y tiempo de comida prevalecen
+    # sobre las horas teóricas al calcular la jornada
+    turno = models.ForeignKey(
+        "asistencia.Turno",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="empleados",
+    )
     
     # almacenamiento de días laborales como cadena csv (ej: "LUN,MAR,MIE")
     # esto facilita la persistencia simple sin tablas intermedias complejas.
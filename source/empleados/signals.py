@@ -47,14 +47,14 @@ def notificaciones_creacion_empleado(sender, instance, created, **kwargs):
             Q(is_superuser=True) | Q(is_staff=True)
         ).exclude(id=creador.id if creador else None)
 
-        for admin in admins_rrhh:
-            NotificacionService.crear_notificacion(
-                usuario=admin,
-                titulo="Nuevo Ingreso",
-                mensaje=f"Se ha incorporado {instance.nombres} {instance.apellidos} al equipo.",
-                tipo=TiposNotificacion.INFO,
-                url=f"/empleados/editar/{instance.id}/"
-            )
+        # Difusión masiva tras el commit: un bulk_create en lugar de un INSERT por admin
+        NotificacionService.difundir(
+            admins_rrhh,
+            titulo="Nuevo Ingreso",
+            mensaje=f"Se ha incorporado {instance.nombres} {instance.apellidos} al equipo.",
+            tipo=TiposNotificacion.INFO,
+            url=f"/empleados/editar/{instance.id}/"
+        )
 
 @receiver(post_save, sender=Contrato)
 def notificar_nuevo_contrato(sender, instance, created, **kwargs):
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import IntegracionErp, Webhook, LogIntegracion
+from .models import EnvioWebhook, IntegracionErp, Webhook, LogIntegracion
 
 
 @admin.register(IntegracionErp)
@@ -29,10 +29,31 @@ class WebhookAdmin(admin.ModelAdmin):
         'evento',
         'url_destino',
         'activo',
+        'intentos_fallidos',
+        'circuito_abierto_hasta',
     )
     list_filter = ('evento', 'activo')
 
 
+@admin.register(EnvioWebhook)
+class EnvioWebhookAdmin(admin.ModelAdmin):
+    """
+    Bandeja de salida de webhooks.
+    Muestra el estado de entrega y los reintentos de cada evento.
+    """
+    list_display = (
+        'fecha_creacion',
+        'evento',
+        'webhook',
+        'estado',
+        'intentos',
+        'ultimo_codigo',
+        'proximo_intento',
+    )
+    list_filter = ('estado', 'evento')
+    list_select_related = ('webhook',)
+
+
 @admin.register(LogIntegracion)
 class LogIntegracionAdmin(admin.ModelAdmin):
     """
@@ -1,3 +1,7 @@
+from datetime import date
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -5,9 +9,11 @@ from rest_framework.permissions import IsAdminUser, AllowAny
 
 from integraciones.models import IntegracionErp, Webhook, LogIntegracion
 from empleados.models import Empleado
-from asistencia.models import EventoAsistencia
 
 from integraciones.services.integracion_service import IntegracionService
+from asistencia.services.exportacion_service import ExportacionAsistenciaService
+from asistencia.services.ingesta_service import FormatoIngestaInvalido, IngestaMarcacionesService
+from core.paginacion import CursorInvalido
 from .serializers import (
     IntegracionErpSerializer,
     WebhookSerializer,
@@ -21,6 +27,7 @@ class IntegracionErpViewSet(viewsets.ModelViewSet):
 
     Incluye endpoints personalizados para:
     - Importación de empleados (API Key).
+    - Ingesta masiva de marcaciones de biométricos (API Key).
     - Exportación de nómina.
     - Exportación de asistencia.
     """
@@ -73,6 +80,62 @@ class IntegracionErpViewSet(viewsets.ModelViewSet):
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(
+        detail=False,
+        methods=["post"],
+        permission_classes=[AllowAny],
+        url_path="importar-marcaciones",
+    )
+    def importar_marcaciones(self, request):
+        """
+        Ingesta masiva de marcaciones (biométricos).
+
+        Formatos según Content-Type:
+        - text/csv: encabezados cedula,registrado_el,tipo[,latitud,longitud,observacion]
+        - application/x-ndjson (JSON lines): un objeto por línea con las mismas claves
+        - application/json: {"marcaciones": [...]}
+
+        `?empresa_id=` acota la búsqueda por cédula. Los errores se reportan por fila.
+        """
+        api_key = request.headers.get("X-API-KEY")
+
+        integracion = IntegracionErp.objects.filter(api_key=api_key, activo=True).first()
+        if not integracion:
+            return Response(
+                {"error": "Unauthorized / API Key inválida"},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+
+        tipo_contenido = (request.content_type or "").lower()
+        try:
+            if "csv" in tipo_contenido:
+                filas = IngestaMarcacionesService.leer_filas(request.body, "csv")
+            elif "ndjson" in tipo_contenido or "jsonl" in tipo_contenido:
+                filas = IngestaMarcacionesService.leer_filas(request.body, "jsonl")
+            else:
+                filas = list(enumerate(request.data.get("marcaciones", []), start=1))
+        except (FormatoIngestaInvalido, UnicodeDecodeError, AttributeError) as e:
+            return Response({"error": str(e) or "Cuerpo inválido"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            empresa_id = int(request.query_params["empresa_id"]) if request.query_params.get("empresa_id") else None
+        except ValueError:
+            return Response({"error": "empresa_id debe ser numérico"}, status=status.HTTP_400_BAD_REQUEST)
+
+        resumen = IngestaMarcacionesService.importar(filas, empresa_id=empresa_id)
+
+        LogIntegracion.objects.create(
+            integracion=integracion,
+            endpoint="/api/integraciones/erp/importar-marcaciones/",
+            codigo_respuesta=201 if not resumen["errores"] else 206,
+            mensaje_respuesta=(
+                f"Recibidas: {resumen['recibidas']}. Insertadas: {resumen['insertadas']}. "
+                f"Duplicadas: {resumen['duplicadas']}. Errores: {len(resumen['errores'])}"
+            ),
+        )
+
+        return Response(resumen, status=status.HTTP_200_OK)
+
     @action(
         detail=False,
         methods=["get"],
@@ -113,27 +176,58 @@ class IntegracionErpViewSet(viewsets.ModelViewSet):
     )
     def exportar_asistencia(self, request):
         """
-        Exporta los últimos 50 eventos de asistencia.
-        """
-        try:
-            eventos = (
-                EventoAsistencia.objects.select_related("empleado")
-                .order_by("-registrado_el")[:50]
-            )
+        Exporta marcaciones en streaming (CSV o JSON Lines).
 
-            data = [
-                {
-                    "fecha": ev.registrado_el,
-                    "empleado": f"{ev.empleado.nombres} {ev.empleado.apellidos}",
-                    "tipo": ev.get_tipo_display(),
-                }
-                for ev in eventos
-            ]
+        Parámetros: desde, hasta (AAAA-MM-DD; por defecto el mes en curso), empresa_id
+        (solo superusuario; el resto exporta su empresa), unidad_id, formato (csv|jsonl), limite (filas por página) y cursor.
+        Con `limite`, la cabecera X-Cursor-Siguiente trae el cursor de la página siguiente.
+        """
+        params = request.query_params
+        formato = params.get("formato", "csv")
+        if formato not in ExportacionAsistenciaService.FORMATOS:
+            return Response({"error": "formato debe ser csv o jsonl"}, status=status.HTTP_400_BAD_REQUEST)
 
-            return Response({"eventos": data}, status=status.HTTP_200_OK)
+        hoy = timezone.localdate()
+        try:
+            desde = date.fromisoformat(params["desde"]) if params.get("desde") else hoy.replace(day=1)
+            hasta = date.fromisoformat(params["hasta"]) if params.get("hasta") else hoy
+            limite = int(params["limite"]) if params.get("limite") else None
+            empresa_id = int(params["empresa_id"]) if params.get("empresa_id") else None
+            unidad_id = int(params["unidad_id"]) if params.get("unidad_id") else None
+            if limite is not None and limite < 1:
+                raise ValueError("limite debe ser positivo")
+            if desde > hasta:
+                raise ValueError("desde es posterior a hasta")
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        # Solo el superusuario puede elegir empresa; el resto exporta la suya
+        if not request.user.is_superuser:
+            empresa = getattr(request, "empresa_actual", None)
+            if empresa is None:
+                return Response({"error": "El usuario no tiene una empresa asignada"}, status=status.HTTP_403_FORBIDDEN)
+            empresa_id = empresa.pk
+        try:
+            qs = ExportacionAsistenciaService.consulta(
+                desde,
+                hasta,
+                empresa_id=empresa_id,
+                unidad_id=unidad_id,
+                cursor=params.get("cursor"),
+            )
+        except CursorInvalido:
+            return Response({"error": "Cursor inválido"}, status=status.HTTP_400_BAD_REQUEST)
+
+        cursor_siguiente = ExportacionAsistenciaService.cursor_siguiente(qs, limite)
+
+        respuesta = StreamingHttpResponse(
+            ExportacionAsistenciaService.generar(qs, formato, limite),
+            content_type="text/csv; charset=utf-8" if formato == "csv" else "application/x-ndjson",
+        )
+        respuesta["Content-Disposition"] = f'attachment; filename="asistencia_{desde}_{hasta}.{formato}"'
+        if cursor_siguiente:
+            respuesta["X-Cursor-Siguiente"] = cursor_siguiente
+        return respuesta
 
 
 class WebhookViewSet(viewsets.ModelViewSet):
@@ -28,3 +28,18 @@ class EventosWebhook:
         (SOLICITUD_APROBADA, 'Vacaciones Aprobadas'),
         (ALERTA_KPI, 'Alerta de KPI Bajo'),
     ]
+
+
+class EstadoEnvioWebhook:
+    """
+    Estados de una entrega de la bandeja de salida de webhooks.
+    """
+    PENDIENTE = 'pendiente'
+    ENVIADO = 'enviado'
+    FALLIDO = 'fallido'
+
+    OPCIONES = [
+        (PENDIENTE, 'Pendiente'),
+        (ENVIADO, 'Enviado'),
+        (FALLIDO, 'Fallido'),
+    ]
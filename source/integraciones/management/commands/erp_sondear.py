@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from integraciones.services.salud_erp_service import (
+    ERP_SONDEO_HILOS,
+    ERP_SONDEO_INTERVALO,
+    SaludErpService,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Sondeo de salud de los ERP: comprueba en paralelo todos los ERP activos "
+        "cada intervalo y guarda latencias y disponibilidad en la caché."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--una-vez",
+            action="store_true",
+            help="Hace una sola ronda y termina (para cron).",
+        )
+        parser.add_argument(
+            "--intervalo",
+            type=float,
+            default=ERP_SONDEO_INTERVALO,
+            help="Segundos entre el inicio de dos rondas (por defecto: %(default)s).",
+        )
+        parser.add_argument(
+            "--hilos",
+            type=int,
+            default=ERP_SONDEO_HILOS,
+            help="Sondeos concurrentes (por defecto: %(default)s).",
+        )
+
+    def handle(self, *args, **options):
+        if options["hilos"] <= 0 or options["intervalo"] <= 0:
+            raise CommandError("--hilos e --intervalo deben ser mayores que 0.")
+
+        try:
+            while True:
+                inicio = time.monotonic()
+                resumen = SaludErpService.sondear_todos(hilos=options["hilos"])
+                self.stdout.write(
+                    f"Sondeados: {resumen['sondeados']} | Disponibles: {resumen['disponibles']} | "
+                    f"Caídos: {resumen['caidos']} | Cambios de estado: {resumen['cambios']}"
+                )
+
+                if options["una_vez"]:
+                    break
+                # Rondas a ritmo fijo: el tiempo de sondeo se descuenta de la espera
+                time.sleep(max(options["intervalo"] - (time.monotonic() - inicio), 0))
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS("Sondeo de ERP finalizado."))
@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from integraciones.services.webhook_service import WEBHOOKS_HILOS, WebhookService
+
+
+class Command(BaseCommand):
+    help = (
+        "Despachador de webhooks: entrega en paralelo los envíos pendientes de la "
+        "bandeja de salida, con reintentos y cortocircuito por endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--una-vez",
+            action="store_true",
+            help="Procesa lo pendiente y termina (para cron).",
+        )
+        parser.add_argument(
+            "--intervalo",
+            type=float,
+            default=5,
+            help="Segundos de espera cuando no hay envíos vencidos (por defecto: %(default)s).",
+        )
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=100,
+            help="Envíos tomados por ronda (por defecto: %(default)s).",
+        )
+        parser.add_argument(
+            "--hilos",
+            type=int,
+            default=WEBHOOKS_HILOS,
+            help="Entregas concurrentes (por defecto: %(default)s).",
+        )
+
+    def handle(self, *args, **options):
+        if options["lote"] <= 0 or options["hilos"] <= 0 or options["intervalo"] < 0:
+            raise CommandError("--lote y --hilos deben ser mayores que 0 e --intervalo >= 0.")
+
+        try:
+            while True:
+                resumen = WebhookService.procesar_pendientes(limite=options["lote"], hilos=options["hilos"])
+                if any(resumen.values()):
+                    self.stdout.write(
+                        f"Enviados: {resumen['enviados']} | Reintentos: {resumen['reintentos']} | "
+                        f"Fallidos: {resumen['fallidos']} | Aplazados: {resumen['aplazados']}"
+                    )
+
+                # Una ronda llena indica que puede quedar más trabajo vencido
+                if sum(resumen.values()) >= options["lote"]:
+                    continue
+                if options["una_vez"]:
+                    break
+                time.sleep(options["intervalo"])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS("Despachador de webhooks detenido."))
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.3 on 2026-10-18 13:34
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integraciones', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhook',
+            name='circuito_abierto_hasta',
+            field=models.DateTimeField(blank=True, help_text='Mientras esté en el futuro no se intentan entregas a este endpoint', null=True),
+        ),
+        migrations.CreateModel(
+            name='EnvioWebhook',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('evento', models.CharField(choices=[('empleado_creado', 'Nuevo Empleado'), ('solicitud_aprobada', 'Vacaciones Aprobadas'), ('alerta_kpi', 'Alerta de KPI Bajo')], max_length=50)),
+                ('payload', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('enviado', 'Enviado'), ('fallido', 'Fallido')], default='pendiente', max_length=20)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('proximo_intento', models.DateTimeField()),
+                ('ultimo_codigo', models.IntegerField(blank=True, null=True)),
+                ('ultimo_error', models.TextField(blank=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_envio', models.DateTimeField(blank=True, null=True)),
+                ('webhook', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='envios', to='integraciones.webhook')),
+            ],
+            options={
+                'verbose_name': 'Envío de Webhook',
+                'verbose_name_plural': 'Envíos de Webhooks',
+                'indexes': [models.Index(fields=['estado', 'proximo_intento'], name='envio_webhook_pendiente_idx')],
+            },
+        ),
+    ]
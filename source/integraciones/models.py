@@ -1,6 +1,7 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
-from integraciones.constants import EstadoIntegracion, EventosWebhook
+from integraciones.constants import EstadoEnvioWebhook, EstadoIntegracion, EventosWebhook
 
 
 class IntegracionErp(models.Model):
@@ -68,12 +69,55 @@ class Webhook(models.Model):
     )
     activo = models.BooleanField(default=True)
 
+    # Fallos consecutivos de entrega; al llegar al umbral se abre el circuito
     intentos_fallidos = models.IntegerField(default=0)
+    circuito_abierto_hasta = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Mientras esté en el futuro no se intentan entregas a este endpoint"
+    )
 
     def __str__(self):
         return f"{self.nombre} -> {self.evento}"
 
 
+class EnvioWebhook(models.Model):
+    """
+    Bandeja de salida (outbox) de webhooks: una fila por evento y webhook.
+
+    Se escribe en la misma transacción que el cambio de negocio que origina el
+    evento, de modo que solo se envía lo confirmado y nada se pierde si el
+    proceso cae. El despachador (comando webhooks_despachar) la consume.
+    """
+    webhook = models.ForeignKey(Webhook, on_delete=models.CASCADE, related_name="envios")
+    evento = models.CharField(max_length=50, choices=EventosWebhook.OPCIONES)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+
+    estado = models.CharField(
+        max_length=20,
+        choices=EstadoEnvioWebhook.OPCIONES,
+        default=EstadoEnvioWebhook.PENDIENTE
+    )
+    intentos = models.PositiveSmallIntegerField(default=0)
+    proximo_intento = models.DateTimeField()
+    ultimo_codigo = models.IntegerField(null=True, blank=True)
+    ultimo_error = models.TextField(blank=True)
+
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_envio = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Envío de Webhook"
+        verbose_name_plural = "Envíos de Webhooks"
+        indexes = [
+            # el despachador busca pendientes vencidos por orden de próximo intento
+            models.Index(fields=["estado", "proximo_intento"], name="envio_webhook_pendiente_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.webhook} #{self.pk} ({self.estado})"
+
+
 class LogIntegracion(models.Model):
     """
     Historial de comunicaciones (auditoría técnica de integraciones).
@@ -4,23 +4,30 @@ from django.db import transaction
 
 from integraciones.models import LogIntegracion
 from integraciones.constants import EstadoIntegracion
+from integraciones.services.salud_erp_service import ERP_SONDEO_TIMEOUT, SaludErpService
+from integraciones.services.webhook_service import WebhookService
 
 from empleados.models import Empleado, Puesto
 from core.models import Empresa, UnidadOrganizacional
+from auditoria.services.auditoria_service import AuditoriaService
 
 
 class IntegracionService:
     @staticmethod
     def probar_conexion_erp(erp):
         """
-        Realiza una prueba de conectividad al ERP y actualiza su estado.
+        Realiza una prueba de conectividad al ERP (manual, desde el dashboard) y
+        actualiza su estado. La muestra se suma al historial del sondeo periódico.
         """
+        estado_previo = erp.estado_sincronizacion
+        latencia_ms = None
         try:
-            response = requests.get(erp.url_api, timeout=5)
+            response = requests.get(erp.url_api, timeout=ERP_SONDEO_TIMEOUT)
 
             if 200 <= response.status_code < 500:
                 erp.estado_sincronizacion = EstadoIntegracion.EXITOSO
                 erp.fecha_ultima_sincronizacion = timezone.now()
+                latencia_ms = round(response.elapsed.total_seconds() * 1000, 1)
                 mensaje = f"Conexión exitosa. Tiempo: {response.elapsed.total_seconds()}s"
                 codigo = response.status_code
                 exito = True
@@ -33,33 +40,29 @@ class IntegracionService:
             codigo = 0
             exito = False
 
+        SaludErpService.agregar_muestras({erp.pk: SaludErpService.muestra(exito, codigo, latencia_ms, mensaje)})
+
         erp.save(update_fields=["estado_sincronizacion", "fecha_ultima_sincronizacion"])
 
-        LogIntegracion.objects.create(
-            integracion=erp,
-            endpoint=erp.url_api,
-            codigo_respuesta=codigo,
-            mensaje_respuesta=mensaje,
-        )
+        # Como en el sondeo periódico, solo los cambios de estado quedan en el log
+        if erp.estado_sincronizacion != estado_previo:
+            LogIntegracion.objects.create(
+                integracion=erp,
+                endpoint=erp.url_api,
+                codigo_respuesta=codigo,
+                mensaje_respuesta=mensaje,
+            )
         return exito, mensaje
 
     @staticmethod
     def disparar_webhook(webhook, payload):
         """
-        Envía un POST a un webhook y registra el resultado.
+        Envía un POST firmado a un webhook de forma inmediata y registra el
+        resultado (prueba manual). Los eventos del sistema no usan esta vía:
+        se encolan con WebhookService.encolar y los entrega el despachador.
         """
-        try:
-            response = requests.post(
-                webhook.url_destino,
-                json=payload,
-                timeout=5,
-                headers={"Content-Type": "application/json"},
-            )
-            codigo = response.status_code
-            mensaje = f"Enviado. Respuesta: {response.text[:100]}"
-        except Exception as e:
-            codigo = 0
-            mensaje = f"Error envío: {str(e)}"
+        peticion = WebhookService.preparar(webhook, payload.get("evento", webhook.evento), payload)
+        codigo, mensaje = WebhookService.entregar(peticion)
 
         LogIntegracion.objects.create(
             webhook=webhook,
@@ -70,13 +73,15 @@ class IntegracionService:
         return codigo
 
     @staticmethod
+    @AuditoriaService.lote()
     @transaction.atomic
     def importar_empleados(lista_data, api_key):
         """
         Importación masiva de empleados.
 
         Selecciona empresa/unidad/puesto por defecto de forma dinámica
-        para evitar IDs hardcodeados.
+        para evitar IDs hardcodeados. La auditoría de la importación se
+        escribe en bloque tras el commit.
         """
         creados = 0
         errores = []
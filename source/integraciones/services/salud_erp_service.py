@@ -0,0 +1,172 @@
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from integraciones.constants import EstadoIntegracion
+from integraciones.models import IntegracionErp, LogIntegracion
+
+# Configuración del sondeo de salud de los ERP
+ERP_SONDEO_INTERVALO = getattr(settings, "ERP_SONDEO_INTERVALO", 60)  # segundos entre rondas
+ERP_SONDEO_TIMEOUT = getattr(settings, "ERP_SONDEO_TIMEOUT", 5)  # segundos por petición
+ERP_SONDEO_HILOS = getattr(settings, "ERP_SONDEO_HILOS", 8)  # sondeos concurrentes
+ERP_SONDEO_HISTORIAL = getattr(settings, "ERP_SONDEO_HISTORIAL", 100)  # muestras guardadas por ERP
+# Vigencia del historial: si el sondeo se detiene, el tablero deja de mostrar datos viejos
+ERP_SONDEO_TTL = getattr(settings, "ERP_SONDEO_TTL", 24 * 60 * 60)
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentil(valores, p):
+    """Percentil por rango más cercano de una lista ya ordenada."""
+    if not valores:
+        return None
+    return valores[max(math.ceil(p / 100 * len(valores)) - 1, 0)]
+
+
+class SaludErpService:
+    """
+    Sondeo periódico de conectividad de los ERP activos.
+
+    El job programado (comando erp_sondear) hace un GET a todos los ERP activos
+    en paralelo, guarda cada muestra (éxito, código, latencia) en un historial
+    acotado en la caché compartida y actualiza `estado_sincronizacion`. Solo los
+    cambios de estado se registran en LogIntegracion, no cada sondeo.
+
+    El tablero lee latencias (p50/p95/p99) y disponibilidad desde la caché con
+    `resumenes`: nunca espera a un servidor remoto. Con varios procesos, CACHE_URL
+    debe apuntar a una caché compartida (Redis, Memcached).
+    """
+
+    @staticmethod
+    def _clave(erp_id):
+        return f"integraciones:salud_erp:{erp_id}"
+
+    # --- Sondeo ---
+
+    @staticmethod
+    def sondear(sesion, url):
+        """GET al endpoint del ERP. Devuelve la muestra (apta para ejecutarse en otro hilo)."""
+        inicio = time.perf_counter()
+        try:
+            respuesta = sesion.get(url, timeout=ERP_SONDEO_TIMEOUT, allow_redirects=False)
+        except requests.RequestException as e:
+            return SaludErpService.muestra(False, 0, None, f"Fallo de conexión: {e}"[:200])
+
+        latencia_ms = round((time.perf_counter() - inicio) * 1000, 1)
+        # Igual que la prueba manual: 4xx indica que el servidor responde
+        if 200 <= respuesta.status_code < 500:
+            return SaludErpService.muestra(True, respuesta.status_code, latencia_ms, "Conexión exitosa")
+        return SaludErpService.muestra(
+            False, respuesta.status_code, latencia_ms, f"Error interno del servidor remoto: {respuesta.status_code}"
+        )
+
+    @staticmethod
+    def muestra(ok, codigo, latencia_ms, mensaje):
+        return {"fecha": timezone.now(), "ok": ok, "codigo": codigo, "latencia_ms": latencia_ms, "mensaje": mensaje}
+
+    @staticmethod
+    def sondear_todos(hilos=None):
+        """
+        Una ronda: sondea en paralelo todos los ERP activos y registra el resultado.
+        Devuelve un resumen {sondeados, disponibles, caidos, cambios}.
+        """
+        hilos = hilos or ERP_SONDEO_HILOS
+        resumen = {"sondeados": 0, "disponibles": 0, "caidos": 0, "cambios": 0}
+
+        erps = list(IntegracionErp.objects.filter(activo=True).values("id", "url_api", "estado_sincronizacion"))
+        if not erps:
+            return resumen
+
+        # Solo E/S en los hilos, con una sesión que reutiliza conexiones por host
+        with requests.Session() as sesion:
+            adaptador = HTTPAdapter(pool_connections=hilos, pool_maxsize=hilos, max_retries=0)
+            sesion.mount("http://", adaptador)
+            sesion.mount("https://", adaptador)
+            with ThreadPoolExecutor(max_workers=min(hilos, len(erps))) as pool:
+                muestras = list(pool.map(partial(SaludErpService.sondear, sesion), [erp["url_api"] for erp in erps]))
+
+        resumen["cambios"] = SaludErpService._registrar(erps, muestras)
+        resumen["sondeados"] = len(muestras)
+        resumen["disponibles"] = sum(1 for muestra in muestras if muestra["ok"])
+        resumen["caidos"] = resumen["sondeados"] - resumen["disponibles"]
+        return resumen
+
+    @staticmethod
+    def _registrar(erps, muestras):
+        """Guarda las muestras y aplica los cambios de estado. Devuelve cuántos ERP cambiaron."""
+        ahora = timezone.now()
+        SaludErpService.agregar_muestras({erp["id"]: muestra for erp, muestra in zip(erps, muestras)})
+
+        disponibles = {erp["id"] for erp, muestra in zip(erps, muestras) if muestra["ok"]}
+        logs = []
+        for erp, muestra in zip(erps, muestras):
+            estado = EstadoIntegracion.EXITOSO if muestra["ok"] else EstadoIntegracion.ERROR
+            if estado != erp["estado_sincronizacion"]:
+                logs.append(LogIntegracion(
+                    integracion_id=erp["id"],
+                    endpoint=erp["url_api"],
+                    codigo_respuesta=muestra["codigo"],
+                    mensaje_respuesta=muestra["mensaje"],
+                ))
+
+        with transaction.atomic():
+            if disponibles:
+                IntegracionErp.objects.filter(pk__in=disponibles).update(
+                    estado_sincronizacion=EstadoIntegracion.EXITOSO, fecha_ultima_sincronizacion=ahora
+                )
+            caidos = [erp["id"] for erp in erps if erp["id"] not in disponibles]
+            if caidos:
+                IntegracionErp.objects.filter(pk__in=caidos).exclude(
+                    estado_sincronizacion=EstadoIntegracion.ERROR
+                ).update(estado_sincronizacion=EstadoIntegracion.ERROR)
+            LogIntegracion.objects.bulk_create(logs)
+        return len(logs)
+
+    # --- Historial en caché ---
+
+    @staticmethod
+    def agregar_muestras(muestras_por_erp):
+        """Añade una muestra al historial de cada ERP ({erp_id: muestra}), conservando las últimas."""
+        claves = {SaludErpService._clave(erp_id): muestra for erp_id, muestra in muestras_por_erp.items()}
+        actuales = cache.get_many(claves.keys())
+        cache.set_many(
+            {
+                clave: (actuales.get(clave, []) + [muestra])[-ERP_SONDEO_HISTORIAL:]
+                for clave, muestra in claves.items()
+            },
+            timeout=ERP_SONDEO_TTL,
+        )
+
+    @staticmethod
+    def historial(erp_id):
+        return cache.get(SaludErpService._clave(erp_id), [])
+
+    @staticmethod
+    def resumenes(erp_ids):
+        """
+        Latencias y disponibilidad de cada ERP a partir del historial en caché
+        (una sola lectura de caché). Los ERP sin muestras no aparecen.
+        """
+        claves = {SaludErpService._clave(erp_id): erp_id for erp_id in erp_ids}
+        resumenes = {}
+        for clave, muestras in cache.get_many(claves.keys()).items():
+            if not muestras:
+                continue
+            latencias = sorted(m["latencia_ms"] for m in muestras if m["ok"] and m["latencia_ms"] is not None)
+            resumen = {
+                "muestras": len(muestras),
+                "disponibilidad": round(100 * sum(1 for m in muestras if m["ok"]) / len(muestras), 1),
+                "ultima": muestras[-1],
+            }
+            for p in PERCENTILES:
+                resumen[f"p{p}"] = percentil(latencias, p)
+            resumenes[claves[clave]] = resumen
+        return resumenes
@@ -0,0 +1,256 @@
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from integraciones.constants import EstadoEnvioWebhook
+from integraciones.models import EnvioWebhook, LogIntegracion, Webhook
+
+# Configuración del despachador de webhooks
+WEBHOOKS_TIMEOUT = getattr(settings, "WEBHOOKS_TIMEOUT", 5)  # segundos por petición
+WEBHOOKS_HILOS = getattr(settings, "WEBHOOKS_HILOS", 8)  # entregas concurrentes (y tamaño del pool HTTP)
+WEBHOOKS_MAX_INTENTOS = getattr(settings, "WEBHOOKS_MAX_INTENTOS", 8)
+WEBHOOKS_BACKOFF_BASE = getattr(settings, "WEBHOOKS_BACKOFF_BASE", 30)  # segundos tras el primer fallo
+WEBHOOKS_BACKOFF_MAX = getattr(settings, "WEBHOOKS_BACKOFF_MAX", 3600)
+WEBHOOKS_UMBRAL_CIRCUITO = getattr(settings, "WEBHOOKS_UMBRAL_CIRCUITO", 5)  # fallos seguidos que abren el circuito
+WEBHOOKS_PAUSA_CIRCUITO = getattr(settings, "WEBHOOKS_PAUSA_CIRCUITO", 300)  # segundos con el circuito abierto
+WEBHOOKS_ARRENDAMIENTO = getattr(settings, "WEBHOOKS_ARRENDAMIENTO", 120)  # reserva de un envío tomado por un worker
+
+# Códigos que justifican reintentar (además de los errores de red y los 5xx)
+CODIGOS_REINTENTABLES = {408, 429}
+
+
+def firmar(secret_key, cuerpo, marca_tiempo):
+    """Firma HMAC-SHA256 de "<marca_tiempo>.<cuerpo>" con el secreto del webhook."""
+    mensaje = f"{marca_tiempo}.".encode() + cuerpo
+    return hmac.new(secret_key.encode(), mensaje, hashlib.sha256).hexdigest()
+
+
+def retraso_reintento(intentos):
+    """Backoff exponencial con tope y un 10% de jitter para no sincronizar reintentos."""
+    retraso = min(WEBHOOKS_BACKOFF_BASE * 2 ** max(intentos - 1, 0), WEBHOOKS_BACKOFF_MAX)
+    return retraso + random.uniform(0, retraso * 0.1)
+
+
+class WebhookService:
+    """
+    Despachador de webhooks basado en una bandeja de salida (EnvioWebhook).
+
+    - `encolar` escribe los envíos en la transacción del cambio de negocio.
+    - `procesar_pendientes` toma los envíos vencidos, los entrega en paralelo con
+      una sesión HTTP compartida (conexiones reutilizadas) y registra el resultado:
+      éxito, reintento con backoff exponencial o fallo definitivo.
+    - Cada endpoint tiene un cortocircuito: tras WEBHOOKS_UMBRAL_CIRCUITO fallos
+      seguidos se pausa WEBHOOKS_PAUSA_CIRCUITO segundos; luego se prueba con un
+      único envío (semiabierto) antes de reanudar.
+    - Con `secret_key` el cuerpo se firma (cabeceras X-Webhook-Timestamp y
+      X-Webhook-Firma: sha256=HMAC("<timestamp>.<cuerpo>")).
+    """
+
+    _sesion = None
+    _lock = threading.Lock()
+
+    # --- Productor ---
+
+    @staticmethod
+    def encolar(evento, payload):
+        """Crea un envío por cada webhook activo suscrito a `evento`. Devuelve cuántos."""
+        return WebhookService.encolar_lote(evento, [payload])
+
+    @staticmethod
+    def encolar_lote(evento, payloads):
+        """Como `encolar` para varios eventos del mismo tipo: una lectura y un INSERT."""
+        ahora = timezone.now()
+        envios = [
+            EnvioWebhook(webhook_id=webhook_id, evento=evento, payload=payload, proximo_intento=ahora)
+            for webhook_id in Webhook.objects.filter(evento=evento, activo=True).values_list("pk", flat=True)
+            for payload in payloads
+        ]
+        EnvioWebhook.objects.bulk_create(envios)
+        return len(envios)
+
+    # --- Entrega HTTP ---
+
+    @staticmethod
+    def sesion():
+        """Sesión HTTP compartida entre hilos, con pool de conexiones por host."""
+        with WebhookService._lock:
+            if WebhookService._sesion is None:
+                sesion = requests.Session()
+                adaptador = HTTPAdapter(pool_connections=WEBHOOKS_HILOS, pool_maxsize=WEBHOOKS_HILOS, max_retries=0)
+                sesion.mount("http://", adaptador)
+                sesion.mount("https://", adaptador)
+                WebhookService._sesion = sesion
+        return WebhookService._sesion
+
+    @staticmethod
+    def preparar(webhook, evento, payload, envio_id=None):
+        """Cuerpo y cabeceras de una entrega (datos planos, aptos para otro hilo)."""
+        cuerpo = json.dumps(payload, cls=DjangoJSONEncoder, ensure_ascii=False).encode()
+        marca_tiempo = str(int(time.time()))
+        cabeceras = {
+            "Content-Type": "application/json",
+            "X-Webhook-Evento": evento,
+            "X-Webhook-Timestamp": marca_tiempo,
+        }
+        if envio_id is not None:
+            # Identificador estable entre reintentos: permite al receptor deduplicar
+            cabeceras["X-Webhook-Id"] = str(envio_id)
+        if webhook.secret_key:
+            cabeceras["X-Webhook-Firma"] = f"sha256={firmar(webhook.secret_key, cuerpo, marca_tiempo)}"
+        return {"url": webhook.url_destino, "cuerpo": cuerpo, "cabeceras": cabeceras}
+
+    @staticmethod
+    def entregar(peticion):
+        """Hace el POST. Devuelve (codigo, mensaje); codigo 0 si no hubo respuesta."""
+        try:
+            respuesta = WebhookService.sesion().post(
+                peticion["url"],
+                data=peticion["cuerpo"],
+                headers=peticion["cabeceras"],
+                timeout=WEBHOOKS_TIMEOUT,
+                allow_redirects=False,
+            )
+        except requests.RequestException as e:
+            return 0, f"Error envío: {e}"[:500]
+        return respuesta.status_code, f"Respuesta: {respuesta.text[:100]}"
+
+    @staticmethod
+    def es_reintentable(codigo):
+        return codigo == 0 or codigo >= 500 or codigo in CODIGOS_REINTENTABLES
+
+    # --- Consumidor ---
+
+    @staticmethod
+    def procesar_pendientes(limite=100, hilos=None):
+        """
+        Una ronda del despachador: entrega hasta `limite` envíos vencidos con
+        `hilos` conexiones concurrentes. Devuelve un resumen de la ronda.
+        """
+        hilos = hilos or WEBHOOKS_HILOS
+        ahora = timezone.now()
+        resumen = {"enviados": 0, "reintentos": 0, "fallidos": 0, "aplazados": 0}
+
+        tomados = WebhookService._tomar(limite, ahora, resumen)
+        if not tomados:
+            return resumen
+
+        peticiones = [
+            WebhookService.preparar(envio.webhook, envio.evento, envio.payload, envio.pk) for envio in tomados
+        ]
+        # Solo E/S en los hilos: la base se actualiza después, desde el hilo llamador
+        with ThreadPoolExecutor(max_workers=min(hilos, len(peticiones))) as pool:
+            resultados = list(pool.map(WebhookService.entregar, peticiones))
+
+        WebhookService._registrar(tomados, resultados, resumen)
+        return resumen
+
+    @staticmethod
+    def _tomar(limite, ahora, resumen):
+        """
+        Reserva los envíos vencidos (SKIP LOCKED: varios workers no se pisan) y
+        aparta los de endpoints con el circuito abierto.
+        """
+        with transaction.atomic():
+            envios = list(
+                EnvioWebhook.objects.select_for_update(skip_locked=True, of=("self",))
+                .select_related("webhook")
+                .filter(estado=EstadoEnvioWebhook.PENDIENTE, proximo_intento__lte=ahora)
+                .order_by("proximo_intento", "id")[:limite]
+            )
+
+            tomados, aplazados, descartados = [], defaultdict(list), []
+            semiabiertos = set()
+            for envio in envios:
+                webhook = envio.webhook
+                if not webhook.activo:
+                    descartados.append(envio.pk)
+                    continue
+                if webhook.circuito_abierto_hasta:
+                    if webhook.circuito_abierto_hasta > ahora:
+                        aplazados[webhook.circuito_abierto_hasta].append(envio.pk)
+                        continue
+                    # Circuito semiabierto: una sola entrega de prueba por ronda
+                    if webhook.pk in semiabiertos:
+                        aplazados[ahora + timedelta(seconds=WEBHOOKS_BACKOFF_BASE)].append(envio.pk)
+                        continue
+                    semiabiertos.add(webhook.pk)
+                tomados.append(envio)
+
+            for momento, ids in aplazados.items():
+                EnvioWebhook.objects.filter(pk__in=ids).update(proximo_intento=momento)
+                resumen["aplazados"] += len(ids)
+            if descartados:
+                resumen["fallidos"] += EnvioWebhook.objects.filter(pk__in=descartados).update(
+                    estado=EstadoEnvioWebhook.FALLIDO, ultimo_error="Webhook desactivado"
+                )
+            if tomados:
+                # Reserva: si el worker cae a mitad de la entrega, otro lo retoma al vencer
+                EnvioWebhook.objects.filter(pk__in=[envio.pk for envio in tomados]).update(
+                    proximo_intento=ahora + timedelta(seconds=WEBHOOKS_ARRENDAMIENTO)
+                )
+        return tomados
+
+    @staticmethod
+    def _registrar(envios, resultados, resumen):
+        ahora = timezone.now()
+        enviados, logs = defaultdict(list), []
+        exitos, fallos = defaultdict(int), defaultdict(int)
+        webhooks = {}
+
+        with transaction.atomic():
+            for envio, (codigo, mensaje) in zip(envios, resultados):
+                webhooks[envio.webhook_id] = envio.webhook
+                logs.append(LogIntegracion(
+                    webhook_id=envio.webhook_id,
+                    endpoint=envio.webhook.url_destino,
+                    codigo_respuesta=codigo,
+                    mensaje_respuesta=mensaje,
+                ))
+
+                if 200 <= codigo < 300:
+                    enviados[codigo].append(envio.pk)
+                    exitos[envio.webhook_id] += 1
+                    continue
+
+                intentos = envio.intentos + 1
+                cambios = {"intentos": intentos, "ultimo_codigo": codigo, "ultimo_error": mensaje}
+                if WebhookService.es_reintentable(codigo):
+                    fallos[envio.webhook_id] += 1
+                if WebhookService.es_reintentable(codigo) and intentos < WEBHOOKS_MAX_INTENTOS:
+                    cambios["proximo_intento"] = ahora + timedelta(seconds=retraso_reintento(intentos))
+                    resumen["reintentos"] += 1
+                else:
+                    cambios["estado"] = EstadoEnvioWebhook.FALLIDO
+                    resumen["fallidos"] += 1
+                EnvioWebhook.objects.filter(pk=envio.pk).update(**cambios)
+
+            for codigo, ids in enviados.items():
+                resumen["enviados"] += EnvioWebhook.objects.filter(pk__in=ids).update(
+                    estado=EstadoEnvioWebhook.ENVIADO, fecha_envio=ahora, intentos=F("intentos") + 1, ultimo_codigo=codigo
+                )
+            LogIntegracion.objects.bulk_create(logs)
+
+            for webhook_id, webhook in webhooks.items():
+                if exitos[webhook_id]:
+                    # El endpoint responde: se cierra el circuito
+                    Webhook.objects.filter(pk=webhook_id).update(intentos_fallidos=0, circuito_abierto_hasta=None)
+                elif fallos[webhook_id]:
+                    consecutivos = webhook.intentos_fallidos + fallos[webhook_id]
+                    cambios = {"intentos_fallidos": F("intentos_fallidos") + fallos[webhook_id]}
+                    if consecutivos >= WEBHOOKS_UMBRAL_CIRCUITO:
+                        cambios["circuito_abierto_hasta"] = ahora + timedelta(seconds=WEBHOOKS_PAUSA_CIRCUITO)
+                    Webhook.objects.filter(pk=webhook_id).update(**cambios)
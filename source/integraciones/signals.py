@@ -1,37 +1,63 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
 
+from empleados.models import Empleado
 from solicitudes.models import SolicitudAusencia
 from asistencia.models import EventoAsistencia
 
-from .models import Webhook
 from .constants import EventosWebhook
-from .services.integracion_service import IntegracionService
+from .services.webhook_service import WebhookService
+
+
+# Los eventos se escriben en la bandeja de salida (EnvioWebhook) dentro de la
+# transacción del cambio; el comando webhooks_despachar los entrega.
+
+@receiver(post_save, sender=Empleado)
+def webhook_empleado_creado(sender, instance, created, **kwargs):
+    if not created:
+        return
+
+    WebhookService.encolar(EventosWebhook.EMPLEADO_CREADO, {
+        "evento": EventosWebhook.EMPLEADO_CREADO,
+        "id": instance.pk,
+        "empresa_id": instance.empresa_id,
+        "nombres": instance.nombres,
+        "apellidos": instance.apellidos,
+        "cedula": instance.cedula,
+        "email": instance.email,
+        "fecha_ingreso": str(instance.fecha_ingreso),
+    })
+
+
+@receiver(pre_save, sender=SolicitudAusencia)
+def recordar_estado_solicitud(sender, instance, **kwargs):
+    """Guarda el estado previo para detectar la transición a aprobado."""
+    instance._estado_previo = None
+    if instance.pk is not None:
+        instance._estado_previo = (
+            SolicitudAusencia.objects.filter(pk=instance.pk).values_list("estado", flat=True).first()
+        )
 
 
 @receiver(post_save, sender=SolicitudAusencia)
-def webhook_nuevo_permiso(sender, instance, created, **kwargs):
+def webhook_solicitud_aprobada(sender, instance, created, **kwargs):
     """
-    Dispara webhooks activos cuando se crea una nueva solicitud de ausencia.
+    Encola los webhooks de SOLICITUD_APROBADA cuando la solicitud pasa a aprobada.
     """
-    if not created:
+    aprobado = SolicitudAusencia.Estado.APROBADO
+    if instance.estado != aprobado or getattr(instance, "_estado_previo", None) == aprobado:
         return
 
-    hooks = Webhook.objects.filter(
-        evento=EventosWebhook.SOLICITUD_APROBADA,
-        activo=True,
-    )
-
-    payload = {
-        "evento": "NUEVA_SOLICITUD",
+    WebhookService.encolar(EventosWebhook.SOLICITUD_APROBADA, {
+        "evento": EventosWebhook.SOLICITUD_APROBADA,
+        "id": instance.pk,
+        "empresa_id": instance.empresa_id,
         "empleado": str(instance.empleado),
         "tipo": str(instance.ausencia),
         "desde": str(instance.fecha_inicio),
         "hasta": str(instance.fecha_fin),
-    }
-
-    for hook in hooks:
-        IntegracionService.disparar_webhook(hook, payload)
+        "dias_habiles": instance.dias_habiles,
+    })
 
 
 @receiver(post_save, sender=EventoAsistencia)
@@ -1,12 +1,21 @@
 import json
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
 from unittest.mock import patch, MagicMock
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase, Client
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
-from integraciones.models import IntegracionErp, Webhook
-from integraciones.constants import EstadoIntegracion, EventosWebhook
+from integraciones.models import EnvioWebhook, IntegracionErp, LogIntegracion, Webhook
+from integraciones.constants import EstadoEnvioWebhook, EstadoIntegracion, EventosWebhook
 from integraciones.services.integracion_service import IntegracionService
+from integraciones.services.salud_erp_service import SaludErpService, percentil
+from integraciones.services.webhook_service import WEBHOOKS_BACKOFF_BASE, WebhookService, firmar, retraso_reintento
 
 from empleados.models import Empleado, Puesto
 from core.models import Empresa, UnidadOrganizacional
@@ -59,6 +68,9 @@ class IntegracionServiceWhiteBoxTests(TestCase):
         self.assertFalse(exito_fail)
         self.assertEqual(self.erp.estado_sincronizacion, EstadoIntegracion.ERROR)
 
+        # Solo el cambio de estado (ok -> error) deja fila en el log
+        self.assertEqual(LogIntegracion.objects.filter(integracion=self.erp).count(), 1)
+
         print("   Exito: la lógica de estados de conexión funciona.")
 
 
@@ -136,6 +148,234 @@ class IntegracionApiWhiteBoxTests(TestCase):
             self.fail(f"Fallo en API. Error devuelto: {data_resp.get('error', 'Desconocido')}")
 
 
+class IngestaMarcacionesWhiteBoxTests(TestCase):
+    """
+    [Caja Blanca] Ingesta masiva de marcaciones (CSV / JSON lines).
+    """
+
+    def setUp(self):
+        self.client = Client()
+        self.api_key = "bio-key-123"
+        IntegracionErp.objects.create(nombre="Biométrico", url_api="http://localhost", api_key=self.api_key)
+
+        self.empresa = Empresa.objects.create(nombre_comercial="Mango Bio", ruc="444")
+        unidad = UnidadOrganizacional.objects.create(nombre="Planta", empresa=self.empresa)
+        puesto = Puesto.objects.create(nombre="Operario", empresa=self.empresa)
+        self.empleado = Empleado.objects.create(
+            nombres="Rosa", apellidos="Vera", cedula="0909", email="rosa@test.com",
+            empresa=self.empresa, unidad_org=unidad, puesto=puesto, fecha_ingreso="2024-01-01"
+        )
+        self.url = reverse("integracionerp-importar-marcaciones")
+
+    def _enviar(self, cuerpo, content_type):
+        return self.client.post(
+            f"{self.url}?empresa_id={self.empresa.id}", data=cuerpo,
+            content_type=content_type, HTTP_X_API_KEY=self.api_key,
+        ).json()
+
+    def test_csv_con_duplicados_y_errores_por_fila(self):
+        print("\n[TEST] Iniciando: test_csv_con_duplicados_y_errores_por_fila")
+        from asistencia.models import EventoAsistencia, JornadaCalculada
+
+        csv_cuerpo = (
+            "cedula,registrado_el,tipo\n"
+            "0909,2025-03-10T09:00:00,entrada\n"
+            "0909,2025-03-10T09:00:00,entrada\n"   # duplicada en el lote
+            "0909,2025-03-10T18:05:00,salida\n"
+            "9999,2025-03-10T09:00:00,entrada\n"   # cédula desconocida
+            "0909,no-es-fecha,entrada\n"
+        )
+        resumen = self._enviar(csv_cuerpo, "text/csv")
+        print(f"   Resumen: {resumen}")
+
+        self.assertEqual(resumen["insertadas"], 2)
+        self.assertEqual(resumen["duplicadas"], 1)
+        self.assertEqual(sorted(e["fila"] for e in resumen["errores"]), [4, 5])
+        self.assertEqual(resumen["jornadas"], 1, "Un recálculo por (empleado, fecha)")
+
+        jornada = JornadaCalculada.objects.get(empleado=self.empleado)
+        self.assertEqual(jornada.minutos_trabajados, 545)
+        self.assertEqual(EventoAsistencia.objects.filter(origen="biometrico").count(), 2)
+        print("   Exito: lote procesado sin abortar por filas inválidas.")
+
+    def test_jsonl_reenvio_es_idempotente(self):
+        print("\n[TEST] Iniciando: test_jsonl_reenvio_es_idempotente")
+        from asistencia.models import EventoAsistencia
+
+        lineas = "\n".join([
+            json.dumps({"cedula": "0909", "registrado_el": "2025-03-11T08:58:00-05:00", "tipo": "check_in"}),
+            "{no es json",
+            json.dumps({"cedula": "0909", "registrado_el": "2025-03-11T17:00:00-05:00", "tipo": "check_out"}),
+        ])
+        primero = self._enviar(lineas, "application/x-ndjson")
+        segundo = self._enviar(lineas, "application/x-ndjson")
+
+        self.assertEqual(primero["insertadas"], 2)
+        self.assertEqual(primero["errores"][0]["fila"], 2)
+        self.assertEqual(segundo["insertadas"], 0)
+        self.assertEqual(segundo["duplicadas"], 2)
+        self.assertEqual(EventoAsistencia.objects.count(), 2)
+        print("   Exito: el reenvío del mismo lote no duplica marcas.")
+
+    def test_lotes_concurrentes_no_duplican(self):
+        print("\n[TEST] Iniciando: test_lotes_concurrentes_no_duplican")
+        from asistencia.models import EventoAsistencia
+        from asistencia.services.ingesta_service import IngestaMarcacionesService
+
+        lineas = "\n".join([
+            json.dumps({"cedula": "0909", "registrado_el": "2025-03-12T08:00:00-05:00", "tipo": "check_in"}),
+            json.dumps({"cedula": "0909", "registrado_el": "2025-03-12T17:00:00-05:00", "tipo": "check_out"}),
+        ])
+        self._enviar(lineas, "application/x-ndjson")
+
+        # Un lote concurrente no llega a ver las marcas del otro en la verificación previa
+        with patch.object(IngestaMarcacionesService, "_existentes", return_value=set()):
+            segundo = self._enviar(lineas, "application/x-ndjson")
+
+        self.assertEqual((segundo["insertadas"], segundo["duplicadas"]), (0, 2))
+        self.assertEqual(EventoAsistencia.objects.count(), 2)
+        print("   Exito: la restricción única descarta las marcas repetidas.")
+
+    def test_empresa_id_invalido(self):
+        print("\n[TEST] Iniciando: test_empresa_id_invalido")
+        response = self.client.post(
+            f"{self.url}?empresa_id=abc", data="cedula,registrado_el,tipo\n",
+            content_type="text/csv", HTTP_X_API_KEY=self.api_key,
+        )
+        self.assertEqual(response.status_code, 400)
+        print("   Exito: empresa_id no numérico devuelve 400.")
+
+    def test_api_key_invalida(self):
+        print("\n[TEST] Iniciando: test_api_key_invalida")
+        response = self.client.post(self.url, data="", content_type="text/csv", HTTP_X_API_KEY="x")
+        self.assertEqual(response.status_code, 401)
+        print("   Exito: acceso denegado sin API key válida.")
+
+
+class ExportacionAsistenciaWhiteBoxTests(TestCase):
+    """
+    [Caja Blanca] Exportación de marcaciones en streaming con cursor keyset.
+    """
+
+    def setUp(self):
+        from datetime import datetime
+        from django.utils import timezone
+        from asistencia.models import EventoAsistencia
+
+        self.client = Client()
+        self.admin = User.objects.create_user(
+            email="nomina@test.com", password="123", is_staff=True, is_superuser=True
+        )
+        self.client.force_login(self.admin)
+
+        self.empresa = Empresa.objects.create(nombre_comercial="Mango Nómina", ruc="555")
+        self.otra = otra = Empresa.objects.create(nombre_comercial="Otra", ruc="556")
+        self.planta = UnidadOrganizacional.objects.create(nombre="Planta", empresa=self.empresa)
+        oficina = UnidadOrganizacional.objects.create(nombre="Oficina", empresa=self.empresa)
+        ajena = UnidadOrganizacional.objects.create(nombre="Ajena", empresa=otra)
+
+        def empleado(cedula, empresa, unidad):
+            puesto = Puesto.objects.create(nombre=f"Puesto {cedula}", empresa=empresa)
+            return Empleado.objects.create(
+                nombres="Luis", apellidos=cedula, cedula=cedula, email=f"{cedula}@test.com",
+                empresa=empresa, unidad_org=unidad, puesto=puesto, fecha_ingreso="2024-01-01",
+            )
+
+        zona = timezone.get_current_timezone()
+        eventos = []
+        for emp in (empleado("101", self.empresa, self.planta), empleado("102", self.empresa, oficina),
+                    empleado("201", otra, ajena)):
+            for dia in (1, 15, 31):
+                momento = timezone.make_aware(datetime(2025, 3, dia, 8, 30), zona)
+                eventos.append(EventoAsistencia(empleado=emp, tipo="check_in", registrado_el=momento))
+        # Fuera del rango
+        eventos.append(EventoAsistencia(
+            empleado=eventos[0].empleado, tipo="check_in",
+            registrado_el=timezone.make_aware(datetime(2025, 4, 1, 0, 5), zona),
+        ))
+        EventoAsistencia.objects.bulk_create(eventos)
+
+        self.url = reverse("integracionerp-exportar-asistencia")
+        self.params = f"desde=2025-03-01&hasta=2025-03-31&empresa_id={self.empresa.id}"
+
+    def _leer(self, response):
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_filtra_empresa_rango_y_unidad(self):
+        print("\n[TEST] Iniciando: test_csv_filtra_empresa_rango_y_unidad")
+        import csv, io
+
+        response = self.client.get(f"{self.url}?{self.params}")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming, "La respuesta debe emitirse en streaming")
+
+        filas = list(csv.DictReader(io.StringIO(self._leer(response))))
+        self.assertEqual(len(filas), 6, "Solo la empresa y el mes pedidos")
+        self.assertEqual(filas[0]["cedula"], "101")
+        self.assertEqual(filas[0]["tipo"], "Entrada")
+        self.assertEqual(filas, sorted(filas, key=lambda f: (f["registrado_el"], int(f["id"]))))
+
+        response = self.client.get(f"{self.url}?{self.params}&unidad_id={self.planta.id}")
+        filas = list(csv.DictReader(io.StringIO(self._leer(response))))
+        self.assertEqual({f["unidad"] for f in filas}, {"Planta"})
+        print("   Exito: filtros de empresa, fechas y unidad aplicados.")
+
+    def test_jsonl_paginado_por_cursor_cubre_todo(self):
+        print("\n[TEST] Iniciando: test_jsonl_paginado_por_cursor_cubre_todo")
+        vistos = []
+        cursor = ""
+        paginas = 0
+        while True:
+            response = self.client.get(f"{self.url}?{self.params}&formato=jsonl&limite=4&cursor={cursor}")
+            self.assertEqual(response["Content-Type"], "application/x-ndjson")
+            lineas = [json.loads(linea) for linea in self._leer(response).splitlines()]
+            vistos.extend(linea["id"] for linea in lineas)
+            paginas += 1
+            cursor = response.get("X-Cursor-Siguiente")
+            if not cursor:
+                break
+
+        print(f"   Páginas: {paginas}, filas: {len(vistos)}")
+        self.assertEqual(paginas, 2)
+        self.assertEqual(len(vistos), 6)
+        self.assertEqual(len(set(vistos)), 6, "Sin filas repetidas entre páginas")
+        print("   Exito: reanudación por cursor sin huecos ni duplicados.")
+
+    def test_parametros_invalidos(self):
+        print("\n[TEST] Iniciando: test_parametros_invalidos")
+        self.assertEqual(self.client.get(f"{self.url}?formato=xml").status_code, 400)
+        self.assertEqual(self.client.get(f"{self.url}?cursor=basura").status_code, 400)
+        self.assertEqual(self.client.get(f"{self.url}?desde=2025-04-01&hasta=2025-03-01").status_code, 400)
+        self.assertEqual(self.client.get(f"{self.url}?empresa_id=abc").status_code, 400)
+        self.assertEqual(self.client.get(f"{self.url}?unidad_id=1x").status_code, 400)
+        print("   Exito: errores de entrada devueltos como 400.")
+
+    def test_staff_sin_superusuario_exporta_solo_su_empresa(self):
+        print("\n[TEST] Iniciando: test_staff_sin_superusuario_exporta_solo_su_empresa")
+        import csv, io
+
+        staff = User.objects.get(email="101@test.com")
+        staff.is_staff = True
+        staff.save()
+        self.client.force_login(staff)
+
+        # Pide la otra empresa: se ignora y exporta la suya
+        response = self.client.get(f"{self.url}?desde=2025-03-01&hasta=2025-03-31&empresa_id={self.otra.id}")
+        self.assertEqual(response.status_code, 200)
+        filas = list(csv.DictReader(io.StringIO(self._leer(response))))
+        self.assertEqual({f["cedula"] for f in filas}, {"101", "102"})
+        print("   Exito: empresa_id ajeno ignorado para staff sin superusuario.")
+
+    def test_staff_sin_empresa_recibe_403(self):
+        print("\n[TEST] Iniciando: test_staff_sin_empresa_recibe_403")
+        staff = User.objects.create_user(email="soporte@test.com", password="123", is_staff=True)
+        self.client.force_login(staff)
+
+        response = self.client.get(f"{self.url}?{self.params}")
+        self.assertEqual(response.status_code, 403)
+        print("   Exito: sin empresa no se exporta nada.")
+
+
 class IntegracionSignalWhiteBoxTests(TestCase):
     """
     [Caja Blanca] Tests para signals y webhooks.
@@ -165,12 +405,11 @@ class IntegracionSignalWhiteBoxTests(TestCase):
 
         self.tipo_ausencia = TipoAusencia.objects.create(nombre="Vacaciones", empresa=self.empresa)
 
-    @patch("integraciones.services.integracion_service.IntegracionService.disparar_webhook")
-    def test_signal_webhook_nuevo_permiso(self, mock_disparar):
-        print("\n[TEST] Iniciando: test_signal_webhook_nuevo_permiso")
-        print("   Objetivo: verificar que el signal llama al servicio de webhook.")
+    def test_signal_solicitud_aprobada_encola_envio(self):
+        print("\n[TEST] Iniciando: test_signal_solicitud_aprobada_encola_envio")
+        print("   Objetivo: la aprobación escribe el evento en la bandeja de salida (sin HTTP).")
 
-        SolicitudAusencia.objects.create(
+        solicitud = SolicitudAusencia.objects.create(
             empleado=self.empleado,
             empresa=self.empresa,
             ausencia=self.tipo_ausencia,
@@ -179,17 +418,302 @@ class IntegracionSignalWhiteBoxTests(TestCase):
             motivo="Descanso",
             dias_habiles=3,
         )
+        self.assertFalse(EnvioWebhook.objects.exists())
+
+        solicitud.estado = SolicitudAusencia.Estado.APROBADO
+        solicitud.save()
+        solicitud.save()  # guardar de nuevo una solicitud ya aprobada no repite el evento
+
+        envio = EnvioWebhook.objects.get()
+        self.assertEqual(envio.webhook, self.webhook)
+        self.assertEqual(envio.estado, EstadoEnvioWebhook.PENDIENTE)
+        self.assertEqual(envio.payload["evento"], EventosWebhook.SOLICITUD_APROBADA)
+        self.assertIn("Web Hook", envio.payload["empleado"])
+        print("   Exito: un único envío pendiente por la transición a aprobado.")
+
+    def test_signal_empleado_creado_encola_envio(self):
+        print("\n[TEST] Iniciando: test_signal_empleado_creado_encola_envio")
+        Webhook.objects.create(
+            nombre="ERP Altas",
+            evento=EventosWebhook.EMPLEADO_CREADO,
+            url_destino="https://erp.test/altas",
+            activo=True,
+        )
+        Webhook.objects.create(
+            nombre="Inactivo",
+            evento=EventosWebhook.EMPLEADO_CREADO,
+            url_destino="https://erp.test/otro",
+            activo=False,
+        )
+
+        nuevo = Empleado.objects.create(
+            nombres="Ana",
+            apellidos="Alta",
+            email="alta@test.com",
+            cedula="889",
+            empresa=self.empresa,
+            unidad_org=self.unidad,
+            puesto=self.puesto,
+            fecha_ingreso="2024-02-01",
+        )
 
-        if mock_disparar.called:
-            print("   El servicio de webhook fue invocado.")
-            args, _ = mock_disparar.call_args
-            webhook_llamado = args[0]
-            payload = args[1]
+        envio = EnvioWebhook.objects.get()
+        self.assertEqual(envio.evento, EventosWebhook.EMPLEADO_CREADO)
+        self.assertEqual(envio.payload["id"], nuevo.pk)
+        print("   Exito: solo los webhooks activos del evento reciben el envío.")
 
-            self.assertEqual(webhook_llamado, self.webhook)
-            self.assertEqual(payload["evento"], "NUEVA_SOLICITUD")
-            self.assertIn("Web Hook", payload["empleado"])
-        else:
-            self.fail("El signal no disparó el webhook (mock_disparar no fue llamado).")
 
-        print("   Exito: la integración entre Solicitudes y Webhooks funciona.")
+class _ReceptorWebhooks(BaseHTTPRequestHandler):
+    """Endpoint HTTP local que registra lo recibido y responde según la ruta."""
+
+    recibidos = []
+    respuestas = {}
+    barrera = None
+
+    def do_POST(self):
+        cuerpo = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.recibidos.append({"ruta": self.path, "cabeceras": dict(self.headers), "cuerpo": cuerpo})
+
+        codigo = self.respuestas.get(self.path, 200)
+        if self.path == "/concurrente":
+            try:
+                # Solo se completa si las entregas llegan a la vez
+                self.barrera.wait()
+            except threading.BrokenBarrierError:
+                codigo = 503
+
+        self.send_response(codigo)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+class WebhookDespachoWhiteBoxTests(TestCase):
+    """
+    [Caja Blanca] Despachador de la bandeja de salida contra un servidor HTTP local.
+    """
+
+    def setUp(self):
+        _ReceptorWebhooks.recibidos = []
+        _ReceptorWebhooks.respuestas = {"/error": 500, "/rechazo": 400}
+        _ReceptorWebhooks.barrera = threading.Barrier(2, timeout=5)
+
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", 0), _ReceptorWebhooks)
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.servidor.server_address[1]}"
+
+    def tearDown(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+    def crear_webhook(self, ruta, secret_key=None):
+        return Webhook.objects.create(
+            nombre=ruta,
+            evento=EventosWebhook.ALERTA_KPI,
+            url_destino=f"{self.base}{ruta}",
+            secret_key=secret_key,
+            activo=True,
+        )
+
+    def vencer_pendientes(self):
+        EnvioWebhook.objects.filter(estado=EstadoEnvioWebhook.PENDIENTE).update(
+            proximo_intento=timezone.now() - timedelta(seconds=1)
+        )
+
+    def test_entrega_firmada_con_hmac(self):
+        print("\n[TEST] Iniciando: test_entrega_firmada_con_hmac")
+        self.crear_webhook("/ok", secret_key="s3cr3t")
+        WebhookService.encolar(EventosWebhook.ALERTA_KPI, {"evento": EventosWebhook.ALERTA_KPI, "valor": 12})
+
+        resumen = WebhookService.procesar_pendientes()
+
+        self.assertEqual(resumen["enviados"], 1)
+        recibido = _ReceptorWebhooks.recibidos[0]
+        marca = recibido["cabeceras"]["X-Webhook-Timestamp"]
+        self.assertEqual(recibido["cabeceras"]["X-Webhook-Firma"], f"sha256={firmar('s3cr3t', recibido['cuerpo'], marca)}")
+        self.assertEqual(json.loads(recibido["cuerpo"])["valor"], 12)
+
+        envio = EnvioWebhook.objects.get()
+        self.assertEqual(recibido["cabeceras"]["X-Webhook-Id"], str(envio.pk))
+        self.assertEqual((envio.estado, envio.intentos, envio.ultimo_codigo), (EstadoEnvioWebhook.ENVIADO, 1, 200))
+        self.assertEqual(LogIntegracion.objects.get().codigo_respuesta, 200)
+        print("   Exito: firma verificable por el receptor y envío marcado como enviado.")
+
+    def test_reintento_con_backoff_y_rechazo_definitivo(self):
+        print("\n[TEST] Iniciando: test_reintento_con_backoff_y_rechazo_definitivo")
+        caido = self.crear_webhook("/error")
+        self.crear_webhook("/rechazo")
+        WebhookService.encolar(EventosWebhook.ALERTA_KPI, {"evento": EventosWebhook.ALERTA_KPI})
+
+        antes = timezone.now()
+        resumen = WebhookService.procesar_pendientes()
+        self.assertEqual((resumen["reintentos"], resumen["fallidos"]), (1, 1))
+
+        reintento = EnvioWebhook.objects.get(webhook=caido)
+        self.assertEqual((reintento.estado, reintento.intentos, reintento.ultimo_codigo), (EstadoEnvioWebhook.PENDIENTE, 1, 500))
+        self.assertGreaterEqual(reintento.proximo_intento, antes + timedelta(seconds=WEBHOOKS_BACKOFF_BASE))
+        self.assertEqual(EnvioWebhook.objects.get(webhook__url_destino__endswith="/rechazo").estado, EstadoEnvioWebhook.FALLIDO)
+
+        # Antes de vencer el backoff no se vuelve a intentar
+        self.assertEqual(WebhookService.procesar_pendientes()["reintentos"], 0)
+        self.assertGreater(retraso_reintento(3), retraso_reintento(1))
+        print("   Exito: 5xx reprogramado con backoff, 4xx descartado sin reintentar.")
+
+    @patch("integraciones.services.webhook_service.WEBHOOKS_UMBRAL_CIRCUITO", 2)
+    def test_cortocircuito_por_endpoint(self):
+        print("\n[TEST] Iniciando: test_cortocircuito_por_endpoint")
+        webhook = self.crear_webhook("/error")
+        for _ in range(3):
+            WebhookService.encolar(EventosWebhook.ALERTA_KPI, {"evento": EventosWebhook.ALERTA_KPI})
+
+        WebhookService.procesar_pendientes()
+        webhook.refresh_from_db()
+        self.assertEqual(webhook.intentos_fallidos, 3)
+        self.assertIsNotNone(webhook.circuito_abierto_hasta)
+
+        print("   Circuito abierto: los envíos se aplazan sin tocar la red.")
+        self.vencer_pendientes()
+        resumen = WebhookService.procesar_pendientes()
+        self.assertEqual(resumen["aplazados"], 3)
+        self.assertEqual(len(_ReceptorWebhooks.recibidos), 3)
+
+        print("   Semiabierto: una sola entrega de prueba; si responde, se cierra.")
+        _ReceptorWebhooks.respuestas["/error"] = 200
+        Webhook.objects.filter(pk=webhook.pk).update(circuito_abierto_hasta=timezone.now() - timedelta(seconds=1))
+        self.vencer_pendientes()
+        resumen = WebhookService.procesar_pendientes()
+        self.assertEqual((resumen["enviados"], resumen["aplazados"]), (1, 2))
+
+        webhook.refresh_from_db()
+        self.assertEqual((webhook.intentos_fallidos, webhook.circuito_abierto_hasta), (0, None))
+        self.vencer_pendientes()
+        self.assertEqual(WebhookService.procesar_pendientes()["enviados"], 2)
+        print("   Exito: el endpoint caído se pausa y se reanuda tras la prueba.")
+
+    def test_entregas_concurrentes(self):
+        print("\n[TEST] Iniciando: test_entregas_concurrentes")
+        self.crear_webhook("/concurrente")
+        self.crear_webhook("/concurrente")
+        WebhookService.encolar(EventosWebhook.ALERTA_KPI, {"evento": EventosWebhook.ALERTA_KPI})
+
+        # El receptor retiene cada petición hasta que llegan las dos
+        resumen = WebhookService.procesar_pendientes(hilos=2)
+
+        self.assertEqual(resumen["enviados"], 2)
+        self.assertFalse(_ReceptorWebhooks.barrera.broken)
+        print("   Exito: las entregas se hacen en paralelo.")
+
+    def test_comando_despachar_una_vez(self):
+        print("\n[TEST] Iniciando: test_comando_despachar_una_vez")
+        self.crear_webhook("/ok")
+        for _ in range(3):
+            WebhookService.encolar(EventosWebhook.ALERTA_KPI, {"evento": EventosWebhook.ALERTA_KPI})
+
+        call_command("webhooks_despachar", "--una-vez", "--lote", "2", stdout=StringIO())
+
+        self.assertEqual(EnvioWebhook.objects.filter(estado=EstadoEnvioWebhook.ENVIADO).count(), 3)
+        print("   Exito: el comando vacía la bandeja en varias rondas.")
+
+
+class _ErpSimulado(BaseHTTPRequestHandler):
+    """Endpoint HTTP local que simula ERPs sanos, caídos o lentos."""
+
+    barrera = None
+
+    def do_GET(self):
+        codigo = 503 if self.path == "/caido" else 200
+        if self.path == "/concurrente":
+            try:
+                self.barrera.wait()
+            except threading.BrokenBarrierError:
+                codigo = 503
+
+        self.send_response(codigo)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+class SaludErpWhiteBoxTests(TestCase):
+    """
+    [Caja Blanca] Sondeo concurrente de ERPs con historial de latencias en caché.
+    """
+
+    def setUp(self):
+        cache.clear()
+        _ErpSimulado.barrera = threading.Barrier(2, timeout=5)
+
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", 0), _ErpSimulado)
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{self.servidor.server_address[1]}"
+
+        self.sap = IntegracionErp.objects.create(nombre="SAP", url_api=f"{base}/concurrente", api_key="1")
+        self.oracle = IntegracionErp.objects.create(nombre="Oracle", url_api=f"{base}/concurrente", api_key="2")
+        self.caido = IntegracionErp.objects.create(nombre="Legacy", url_api=f"{base}/caido", api_key="3")
+        self.pausado = IntegracionErp.objects.create(nombre="Pausado", url_api=f"{base}/caido", api_key="4", activo=False)
+
+        self.superusuario = User.objects.create_superuser(email="root@test.com", password="123")
+
+    def tearDown(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+    def test_ronda_concurrente_registra_solo_cambios(self):
+        print("\n[TEST] Iniciando: test_ronda_concurrente_registra_solo_cambios")
+
+        # /concurrente solo responde 200 si las dos peticiones llegan a la vez
+        resumen = SaludErpService.sondear_todos(hilos=4)
+        print(f"   Ronda 1: {resumen}")
+        self.assertEqual(resumen, {"sondeados": 3, "disponibles": 2, "caidos": 1, "cambios": 1})
+
+        self.caido.refresh_from_db()
+        self.sap.refresh_from_db()
+        self.assertEqual(self.caido.estado_sincronizacion, EstadoIntegracion.ERROR)
+        self.assertIsNotNone(self.sap.fecha_ultima_sincronizacion)
+        self.assertEqual(SaludErpService.historial(self.pausado.pk), [])
+
+        _ErpSimulado.barrera = threading.Barrier(2, timeout=5)
+        self.assertEqual(SaludErpService.sondear_todos(hilos=4)["cambios"], 0)
+        self.assertEqual(LogIntegracion.objects.count(), 1)
+        self.assertEqual(len(SaludErpService.historial(self.sap.pk)), 2)
+        print("   Exito: sondeo en paralelo, historial en caché y log solo al cambiar de estado.")
+
+    def test_dashboard_muestra_percentiles_sin_red(self):
+        print("\n[TEST] Iniciando: test_dashboard_muestra_percentiles_sin_red")
+        for latencia in range(10, 210, 10):
+            SaludErpService.agregar_muestras({self.sap.pk: SaludErpService.muestra(True, 200, float(latencia), "ok")})
+        for _ in range(5):
+            SaludErpService.agregar_muestras({self.sap.pk: SaludErpService.muestra(False, 0, None, "caído")})
+
+        self.assertEqual(percentil([1, 2, 3, 4], 50), 2)
+        resumen = SaludErpService.resumenes([self.sap.pk, self.oracle.pk])
+        self.assertNotIn(self.oracle.pk, resumen)
+        self.assertEqual(
+            (resumen[self.sap.pk]["p50"], resumen[self.sap.pk]["p95"], resumen[self.sap.pk]["p99"]),
+            (100.0, 190.0, 200.0),
+        )
+        self.assertEqual(resumen[self.sap.pk]["disponibilidad"], 80.0)
+
+        self.client.force_login(self.superusuario)
+        with patch("requests.Session.request", side_effect=AssertionError("El dashboard no debe hacer peticiones")):
+            response = self.client.get(reverse("integraciones:dashboard"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "190 ms")
+        self.assertContains(response, "Sin sondeos recientes")
+        print("   Exito: percentiles servidos desde caché, sin E/S remota en la página.")
+
+    def test_comando_sondear_una_vez(self):
+        print("\n[TEST] Iniciando: test_comando_sondear_una_vez")
+        salida = StringIO()
+        call_command("erp_sondear", "--una-vez", "--hilos", "4", stdout=salida)
+
+        self.assertIn("Sondeados: 3", salida.getvalue())
+        self.assertEqual(len(SaludErpService.historial(self.caido.pk)), 1)
+        print("   Exito: el comando ejecuta una ronda y termina.")
@@ -5,6 +5,7 @@ from django.contrib import messages
 from integraciones.models import IntegracionErp, Webhook, LogIntegracion
 from usuarios.decorators import solo_superusuario
 from integraciones.services.integracion_service import IntegracionService
+from integraciones.services.salud_erp_service import SaludErpService
 
 
 @login_required
@@ -14,8 +15,13 @@ def integraciones_dashboard_view(request):
     Dashboard de integraciones.
 
     Muestra el estado de ERPs, webhooks y actividad reciente (logs).
+    La salud de cada ERP (latencias, disponibilidad) se lee del historial en
+    caché del sondeo periódico: la página no hace peticiones remotas.
     """
-    erps = IntegracionErp.objects.all()
+    erps = list(IntegracionErp.objects.all())
+    salud = SaludErpService.resumenes([erp.pk for erp in erps])
+    for erp in erps:
+        erp.salud = salud.get(erp.pk)
     webhooks = Webhook.objects.all()
     ultimos_logs = LogIntegracion.objects.all().order_by("-fecha")[:5]
 
@@ -1,8 +1,19 @@
-from rest_framework import viewsets
-from rest_framework.permissions import IsAdminUser
+from datetime import date
+
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import BasePermission, IsAdminUser
+from rest_framework.response import Response
 from kpi.models import KPI, KPIResultado
+from kpi.services.rollup_service import RollupKPIService
 from .serializers import KPISerializer, KPIResultadoSerializer
 
+
+class EsSuperusuario(BasePermission):
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_superuser)
+
+
 class KPIViewSet(viewsets.ModelViewSet):
     # api para configurar los indicadores (metas, fórmulas, nombres).
     
@@ -10,9 +21,19 @@ class KPIViewSet(viewsets.ModelViewSet):
     serializer_class = KPISerializer
     permission_classes = [IsAdminUser]
 
+    @action(detail=False, methods=["get"], permission_classes=[EsSuperusuario], url_path="rollup")
+    def rollup(self, request):
+        # consolidado multiempresa (desde caché); ?periodo=AAAA-MM para otro mes.
+        periodo = request.query_params.get("periodo")
+        try:
+            fecha = date.fromisoformat(f"{periodo}-01") if periodo else None
+        except ValueError:
+            return Response({"error": "periodo debe tener formato AAAA-MM"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(RollupKPIService.obtener(fecha))
+
 class KPIResultadoViewSet(viewsets.ModelViewSet):
     # api para gestionar los valores medidos mes a mes.
     
     queryset = KPIResultado.objects.select_related('kpi').all().order_by('-periodo')
     serializer_class = KPIResultadoSerializer
-    permission_classes = [IsAdminUser]
\ No newline at end of file
+    permission_classes = [IsAdminUser]
@@ -1,125 +1,189 @@
+from datetime import datetime, timedelta
 from decimal import Decimal
-from django.db.models import Avg, Sum
+from django.db.models import Avg, Count, F, Q, Sum
 from django.utils import timezone
 from kpi.constants import CodigosKPI
 
-def calcular_valor_automatico(kpi):
+CERO = Decimal("0.00")
+
+# Estimación estándar: 22 días laborables por empleado
+DIAS_LABORABLES_MES = Decimal("22")
+
+
+def _porcentaje(parte, total):
+    if total:
+        return ((Decimal(parte) / Decimal(total)) * 100).quantize(CERO)
+    return CERO
+
+
+def _monto(valor):
+    if valor:
+        return Decimal(str(valor)).quantize(CERO)
+    return CERO
+
+
+def limites_periodo(periodo=None):
+    """
+    (inicio, fin) aware del mes que contiene `periodo` (date); por defecto el mes
+    actual en hora local. El intervalo es semiabierto: [inicio, fin).
+    """
+    zona = timezone.get_current_timezone()
+    if periodo is None:
+        periodo = timezone.localdate()
+    inicio = timezone.make_aware(datetime(periodo.year, periodo.month, 1), zona)
+    siguiente = (periodo.replace(day=1) + timedelta(days=32)).replace(day=1)
+    fin = timezone.make_aware(datetime(siguiente.year, siguiente.month, 1), zona)
+    return inicio, fin
+
+
+def calcular_metricas(empresa_id, codigos, periodo=None):
+    """
+    Calcula de una vez los KPIs automáticos `codigos` de una empresa para el mes
+    de `periodo` (date; por defecto el actual). Devuelve {codigo: Decimal}.
+    Ver `calcular_metricas_por_empresa`.
+    """
+    return calcular_metricas_por_empresa(codigos, periodo, empresa_ids=[empresa_id])[empresa_id]
+
+
+def calcular_metricas_por_empresa(codigos, periodo=None, empresa_ids=None):
+    """
+    Calcula los KPIs automáticos `codigos` del mes de `periodo` para varias
+    empresas a la vez (todas las activas si `empresa_ids` es None).
+
+    Cada fuente se consulta una sola vez con un agregado agrupado por empresa
+    (GROUP BY empresa_id) y sus resultados intermedios se comparten: AUSENTISMO
+    reutiliza el HEADCOUNT, y SALARIO_PROM y COSTO_NOMINA salen del mismo
+    recorrido de Contrato. Como máximo son cinco consultas (seis si hay que
+    resolver las empresas activas), sin importar cuántos KPIs ni cuántas empresas.
+    Devuelve {empresa_id: {codigo: Decimal}}.
+
+    En meses pasados las métricas de stock se reconstruyen por fechas y no por el
+    estado de hoy: empleados ingresados hasta el cierre del mes que siguen activos
+    o tuvieron un contrato vigente ese mes, entradas del mes sin importar el estado
+    actual del empleado, contratos vigentes en algún día del mes y solicitudes
+    creadas antes del cierre que siguen pendientes. Sin fecha de salida ni
+    historial de puestos, un ex empleado sin contratos no cuenta y TOTAL_CARGOS
+    usa los puestos activos de hoy.
+    """
     # --- IMPORTACIONES LOCALES PARA EVITAR CICLOS ---
+    from core.models import Empresa
     from empleados.models import Empleado, Contrato, Puesto
     from asistencia.models import EventoAsistencia
     from solicitudes.models import SolicitudAusencia
     # ------------------------------------------------
 
-    empresa = kpi.empresa
-    codigo = kpi.codigo
-    now = timezone.now()
-    mes_actual = now.month
-    anio_actual = now.year
-
-    # 1. HEADCOUNT (Total Empleados Activos)
-    if codigo == CodigosKPI.HEADCOUNT:
-        return Decimal(Empleado.objects.filter(
-            empresa=empresa, 
-            estado=Empleado.Estado.ACTIVO
-        ).count())
-
-    # 2. PUNTUALIDAD (Entradas a tiempo vs Total Entradas)
-    elif codigo == CodigosKPI.PUNTUALIDAD:
-        marcaciones = EventoAsistencia.objects.filter(
-            empleado__empresa=empresa,
-            empleado__estado=Empleado.Estado.ACTIVO,
+    codigos = set(codigos)
+    inicio_mes, fin_mes = limites_periodo(periodo)
+    es_actual = inicio_mes <= timezone.now() < fin_mes
+    if empresa_ids is None:
+        empresa_ids = list(Empresa.objects.filter(estado=True).values_list("pk", flat=True))
+
+    def agrupado(qs, campo_empresa, **agregados):
+        # {empresa_id: {alias: valor}} con un solo GROUP BY
+        return {
+            fila.pop(campo_empresa): fila
+            for fila in qs.filter(**{f"{campo_empresa}__in": empresa_ids})
+            .values(campo_empresa)
+            .annotate(**agregados)
+            .order_by()
+        }
+
+    headcount = marcas = solicitudes = contratos = cargos = {}
+
+    # Contratos con algún día dentro del mes (historia de meses pasados)
+    contrato_en_mes = (Q(fecha_fin__isnull=True) | Q(fecha_fin__gte=inicio_mes.date())) & Q(
+        fecha_inicio__lt=fin_mes.date()
+    )
+
+    # Empleados activos (HEADCOUNT y denominador de AUSENTISMO)
+    if codigos & {CodigosKPI.HEADCOUNT, CodigosKPI.AUSENTISMO}:
+        plantilla = Empleado.objects.filter(fecha_ingreso__lt=fin_mes.date())
+        if es_actual:
+            plantilla = plantilla.filter(estado=Empleado.Estado.ACTIVO)
+        else:
+            # Quien hoy está inactivo cuenta si tuvo un contrato vigente ese mes
+            plantilla = plantilla.filter(
+                Q(estado=Empleado.Estado.ACTIVO)
+                | Q(pk__in=Contrato.objects.filter(contrato_en_mes).values("empleado_id"))
+            )
+        headcount = agrupado(plantilla, "empresa_id", total=Count("id"))
+
+    # PUNTUALIDAD (Entradas a tiempo vs Total Entradas)
+    if CodigosKPI.PUNTUALIDAD in codigos:
+        # Un único agregado en la base: la hora local de cada entrada se obtiene con
+        # AT TIME ZONE (lookup __time con USE_TZ) y se compara con la hora teórica
+        # del empleado; Count condicional evita traer las marcaciones a Python.
+        entradas = EventoAsistencia.objects.filter(
+            empleado__hora_entrada_teorica__isnull=False,
             tipo=EventoAsistencia.TipoEvento.CHECK_IN,
-            registrado_el__year=anio_actual,
-            registrado_el__month=mes_actual
-        ).select_related('empleado')
-
-        total_entradas = 0
-        entradas_a_tiempo = 0
-
-        for m in marcaciones:
-            emp = m.empleado
-            # Solo evaluamos si tiene horario configurado
-            if emp.hora_entrada_teorica:
-                total_entradas += 1
-                # Convertimos a hora local para comparar correctamente
-                hora_real = timezone.localtime(m.registrado_el).time()
-                
-                # Tolerancia 0: debe llegar antes o a la misma hora exacta
-                if hora_real <= emp.hora_entrada_teorica:
-                    entradas_a_tiempo += 1
-        
-        if total_entradas > 0:
-            val = (Decimal(entradas_a_tiempo) / Decimal(total_entradas)) * 100
-            return val.quantize(Decimal("0.00"))
-        
-        return Decimal("0.00")
-
-    # 3. AUSENTISMO (Días perdidos vs Días teóricos)
-    elif codigo == CodigosKPI.AUSENTISMO:
-        dias_perdidos = SolicitudAusencia.objects.filter(
-            empresa=empresa,
-            estado=SolicitudAusencia.Estado.APROBADO,
-            fecha_inicio__year=anio_actual,
-            fecha_inicio__month=mes_actual
-        ).aggregate(total=Sum('dias_habiles'))['total'] or 0
-
-        headcount = Empleado.objects.filter(
-            empresa=empresa, 
-            estado=Empleado.Estado.ACTIVO
-        ).count()
-        
-        # Estimación estándar: 22 días laborables por empleado
-        dias_teoricos = Decimal(headcount) * Decimal("22")
-
-        if dias_teoricos > 0:
-            val = (Decimal(dias_perdidos) / dias_teoricos) * 100
-            return val.quantize(Decimal("0.00"))
-        
-        return Decimal("0.00")
-
-    # 4. SALARIO PROMEDIO (Contratos vigentes)
-    elif codigo == CodigosKPI.SALARIO_PROM:
-        promedio = Contrato.objects.filter(
-            empleado__empresa=empresa,
-            empleado__estado=Empleado.Estado.ACTIVO,
-            estado=True
-        ).aggregate(media=Avg('salario'))['media']
-        
-        if promedio:
-            return Decimal(str(promedio)).quantize(Decimal("0.00"))
-        return Decimal("0.00")
-
-    # 5. COSTO NÓMINA (Suma salarios vigentes)
-    elif codigo == CodigosKPI.COSTO_NOMINA:
-        total = Contrato.objects.filter(
-            empleado__empresa=empresa,
-            empleado__estado=Empleado.Estado.ACTIVO,
-            estado=True
-        ).aggregate(suma=Sum('salario'))['suma']
-        
-        if total:
-            return Decimal(str(total)).quantize(Decimal("0.00"))
-        return Decimal("0.00")
-
-    # 6. SOLICITUDES PENDIENTES
-    elif codigo == CodigosKPI.SOLICITUDES_PEND:
-        pendientes = SolicitudAusencia.objects.filter(
-            empresa=empresa,
-            estado=SolicitudAusencia.Estado.PENDIENTE
-        ).count()
-        return Decimal(pendientes)
-
-    # 7. TOTAL CARGOS (Puestos definidos)
-    elif codigo == CodigosKPI.TOTAL_CARGOS:
-        cargos = Puesto.objects.filter(
-            empresa=empresa,
-            estado=True
-        ).count()
-        return Decimal(cargos)
-
-    # 8. MANUAL
-    elif codigo == CodigosKPI.MANUAL:
+            registrado_el__gte=inicio_mes,
+            registrado_el__lt=fin_mes,
+        )
+        if es_actual:
+            # En meses pasados las marcas del mes bastan: el estado de hoy no aplica
+            entradas = entradas.filter(empleado__estado=Empleado.Estado.ACTIVO)
+        marcas = agrupado(
+            entradas,
+            "empleado__empresa_id",
+            total=Count("id"),
+            # Tolerancia 0: debe llegar antes o a la misma hora exacta
+            a_tiempo=Count("id", filter=Q(registrado_el__time__lte=F("empleado__hora_entrada_teorica"))),
+        )
+
+    # Solicitudes: días perdidos del mes (AUSENTISMO) y pendientes, en un solo recorrido
+    if codigos & {CodigosKPI.AUSENTISMO, CodigosKPI.SOLICITUDES_PEND}:
+        solicitudes = agrupado(
+            SolicitudAusencia.objects.filter(fecha_creacion__lt=fin_mes),
+            "empresa_id",
+            dias_perdidos=Sum(
+                "dias_habiles",
+                filter=Q(
+                    estado=SolicitudAusencia.Estado.APROBADO,
+                    fecha_inicio__gte=inicio_mes.date(),
+                    fecha_inicio__lt=fin_mes.date(),
+                ),
+            ),
+            pendientes=Count("id", filter=Q(estado=SolicitudAusencia.Estado.PENDIENTE)),
+        )
+
+    # Contratos vigentes: SALARIO PROMEDIO y COSTO NÓMINA
+    if codigos & {CodigosKPI.SALARIO_PROM, CodigosKPI.COSTO_NOMINA}:
+        if es_actual:
+            vigentes = Contrato.objects.filter(empleado__estado=Empleado.Estado.ACTIVO, estado=True)
+        else:
+            vigentes = Contrato.objects.filter(contrato_en_mes)
+        contratos = agrupado(vigentes, "empleado__empresa_id", media=Avg('salario'), suma=Sum('salario'))
+
+    # TOTAL CARGOS (Puestos definidos). Puesto no guarda historial: en meses
+    # pasados refleja los puestos activos de hoy
+    if CodigosKPI.TOTAL_CARGOS in codigos:
+        cargos = agrupado(Puesto.objects.filter(estado=True), "empresa_id", total=Count("id"))
+
+    resultados = {}
+    for empresa_id in empresa_ids:
+        personas = headcount.get(empresa_id, {}).get("total", 0)
+        marca = marcas.get(empresa_id, {})
+        solicitud = solicitudes.get(empresa_id, {})
+        contrato = contratos.get(empresa_id, {})
+        valores = {
+            CodigosKPI.HEADCOUNT: Decimal(personas),
+            CodigosKPI.PUNTUALIDAD: _porcentaje(marca.get("a_tiempo", 0), marca.get("total", 0)),
+            CodigosKPI.AUSENTISMO: _porcentaje(
+                solicitud.get("dias_perdidos") or 0, Decimal(personas) * DIAS_LABORABLES_MES
+            ),
+            CodigosKPI.SOLICITUDES_PEND: Decimal(solicitud.get("pendientes", 0)),
+            CodigosKPI.SALARIO_PROM: _monto(contrato.get("media")),
+            CodigosKPI.COSTO_NOMINA: _monto(contrato.get("suma")),
+            CodigosKPI.TOTAL_CARGOS: Decimal(cargos.get(empresa_id, {}).get("total", 0)),
+        }
+        resultados[empresa_id] = {codigo: valor for codigo, valor in valores.items() if codigo in codigos}
+    return resultados
+
+
+def calcular_valor_automatico(kpi, periodo=None):
+    # MANUAL: se conserva el último valor ingresado
+    if kpi.codigo == CodigosKPI.MANUAL:
         ultimo = kpi.resultados.order_by('-periodo').first()
-        return ultimo.valor if ultimo else Decimal("0.00")
+        return ultimo.valor if ultimo else CERO
 
-    return Decimal("0.00")
\ No newline at end of file
+    return calcular_metricas(kpi.empresa_id, [kpi.codigo], periodo).get(kpi.codigo, CERO)
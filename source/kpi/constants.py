@@ -18,4 +18,16 @@ class CodigosKPI:
         (SOLICITUDES_PEND, 'Solicitudes Pendientes'),
         (TOTAL_CARGOS, 'Cargos Definidos'),
         (MANUAL, 'Ingreso Manual'),
-    ]
\ No newline at end of file
+    ]
+
+    # KPIs en los que un valor menor es mejor (semáforo invertido)
+    INVERSOS = {AUSENTISMO}
+
+    @classmethod
+    def color(cls, codigo, valor, meta):
+        """Color del semáforo: green/red según la meta, gray si falta el valor o la meta."""
+        if valor is None or meta is None:
+            return "gray"
+        if codigo in cls.INVERSOS:
+            return "green" if valor <= meta else "red"
+        return "green" if valor >= meta else "red"
@@ -0,0 +1,54 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Empresa
+from kpi.services.kpi_service import KPIService
+
+
+class Command(BaseCommand):
+    help = (
+        "Calcula los KPIs automáticos de los N meses anteriores para cada empresa activa, "
+        "repartiendo el trabajo entre varios procesos. Los meses pasados se reconstruyen por "
+        "fechas (ingreso, contratos, marcas); sin fecha de salida ni historial de puestos, los "
+        "ex empleados sin contratos no cuentan en HEADCOUNT y TOTAL_CARGOS usa los puestos de hoy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--meses", type=int, default=12, help="Meses hacia atrás (por defecto: %(default)s).")
+        parser.add_argument("--empresa", type=int, help="ID de la empresa (por defecto: todas las activas).")
+        parser.add_argument(
+            "--procesos",
+            type=int,
+            default=min(4, os.cpu_count() or 1),
+            help="Procesos de trabajo (por defecto: %(default)s).",
+        )
+        parser.add_argument(
+            "--recalcular",
+            action="store_true",
+            help="Sobrescribe los meses que ya tienen resultado.",
+        )
+
+    def handle(self, *args, **options):
+        if options["meses"] < 1:
+            raise CommandError("--meses debe ser mayor que cero.")
+
+        if options["empresa"]:
+            empresas = list(Empresa.objects.filter(pk=options["empresa"]))
+            if not empresas:
+                raise CommandError(f"No existe la empresa {options['empresa']}.")
+        else:
+            empresas = list(Empresa.objects.filter(estado=True))
+
+        for empresa in empresas:
+            KPIService.sembrar_defaults(empresa)
+
+        total = KPIService.backfill(
+            empresas, options["meses"], procesos=options["procesos"], recalcular=options["recalcular"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Backfill completado: {total} resultados en {len(empresas)} empresas "
+                f"({options['meses']} meses)."
+            )
+        )
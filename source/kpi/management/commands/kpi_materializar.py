@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Empresa
+from kpi.services.kpi_service import KPIService
+from kpi.services.rollup_service import RollupKPIService
+
+
+class Command(BaseCommand):
+    help = (
+        "Materializa los resultados de KPI del periodo actual para las empresas activas "
+        "(siembra los KPIs por defecto que falten) y renueva el consolidado multiempresa. "
+        "Pensado para ejecutarse por cron, p. ej. cada hora: los tableros solo leen "
+        "resultados ya calculados."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--empresa", type=int, help="ID de la empresa (por defecto: todas las activas).")
+        parser.add_argument(
+            "--recalcular",
+            action="store_true",
+            help="Recalcula también los KPIs que ya tienen resultado en el periodo.",
+        )
+        parser.add_argument(
+            "--sin-rollup",
+            action="store_true",
+            help="No renueva el consolidado multiempresa en caché.",
+        )
+
+    def handle(self, *args, **options):
+        if options["empresa"]:
+            empresas = Empresa.objects.filter(pk=options["empresa"])
+            if not empresas.exists():
+                raise CommandError(f"No existe la empresa {options['empresa']}.")
+        else:
+            empresas = Empresa.objects.filter(estado=True)
+
+        resumen = KPIService.materializar(empresas, recalcular=options["recalcular"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"KPIs materializados: {sum(resumen.values())} resultados en {len(resumen)} empresas "
+                f"(periodo {KPIService.periodo_actual()})."
+            )
+        )
+
+        if not options["sin_rollup"]:
+            rollup = RollupKPIService.refrescar()
+            self.stdout.write(f"Consolidado multiempresa renovado ({len(rollup['empresas'])} empresas).")
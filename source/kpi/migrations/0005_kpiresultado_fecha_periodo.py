@@ -0,0 +1,36 @@
+from datetime import date
+
+from django.db import migrations, models
+
+
+def rellenar_fecha_periodo(apps, schema_editor):
+    KPIResultado = apps.get_model("kpi", "KPIResultado")
+    pendientes = []
+    for resultado in KPIResultado.objects.filter(fecha_periodo__isnull=True).only("id", "periodo").iterator():
+        try:
+            anio, mes = resultado.periodo.split("-")[:2]
+            resultado.fecha_periodo = date(int(anio), int(mes), 1)
+        except (TypeError, ValueError):
+            continue
+        pendientes.append(resultado)
+    KPIResultado.objects.bulk_update(pendientes, ["fecha_periodo"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kpi', '0004_alter_kpi_codigo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kpiresultado',
+            name='fecha_periodo',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(rellenar_fecha_periodo, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='kpiresultado',
+            index=models.Index(fields=['kpi', 'fecha_periodo'], name='kpi_res_kpi_fecha_idx'),
+        ),
+    ]
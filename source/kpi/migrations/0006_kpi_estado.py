@@ -0,0 +1,57 @@
+# Generated by Django 5.0.3 on 2026-10-18 13:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from kpi.constants import CodigosKPI
+
+
+def poblar_estados(apps, schema_editor):
+    KPI = apps.get_model("kpi", "KPI")
+    KPIResultado = apps.get_model("kpi", "KPIResultado")
+    KPIEstado = apps.get_model("kpi", "KPIEstado")
+
+    estados = []
+    for kpi in KPI.objects.filter(estado=True).iterator():
+        ultimos = list(KPIResultado.objects.filter(kpi=kpi).order_by("-periodo").values("periodo", "valor")[:2])
+        valor = ultimos[0]["valor"] if ultimos else None
+        anterior = ultimos[1]["valor"] if len(ultimos) > 1 else None
+        estados.append(KPIEstado(
+            kpi=kpi, empresa_id=kpi.empresa_id, codigo=kpi.codigo,
+            periodo=ultimos[0]["periodo"] if ultimos else None,
+            valor=valor, valor_anterior=anterior,
+            delta=valor - anterior if valor is not None and anterior is not None else None,
+            meta=kpi.meta_default, color=CodigosKPI.color(kpi.codigo, valor, kpi.meta_default),
+        ))
+    KPIEstado.objects.bulk_create(estados, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('kpi', '0005_kpiresultado_fecha_periodo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KPIEstado',
+            fields=[
+                ('kpi', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='estado_actual', serialize=False, to='kpi.kpi')),
+                ('codigo', models.CharField(max_length=50)),
+                ('periodo', models.CharField(blank=True, max_length=20, null=True)),
+                ('valor', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('valor_anterior', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('delta', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('meta', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('color', models.CharField(default='gray', max_length=10)),
+                ('actualizado_el', models.DateTimeField(auto_now=True)),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='kpi_estados', to='core.empresa')),
+            ],
+            options={
+                'db_table': 'kpi_estado',
+                'indexes': [models.Index(fields=['empresa', 'codigo'], name='kpi_estado_empresa_idx')],
+            },
+        ),
+        migrations.RunPython(poblar_estados, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+from django.db import migrations
+
+# Copia fija de KPIS_DEFAULT al momento de esta migración: las migraciones no
+# importan servicios de la app, cuyo contenido puede cambiar después.
+KPIS_DEFAULT = [
+    ("HEADCOUNT", "Total Empleados", "Colaboradores", 0, "Número total de empleados activos."),
+    ("AUSENTISMO", "Ausentismo Laboral", "%", 5.0, "Porcentaje de ausencias respecto a días laborales."),
+    ("PUNTUALIDAD", "Puntualidad", "%", 95.0, "Porcentaje de llegadas a tiempo."),
+    ("SALARIO_PROM", "Salario Promedio", "USD", 0, "Promedio de salarios brutos activos."),
+    ("COSTO_NOMINA", "Costo Nómina Total", "USD", 0, "Suma total de salarios brutos (Contratos activos)."),
+    ("SOLICITUDES_PEND", "Solicitudes Pendientes", "Tickets", 0, "Número de solicitudes de ausencia sin procesar."),
+    ("TOTAL_CARGOS", "Cargos Definidos", "Puestos", 0, "Cantidad de puestos de trabajo configurados."),
+]
+
+
+def sembrar_defaults(apps, schema_editor):
+    # Empresas creadas antes de que el tablero dejara de sembrar al vuelo: se crean
+    # solo los KPIs por defecto que faltan, sin tocar los ya configurados
+    Empresa = apps.get_model("core", "Empresa")
+    KPI = apps.get_model("kpi", "KPI")
+    KPIEstado = apps.get_model("kpi", "KPIEstado")
+
+    existentes = set(KPI.objects.values_list("empresa_id", "codigo"))
+    nuevos = [
+        KPI(
+            empresa_id=empresa_id, codigo=codigo, nombre=nombre, unidad_medida=unidad,
+            frecuencia="mensual", meta_default=meta, descripcion=descripcion,
+        )
+        for empresa_id in Empresa.objects.values_list("pk", flat=True).iterator()
+        for codigo, nombre, unidad, meta, descripcion in KPIS_DEFAULT
+        if (empresa_id, codigo) not in existentes
+    ]
+    KPI.objects.bulk_create(nuevos, batch_size=1000)
+
+    # Los KPIs nuevos aún no tienen resultados: su estado arranca en gris
+    KPIEstado.objects.bulk_create(
+        [
+            KPIEstado(kpi=kpi, empresa_id=kpi.empresa_id, codigo=kpi.codigo, meta=kpi.meta_default, color="gray")
+            for kpi in KPI.objects.filter(estado=True, estado_actual__isnull=True, resultados__isnull=True)
+            .only("id", "empresa_id", "codigo", "meta_default")
+            .iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('kpi', '0006_kpi_estado'),
+    ]
+
+    operations = [
+        migrations.RunPython(sembrar_defaults, migrations.RunPython.noop),
+    ]
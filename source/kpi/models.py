@@ -1,3 +1,4 @@
+from datetime import date
 from decimal import Decimal
 from django.db import models
 from kpi.constants import CodigosKPI # Importamos
@@ -39,6 +40,9 @@ class KPIResultado(models.Model):
     valor = models.DecimalField(max_digits=10, decimal_places=2)
     meta_periodo = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     
+    # Primer día del periodo: versión fechable de `periodo` para series temporales
+    fecha_periodo = models.DateField(null=True, blank=True, editable=False)
+    
     calculado_automatico = models.BooleanField(default=False)
     observacion = models.TextField(blank=True, null=True)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
@@ -51,4 +55,55 @@ class KPIResultado(models.Model):
                 fields=["kpi", "periodo"], # Simplificado si es por empresa global
                 name="unique_kpi_periodo"
             )
-        ]
\ No newline at end of file
+        ]
+        indexes = [
+            # Tendencias: rango de fechas por KPI con un recorrido de índice
+            models.Index(fields=["kpi", "fecha_periodo"], name="kpi_res_kpi_fecha_idx"),
+        ]
+
+    @staticmethod
+    def fecha_de_periodo(periodo):
+        """'AAAA-MM' -> date del primer día del mes (None si no tiene ese formato)."""
+        try:
+            anio, mes = str(periodo).split("-")[:2]
+            return date(int(anio), int(mes), 1)
+        except (TypeError, ValueError):
+            return None
+
+    def save(self, *args, **kwargs):
+        self.fecha_periodo = self.fecha_de_periodo(self.periodo)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "periodo" in update_fields:
+            kwargs["update_fields"] = set(update_fields) | {"fecha_periodo"}
+        super().save(*args, **kwargs)
+
+
+class KPIEstado(models.Model):
+    """
+    Último estado conocido de cada KPI activo (tabla materializada).
+
+    Se refresca de forma incremental cada vez que se escribe un KPIResultado o
+    cambia el KPI (ver KPIEstadoService), de modo que los tableros leen una fila
+    por KPI sin subconsultas correlacionadas.
+    """
+    kpi = models.OneToOneField(KPI, on_delete=models.CASCADE, primary_key=True, related_name="estado_actual")
+    empresa = models.ForeignKey("core.Empresa", on_delete=models.CASCADE, related_name="kpi_estados")
+    codigo = models.CharField(max_length=50)
+
+    periodo = models.CharField(max_length=20, blank=True, null=True)
+    valor = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    valor_anterior = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    delta = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    meta = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    color = models.CharField(max_length=10, default="gray")
+
+    actualizado_el = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "kpi_estado"
+        indexes = [
+            models.Index(fields=["empresa", "codigo"], name="kpi_estado_empresa_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kpi_id} {self.periodo}: {self.valor} ({self.color})"
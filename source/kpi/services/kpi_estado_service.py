@@ -0,0 +1,100 @@
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from kpi.constants import CodigosKPI
+from kpi.models import KPI, KPIEstado, KPIResultado
+
+
+class KPIEstadoService:
+    """
+    Mantiene la tabla KPIEstado (último valor, meta, color y variación de cada KPI).
+
+    `refrescar` es incremental y por conjunto: recibe los KPIs afectados por una
+    escritura y los recalcula con una lectura de KPIs, una de resultados (los dos
+    últimos de cada KPI, con ROW_NUMBER) y un upsert, sin importar cuántos sean.
+    """
+
+    @staticmethod
+    def refrescar(kpi_ids):
+        kpi_ids = set(kpi_ids)
+        if not kpi_ids:
+            return 0
+
+        kpis = {
+            fila["id"]: fila
+            for fila in KPI.objects.filter(pk__in=kpi_ids, estado=True).values(
+                "id", "empresa_id", "codigo", "meta_default",
+                # color previo (LEFT JOIN): un KPI que pasa a rojo dispara el webhook ALERTA_KPI
+                color_previo=F("estado_actual__color"),
+            )
+        }
+        # KPIs eliminados o desactivados dejan de figurar en los tableros
+        retirados = kpi_ids - kpis.keys()
+        if retirados:
+            KPIEstado.objects.filter(kpi_id__in=retirados).delete()
+        if not kpis:
+            return 0
+
+        ultimos = {}
+        for kpi_id, periodo, valor in (
+            KPIResultado.objects.filter(kpi_id__in=kpis.keys())
+            .annotate(n=Window(RowNumber(), partition_by=[F("kpi_id")], order_by=F("periodo").desc()))
+            .filter(n__lte=2)
+            .order_by("kpi_id", "-periodo")
+            .values_list("kpi_id", "periodo", "valor")
+        ):
+            ultimos.setdefault(kpi_id, []).append((periodo, valor))
+
+        estados = []
+        for kpi_id, kpi in kpis.items():
+            serie = ultimos.get(kpi_id, [])
+            periodo, valor = serie[0] if serie else (None, None)
+            anterior = serie[1][1] if len(serie) > 1 else None
+            estados.append(
+                KPIEstado(
+                    kpi_id=kpi_id,
+                    empresa_id=kpi["empresa_id"],
+                    codigo=kpi["codigo"],
+                    periodo=periodo,
+                    valor=valor,
+                    valor_anterior=anterior,
+                    delta=valor - anterior if valor is not None and anterior is not None else None,
+                    meta=kpi["meta_default"],
+                    color=CodigosKPI.color(kpi["codigo"], valor, kpi["meta_default"]),
+                )
+            )
+
+        alertas = [e for e in estados if e.color == "red" and kpis[e.kpi_id]["color_previo"] != "red"]
+
+        KPIEstado.objects.bulk_create(
+            estados,
+            update_conflicts=True,
+            unique_fields=["kpi"],
+            update_fields=[
+                "empresa", "codigo", "periodo", "valor", "valor_anterior",
+                "delta", "meta", "color", "actualizado_el",
+            ],
+        )
+
+        if alertas:
+            # Import local para evitar dependencias circulares entre apps.
+            from integraciones.constants import EventosWebhook
+            from integraciones.services.webhook_service import WebhookService
+
+            WebhookService.encolar_lote(EventosWebhook.ALERTA_KPI, [
+                {
+                    "evento": EventosWebhook.ALERTA_KPI,
+                    "kpi_id": estado.kpi_id,
+                    "empresa_id": estado.empresa_id,
+                    "codigo": estado.codigo,
+                    "periodo": estado.periodo,
+                    "valor": estado.valor,
+                    "meta": estado.meta,
+                }
+                for estado in alertas
+            ])
+        return len(estados)
+
+    @staticmethod
+    def refrescar_empresa(empresa):
+        return KPIEstadoService.refrescar(KPI.objects.filter(empresa=empresa).values_list("pk", flat=True))
@@ -1,73 +1,88 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.db import connections
 from django.utils import timezone
+from core.models import Empresa
 from kpi.models import KPI, KPIResultado
 from kpi.constants import CodigosKPI
+from kpi.services.kpi_estado_service import KPIEstadoService
+
+KPIS_DEFAULT = [
+    {
+        "codigo": CodigosKPI.HEADCOUNT,
+        "nombre": "Total Empleados",
+        "unidad_medida": "Colaboradores",
+        "frecuencia": "mensual",
+        "meta_default": 0,
+        "descripcion": "Número total de empleados activos."
+    },
+    {
+        "codigo": CodigosKPI.AUSENTISMO,
+        "nombre": "Ausentismo Laboral",
+        "unidad_medida": "%",
+        "frecuencia": "mensual",
+        "meta_default": 5.0,
+        "descripcion": "Porcentaje de ausencias respecto a días laborales."
+    },
+    {
+        "codigo": CodigosKPI.PUNTUALIDAD,
+        "nombre": "Puntualidad",
+        "unidad_medida": "%",
+        "frecuencia": "mensual",
+        "meta_default": 95.0,
+        "descripcion": "Porcentaje de llegadas a tiempo."
+    },
+    {
+        "codigo": CodigosKPI.SALARIO_PROM,
+        "nombre": "Salario Promedio",
+        "unidad_medida": "USD",
+        "frecuencia": "mensual",
+        "meta_default": 0,
+        "descripcion": "Promedio de salarios brutos activos."
+    },
+    {
+        "codigo": CodigosKPI.COSTO_NOMINA,
+        "nombre": "Costo Nómina Total",
+        "unidad_medida": "USD",
+        "frecuencia": "mensual",
+        "meta_default": 0,
+        "descripcion": "Suma total de salarios brutos (Contratos activos)."
+    },
+    {
+        "codigo": CodigosKPI.SOLICITUDES_PEND,
+        "nombre": "Solicitudes Pendientes",
+        "unidad_medida": "Tickets",
+        "frecuencia": "mensual",
+        "meta_default": 0,
+        "descripcion": "Número de solicitudes de ausencia sin procesar."
+    },
+    # --- NUEVO DEFAULT SEGURO ---
+    {
+        "codigo": CodigosKPI.TOTAL_CARGOS,
+        "nombre": "Cargos Definidos",
+        "unidad_medida": "Puestos",
+        "frecuencia": "mensual",
+        "meta_default": 0, 
+        "descripcion": "Cantidad de puestos de trabajo configurados."
+    },
+]
+
+
+def _calcular_tarea(tarea):
+    """Unidad de trabajo del backfill (nivel de módulo para poder enviarla a otro proceso)."""
+    empresa_id, mes, recalcular = tarea
+    empresa = Empresa.objects.get(pk=empresa_id)
+    return KPIService.calcular_lote(empresa, periodo=mes, solo_faltantes=not recalcular)
+
 
 class KPIService:
     
     @staticmethod
     def asegurar_defaults(empresa):
-        defaults = [
-            {
-                "codigo": CodigosKPI.HEADCOUNT,
-                "nombre": "Total Empleados",
-                "unidad_medida": "Colaboradores",
-                "frecuencia": "mensual",
-                "meta_default": 0,
-                "descripcion": "Número total de empleados activos."
-            },
-            {
-                "codigo": CodigosKPI.AUSENTISMO,
-                "nombre": "Ausentismo Laboral",
-                "unidad_medida": "%",
-                "frecuencia": "mensual",
-                "meta_default": 5.0,
-                "descripcion": "Porcentaje de ausencias respecto a días laborales."
-            },
-            {
-                "codigo": CodigosKPI.PUNTUALIDAD,
-                "nombre": "Puntualidad",
-                "unidad_medida": "%",
-                "frecuencia": "mensual",
-                "meta_default": 95.0,
-                "descripcion": "Porcentaje de llegadas a tiempo."
-            },
-            {
-                "codigo": CodigosKPI.SALARIO_PROM,
-                "nombre": "Salario Promedio",
-                "unidad_medida": "USD",
-                "frecuencia": "mensual",
-                "meta_default": 0,
-                "descripcion": "Promedio de salarios brutos activos."
-            },
-            {
-                "codigo": CodigosKPI.COSTO_NOMINA,
-                "nombre": "Costo Nómina Total",
-                "unidad_medida": "USD",
-                "frecuencia": "mensual",
-                "meta_default": 0,
-                "descripcion": "Suma total de salarios brutos (Contratos activos)."
-            },
-            {
-                "codigo": CodigosKPI.SOLICITUDES_PEND,
-                "nombre": "Solicitudes Pendientes",
-                "unidad_medida": "Tickets",
-                "frecuencia": "mensual",
-                "meta_default": 0,
-                "descripcion": "Número de solicitudes de ausencia sin procesar."
-            },
-            # --- NUEVO DEFAULT SEGURO ---
-            {
-                "codigo": CodigosKPI.TOTAL_CARGOS,
-                "nombre": "Cargos Definidos",
-                "unidad_medida": "Puestos",
-                "frecuencia": "mensual",
-                "meta_default": 0, 
-                "descripcion": "Cantidad de puestos de trabajo configurados."
-            },
-        ]
-        
         creados = 0
-        for data in defaults:
+        for data in KPIS_DEFAULT:
             obj, created = KPI.objects.update_or_create(
                 empresa=empresa,
                 codigo=data["codigo"], 
@@ -83,32 +98,119 @@ class KPIService:
         return creados
 
     @staticmethod
-    def garantizar_resultados_actuales(empresa):
-        from kpi.calculators import calcular_valor_automatico
-        periodo = timezone.now().strftime("%Y-%m")
-        kpis = KPI.objects.filter(empresa=empresa, estado=True).exclude(codigo=CodigosKPI.MANUAL)
-        calculados = 0
-        for kpi in kpis:
-            if not KPIResultado.objects.filter(kpi=kpi, periodo=periodo).exists():
-                valor = calcular_valor_automatico(kpi)
-                KPIResultado.objects.create(
-                    kpi=kpi, periodo=periodo, valor=valor,
-                    calculado_automatico=True, fecha_creacion=timezone.now()
+    def sembrar_defaults(empresa):
+        """
+        Crea solo los KPIs por defecto que faltan (una lectura y un bulk_create),
+        sin tocar los ya configurados. Se usa al crear la empresa y en el job
+        programado; `asegurar_defaults` además restablece nombres y metas.
+        """
+        existentes = set(KPI.objects.filter(empresa=empresa).values_list("codigo", flat=True))
+        nuevos = [
+            KPI(empresa=empresa, **data)
+            for data in KPIS_DEFAULT
+            if data["codigo"] not in existentes
+        ]
+        KPI.objects.bulk_create(nuevos)
+        if nuevos:
+            # bulk_create no emite señales: se refresca el estado a mano
+            KPIEstadoService.refrescar(KPI.objects.filter(empresa=empresa).values_list("pk", flat=True))
+        return len(nuevos)
+
+    @staticmethod
+    def periodo_actual(ahora=None):
+        """Periodo mensual "AAAA-MM" según la hora local."""
+        return timezone.localtime(ahora or timezone.now()).strftime("%Y-%m")
+
+    @staticmethod
+    def meses_atras(n, desde=None):
+        """Primer día de los `n` meses anteriores a `desde` (por defecto el actual), del más antiguo al más reciente."""
+        mes = (desde or timezone.localdate()).replace(day=1)
+        meses = []
+        for _ in range(n):
+            mes = (mes - timedelta(days=1)).replace(day=1)
+            meses.append(mes)
+        return meses[::-1]
+
+    @staticmethod
+    def calcular_lote(empresa, periodo=None, solo_faltantes=False):
+        """
+        Calcula todos los KPIs automáticos activos de la empresa para el mes de
+        `periodo` (date; por defecto el actual) en una pasada: los agregados se
+        comparten entre códigos (`calcular_metricas`) y los resultados se escriben
+        con un único bulk_create con upsert sobre (kpi, periodo). Devuelve cuántos escribió.
+        """
+        from kpi.calculators import calcular_metricas
+        ahora = timezone.now()
+        fecha_periodo = (periodo or timezone.localdate(ahora)).replace(day=1)
+        periodo = fecha_periodo.strftime("%Y-%m")
+        kpis = list(
+            KPI.objects.filter(empresa=empresa, estado=True).exclude(codigo=CodigosKPI.MANUAL)
+        )
+        if solo_faltantes and kpis:
+            existentes = set(
+                KPIResultado.objects.filter(kpi__in=kpis, periodo=periodo).values_list("kpi_id", flat=True)
+            )
+            kpis = [kpi for kpi in kpis if kpi.pk not in existentes]
+        if not kpis:
+            return 0
+
+        valores = calcular_metricas(empresa.pk, {kpi.codigo for kpi in kpis}, fecha_periodo)
+        KPIResultado.objects.bulk_create(
+            [
+                KPIResultado(
+                    kpi=kpi, periodo=periodo, fecha_periodo=fecha_periodo, valor=valores[kpi.codigo],
+                    calculado_automatico=True, fecha_creacion=ahora,
                 )
-                calculados += 1
-        return calculados
+                for kpi in kpis
+            ],
+            update_conflicts=True,
+            unique_fields=["kpi", "periodo"],
+            update_fields=["valor", "fecha_periodo", "calculado_automatico", "fecha_creacion"],
+        )
+        KPIEstadoService.refrescar(kpi.pk for kpi in kpis)
+        return len(kpis)
+
+    @staticmethod
+    def backfill(empresas, meses, procesos=1, recalcular=False):
+        """
+        Rellena los `meses` anteriores al actual para cada empresa. Cada tarea
+        (empresa, mes) es independiente, así que con `procesos` > 1 se reparten en
+        procesos de trabajo (cada uno con su propia conexión a la base).
+        Devuelve el total de resultados escritos.
+        """
+        tareas = [
+            (empresa.pk, mes, recalcular)
+            for empresa in empresas
+            for mes in KPIService.meses_atras(meses)
+        ]
+        if procesos <= 1 or len(tareas) <= 1:
+            return sum(_calcular_tarea(tarea) for tarea in tareas)
+
+        # Los hijos (fork) no deben heredar la conexión abierta del padre
+        connections.close_all()
+        contexto = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto) as pool:
+            return sum(pool.map(_calcular_tarea, tareas))
+
+    @staticmethod
+    def materializar(empresas=None, recalcular=False):
+        """
+        Job programado (ver comando `kpi_materializar`): siembra los KPIs que falten
+        y calcula el periodo actual de cada empresa activa, fuera del ciclo de
+        petición. Devuelve {empresa_id: resultados escritos}.
+        """
+        if empresas is None:
+            empresas = Empresa.objects.filter(estado=True)
+        resumen = {}
+        for empresa in empresas:
+            KPIService.sembrar_defaults(empresa)
+            resumen[empresa.pk] = KPIService.calcular_lote(empresa, solo_faltantes=not recalcular)
+        return resumen
+
+    @staticmethod
+    def garantizar_resultados_actuales(empresa):
+        return KPIService.calcular_lote(empresa, solo_faltantes=True)
 
     @staticmethod
     def recalcular_todo(empresa):
-        from kpi.calculators import calcular_valor_automatico
-        periodo = timezone.now().strftime("%Y-%m")
-        kpis = KPI.objects.filter(empresa=empresa, estado=True).exclude(codigo=CodigosKPI.MANUAL)
-        actualizados = 0
-        for kpi in kpis:
-            valor = calcular_valor_automatico(kpi)
-            KPIResultado.objects.update_or_create(
-                kpi=kpi, periodo=periodo,
-                defaults={"valor": valor, "calculado_automatico": True, "fecha_creacion": timezone.now()}
-            )
-            actualizados += 1
-        return actualizados
\ No newline at end of file
+        return KPIService.calcular_lote(empresa)
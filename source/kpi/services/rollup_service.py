@@ -0,0 +1,76 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from core.models import Empresa
+from kpi.constants import CodigosKPI
+
+# Vigencia del consolidado en caché; el job programado lo renueva antes de vencer
+KPI_ROLLUP_TTL = getattr(settings, "KPI_ROLLUP_TTL", 60 * 60)
+
+CODIGOS_ROLLUP = (
+    CodigosKPI.HEADCOUNT,
+    CodigosKPI.COSTO_NOMINA,
+    CodigosKPI.SALARIO_PROM,
+    CodigosKPI.AUSENTISMO,
+    CodigosKPI.PUNTUALIDAD,
+    CodigosKPI.SOLICITUDES_PEND,
+    CodigosKPI.TOTAL_CARGOS,
+)
+
+# Métricas que pueden sumarse entre empresas para el total general
+CODIGOS_SUMABLES = (
+    CodigosKPI.HEADCOUNT,
+    CodigosKPI.COSTO_NOMINA,
+    CodigosKPI.SOLICITUDES_PEND,
+    CodigosKPI.TOTAL_CARGOS,
+)
+
+
+class RollupKPIService:
+    """
+    Consolidado de KPIs de todas las empresas activas (vista de superadmin).
+
+    Se calcula con los agregados agrupados por empresa de
+    `calcular_metricas_por_empresa` (un GROUP BY por fuente, no N tableros) y se
+    guarda en la caché compartida. `obtener` sirve siempre desde la caché y solo
+    calcula si no hay entrada; `refrescar` lo invoca el job programado.
+    """
+
+    @staticmethod
+    def _clave(periodo):
+        return f"kpi:rollup:{periodo}"
+
+    @staticmethod
+    def calcular(periodo=None):
+        from kpi.calculators import calcular_metricas_por_empresa
+
+        fecha = (periodo or timezone.localdate()).replace(day=1)
+        empresas = dict(Empresa.objects.filter(estado=True).values_list("pk", "nombre_comercial"))
+        metricas = calcular_metricas_por_empresa(CODIGOS_ROLLUP, fecha, empresa_ids=list(empresas))
+
+        filas = [
+            {"empresa_id": empresa_id, "empresa": nombre, **metricas[empresa_id]}
+            for empresa_id, nombre in sorted(empresas.items(), key=lambda par: par[1])
+        ]
+        totales = {codigo: sum(fila[codigo] for fila in filas) for codigo in CODIGOS_SUMABLES}
+        return {
+            "periodo": fecha.strftime("%Y-%m"),
+            "generado_el": timezone.now(),
+            "empresas": filas,
+            "totales": totales,
+        }
+
+    @staticmethod
+    def refrescar(periodo=None):
+        datos = RollupKPIService.calcular(periodo)
+        cache.set(RollupKPIService._clave(datos["periodo"]), datos, timeout=KPI_ROLLUP_TTL)
+        return datos
+
+    @staticmethod
+    def obtener(periodo=None):
+        fecha = (periodo or timezone.localdate()).replace(day=1)
+        datos = cache.get(RollupKPIService._clave(fecha.strftime("%Y-%m")))
+        if datos is None:
+            datos = RollupKPIService.refrescar(fecha)
+        return datos
@@ -0,0 +1,23 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import Empresa
+from kpi.models import KPI, KPIResultado
+from kpi.services.kpi_estado_service import KPIEstadoService
+from kpi.services.kpi_service import KPIService
+
+
+@receiver(post_save, sender=Empresa)
+def sembrar_kpis_empresa(sender, instance, created, **kwargs):
+    """Siembra los KPIs por defecto al crear la empresa (una vez confirmada la alta)."""
+    if created:
+        transaction.on_commit(lambda: KPIService.sembrar_defaults(instance))
+
+
+@receiver(post_save, sender=KPI)
+@receiver(post_save, sender=KPIResultado)
+@receiver(post_delete, sender=KPIResultado)
+def refrescar_estado_kpi(sender, instance, **kwargs):
+    """Mantiene al día la fila de KPIEstado del KPI afectado."""
+    KPIEstadoService.refrescar([instance.pk if sender is KPI else instance.kpi_id])
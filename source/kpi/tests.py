@@ -165,4 +165,464 @@ class KPIViewWhiteBoxTests(TestCase):
             
             print("     ✅ Éxito: Semáforo visual correcto.")
         else:
-            print(f"   ⚠️ No se pudo verificar contexto. Status: {response.status_code}")
\ No newline at end of file
+            print(f"   ⚠️ No se pudo verificar contexto. Status: {response.status_code}")
+
+class KPIPuntualidadWhiteBoxTests(TestCase):
+    """
+    [Caja Blanca] PUNTUALIDAD calculada con un agregado en la base de datos.
+    """
+
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nombre_comercial="Reloj Corp", ruc="303030")
+        self.unidad = UnidadOrganizacional.objects.create(nombre="Planta", empresa=self.empresa)
+        self.puesto = Puesto.objects.create(nombre="Operario", empresa=self.empresa)
+        self.kpi = KPI.objects.create(
+            empresa=self.empresa, codigo=CodigosKPI.PUNTUALIDAD, nombre="Puntualidad",
+            unidad_medida="%", frecuencia="mensual"
+        )
+        self.inicio_mes = timezone.localtime().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    @staticmethod
+    def _referencia(kpi):
+        """Implementación anterior (bucle en Python), usada como oráculo."""
+        from asistencia.models import EventoAsistencia
+
+        now = timezone.now()
+        marcaciones = EventoAsistencia.objects.filter(
+            empleado__empresa=kpi.empresa,
+            empleado__estado=Empleado.Estado.ACTIVO,
+            tipo=EventoAsistencia.TipoEvento.CHECK_IN,
+            registrado_el__year=now.year,
+            registrado_el__month=now.month,
+        ).select_related("empleado")
+        total = a_tiempo = 0
+        for m in marcaciones:
+            if m.empleado.hora_entrada_teorica:
+                total += 1
+                if timezone.localtime(m.registrado_el).time() <= m.empleado.hora_entrada_teorica:
+                    a_tiempo += 1
+        if total:
+            return ((Decimal(a_tiempo) / Decimal(total)) * 100).quantize(Decimal("0.00"))
+        return Decimal("0.00")
+
+    def _sembrar(self, empleados, dias):
+        from datetime import time, timedelta
+        from asistencia.models import EventoAsistencia
+
+        horas = [time(8, 30), time(9, 0), time(9, 0, 1), time(9, 45), time(20, 30)]
+        personas = [
+            Empleado(
+                nombres="Emp", apellidos=str(i), cedula=f"C{i}", email=f"e{i}@reloj.com",
+                empresa=self.empresa, unidad_org=self.unidad, puesto=self.puesto,
+                fecha_ingreso="2024-01-01", hora_entrada_teorica=time(9, 0) if i % 3 else time(8, 0),
+                estado=Empleado.Estado.INACTIVO if i % 17 == 0 else Empleado.Estado.ACTIVO,
+            )
+            for i in range(empleados)
+        ]
+        personas = Empleado.objects.bulk_create(personas)
+
+        eventos = []
+        for i, emp in enumerate(personas):
+            for d in range(dias):
+                fecha = (self.inicio_mes + timedelta(days=d % 28)).date()
+                momento = timezone.make_aware(timezone.datetime.combine(fecha, horas[(i + d) % len(horas)]))
+                tipo = EventoAsistencia.TipoEvento.CHECK_IN if d % 4 else EventoAsistencia.TipoEvento.CHECK_OUT
+                eventos.append(EventoAsistencia(empleado=emp, tipo=tipo, registrado_el=momento))
+        # Fuera del mes: la noche anterior al día 1 (en UTC ya es el mes en curso)
+        eventos.append(EventoAsistencia(
+            empleado=personas[1], tipo=EventoAsistencia.TipoEvento.CHECK_IN,
+            registrado_el=self.inicio_mes - timedelta(hours=2),
+        ))
+        EventoAsistencia.objects.bulk_create(eventos, batch_size=1000)
+
+    def test_equivalencia_con_implementacion_anterior(self):
+        print("\n🧮 [TEST] Iniciando: test_equivalencia_con_implementacion_anterior")
+        self.assertEqual(calcular_valor_automatico(self.kpi), Decimal("0.00"))
+
+        self._sembrar(empleados=12, dias=10)
+        esperado = self._referencia(self.kpi)
+        with self.assertNumQueries(1):
+            obtenido = calcular_valor_automatico(self.kpi)
+
+        print(f"   ↳ Referencia: {esperado} | Agregado: {obtenido}")
+        self.assertEqual(obtenido, esperado)
+        print("     ✅ Éxito: mismo resultado con una sola consulta.")
+
+    def test_benchmark_datos_sinteticos(self):
+        print("\n⏱️ [TEST] Iniciando: test_benchmark_datos_sinteticos")
+        import time as reloj
+
+        self._sembrar(empleados=200, dias=22)
+
+        inicio = reloj.perf_counter()
+        esperado = self._referencia(self.kpi)
+        t_bucle = reloj.perf_counter() - inicio
+
+        inicio = reloj.perf_counter()
+        obtenido = calcular_valor_automatico(self.kpi)
+        t_agregado = reloj.perf_counter() - inicio
+
+        print(f"   ↳ Bucle Python: {t_bucle * 1000:.1f} ms | Agregado SQL: {t_agregado * 1000:.1f} ms "
+              f"| Aceleración: x{t_bucle / max(t_agregado, 1e-6):.1f}")
+        self.assertEqual(obtenido, esperado)
+        print("     ✅ Éxito: benchmark ejecutado sobre ~4.400 marcaciones.")
+
+
+class KPILoteWhiteBoxTests(TestCase):
+    """
+    [Caja Blanca] Cálculo por lote de todos los KPIs de una empresa.
+    """
+
+    def setUp(self):
+        from solicitudes.models import SolicitudAusencia, TipoAusencia
+
+        self.empresa = Empresa.objects.create(nombre_comercial="Lote Corp", ruc="404040")
+        unidad = UnidadOrganizacional.objects.create(nombre="Ops", empresa=self.empresa)
+        puesto = Puesto.objects.create(nombre="Analista", empresa=self.empresa)
+        for i, salario in enumerate((1000, 1500, 2600)):
+            emp = Empleado.objects.create(
+                nombres="E", apellidos=str(i), cedula=f"L{i}", email=f"l{i}@lote.com",
+                empresa=self.empresa, unidad_org=unidad, puesto=puesto, fecha_ingreso="2024-01-01"
+            )
+            Contrato.objects.create(
+                empleado=emp, tipo="Indefinido", cargo_en_contrato="X",
+                fecha_inicio="2024-01-01", salario=salario
+            )
+        tipo = TipoAusencia.objects.create(empresa=self.empresa, nombre="Vacaciones")
+        hoy = timezone.localdate()
+        SolicitudAusencia.objects.create(
+            empresa=self.empresa, empleado=emp, ausencia=tipo, fecha_inicio=hoy, fecha_fin=hoy,
+            dias_habiles=2, motivo="x", estado=SolicitudAusencia.Estado.APROBADO
+        )
+        SolicitudAusencia.objects.create(
+            empresa=self.empresa, empleado=emp, ausencia=tipo, fecha_inicio=hoy, fecha_fin=hoy,
+            dias_habiles=1, motivo="y", estado=SolicitudAusencia.Estado.PENDIENTE
+        )
+        KPIService.asegurar_defaults(self.empresa)
+
+    def test_recalcular_todo_consultas_acotadas(self):
+        print("\n⚙️ [TEST] Iniciando: test_recalcular_todo_consultas_acotadas")
+        kpis = list(KPI.objects.filter(empresa=self.empresa))
+        esperados = {k.codigo: calcular_valor_automatico(k) for k in kpis}
+
+        # 1 (KPIs) + 5 agregados (empleados, marcaciones, solicitudes, contratos, puestos) + 1 upsert
+        # + 3 del refresco de KPIEstado (KPIs, últimos resultados, upsert)
+        # + 1 lectura de webhooks ALERTA_KPI (hay KPIs que pasan a rojo)
+        with self.assertNumQueries(11):
+            n = KPIService.recalcular_todo(self.empresa)
+
+        self.assertEqual(n, len(kpis))
+        periodo = KPIService.periodo_actual()
+        obtenidos = dict(
+            KPIResultado.objects.filter(kpi__empresa=self.empresa, periodo=periodo)
+            .values_list("kpi__codigo", "valor")
+        )
+        print(f"   ↳ Resultados: {obtenidos}")
+        self.assertEqual(obtenidos, esperados)
+        self.assertEqual(obtenidos[CodigosKPI.COSTO_NOMINA], Decimal("5100.00"))
+        self.assertEqual(obtenidos[CodigosKPI.AUSENTISMO], Decimal("3.03"))
+        print("     ✅ Éxito: mismos valores que el cálculo individual en consultas acotadas.")
+
+    def test_upsert_y_garantizar_sin_recalculo(self):
+        print("\n⚙️ [TEST] Iniciando: test_upsert_y_garantizar_sin_recalculo")
+        KPIService.recalcular_todo(self.empresa)
+        Empleado.objects.filter(empresa=self.empresa).first().delete()
+        KPIService.recalcular_todo(self.empresa)
+
+        headcount = KPIResultado.objects.get(kpi__empresa=self.empresa, kpi__codigo=CodigosKPI.HEADCOUNT)
+        self.assertEqual(headcount.valor, 2, "El upsert actualiza la fila del periodo")
+
+        with self.assertNumQueries(2):
+            self.assertEqual(KPIService.garantizar_resultados_actuales(self.empresa), 0)
+        print("     ✅ Éxito: upsert por (kpi, periodo) y garantía sin cálculos redundantes.")
+
+
+class KPIDashboardLecturaWhiteBoxTests(TestCase):
+    """
+    [Caja Blanca] El dashboard solo lee resultados materializados.
+    """
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.empresa = Empresa.objects.create(nombre_comercial="Lectura Corp", ruc="505050")
+        unidad = UnidadOrganizacional.objects.create(nombre="Ops", empresa=self.empresa)
+        puesto = Puesto.objects.create(nombre="Jefe", empresa=self.empresa)
+        self.user = User.objects.create_user(email='lector@kpi.com', password='123')
+        self.user.empleado = Empleado.objects.create(
+            nombres="Lector", apellidos="Test", cedula="505", email=self.user.email,
+            empresa=self.empresa, unidad_org=unidad, puesto=puesto, fecha_ingreso="2024-01-01"
+        )
+        self.user.save()
+        self.client.force_login(self.user)
+
+    def test_kpis_sembrados_al_crear_empresa(self):
+        print("\n🌱 [TEST] Iniciando: test_kpis_sembrados_al_crear_empresa")
+        self.assertEqual(KPI.objects.filter(empresa=self.empresa).count(), 7)
+        self.assertEqual(KPIService.sembrar_defaults(self.empresa), 0, "La siembra es idempotente")
+        print("     ✅ Éxito: defaults creados en el alta de la empresa.")
+
+    def test_dashboard_sin_escrituras_y_consultas_constantes(self):
+        print("\n📊 [TEST] Iniciando: test_dashboard_sin_escrituras_y_consultas_constantes")
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from django.urls import reverse
+
+        url = reverse('kpi:dashboard')
+        self.client.get(url)  # calienta caches de sesión/rol/empresa
+
+        with CaptureQueriesContext(connection) as antes:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        KPIService.materializar([self.empresa])
+        for i in range(5):
+            KPI.objects.create(empresa=self.empresa, nombre=f"Manual {i}", codigo=CodigosKPI.MANUAL)
+
+        with CaptureQueriesContext(connection) as despues:
+            self.client.get(url)
+
+        sentencias = [q["sql"].split()[0].upper() for q in antes.captured_queries + despues.captured_queries]
+        print(f"   ↳ Consultas: {len(antes)} (sin resultados) / {len(despues)} (12 KPIs con resultados)")
+        self.assertEqual(len(antes), len(despues), "El costo no depende del número de KPIs")
+        self.assertFalse({"INSERT", "UPDATE", "DELETE"} & set(sentencias), "Un GET no debe escribir")
+        print("     ✅ Éxito: dashboard de solo lectura con presupuesto fijo de consultas.")
+
+    def test_comando_materializar(self):
+        print("\n⏱️ [TEST] Iniciando: test_comando_materializar")
+        from django.core.management import call_command
+
+        call_command("kpi_materializar", empresa=self.empresa.pk)
+        periodo = KPIService.periodo_actual()
+        self.assertEqual(KPIResultado.objects.filter(kpi__empresa=self.empresa, periodo=periodo).count(), 7)
+        print("     ✅ Éxito: resultados del periodo calculados por el job.")
+
+
+class KPIHistoricoWhiteBoxTests(TestCase):
+    """
+    [Caja Blanca] Cálculo por periodo, backfill y series temporales.
+    """
+
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nombre_comercial="Historia Corp", ruc="606060")
+        unidad = UnidadOrganizacional.objects.create(nombre="Ops", empresa=self.empresa)
+        puesto = Puesto.objects.create(nombre="Analista", empresa=self.empresa)
+        self.user = User.objects.create_user(email="h1@hist.com", password='123')
+        self.empleado = Empleado.objects.create(
+            nombres="Hist", apellidos="Uno", cedula="H1", email=self.user.email,
+            empresa=self.empresa, unidad_org=unidad, puesto=puesto, fecha_ingreso="2024-01-01"
+        )
+        self.user.empleado = self.empleado
+        self.user.save()
+        KPIService.sembrar_defaults(self.empresa)
+        self.mes_pasado = KPIService.meses_atras(1)[0]
+
+    def test_calculo_de_un_mes_pasado(self):
+        print("\n📅 [TEST] Iniciando: test_calculo_de_un_mes_pasado")
+        from datetime import timedelta
+
+        # Contrato que terminó el mes pasado: cuenta allí, no en el mes actual
+        Contrato.objects.create(
+            empleado=self.empleado, tipo="Indefinido", cargo_en_contrato="X", salario=1200,
+            fecha_inicio="2024-01-01", fecha_fin=self.mes_pasado + timedelta(days=10), estado=False
+        )
+        KPIService.calcular_lote(self.empresa, periodo=self.mes_pasado)
+        KPIService.calcular_lote(self.empresa)
+
+        pasado = KPIResultado.objects.get(
+            kpi__empresa=self.empresa, kpi__codigo=CodigosKPI.COSTO_NOMINA,
+            periodo=self.mes_pasado.strftime("%Y-%m"),
+        )
+        actual = KPIResultado.objects.get(
+            kpi__empresa=self.empresa, kpi__codigo=CodigosKPI.COSTO_NOMINA,
+            periodo=KPIService.periodo_actual(),
+        )
+        print(f"   ↳ Nómina {pasado.periodo}: {pasado.valor} | {actual.periodo}: {actual.valor}")
+        self.assertEqual(pasado.valor, Decimal("1200.00"))
+        self.assertEqual(pasado.fecha_periodo, self.mes_pasado)
+        self.assertEqual(actual.valor, Decimal("0.00"))
+        print("     ✅ Éxito: el periodo define la ventana del cálculo.")
+
+    def test_mes_pasado_no_depende_del_estado_actual(self):
+        print("\n📅 [TEST] Iniciando: test_mes_pasado_no_depende_del_estado_actual")
+        from datetime import timedelta
+        from kpi.calculators import calcular_metricas_por_empresa
+
+        # Trabajó el mes pasado con contrato y hoy está inactivo
+        Contrato.objects.create(
+            empleado=self.empleado, tipo="Indefinido", cargo_en_contrato="X", salario=900,
+            fecha_inicio="2024-01-01", fecha_fin=self.mes_pasado + timedelta(days=10), estado=False
+        )
+        Empleado.objects.filter(pk=self.empleado.pk).update(estado=Empleado.Estado.INACTIVO)
+
+        codigos = [CodigosKPI.HEADCOUNT, CodigosKPI.COSTO_NOMINA]
+        pasado = calcular_metricas_por_empresa(codigos, self.mes_pasado, [self.empresa.pk])[self.empresa.pk]
+        actual = calcular_metricas_por_empresa(codigos, None, [self.empresa.pk])[self.empresa.pk]
+
+        print(f"   ↳ Mes pasado: {pasado} | Actual: {actual}")
+        self.assertEqual(pasado[CodigosKPI.HEADCOUNT], Decimal(1))
+        self.assertEqual(pasado[CodigosKPI.COSTO_NOMINA], Decimal("900.00"))
+        self.assertEqual(actual[CodigosKPI.HEADCOUNT], Decimal(0))
+        print("     ✅ Éxito: el histórico usa fechas, no el estado de hoy.")
+
+    def test_backfill_y_fecha_periodo(self):
+        print("\n📅 [TEST] Iniciando: test_backfill_y_fecha_periodo")
+        from django.core.management import call_command
+
+        call_command("kpi_backfill", meses=3, empresa=self.empresa.pk, procesos=1)
+        resultados = KPIResultado.objects.filter(kpi__empresa=self.empresa)
+        self.assertEqual(resultados.count(), 3 * 7)
+        self.assertFalse(resultados.filter(fecha_periodo__isnull=True).exists())
+
+        # Reejecutar sin --recalcular no escribe nada
+        self.assertEqual(KPIService.backfill([self.empresa], 3), 0)
+
+        manual = KPI.objects.create(empresa=self.empresa, nombre="Clima", codigo=CodigosKPI.MANUAL)
+        registro = KPIResultado.objects.create(kpi=manual, periodo="2024-07", valor=80)
+        self.assertEqual(registro.fecha_periodo.isoformat(), "2024-07-01")
+        print("     ✅ Éxito: meses rellenados con su fecha de periodo.")
+
+    def test_tendencia_en_una_consulta(self):
+        print("\n📈 [TEST] Iniciando: test_tendencia_en_una_consulta")
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from django.urls import reverse
+
+        KPIService.backfill([self.empresa], 6)
+        kpi = KPI.objects.get(empresa=self.empresa, codigo=CodigosKPI.HEADCOUNT)
+        self.client.force_login(self.user)
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('kpi:kpi_detalle', args=[kpi.pk]) + "?meses=12")
+
+        self.assertEqual(response.status_code, 200)
+        sobre_resultados = [q for q in consultas.captured_queries if "kpi_resultado" in q["sql"]]
+        print(f"   ↳ Consultas a kpi_resultado: {len(sobre_resultados)}")
+        self.assertEqual(len(sobre_resultados), 1)
+        self.assertEqual(len(response.context["tendencia"]["puntos"]), 6)
+        print("     ✅ Éxito: serie cargada con una consulta de rango.")
+
+
+class KPIEstadoWhiteBoxTests(TestCase):
+    """
+    [Caja Blanca] Tabla materializada con el último estado de cada KPI.
+    """
+
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nombre_comercial="Estado Corp", ruc="707070")
+        self.kpi = KPI.objects.create(
+            empresa=self.empresa, codigo=CodigosKPI.AUSENTISMO, nombre="Ausentismo", meta_default=5
+        )
+
+    def test_refresco_incremental_en_escrituras(self):
+        print("\n🚦 [TEST] Iniciando: test_refresco_incremental_en_escrituras")
+        from kpi.models import KPIEstado
+
+        estado = KPIEstado.objects.get(kpi=self.kpi)
+        self.assertEqual(estado.color, "gray", "KPI sin resultados")
+
+        KPIResultado.objects.create(kpi=self.kpi, periodo="2025-01", valor=7)
+        KPIResultado.objects.create(kpi=self.kpi, periodo="2025-02", valor=4)
+        estado.refresh_from_db()
+        print(f"   ↳ Estado: {estado}")
+        self.assertEqual((estado.periodo, estado.valor, estado.delta), ("2025-02", 4, -3))
+        self.assertEqual(estado.color, "green", "Ausentismo es inverso: 4 <= 5")
+
+        self.kpi.meta_default = 3
+        self.kpi.save()
+        estado.refresh_from_db()
+        self.assertEqual(estado.color, "red")
+
+        KPIResultado.objects.filter(periodo="2025-02").get().delete()
+        estado.refresh_from_db()
+        self.assertEqual((estado.valor, estado.delta), (7, None))
+
+        self.kpi.estado = False
+        self.kpi.save()
+        self.assertFalse(KPIEstado.objects.filter(kpi=self.kpi).exists())
+        print("     ✅ Éxito: el estado sigue a resultados y configuración del KPI.")
+
+    def test_resumen_global_solo_superusuario(self):
+        print("\n🌐 [TEST] Iniciando: test_resumen_global_solo_superusuario")
+        from django.urls import reverse
+
+        otra = Empresa.objects.create(nombre_comercial="Otra Corp", ruc="717171")
+        otro = KPI.objects.create(empresa=otra, codigo=CodigosKPI.HEADCOUNT, nombre="Headcount", meta_default=1)
+        KPIResultado.objects.create(kpi=otro, periodo="2025-01", valor=10)
+
+        url = reverse('kpi:resumen_global')
+        self.client.force_login(User.objects.create_user(email='normal@kpi.com', password='123'))
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_login(User.objects.create_user(email='root@kpi.com', password='123', is_superuser=True))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        filas = {f["empresa"].nombre_comercial: f for f in response.context["empresas"]}
+        self.assertEqual(filas["Otra Corp"]["verde"], 1)
+        self.assertEqual(filas["Estado Corp"]["sin_datos"], 1)
+        print("     ✅ Éxito: vista global multiempresa restringida a superusuarios.")
+
+
+class KPIRollupWhiteBoxTests(TestCase):
+    """
+    [Caja Blanca] Consolidado multiempresa con agregados agrupados y caché.
+    """
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+        self.empresas = []
+        for n in range(3):
+            empresa = Empresa.objects.create(nombre_comercial=f"Grupo {n}", ruc=f"80{n}")
+            unidad = UnidadOrganizacional.objects.create(nombre="Ops", empresa=empresa)
+            puesto = Puesto.objects.create(nombre="Cargo", empresa=empresa)
+            for i in range(n + 1):
+                emp = Empleado.objects.create(
+                    nombres="R", apellidos=f"{n}{i}", cedula=f"R{n}{i}", email=f"r{n}{i}@grupo.com",
+                    empresa=empresa, unidad_org=unidad, puesto=puesto, fecha_ingreso="2024-01-01"
+                )
+                Contrato.objects.create(
+                    empleado=emp, tipo="Indefinido", cargo_en_contrato="X",
+                    fecha_inicio="2024-01-01", salario=1000 * (n + 1)
+                )
+            self.empresas.append(empresa)
+
+    def test_agrupado_equivale_al_calculo_por_empresa(self):
+        print("\n🌐 [TEST] Iniciando: test_agrupado_equivale_al_calculo_por_empresa")
+        from kpi.calculators import calcular_metricas
+        from kpi.services.rollup_service import CODIGOS_ROLLUP, RollupKPIService
+
+        # 1 (empresas activas) + 5 agregados GROUP BY, sin importar el número de empresas
+        with self.assertNumQueries(6):
+            datos = RollupKPIService.calcular()
+
+        for fila in datos["empresas"]:
+            individual = calcular_metricas(fila["empresa_id"], CODIGOS_ROLLUP)
+            self.assertEqual({c: fila[c] for c in CODIGOS_ROLLUP}, individual)
+        print(f"   ↳ Totales: {datos['totales']}")
+        self.assertEqual(datos["totales"][CodigosKPI.HEADCOUNT], 6)
+        self.assertEqual(datos["totales"][CodigosKPI.COSTO_NOMINA], Decimal("14000.00"))
+        print("     ✅ Éxito: un GROUP BY por fuente para todas las empresas.")
+
+    def test_api_rollup_cacheada_y_restringida(self):
+        print("\n🌐 [TEST] Iniciando: test_api_rollup_cacheada_y_restringida")
+        from django.urls import reverse
+
+        url = reverse("kpi-rollup")
+        self.client.force_login(User.objects.create_user(email='staff@grupo.com', password='123', is_staff=True))
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_login(User.objects.create_user(email='root@grupo.com', password='123', is_superuser=True))
+        primera = self.client.get(url).json()
+        self.assertEqual(len(primera["empresas"]), 3)
+
+        Empresa.objects.create(nombre_comercial="Grupo Nuevo", ruc="899")
+        segunda = self.client.get(url).json()
+        self.assertEqual(len(segunda["empresas"]), 3, "Se sirve desde caché hasta el próximo refresco")
+
+        from django.core.management import call_command
+        call_command("kpi_materializar")
+        tercera = self.client.get(url).json()
+        self.assertEqual(len(tercera["empresas"]), 4)
+        self.assertEqual(self.client.get(url + "?periodo=2025-13").status_code, 400)
+        print("     ✅ Éxito: API para superusuarios servida desde caché y renovada por el job.")
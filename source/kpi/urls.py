@@ -6,7 +6,8 @@ from .views.kpi_view import (
     kpi_detalle_view, 
     kpi_recalcular_view,
     kpi_editar_view,
-    kpi_eliminar_view
+    kpi_eliminar_view,
+    kpi_resumen_global_view,
 )
 
 app_name = "kpi"
@@ -15,6 +16,7 @@ urlpatterns = [
     path("", dashboard_view, name="dashboard"),
     # Corregido: ya no dice "kpi_view.kpi_recalcular..."
     path("recalcular/", kpi_recalcular_global_view, name="recalcular_global"),
+    path("global/", kpi_resumen_global_view, name="resumen_global"),
     path("generar-defaults/", kpi_generar_default_view, name="kpi_generar_defaults"),
     path("<int:pk>/", kpi_detalle_view, name="kpi_detalle"),
     path("<int:pk>/recalcular/", kpi_recalcular_view, name="kpi_recalcular"),
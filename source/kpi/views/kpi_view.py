@@ -1,12 +1,11 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import OuterRef, Subquery
 from django.utils import timezone
 
-from kpi.models import KPI, KPIResultado
+from kpi.models import KPI, KPIEstado, KPIResultado
 from kpi.forms import KPIForm
-from kpi.constants import CodigosKPI
+from usuarios.decorators import solo_superusuario
 
 @login_required
 def dashboard_view(request):
@@ -14,9 +13,6 @@ def dashboard_view(request):
     Vista principal. Usa 'request.empresa_actual' proporcionado por el Middleware
     para respetar la empresa seleccionada en la sesión.
     """
-    # IMPORTACIÓN TARDÍA
-    from kpi.services.kpi_service import KPIService
-
     # CAMBIO CLAVE: Usamos la empresa de la sesión (Middleware), no la del usuario fijo.
     empresa = getattr(request, 'empresa_actual', None)
     
@@ -25,40 +21,58 @@ def dashboard_view(request):
         # Redirigir a home o selector de empresa si existe
         return redirect("core:home") 
     
-    # 1. Asegurar Defaults (Crea Cargos, Nómina, etc. si no existen)
-    KPIService.asegurar_defaults(empresa)
-    
-    # 2. Garantizar cálculos del mes actual
-    KPIService.garantizar_resultados_actuales(empresa)
-    
-    # 3. Consulta de semáforos
-    ultimo_valor_sq = KPIResultado.objects.filter(
-        kpi=OuterRef('pk')
-    ).order_by('-periodo').values('valor')[:1]
-
-    kpis = KPI.objects.filter(empresa=empresa, estado=True).annotate(
-        ultimo_valor=Subquery(ultimo_valor_sq)
-    )
+    # Solo lectura: los KPIs se siembran al crear la empresa y los resultados del
+    # periodo los materializa el job programado (comando kpi_materializar).
 
+    # Semáforos desde la tabla materializada KPIEstado (una sola consulta con JOIN)
+    kpis = KPI.objects.filter(empresa=empresa, estado=True).select_related("estado_actual")
     for k in kpis:
-        k.color = "gray"
-        val = k.ultimo_valor
-        meta = k.meta_default
-        
-        if val is not None and meta is not None:
-            # Lógica inversa (ej: Ausentismo, mientras menos mejor)
-            es_kpi_inverso = k.codigo in [CodigosKPI.AUSENTISMO]
-            
-            if es_kpi_inverso:
-                k.color = "green" if val <= meta else "red"
-            else:
-                k.color = "green" if val >= meta else "red"
+        _aplicar_estado(k)
 
     return render(request, "kpi/dashboard.html", {
         "kpis": kpis,
         "form": KPIForm()
     })
 
+
+def _aplicar_estado(kpi):
+    """Copia al KPI los atributos que leen las plantillas (ultimo_valor, color, delta)."""
+    try:
+        estado = kpi.estado_actual
+    except KPIEstado.DoesNotExist:
+        estado = None
+    kpi.ultimo_valor = estado.valor if estado else None
+    kpi.delta = estado.delta if estado else None
+    kpi.color = estado.color if estado else "gray"
+    return kpi
+
+
+@solo_superusuario
+def kpi_resumen_global_view(request):
+    """
+    Vista de superadmin: consolidado multiempresa (en caché) y semáforos de todas
+    las empresas desde KPIEstado.
+    """
+    estados = (
+        KPIEstado.objects.select_related("empresa", "kpi")
+        .filter(empresa__estado=True)
+        .order_by("empresa__nombre_comercial", "kpi__nombre")
+    )
+    empresas = {}
+    for estado in estados:
+        fila = empresas.setdefault(estado.empresa_id, {
+            "empresa": estado.empresa, "estados": [], "verde": 0, "rojo": 0, "sin_datos": 0,
+        })
+        fila["estados"].append(estado)
+        fila[{"green": "verde", "red": "rojo"}.get(estado.color, "sin_datos")] += 1
+
+    from kpi.services.rollup_service import RollupKPIService
+
+    return render(request, "kpi/resumen_global.html", {
+        "empresas": list(empresas.values()),
+        "rollup": RollupKPIService.obtener(),
+    })
+
 @login_required
 def kpi_recalcular_global_view(request):
     from kpi.services.kpi_service import KPIService
@@ -89,13 +103,14 @@ def kpi_generar_default_view(request):
 @login_required
 def kpi_recalcular_view(request, pk):
     from kpi.calculators import calcular_valor_automatico
+    from kpi.services.kpi_service import KPIService
     
     empresa = getattr(request, 'empresa_actual', None)
     # Seguridad: Solo permitimos recalcular KPIs de la empresa en sesión
     kpi = get_object_or_404(KPI, pk=pk, empresa=empresa)
     
     valor = calcular_valor_automatico(kpi)
-    periodo = timezone.now().strftime("%Y-%m")
+    periodo = KPIService.periodo_actual()
     
     KPIResultado.objects.update_or_create(
         kpi=kpi,
@@ -112,10 +127,54 @@ def kpi_recalcular_view(request, pk):
 # Las vistas de detalle, editar y eliminar siguen el mismo patrón de seguridad
 @login_required
 def kpi_detalle_view(request, pk):
+    from kpi.services.kpi_service import KPIService
+
     empresa = getattr(request, 'empresa_actual', None)
     kpi = get_object_or_404(KPI, pk=pk, empresa=empresa)
-    resultados = kpi.resultados.all().order_by('-periodo')
-    return render(request, "kpi/kpi_detalle.html", {"kpi": kpi, "resultados": resultados})
+
+    try:
+        meses = min(max(int(request.GET.get("meses", 24)), 1), 120)
+    except ValueError:
+        meses = 24
+
+    # Una consulta de rango sobre el índice (kpi, fecha_periodo)
+    desde = KPIService.meses_atras(meses - 1)[0] if meses > 1 else timezone.localdate().replace(day=1)
+    serie = list(kpi.resultados.filter(fecha_periodo__gte=desde).order_by('fecha_periodo'))
+
+    return render(request, "kpi/kpi_detalle.html", {
+        "kpi": kpi,
+        "resultados": serie[::-1],
+        "tendencia": _grafico_tendencia(serie, kpi.meta_default),
+        "meses": meses,
+    })
+
+
+def _grafico_tendencia(serie, meta, ancho=600, alto=160, margen=12):
+    """Coordenadas SVG (polilínea, puntos y línea de meta) para la serie ordenada por fecha."""
+    if not serie:
+        return None
+    valores = [r.valor for r in serie]
+    referencia = valores + ([meta] if meta is not None else [])
+    minimo, maximo = min(referencia), max(referencia)
+    rango = (maximo - minimo) or 1
+    paso = (ancho - 2 * margen) / max(len(serie) - 1, 1)
+
+    def y(valor):
+        return round(alto - margen - float((valor - minimo) / rango) * (alto - 2 * margen), 1)
+
+    puntos = [
+        {"x": round(margen + i * paso, 1), "y": y(r.valor), "periodo": r.periodo, "valor": r.valor}
+        for i, r in enumerate(serie)
+    ]
+    return {
+        "ancho": ancho,
+        "alto": alto,
+        "puntos": puntos,
+        "polilinea": " ".join(f"{p['x']},{p['y']}" for p in puntos),
+        "meta_y": y(meta) if meta is not None else None,
+        "minimo": minimo,
+        "maximo": maximo,
+    }
 
 @login_required
 def kpi_editar_view(request, pk):
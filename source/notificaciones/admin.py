@@ -1,9 +1,16 @@
 from django.contrib import admin
-from .models import Notificacion
+from .models import Notificacion, NotificacionArchivada
 
 @admin.register(Notificacion)
 class NotificacionAdmin(admin.ModelAdmin):
     list_display = ('titulo', 'usuario', 'tipo', 'leido', 'fecha_creacion')
     list_filter = ('leido', 'tipo', 'fecha_creacion')
     search_fields = ('titulo', 'mensaje', 'usuario__email')
-    list_editable = ('leido',)
\ No newline at end of file
+    list_editable = ('leido',)
+
+
+@admin.register(NotificacionArchivada)
+class NotificacionArchivadaAdmin(admin.ModelAdmin):
+    list_display = ('titulo', 'usuario', 'tipo', 'fecha_creacion', 'fecha_archivado')
+    list_filter = ('tipo', 'fecha_creacion')
+    search_fields = ('titulo', 'usuario__email')
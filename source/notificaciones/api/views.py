@@ -1,19 +1,33 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import IsAuthenticated
 
 from notificaciones.models import Notificacion
+from notificaciones.services.notificacion_service import NotificacionService
 from .serializers import NotificacionSerializer
 
+class NotificacionCursorPagination(CursorPagination):
+    """
+    Paginación por cursor (keyset) sobre el índice (usuario, fecha_creacion, id).
+    Evita COUNT y OFFSET, cuyo coste crece con el historial del usuario.
+    """
+    ordering = ('-fecha_creacion', '-id')
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+
+
 class NotificacionViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = NotificacionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = NotificacionCursorPagination
 
     def get_queryset(self):
         return Notificacion.objects.filter(
             usuario=self.request.user
-        ).order_by('-fecha_creacion')
+        ).order_by('-fecha_creacion', '-id')
 
     # marca una notificación específica como leída
     @action(detail=True, methods=['post'], url_path='marcar-leida')
@@ -30,10 +44,10 @@ class NotificacionViewSet(viewsets.ReadOnlyModelViewSet):
     # marca todas las notificaciones como leídas
     @action(detail=False, methods=['post'], url_path='marcar-todas-leidas')
     def marcar_todas_leidas(self, request):
-        self.get_queryset().filter(leido=False).update(leido=True)
+        NotificacionService.marcar_como_leidas(request.user)
         return Response({'status': 'todas leidas'}, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['get'], url_path='badge-count')
     def badge_count(self, request):
-        cantidad = self.get_queryset().filter(leido=False).count()
+        cantidad = NotificacionService.contar_no_leidas(request.user)
         return Response({'no_leidas': cantidad}, status=status.HTTP_200_OK)
\ No newline at end of file
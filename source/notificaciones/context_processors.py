@@ -1,15 +1,19 @@
-from notificaciones.models import Notificacion
+from django.utils.functional import SimpleLazyObject
+
+from notificaciones.services.canal_service import NOTIFICACIONES_SONDEO_SEGUNDOS, NOTIFICACIONES_SSE
+from notificaciones.services.notificacion_service import NotificacionService
+
 
 def notificaciones_globales(request):
-    if request.user.is_authenticated:
-        conteo = Notificacion.objects.filter(usuario=request.user, leido=False).count()
-        # también se puede devolver las últimas 3 para un mini-dropdown
-        ultimas = Notificacion.objects.filter(usuario=request.user).order_by('-fecha_creacion')[:5]
-        return {
-            'conteo_notificaciones': conteo,
-            'ultimas_notificaciones': ultimas
-        }
+    """
+    Campana del navbar. Los valores son perezosos: solo se resuelven si la
+    plantilla los usa. El conteo se lee del contador ya cargado con el usuario
+    (sin consultas) y las últimas notificaciones se comparten con el dashboard.
+    """
     return {
-        'conteo_notificaciones': 0,
-        'ultimas_notificaciones': []
-    }
\ No newline at end of file
+        'conteo_notificaciones': SimpleLazyObject(lambda: NotificacionService.contar_no_leidas(request.user)),
+        'ultimas_notificaciones': SimpleLazyObject(lambda: NotificacionService.recientes_de_request(request)),
+        # La campana usa SSE si está activo; si no, consulta badge-count cada cierto tiempo
+        'notificaciones_sse': NOTIFICACIONES_SSE,
+        'notificaciones_sondeo_ms': NOTIFICACIONES_SONDEO_SEGUNDOS * 1000,
+    }
@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from notificaciones.services.notificacion_service import NotificacionService
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye el contador de notificaciones no leídas de cada usuario a "
+        "partir de sus notificaciones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--usuario", type=int, help="ID del usuario (por defecto: todos).")
+
+    def handle(self, *args, **options):
+        usuarios = get_user_model().objects.all()
+        if options["usuario"]:
+            usuarios = usuarios.filter(pk=options["usuario"])
+
+        total = NotificacionService.recalcular_no_leidas(usuarios)
+        self.stdout.write(self.style.SUCCESS(f"Contadores reconstruidos: {total} usuarios."))
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from notificaciones.services.retencion_service import (
+    NOTIFICACIONES_RETENCION_DIAS,
+    RetencionNotificacionesService,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Aplica la política de retención de notificaciones: archiva (o elimina) "
+        "por lotes las notificaciones leídas más antiguas que el límite."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dias",
+            type=int,
+            default=NOTIFICACIONES_RETENCION_DIAS,
+            help="Días de historial leído a conservar (por defecto: %(default)s).",
+        )
+        parser.add_argument(
+            "--eliminar",
+            action="store_true",
+            help="Elimina las notificaciones vencidas en lugar de archivarlas.",
+        )
+        parser.add_argument(
+            "--tam-lote",
+            type=int,
+            default=5000,
+            help="Filas por lote (cada lote es una transacción corta).",
+        )
+
+    def handle(self, *args, **options):
+        if options["dias"] < 0 or options["tam_lote"] <= 0:
+            raise CommandError("--dias debe ser >= 0 y --tam-lote mayor que 0.")
+
+        resumen = RetencionNotificacionesService.aplicar_retencion(
+            dias=options["dias"],
+            eliminar=options["eliminar"],
+            tam_lote=options["tam_lote"],
+        )
+
+        accion = "eliminadas" if options["eliminar"] else "archivadas"
+        total = resumen["eliminadas"] if options["eliminar"] else resumen["archivadas"]
+        self.stdout.write(
+            f"Notificaciones leídas anteriores a {resumen['limite']:%Y-%m-%d %H:%M} {accion}: "
+            f"{total} en {resumen['lotes']} lotes."
+        )
+        self.stdout.write(self.style.SUCCESS("Política de retención aplicada correctamente."))
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.3 on 2026-10-18 13:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notificaciones', '0002_remove_notificacion_link_notificacion_url_destino_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['usuario', 'leido', '-fecha_creacion'], name='notif_usuario_leido_fecha_idx'),
+        ),
+    ]
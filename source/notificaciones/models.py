@@ -16,8 +16,39 @@ class Notificacion(models.Model):
 
     class Meta:
         ordering = ['-fecha_creacion']
+        indexes = [
+            # campana, listado por usuario y "marcar todas" filtran por (usuario, leido) y ordenan por fecha
+            models.Index(fields=['usuario', 'leido', '-fecha_creacion'], name='notif_usuario_leido_fecha_idx'),
+            # paginación por cursor del historial de cada usuario (web y API)
+            models.Index(fields=['usuario', '-fecha_creacion', '-id'], name='notif_usuario_fecha_id_idx'),
+        ]
         verbose_name = "Notificación"
         verbose_name_plural = "Notificaciones"
 
     def __str__(self):
-        return f"{self.usuario} - {self.titulo}"
\ No newline at end of file
+        return f"{self.usuario} - {self.titulo}"
+
+
+class NotificacionArchivada(models.Model):
+    """
+    Notificación leída retirada de la tabla principal por la política de
+    retención (comando notificaciones_retencion). Conserva el contenido original
+    para consulta histórica sin engordar los índices del historial activo.
+    """
+
+    id = models.BigIntegerField(primary_key=True)  # mismo id que tenía en Notificacion
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notificaciones_archivadas')
+    titulo = models.CharField(max_length=100)
+    mensaje = models.TextField()
+    tipo = models.CharField(max_length=20, choices=TiposNotificacion.OPCIONES, default=TiposNotificacion.INFO)
+    url_destino = models.CharField(max_length=200, blank=True, null=True)
+    fecha_creacion = models.DateTimeField()
+    fecha_archivado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-fecha_creacion']
+        verbose_name = "Notificación archivada"
+        verbose_name_plural = "Notificaciones archivadas"
+
+    def __str__(self):
+        return f"{self.usuario} - {self.titulo} (archivada)"
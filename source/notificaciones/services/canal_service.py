@@ -0,0 +1,218 @@
+import asyncio
+import json
+import logging
+import threading
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger("notificaciones")
+
+# Canal SSE activo: solo con el proyecto servido por ASGI (ver settings.NOTIFICACIONES_SSE)
+NOTIFICACIONES_SSE = getattr(settings, "NOTIFICACIONES_SSE", False)
+# Sin SSE, cada cuántos segundos la campana consulta el contador (badge-count)
+NOTIFICACIONES_SONDEO_SEGUNDOS = getattr(settings, "NOTIFICACIONES_SONDEO_SEGUNDOS", 60)
+# Broker de eventos (ruta importable de una subclase de BrokerEventos)
+NOTIFICACIONES_BROKER = getattr(
+    settings, "NOTIFICACIONES_BROKER", "notificaciones.services.canal_service.BrokerMemoria"
+)
+# Eventos pendientes por conexión antes de considerarla desbordada
+NOTIFICACIONES_SSE_CAPACIDAD = getattr(settings, "NOTIFICACIONES_SSE_CAPACIDAD", 100)
+# Segundos sin eventos tras los cuales se envía un comentario de keep-alive
+NOTIFICACIONES_SSE_KEEPALIVE = getattr(settings, "NOTIFICACIONES_SSE_KEEPALIVE", 25)
+# Duración máxima de una conexión; el navegador reconecta solo (EventSource)
+NOTIFICACIONES_SSE_DURACION = getattr(settings, "NOTIFICACIONES_SSE_DURACION", 300)
+# Milisegundos que el navegador espera antes de reconectar
+NOTIFICACIONES_SSE_REINTENTO = getattr(settings, "NOTIFICACIONES_SSE_REINTENTO", 5000)
+
+
+class BrokerEventos:
+    """
+    Interfaz del broker que transporta eventos entre publicadores y conexiones.
+
+    `publicar` puede llamarse desde cualquier hilo o proceso; el broker debe
+    hacer llegar cada evento a `entregar(usuario_id, evento)` en todos los
+    procesos con conexiones abiertas. Un broker entre procesos (p. ej. Redis
+    pub/sub) publica en `publicar` y llama a `entregar` desde su hilo oyente.
+    """
+
+    def iniciar(self, entregar):
+        self.entregar = entregar
+
+    def publicar(self, usuario_id, evento):
+        raise NotImplementedError
+
+    def detener(self):
+        pass
+
+
+class BrokerMemoria(BrokerEventos):
+    """Broker en proceso: entrega directa a las conexiones del mismo proceso."""
+
+    def publicar(self, usuario_id, evento):
+        self.entregar(usuario_id, evento)
+
+
+class Suscripcion:
+    """Cola de eventos de una conexión, ligada al event loop que la consume."""
+
+    def __init__(self, usuario_id, capacidad=NOTIFICACIONES_SSE_CAPACIDAD):
+        self.usuario_id = usuario_id
+        self.loop = asyncio.get_running_loop()
+        self.cola = asyncio.Queue(maxsize=capacidad)
+        self.desbordada = False
+
+    def recibir(self, evento):
+        # Se ejecuta dentro del loop de la conexión (call_soon_threadsafe)
+        try:
+            self.cola.put_nowait(evento)
+        except asyncio.QueueFull:
+            self.desbordada = True
+
+
+class CanalNotificacionesService:
+    """
+    Canal de tiempo real de notificaciones (pub/sub en proceso).
+
+    Las escrituras publican eventos al confirmar su transacción; cada conexión
+    SSE abierta tiene una `Suscripcion` y recibe solo los eventos de su usuario.
+    Las conexiones en espera no consultan la base: solo esperan en su cola.
+
+    Eventos: {"evento": "notificacion", "datos": {...}, "delta": 0|1} y
+    {"evento": "contador", "delta": n} o {"evento": "contador", "no_leidas": n}.
+    """
+
+    _suscripciones = {}
+    _lock = threading.Lock()
+    _broker = None
+
+    # --- Broker ---
+
+    @staticmethod
+    def broker():
+        if CanalNotificacionesService._broker is None:
+            CanalNotificacionesService.configurar_broker(import_string(NOTIFICACIONES_BROKER)())
+        return CanalNotificacionesService._broker
+
+    @staticmethod
+    def configurar_broker(broker):
+        """Reemplaza el broker activo (p. ej. por uno entre procesos o un doble de pruebas)."""
+        with CanalNotificacionesService._lock:
+            anterior = CanalNotificacionesService._broker
+            broker.iniciar(CanalNotificacionesService.entregar)
+            CanalNotificacionesService._broker = broker
+        if anterior is not None:
+            anterior.detener()
+        return anterior
+
+    # --- Publicación ---
+
+    @staticmethod
+    def publicar(usuario_id, evento):
+        # Un fallo del canal nunca debe romper la escritura que lo originó
+        try:
+            CanalNotificacionesService.broker().publicar(usuario_id, evento)
+        except Exception:
+            logger.exception("No se pudo publicar el evento de notificaciones del usuario %s", usuario_id)
+
+    @staticmethod
+    def publicar_al_confirmar(usuario_id, evento):
+        transaction.on_commit(partial(CanalNotificacionesService.publicar, usuario_id, evento))
+
+    @staticmethod
+    def evento_notificacion(notificacion):
+        return {
+            "evento": "notificacion",
+            "delta": 0 if notificacion.leido else 1,
+            "datos": {
+                "id": notificacion.pk,
+                "titulo": notificacion.titulo,
+                "mensaje": notificacion.mensaje,
+                "tipo": notificacion.tipo,
+                "url": notificacion.url_destino,
+                "fecha_creacion": notificacion.fecha_creacion.isoformat() if notificacion.fecha_creacion else None,
+            },
+        }
+
+    @staticmethod
+    def evento_contador(delta=None, no_leidas=None):
+        if no_leidas is not None:
+            return {"evento": "contador", "no_leidas": no_leidas}
+        return {"evento": "contador", "delta": delta}
+
+    # --- Distribución local ---
+
+    @staticmethod
+    def suscribir(usuario_id):
+        """Registra una conexión del usuario. Debe llamarse dentro de su event loop."""
+        suscripcion = Suscripcion(usuario_id)
+        with CanalNotificacionesService._lock:
+            CanalNotificacionesService._suscripciones.setdefault(usuario_id, set()).add(suscripcion)
+        return suscripcion
+
+    @staticmethod
+    def desuscribir(suscripcion):
+        with CanalNotificacionesService._lock:
+            conexiones = CanalNotificacionesService._suscripciones.get(suscripcion.usuario_id)
+            if conexiones is not None:
+                conexiones.discard(suscripcion)
+                if not conexiones:
+                    del CanalNotificacionesService._suscripciones[suscripcion.usuario_id]
+
+    @staticmethod
+    def entregar(usuario_id, evento):
+        """Entrega un evento a las conexiones locales del usuario (desde cualquier hilo)."""
+        with CanalNotificacionesService._lock:
+            conexiones = list(CanalNotificacionesService._suscripciones.get(usuario_id, ()))
+        for suscripcion in conexiones:
+            try:
+                suscripcion.loop.call_soon_threadsafe(suscripcion.recibir, evento)
+            except RuntimeError:
+                # El loop de la conexión ya se cerró
+                CanalNotificacionesService.desuscribir(suscripcion)
+
+    @staticmethod
+    def conexiones_abiertas():
+        with CanalNotificacionesService._lock:
+            return sum(len(conexiones) for conexiones in CanalNotificacionesService._suscripciones.values())
+
+    # --- Flujo SSE ---
+
+    @staticmethod
+    def formatear_sse(evento, datos):
+        return f"event: {evento}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+    @staticmethod
+    async def flujo(usuario_id, no_leidas, keepalive=NOTIFICACIONES_SSE_KEEPALIVE, duracion=NOTIFICACIONES_SSE_DURACION):
+        """
+        Generador asíncrono de la respuesta SSE de una conexión. Parte del contador
+        `no_leidas` y lo mantiene con los eventos recibidos. Termina al agotar la
+        duración o si la cola se desborda (al reconectar se parte del contador real).
+        """
+        suscripcion = CanalNotificacionesService.suscribir(usuario_id)
+        loop = asyncio.get_running_loop()
+        fin = loop.time() + duracion
+        try:
+            yield f"retry: {NOTIFICACIONES_SSE_REINTENTO}\n\n"
+            yield CanalNotificacionesService.formatear_sse("contador", {"no_leidas": no_leidas})
+
+            while not suscripcion.desbordada:
+                restante = fin - loop.time()
+                if restante <= 0:
+                    break
+                try:
+                    evento = await asyncio.wait_for(suscripcion.cola.get(), timeout=min(keepalive, restante))
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                if "no_leidas" in evento:
+                    no_leidas = evento["no_leidas"]
+                else:
+                    no_leidas = max(0, no_leidas + evento.get("delta", 0))
+                datos = dict(evento.get("datos", {}), no_leidas=no_leidas)
+                yield CanalNotificacionesService.formatear_sse(evento["evento"], datos)
+        finally:
+            CanalNotificacionesService.desuscribir(suscripcion)
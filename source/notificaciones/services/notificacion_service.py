@@ -1,15 +1,62 @@
+import atexit
+import threading
+from collections import Counter, defaultdict
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from auditoria.services.escritor_asincrono import EscritorAuditoriaAsincrono
+from notificaciones.services.canal_service import CanalNotificacionesService
 from notificaciones.models import Notificacion
 from notificaciones.constants import TiposNotificacion
 
+# Cantidad de notificaciones que muestran la campana del navbar y el dashboard
+LIMITE_RECIENTES = 5
+
+# Configuración de las difusiones (una notificación para muchos usuarios)
+NOTIFICACIONES_TAM_LOTE = getattr(settings, "NOTIFICACIONES_TAM_LOTE", 500)
+NOTIFICACIONES_VENTANA_DUPLICADOS = getattr(settings, "NOTIFICACIONES_VENTANA_DUPLICADOS", 300)  # segundos
+NOTIFICACIONES_ASINCRONAS = getattr(settings, "NOTIFICACIONES_ASINCRONAS", False)
+NOTIFICACIONES_COLA_CAPACIDAD = getattr(settings, "NOTIFICACIONES_COLA_CAPACIDAD", 10000)
+
+
+def _escribir_lote(notificaciones):
+    """
+    Inserta un bloque de notificaciones y suma sus no leídas a los contadores.
+    bulk_create no dispara las señales que mantienen el contador: se actualiza
+    aquí con un UPDATE por cada cantidad distinta (normalmente uno solo).
+    """
+    por_cantidad = defaultdict(list)
+    for usuario_id, cantidad in Counter(n.usuario_id for n in notificaciones if not n.leido).items():
+        por_cantidad[cantidad].append(usuario_id)
+
+    with transaction.atomic():
+        Notificacion.objects.bulk_create(notificaciones, batch_size=NOTIFICACIONES_TAM_LOTE)
+        for cantidad, usuario_ids in por_cantidad.items():
+            get_user_model().objects.filter(pk__in=usuario_ids).update(
+                notificaciones_no_leidas=F("notificaciones_no_leidas") + cantidad
+            )
+        for notificacion in notificaciones:
+            CanalNotificacionesService.publicar_al_confirmar(
+                notificacion.usuario_id, CanalNotificacionesService.evento_notificacion(notificacion)
+            )
+
 class NotificacionService:
-    
+
+    _escritor_asincrono = None
+    _lock = threading.Lock()
+
     @staticmethod
     def crear_notificacion(usuario, titulo, mensaje, tipo=TiposNotificacion.INFO, url=None):
-        # creación de una nueva notificación
+        # creación de una nueva notificación (el contador de no leídas se ajusta en notificaciones.signals)
         if not usuario:
             return None
-            
+
         return Notificacion.objects.create(
             usuario=usuario,
             titulo=titulo,
@@ -18,20 +65,170 @@ class NotificacionService:
             url_destino=url
         )
 
+    @staticmethod
+    def crear_lote(notificaciones):
+        """
+        Inserta notificaciones ya construidas (distinto contenido por usuario) en
+        bloques de NOTIFICACIONES_TAM_LOTE, manteniendo los contadores de no leídas
+        y publicando en el canal de tiempo real. Devuelve cuántas se crearon.
+        """
+        for inicio in range(0, len(notificaciones), NOTIFICACIONES_TAM_LOTE):
+            _escribir_lote(notificaciones[inicio:inicio + NOTIFICACIONES_TAM_LOTE])
+        return len(notificaciones)
+
+    @staticmethod
+    def difundir(usuarios, titulo, mensaje, tipo=TiposNotificacion.INFO, url=None,
+                 al_confirmar=True, en_segundo_plano=None, ventana=NOTIFICACIONES_VENTANA_DUPLICADOS):
+        """
+        Crea la misma notificación para todos los `usuarios` (queryset).
+
+        - Los destinatarios se resuelven en SQL y las filas se escriben con
+          bulk_create en bloques de NOTIFICACIONES_TAM_LOTE (no hay señales por fila).
+        - `al_confirmar`: la escritura espera al commit de la transacción en curso
+          (si se revierte, no se notifica a nadie) y no la alarga.
+        - `en_segundo_plano`: las filas se encolan en un hilo escritor en vez de
+          insertarse en el hilo llamador (por defecto NOTIFICACIONES_ASINCRONAS).
+        - `ventana` (segundos): se omiten los usuarios que ya recibieron la misma
+          notificación (título, mensaje y url) en ese intervalo. 0 o None la desactiva.
+
+        Devuelve el número de notificaciones creadas, o None si se difirió al commit.
+        """
+        if en_segundo_plano is None:
+            en_segundo_plano = NOTIFICACIONES_ASINCRONAS
+
+        tarea = partial(
+            NotificacionService._escribir_difusion,
+            usuarios, titulo, mensaje, tipo, url, ventana, en_segundo_plano,
+        )
+        if al_confirmar:
+            transaction.on_commit(tarea)
+            return None
+        return tarea()
+
+    @staticmethod
+    def _escribir_difusion(usuarios, titulo, mensaje, tipo, url, ventana, en_segundo_plano):
+        destinatarios = usuarios.order_by()
+        if ventana:
+            recientes = Notificacion.objects.filter(
+                titulo=titulo,
+                mensaje=mensaje,
+                url_destino=url,
+                fecha_creacion__gte=timezone.now() - timedelta(seconds=ventana),
+            ).values("usuario")
+            destinatarios = destinatarios.exclude(pk__in=recientes)
+
+        notificaciones = [
+            Notificacion(usuario_id=usuario_id, titulo=titulo, mensaje=mensaje, tipo=tipo, url_destino=url)
+            for usuario_id in destinatarios.values_list("pk", flat=True).distinct()
+        ]
+        if not notificaciones:
+            return 0
+
+        if en_segundo_plano:
+            NotificacionService._obtener_escritor_asincrono().encolar(notificaciones)
+        else:
+            NotificacionService.crear_lote(notificaciones)
+        return len(notificaciones)
+
+    @staticmethod
+    def _obtener_escritor_asincrono():
+        with NotificacionService._lock:
+            if NotificacionService._escritor_asincrono is None:
+                escritor = EscritorAuditoriaAsincrono(
+                    escritor=_escribir_lote,
+                    capacidad=NOTIFICACIONES_COLA_CAPACIDAD,
+                    tam_lote=NOTIFICACIONES_TAM_LOTE,
+                    nombre="notificaciones",
+                )
+                atexit.register(escritor.detener)
+                NotificacionService._escritor_asincrono = escritor
+        return NotificacionService._escritor_asincrono
+
     @staticmethod
     def marcar_como_leidas(usuario):
-        # actualización masiva de estado a leído
-        Notificacion.objects.filter(usuario=usuario, leido=False).update(leido=True)
+        # actualización masiva de estado a leído; el UPDATE no dispara señales, el contador se recalcula aquí
+        with transaction.atomic():
+            cambiadas = Notificacion.objects.filter(usuario=usuario, leido=False).update(leido=True)
+            if cambiadas:
+                usuarios = get_user_model().objects.filter(pk=usuario.pk)
+                NotificacionService.recalcular_no_leidas(usuarios)
+                CanalNotificacionesService.publicar_al_confirmar(
+                    usuario.pk,
+                    CanalNotificacionesService.evento_contador(
+                        no_leidas=usuarios.values_list("notificaciones_no_leidas", flat=True).first() or 0
+                    ),
+                )
+        return cambiadas
+
+    # --- Contador de no leídas (Usuario.notificaciones_no_leidas) ---
+
+    @staticmethod
+    def ajustar_no_leidas(usuario_id, delta):
+        # suma atómica en la base (sin leer el valor previo), sin bajar de cero
+        if not delta:
+            return
+        get_user_model().objects.filter(pk=usuario_id).update(
+            notificaciones_no_leidas=Greatest(F("notificaciones_no_leidas") + delta, 0)
+        )
+
+    @staticmethod
+    def recalcular_no_leidas(usuarios=None):
+        """
+        Recalcula el contador de los `usuarios` (queryset, por defecto todos) con un
+        único UPDATE a partir de sus notificaciones. Devuelve el número de usuarios.
+        """
+        Usuario = get_user_model()
+        if usuarios is None:
+            usuarios = Usuario.objects.all()
+
+        no_leidas = (
+            Notificacion.objects.filter(usuario=OuterRef("pk"), leido=False)
+            .order_by().values("usuario")
+            .annotate(n=Count("pk")).values("n")
+        )
+        return Usuario.objects.filter(pk__in=usuarios.order_by().values("pk")).update(
+            notificaciones_no_leidas=Coalesce(Subquery(no_leidas), 0)
+        )
+
+    @staticmethod
+    def contar_no_leidas(usuario):
+        # lectura del contador ya cargado con el usuario: no consulta la base
+        if not usuario.is_authenticated:
+            return 0
+        return usuario.notificaciones_no_leidas
+
+    # --- Lecturas para plantillas ---
+
+    @staticmethod
+    def recientes_de_request(request):
+        """
+        Últimas notificaciones del usuario de la petición, memorizadas en el request:
+        el context processor y el dashboard comparten una sola consulta.
+        """
+        if not hasattr(request, "_notificaciones_recientes"):
+            recientes = []
+            if request.user.is_authenticated:
+                recientes = list(
+                    Notificacion.objects.filter(usuario=request.user).order_by("-fecha_creacion")[:LIMITE_RECIENTES]
+                )
+            request._notificaciones_recientes = recientes
+        return request._notificaciones_recientes
 
     @staticmethod
     def obtener_resumen_navbar(usuario):
         # resumen de notificaciones para la barra de navegación
         if not usuario.is_authenticated:
             return {'num_no_leidas': 0, 'ultimas': []}
-            
-        qs = Notificacion.objects.filter(usuario=usuario, leido=False)
-        
+
+        # lectura por PK del contador: la instancia recibida puede estar desactualizada
+        num_no_leidas = get_user_model().objects.filter(pk=usuario.pk).values_list(
+            "notificaciones_no_leidas", flat=True
+        ).first() or 0
+        ultimas = []
+        if num_no_leidas:
+            ultimas = Notificacion.objects.filter(usuario=usuario, leido=False).order_by('-fecha_creacion')[:LIMITE_RECIENTES]
+
         return {
-            'num_no_leidas': qs.count(),
-            'ultimas': qs.order_by('-fecha_creacion')[:5]
-        }
\ No newline at end of file
+            'num_no_leidas': num_no_leidas,
+            'ultimas': ultimas
+        }
@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from notificaciones.models import Notificacion, NotificacionArchivada
+
+# Días que se conserva una notificación leída en la tabla principal
+NOTIFICACIONES_RETENCION_DIAS = getattr(settings, "NOTIFICACIONES_RETENCION_DIAS", 90)
+
+CAMPOS_ARCHIVO = ("id", "usuario_id", "titulo", "mensaje", "tipo", "url_destino", "fecha_creacion")
+
+
+class RetencionNotificacionesService:
+    """
+    Política de retención de notificaciones.
+
+    Solo se retiran notificaciones leídas (el contador de no leídas no cambia).
+    Se procesan en lotes por id, cada uno en su propia transacción corta, de modo
+    que ningún bloqueo se mantiene durante toda la limpieza. Por defecto se
+    archivan en NotificacionArchivada; con `eliminar=True` se borran.
+    """
+
+    @staticmethod
+    def limite_retencion(dias=NOTIFICACIONES_RETENCION_DIAS):
+        return timezone.now() - timedelta(days=dias)
+
+    @staticmethod
+    def aplicar_retencion(dias=NOTIFICACIONES_RETENCION_DIAS, eliminar=False, tam_lote=5000):
+        """Aplica la retención y devuelve un resumen {limite, archivadas, eliminadas, lotes}."""
+        limite = RetencionNotificacionesService.limite_retencion(dias)
+        vencidas = Notificacion.objects.filter(leido=True, fecha_creacion__lt=limite).order_by("id")
+        resumen = {"limite": limite, "archivadas": 0, "eliminadas": 0, "lotes": 0}
+
+        ultimo_id = 0
+        while True:
+            # Recorrido por id: los ids crecen con la fecha, así que los vencidos están al principio
+            filas = list(vencidas.filter(id__gt=ultimo_id).values(*CAMPOS_ARCHIVO)[:tam_lote])
+            if not filas:
+                break
+            ultimo_id = filas[-1]["id"]
+            ids = [fila["id"] for fila in filas]
+
+            with transaction.atomic():
+                if not eliminar:
+                    NotificacionArchivada.objects.bulk_create(
+                        [NotificacionArchivada(**fila) for fila in filas],
+                        batch_size=tam_lote,
+                        ignore_conflicts=True,
+                    )
+                    resumen["archivadas"] += len(ids)
+                resumen["eliminadas"] += RetencionNotificacionesService._borrar(ids)
+            resumen["lotes"] += 1
+
+        return resumen
+
+    @staticmethod
+    def _borrar(ids):
+        # DELETE directo por id: evita cargar instancias y disparar señales por fila
+        tabla = connection.ops.quote_name(Notificacion._meta.db_table)
+        marcadores = ", ".join(["%s"] * len(ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {tabla} WHERE id IN ({marcadores}) AND leido = %s", [*ids, True])
+            return cursor.rowcount
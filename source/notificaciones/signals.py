@@ -1,8 +1,10 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.conf import settings
 from solicitudes.models import SolicitudAusencia
+from notificaciones.models import Notificacion
 from notificaciones.services.notificacion_service import NotificacionService
+from notificaciones.services.canal_service import CanalNotificacionesService
 from notificaciones.constants import TiposNotificacion
 
 @receiver(post_save, sender=SolicitudAusencia)
@@ -16,4 +18,47 @@ def notificar_cambio_solicitud(sender, instance, created, **kwargs):
         mensaje=f"Tu solicitud ha cambiado a estado: {instance.estado}",
         tipo=TiposNotificacion.INFO,
         url=f"/solicitudes/{instance.id}/"
-    )
\ No newline at end of file
+    )
+
+
+# --- Contador de no leídas (Usuario.notificaciones_no_leidas) ---
+
+@receiver(pre_save, sender=Notificacion)
+def recordar_leido_previo(sender, instance, update_fields=None, **kwargs):
+    """Guarda el estado 'leido' previo para calcular el delta del contador tras guardar."""
+    instance._leido_previo = None
+    if instance.pk is None:
+        return
+    if update_fields is not None and "leido" not in update_fields:
+        instance._leido_previo = instance.leido  # el cambio no afecta al contador
+        return
+    instance._leido_previo = (
+        Notificacion.objects.filter(pk=instance.pk).values_list("leido", flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Notificacion)
+def ajustar_contador_por_notificacion(sender, instance, created, **kwargs):
+    previo = getattr(instance, "_leido_previo", None)
+    if created or previo is None:
+        NotificacionService.ajustar_no_leidas(instance.usuario_id, int(not instance.leido))
+        CanalNotificacionesService.publicar_al_confirmar(
+            instance.usuario_id, CanalNotificacionesService.evento_notificacion(instance)
+        )
+        return
+
+    delta = int(previo) - int(instance.leido)
+    if delta:
+        NotificacionService.ajustar_no_leidas(instance.usuario_id, delta)
+        CanalNotificacionesService.publicar_al_confirmar(
+            instance.usuario_id, CanalNotificacionesService.evento_contador(delta=delta)
+        )
+
+
+@receiver(post_delete, sender=Notificacion)
+def descontar_notificacion_eliminada(sender, instance, **kwargs):
+    if not instance.leido:
+        NotificacionService.ajustar_no_leidas(instance.usuario_id, -1)
+        CanalNotificacionesService.publicar_al_confirmar(
+            instance.usuario_id, CanalNotificacionesService.evento_contador(delta=-1)
+        )
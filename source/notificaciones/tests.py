@@ -1,4 +1,8 @@
+from io import StringIO
+
+from django.db import connection
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from notificaciones.models import Notificacion
@@ -138,4 +142,467 @@ class NotificacionViewsWhiteBoxTests(TestCase):
 
         self.assertEqual(conteo_contexto, 2)
         self.assertEqual(total_contexto, 3)
-        print("     ✅ Éxito: Los cálculos internos de la vista son correctos.")
\ No newline at end of file
+        print("     ✅ Éxito: Los cálculos internos de la vista son correctos.")
+
+class NotificacionContadorWhiteBoxTests(TestCase):
+    """
+    Tests de Caja Blanca del contador desnormalizado de no leídas.
+    Objetivo: Validar que se mantiene en cada escritura y que la campana no consulta.
+    """
+
+    def setUp(self):
+        self.usuario = User.objects.create_user(email='mango_contador@prueba.com', password='password123')
+        # la bienvenida automática no interesa aquí
+        Notificacion.objects.filter(usuario=self.usuario).delete()
+        self.client = Client()
+        self.client.force_login(self.usuario)
+
+    def _contador(self):
+        self.usuario.refresh_from_db(fields=['notificaciones_no_leidas'])
+        return self.usuario.notificaciones_no_leidas
+
+    def _conteo_real(self):
+        return Notificacion.objects.filter(usuario=self.usuario, leido=False).count()
+
+    def test_contador_sigue_creacion_lectura_y_borrado(self):
+        print("\n🔢 [TEST] Iniciando: test_contador_sigue_creacion_lectura_y_borrado")
+        print("   ↳ Objetivo: El contador coincide con el COUNT real tras cada operación.")
+
+        notifs = [
+            NotificacionService.crear_notificacion(usuario=self.usuario, titulo=f"N{i}", mensaje="...")
+            for i in range(4)
+        ]
+        self.assertEqual(self._contador(), 4)
+
+        self.client.get(reverse('notificaciones:marcar_leida', args=[notifs[0].id]))
+        self.assertEqual(self._contador(), 3)
+        print(f"   ↳ Tras marcar una: {self._contador()}")
+
+        # guardar sin tocar 'leido' no altera el contador
+        notifs[1].titulo = "Editada"
+        notifs[1].save(update_fields=['titulo'])
+        notifs[2].delete()
+        self.assertEqual(self._contador(), 2)
+
+        NotificacionService.marcar_como_leidas(self.usuario)
+        self.assertEqual(self._contador(), 0)
+        self.assertEqual(self._contador(), self._conteo_real())
+        print("     ✅ Éxito: El contador se mantiene sin recontar.")
+
+    def test_save_completo_no_pisa_contador(self):
+        print("\n🔢 [TEST] Iniciando: test_save_completo_no_pisa_contador")
+        print("   ↳ Objetivo: Un save() de una instancia vieja del usuario no sobrescribe el contador.")
+
+        usuario_viejo = User.objects.get(pk=self.usuario.pk)
+        NotificacionService.crear_notificacion(usuario=self.usuario, titulo="Nueva", mensaje="...")
+        usuario_viejo.telefono = "0999999999"
+        usuario_viejo.save()
+
+        self.assertEqual(self._contador(), 1)
+        print("     ✅ Éxito: El contador conserva el valor actualizado por la base.")
+
+    def test_save_conserva_semantica_de_django(self):
+        print("\n🔢 [TEST] Iniciando: test_save_conserva_semantica_de_django")
+        print("   ↳ Objetivo: Campos diferidos sin consultas extra y save() de una fila borrada inserta.")
+
+        parcial = User.objects.only("pk", "email", "telefono").get(pk=self.usuario.pk)
+        parcial.telefono = "0988888888"
+        with CaptureQueriesContext(connection) as consultas:
+            parcial.save()
+        updates = [q["sql"] for q in consultas.captured_queries if q["sql"].startswith("UPDATE \"usuario\"")]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn("notificaciones_no_leidas", updates[0])
+        self.assertNotIn("password", updates[0], "Los campos diferidos no se escriben")
+        self.assertEqual(User.objects.get(pk=self.usuario.pk).telefono, "0988888888")
+
+        huerfano = User.objects.get(pk=self.usuario.pk)
+        User.objects.filter(pk=self.usuario.pk).update(email="otro@prueba.com")
+        Notificacion.objects.filter(usuario=self.usuario).delete()
+        User.objects.filter(pk=self.usuario.pk).delete()
+        huerfano.save()  # como un save() normal: la fila se vuelve a insertar
+        self.assertTrue(User.objects.filter(pk=self.usuario.pk).exists())
+        print("     ✅ Éxito: save() se comporta como el de Django.")
+
+    def test_context_processor_perezoso(self):
+        print("\n🔔 [TEST] Iniciando: test_context_processor_perezoso")
+        print("   ↳ Objetivo: Sin usar la campana no hay consultas; usándola, una como máximo.")
+        from django.test import RequestFactory
+        from notificaciones.context_processors import notificaciones_globales
+
+        for i in range(3):
+            NotificacionService.crear_notificacion(usuario=self.usuario, titulo=f"N{i}", mensaje="...")
+        request = RequestFactory().get('/')
+        request.user = User.objects.get(pk=self.usuario.pk)
+
+        with self.assertNumQueries(0):
+            contexto = notificaciones_globales(request)
+            self.assertTrue(contexto['conteo_notificaciones'] > 0)
+            self.assertEqual(str(contexto['conteo_notificaciones']), "3")
+        with self.assertNumQueries(1):
+            self.assertEqual(len(contexto['ultimas_notificaciones']), 3)
+            # el dashboard reutiliza la misma lista
+            NotificacionService.recientes_de_request(request)
+        print("     ✅ Éxito: Conteo sin consultas y últimas notificaciones en una sola consulta.")
+
+    def test_comando_reconstruye_contadores(self):
+        print("\n🛠️ [TEST] Iniciando: test_comando_reconstruye_contadores")
+        print("   ↳ Objetivo: El comando corrige contadores desincronizados con un UPDATE.")
+        from django.core.management import call_command
+
+        NotificacionService.crear_notificacion(usuario=self.usuario, titulo="N", mensaje="...")
+        User.objects.filter(pk=self.usuario.pk).update(notificaciones_no_leidas=42)
+
+        call_command('notificaciones_reconstruir_contadores', stdout=StringIO())
+        self.assertEqual(self._contador(), 1)
+        print("     ✅ Éxito: Contador reconstruido.")
+
+
+class NotificacionDifusionWhiteBoxTests(TestCase):
+    """
+    Tests de Caja Blanca de la difusión masiva (NotificacionService.difundir).
+    Objetivo: Validar escritura por bloques, diferimiento al commit y deduplicación.
+    """
+
+    def setUp(self):
+        self.admins = [
+            User.objects.create_user(email=f'admin{i}@prueba.com', password='password123', is_staff=True)
+            for i in range(3)
+        ]
+        self.destinatarios = User.objects.filter(is_staff=True)
+
+    def _difundir(self, **kwargs):
+        return NotificacionService.difundir(self.destinatarios, titulo="Aviso", mensaje="Mantenimiento", **kwargs)
+
+    def _avisos(self):
+        return Notificacion.objects.filter(titulo="Aviso").count()
+
+    def test_difusion_un_insert_y_contadores(self):
+        print("\n📣 [TEST] Iniciando: test_difusion_un_insert_y_contadores")
+        print("   ↳ Objetivo: Un bulk_create para todos los destinatarios y contadores al día.")
+
+        with CaptureQueriesContext(connection) as consultas:
+            creadas = self._difundir(al_confirmar=False)
+        inserts = [q for q in consultas.captured_queries if q['sql'].startswith('INSERT INTO "notificaciones_notificacion"')]
+
+        print(f"   ↳ Creadas: {creadas} | INSERTs: {len(inserts)} | Consultas: {len(consultas)}")
+        self.assertEqual(creadas, 3)
+        self.assertEqual(len(inserts), 1)
+        for admin in self.admins:
+            admin.refresh_from_db(fields=['notificaciones_no_leidas'])
+            self.assertEqual(
+                admin.notificaciones_no_leidas,
+                Notificacion.objects.filter(usuario=admin, leido=False).count()
+            )
+        print("     ✅ Éxito: Escritura masiva con contadores consistentes.")
+
+    def test_difusion_espera_al_commit(self):
+        print("\n📣 [TEST] Iniciando: test_difusion_espera_al_commit")
+        print("   ↳ Objetivo: Nada se escribe antes del commit ni si la transacción se revierte.")
+        from django.db import transaction
+
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self._difundir()
+                    raise RuntimeError("rollback")
+            except RuntimeError:
+                pass
+        self.assertEqual(self._avisos(), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertIsNone(self._difundir())
+            self.assertEqual(self._avisos(), 0)
+        self.assertEqual(self._avisos(), 3)
+        print("     ✅ Éxito: La difusión se aplica solo al confirmar.")
+
+    def test_difusion_colapsa_duplicados_en_ventana(self):
+        print("\n📣 [TEST] Iniciando: test_difusion_colapsa_duplicados_en_ventana")
+        print("   ↳ Objetivo: Repetir la misma notificación dentro de la ventana no duplica filas.")
+
+        self._difundir(al_confirmar=False)
+        repetidas = self._difundir(al_confirmar=False)
+        self.assertEqual(repetidas, 0)
+
+        nuevo = User.objects.create_user(email='admin_nuevo@prueba.com', password='password123', is_staff=True)
+        self.assertEqual(self._difundir(al_confirmar=False), 1)
+        self.assertEqual(Notificacion.objects.filter(titulo="Aviso", usuario=nuevo).count(), 1)
+
+        self.assertEqual(self._difundir(al_confirmar=False, ventana=0), 4)
+        print(f"   ↳ Total de avisos: {self._avisos()}")
+        print("     ✅ Éxito: Solo se notifica a quien no recibió el aviso en la ventana.")
+
+    def test_difusion_en_segundo_plano_encola(self):
+        print("\n📣 [TEST] Iniciando: test_difusion_en_segundo_plano_encola")
+        print("   ↳ Objetivo: En modo asíncrono las filas van a la cola del hilo escritor.")
+        from auditoria.services.escritor_asincrono import EscritorAuditoriaAsincrono
+
+        lotes = []
+        escritor = EscritorAuditoriaAsincrono(escritor=lotes.append, tam_lote=10, intervalo=0.05, nombre="notificaciones")
+        anterior = NotificacionService._escritor_asincrono
+        NotificacionService._escritor_asincrono = escritor
+        try:
+            creadas = self._difundir(al_confirmar=False, en_segundo_plano=True)
+            escritor.detener()
+        finally:
+            NotificacionService._escritor_asincrono = anterior
+
+        print(f"   ↳ Lotes recibidos por el escritor: {len(lotes)}")
+        self.assertEqual(creadas, 3)
+        self.assertEqual(sum(len(lote) for lote in lotes), 3)
+        self.assertEqual(self._avisos(), 0)  # el hilo llamador no insertó nada
+        print("     ✅ Éxito: El hilo llamador solo encola.")
+
+    def test_alta_empleado_difunde_a_admins(self):
+        print("\n📣 [TEST] Iniciando: test_alta_empleado_difunde_a_admins")
+        print("   ↳ Objetivo: El alta de un empleado notifica a los admins con una difusión tras el commit.")
+        from core.models import Empresa, UnidadOrganizacional
+        from empleados.models import Empleado, Puesto
+
+        empresa = Empresa.objects.create(nombre_comercial="Difusión SA", ruc="909")
+        with self.captureOnCommitCallbacks(execute=True):
+            Empleado.objects.create(
+                nombres="Nora", apellidos="Nueva", cedula="0909", empresa=empresa,
+                unidad_org=UnidadOrganizacional.objects.create(nombre="TI", empresa=empresa),
+                puesto=Puesto.objects.create(nombre="Dev", empresa=empresa),
+                fecha_ingreso="2024-01-01",
+            )
+
+        for admin in self.admins:
+            self.assertTrue(Notificacion.objects.filter(usuario=admin, titulo="Nuevo Ingreso").exists())
+        print("     ✅ Éxito: Cada admin recibió el aviso de nuevo ingreso.")
+
+
+class BrokerRegistro:
+    """Doble local del broker: registra lo publicado y lo entrega en proceso."""
+
+    def __init__(self):
+        self.publicados = []
+
+    def iniciar(self, entregar):
+        self.entregar = entregar
+
+    def publicar(self, usuario_id, evento):
+        self.publicados.append((usuario_id, evento))
+        self.entregar(usuario_id, evento)
+
+    def detener(self):
+        pass
+
+
+class NotificacionTiempoRealWhiteBoxTests(TestCase):
+    """
+    Tests de Caja Blanca del canal SSE (CanalNotificacionesService).
+    Objetivo: Validar la publicación al confirmar y el flujo de eventos por conexión.
+    """
+
+    def setUp(self):
+        from notificaciones.services.canal_service import CanalNotificacionesService
+        self.canal = CanalNotificacionesService
+        self.usuario = User.objects.create_user(email='mango_sse@prueba.com', password='password123')
+        self.broker = BrokerRegistro()
+        anterior = self.canal.configurar_broker(self.broker)
+        if anterior is not None:
+            self.addCleanup(self.canal.configurar_broker, anterior)
+
+    def test_escrituras_publican_al_confirmar(self):
+        print("\n📡 [TEST] Iniciando: test_escrituras_publican_al_confirmar")
+        print("   ↳ Objetivo: Crear, leer y difundir publican eventos solo tras el commit.")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            notif = NotificacionService.crear_notificacion(usuario=self.usuario, titulo="SSE", mensaje="Hola")
+            self.assertEqual(self.broker.publicados, [])
+        usuario_id, evento = self.broker.publicados[-1]
+        self.assertEqual((usuario_id, evento['evento'], evento['delta']), (self.usuario.pk, 'notificacion', 1))
+        self.assertEqual(evento['datos']['titulo'], "SSE")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            notif.leido = True
+            notif.save()
+        self.assertEqual(self.broker.publicados[-1][1], {'evento': 'contador', 'delta': -1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            NotificacionService.difundir(User.objects.filter(pk=self.usuario.pk), titulo="Masiva", mensaje="...")
+        self.assertEqual(self.broker.publicados[-1][1]['datos']['titulo'], "Masiva")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            NotificacionService.marcar_como_leidas(self.usuario)
+        self.assertEqual(self.broker.publicados[-1][1], {'evento': 'contador', 'no_leidas': 0})
+        print(f"   ↳ Eventos publicados: {len(self.broker.publicados)}")
+        print("     ✅ Éxito: Cada cambio confirmado llega al broker.")
+
+    async def test_flujo_entrega_eventos_de_otro_hilo(self):
+        print("\n📡 [TEST] Iniciando: test_flujo_entrega_eventos_de_otro_hilo")
+        print("   ↳ Objetivo: La conexión recibe solo los eventos de su usuario y mantiene el contador.")
+        import asyncio
+        import json
+
+        flujo = self.canal.flujo(usuario_id=7001, no_leidas=2, keepalive=5, duracion=5)
+        self.assertTrue((await anext(flujo)).startswith("retry:"))
+        self.assertIn('"no_leidas": 2', await anext(flujo))
+        self.assertEqual(self.canal.conexiones_abiertas(), 1)
+
+        evento = {'evento': 'notificacion', 'delta': 1, 'datos': {'titulo': 'Hola'}}
+        await asyncio.to_thread(self.canal.publicar, 7002, evento)  # otro usuario: no llega
+        await asyncio.to_thread(self.canal.publicar, 7001, evento)
+        mensaje = await asyncio.wait_for(anext(flujo), timeout=2)
+
+        print(f"   ↳ Mensaje SSE: {mensaje.strip()}")
+        self.assertTrue(mensaje.startswith("event: notificacion\n"))
+        self.assertEqual(json.loads(mensaje.split("data: ", 1)[1]), {'titulo': 'Hola', 'no_leidas': 3})
+
+        await flujo.aclose()
+        self.assertEqual(self.canal.conexiones_abiertas(), 0)
+        print("     ✅ Éxito: Entrega por usuario y desuscripción al cerrar.")
+
+    async def test_flujo_ocioso_envia_keepalive(self):
+        print("\n📡 [TEST] Iniciando: test_flujo_ocioso_envia_keepalive")
+        print("   ↳ Objetivo: Sin eventos, la conexión solo emite comentarios de keep-alive.")
+
+        flujo = self.canal.flujo(usuario_id=7003, no_leidas=0, keepalive=0.01, duracion=1)
+        await anext(flujo)
+        await anext(flujo)
+        self.assertEqual(await anext(flujo), ": keep-alive\n\n")
+        await flujo.aclose()
+        print("     ✅ Éxito: Keep-alive sin consultas.")
+
+    async def test_vista_stream(self):
+        print("\n📡 [TEST] Iniciando: test_vista_stream")
+        print("   ↳ Objetivo: 401 para anónimos; text/event-stream con el contador para autenticados.")
+        from django.contrib.auth.models import AnonymousUser
+        from django.test import AsyncRequestFactory
+        from notificaciones.views.stream_view import stream_notificaciones
+
+        def peticion(usuario):
+            request = AsyncRequestFactory().get('/notificaciones/stream/')
+
+            async def auser():
+                return usuario
+            request.auser = auser
+            return request
+
+        self.assertEqual((await stream_notificaciones(peticion(AnonymousUser()))).status_code, 401)
+
+        self.usuario.notificaciones_no_leidas = 4
+        respuesta = await stream_notificaciones(peticion(self.usuario))
+        self.assertEqual(respuesta['Content-Type'], 'text/event-stream')
+        contenido = aiter(respuesta.streaming_content)
+        await anext(contenido)
+        self.assertIn(b'"no_leidas": 4', await anext(contenido))
+        await contenido.aclose()
+        print("     ✅ Éxito: La vista abre el canal SSE.")
+
+    def test_sin_asgi_la_campana_consulta_el_contador(self):
+        print("\n📡 [TEST] Iniciando: test_sin_asgi_la_campana_consulta_el_contador")
+        print("   ↳ Objetivo: Con NOTIFICACIONES_SSE desactivado (WSGI) no hay ruta SSE ni EventSource.")
+        from django.urls import NoReverseMatch
+
+        with self.assertRaises(NoReverseMatch):
+            reverse('notificaciones:stream')
+
+        self.client.force_login(self.usuario)
+        respuesta = self.client.get(reverse('notificaciones:lista_notificaciones'))
+        self.assertNotContains(respuesta, "EventSource(")
+        self.assertContains(respuesta, reverse('notificacion-badge-count'))
+        print("     ✅ Éxito: La campana usa badge-count como respaldo.")
+
+
+class NotificacionRetencionWhiteBoxTests(TestCase):
+    """
+    Tests de Caja Blanca de la retención y la paginación por cursor del historial.
+    Objetivo: Validar el archivado por lotes y que cada página cueste lo mismo.
+    """
+
+    def setUp(self):
+        self.usuario = User.objects.create_user(email='mango_retencion@prueba.com', password='password123')
+        Notificacion.objects.filter(usuario=self.usuario).delete()
+        self.client = Client()
+        self.client.force_login(self.usuario)
+
+    def _crear(self, cantidad, leido=False, dias=0):
+        from datetime import timedelta
+        from django.utils import timezone
+
+        notifs = [
+            NotificacionService.crear_notificacion(usuario=self.usuario, titulo=f"N{i}", mensaje="...")
+            for i in range(cantidad)
+        ]
+        Notificacion.objects.filter(pk__in=[n.pk for n in notifs]).update(
+            leido=leido, fecha_creacion=timezone.now() - timedelta(days=dias)
+        )
+        return notifs
+
+    def test_retencion_archiva_solo_leidas_vencidas(self):
+        print("\n🗄️ [TEST] Iniciando: test_retencion_archiva_solo_leidas_vencidas")
+        print("   ↳ Objetivo: Archivar por lotes las leídas antiguas sin tocar no leídas ni recientes.")
+        from django.core.management import call_command
+        from notificaciones.models import NotificacionArchivada
+
+        self._crear(5, leido=True, dias=200)
+        viejas_no_leidas = self._crear(2, leido=False, dias=200)
+        self._crear(3, leido=True, dias=1)
+        NotificacionService.recalcular_no_leidas()
+
+        salida = StringIO()
+        call_command('notificaciones_retencion', '--dias=90', '--tam-lote=2', stdout=salida)
+        print(f"   ↳ {salida.getvalue().splitlines()[0]}")
+
+        self.assertEqual(NotificacionArchivada.objects.filter(usuario=self.usuario).count(), 5)
+        self.assertEqual(Notificacion.objects.filter(usuario=self.usuario).count(), 5)
+        self.assertTrue(Notificacion.objects.filter(pk=viejas_no_leidas[0].pk).exists())
+        self.assertIn("en 3 lotes", salida.getvalue())
+
+        self.usuario.refresh_from_db()
+        self.assertEqual(self.usuario.notificaciones_no_leidas, 2)
+        print("     ✅ Éxito: Solo se archivaron las leídas vencidas.")
+
+    def test_retencion_eliminar_no_archiva(self):
+        print("\n🗄️ [TEST] Iniciando: test_retencion_eliminar_no_archiva")
+        print("   ↳ Objetivo: Con --eliminar las vencidas se borran sin copia.")
+        from notificaciones.models import NotificacionArchivada
+        from notificaciones.services.retencion_service import RetencionNotificacionesService
+
+        self._crear(4, leido=True, dias=100)
+        resumen = RetencionNotificacionesService.aplicar_retencion(dias=30, eliminar=True)
+
+        self.assertEqual((resumen['eliminadas'], resumen['archivadas']), (4, 0))
+        self.assertFalse(NotificacionArchivada.objects.exists())
+        self.assertFalse(Notificacion.objects.filter(usuario=self.usuario).exists())
+        print("     ✅ Éxito: Filas eliminadas por lotes.")
+
+    def test_lista_paginada_por_cursor(self):
+        print("\n📄 [TEST] Iniciando: test_lista_paginada_por_cursor")
+        print("   ↳ Objetivo: El historial se pagina por cursor con consultas constantes por página.")
+
+        self._crear(25)
+        url = reverse('notificaciones:lista_notificaciones')
+        self.client.get(url)  # calentamiento: sesión y cachés de la primera petición
+
+        with CaptureQueriesContext(connection) as primera:
+            respuesta = self.client.get(url)
+        pagina = respuesta.context['page_obj']
+        self.assertEqual(len(respuesta.context['notificaciones']), 20)
+        self.assertTrue(pagina.has_next)
+
+        with CaptureQueriesContext(connection) as segunda:
+            respuesta = self.client.get(url, {'cursor': pagina.cursor_siguiente})
+        self.assertEqual(len(respuesta.context['notificaciones']), 5)
+        self.assertFalse(respuesta.context['page_obj'].has_next)
+
+        print(f"   ↳ Consultas: página 1 = {len(primera)}, página 2 = {len(segunda)}")
+        self.assertEqual(len(primera), len(segunda))
+        self.assertFalse(any('COUNT(' in q['sql'] for q in segunda.captured_queries))
+        print("     ✅ Éxito: Paginación keyset sin COUNT.")
+
+    def test_api_paginada_por_cursor(self):
+        print("\n📄 [TEST] Iniciando: test_api_paginada_por_cursor")
+        print("   ↳ Objetivo: La API devuelve páginas con enlaces next/previous por cursor.")
+
+        self._crear(25)
+        datos = self.client.get('/api/notificaciones/').json()
+        self.assertEqual(len(datos['results']), 20)
+        self.assertIn('cursor=', datos['next'])
+
+        siguiente = self.client.get(datos['next']).json()
+        self.assertEqual(len(siguiente['results']), 5)
+        self.assertIsNone(siguiente['next'])
+        print("     ✅ Éxito: Páginas de 20 y 5 resultados.")
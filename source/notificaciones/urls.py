@@ -5,6 +5,8 @@ from notificaciones.views.notificaciones_view import (
     marcar_todas_leidas,
     ver_detalle_notificacion
 )
+from notificaciones.services.canal_service import NOTIFICACIONES_SSE
+from notificaciones.views.stream_view import stream_notificaciones
 
 app_name = "notificaciones"
 
@@ -14,4 +16,9 @@ urlpatterns = [
     path("marcar-todas/", marcar_todas_leidas, name="marcar_todas"),
     path("<int:pk>/leida/", marcar_una_leida, name="marcar_leida"),
     path("<int:pk>/detalle/", ver_detalle_notificacion, name="detalle"),
-]
\ No newline at end of file
+]
+
+# El canal SSE solo se publica servido por ASGI: con WSGI cada conexión ocuparía
+# un worker durante toda su duración sin entregar nada en vivo
+if NOTIFICACIONES_SSE:
+    urlpatterns.append(path("stream/", stream_notificaciones, name="stream"))
\ No newline at end of file
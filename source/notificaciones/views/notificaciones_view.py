@@ -1,19 +1,26 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from core.paginacion import paginar_keyset
 from notificaciones.models import Notificacion
+from notificaciones.services.notificacion_service import NotificacionService
 
 @login_required
 def lista_notificaciones(request):
-    # lista todas las notificaciones del usuario
-    notificaciones = Notificacion.objects.filter(
-        usuario=request.user
-    ).order_by('-fecha_creacion')
-    
-    no_leidas = notificaciones.filter(leido=False).count()
+    # historial del usuario paginado por cursor sobre el índice (usuario, fecha_creacion, id):
+    # sin COUNT ni OFFSET, cada página cuesta lo mismo aunque el historial crezca
+    page_obj = paginar_keyset(
+        Notificacion.objects.filter(usuario=request.user),
+        cursor=request.GET.get("cursor"),
+        campos=("fecha_creacion", "id"),
+        por_pagina=20,
+    )
+
+    no_leidas = NotificacionService.contar_no_leidas(request.user)
 
     return render(request, "notificaciones/lista.html", {
-        "notificaciones": notificaciones,
+        "notificaciones": page_obj,
+        "page_obj": page_obj,
         "no_leidas": no_leidas
     })
 
@@ -32,7 +39,7 @@ def marcar_una_leida(request, pk):
 @login_required
 def marcar_todas_leidas(request):
     # actualizacion masiva de estado
-    Notificacion.objects.filter(usuario=request.user, leido=False).update(leido=True)
+    NotificacionService.marcar_como_leidas(request.user)
     messages.success(request, "Todas marcadas como leídas.")
     
     return redirect("notificaciones:lista_notificaciones")
@@ -45,6 +52,8 @@ def ver_detalle_notificacion(request, pk):
     if not notificacion.leido:
         notificacion.leido = True
         notificacion.save()
+        # la campana de esta misma página debe reflejar la lectura
+        request.user.refresh_from_db(fields=["notificaciones_no_leidas"])
 
     detalles = [
         {'label': 'Título', 'valor': notificacion.titulo},
@@ -0,0 +1,26 @@
+from django.http import HttpResponse, StreamingHttpResponse
+
+from notificaciones.services.canal_service import CanalNotificacionesService
+
+
+async def stream_notificaciones(request):
+    """
+    Canal SSE (text/event-stream) de notificaciones del usuario autenticado.
+
+    Vista asíncrona: requiere servir el proyecto por ASGI (talenttrack.asgi) y
+    solo se enruta con settings.NOTIFICACIONES_SSE activo;
+    cada conexión en espera es solo una tarea del event loop, sin consultas
+    periódicas a la base. El contador inicial sale del usuario ya cargado.
+    """
+    usuario = await request.auser()
+    if not usuario.is_authenticated:
+        return HttpResponse(status=401)
+
+    respuesta = StreamingHttpResponse(
+        CanalNotificacionesService.flujo(usuario.pk, usuario.notificaciones_no_leidas),
+        content_type="text/event-stream",
+    )
+    respuesta["Cache-Control"] = "no-cache"
+    # Evita que un proxy (nginx) acumule los eventos antes de enviarlos
+    respuesta["X-Accel-Buffering"] = "no"
+    return respuesta
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Empresa
+from poa.services.avance_service import AvanceService
+
+
+class Command(BaseCommand):
+    help = (
+        "Cierre del año fiscal del POA: cancela las actividades sin terminar, marca "
+        "las metas como cumplidas o vencidas y cierra los objetivos activos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("anio", type=int, help="Año fiscal a cerrar.")
+        parser.add_argument("--empresa", type=int, help="ID de la empresa (por defecto: todas las activas).")
+
+    def handle(self, *args, **options):
+        if options["empresa"]:
+            empresas = Empresa.objects.filter(pk=options["empresa"])
+            if not empresas.exists():
+                raise CommandError(f"No existe la empresa {options['empresa']}.")
+        else:
+            empresas = Empresa.objects.filter(estado=True)
+
+        for empresa in empresas:
+            resumen = AvanceService.cierre_anual(empresa, options["anio"])
+            self.stdout.write(
+                f"{empresa}: {resumen['actividades_canceladas']} actividades canceladas, "
+                f"{resumen['objetivos_cerrados']} objetivos cerrados."
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Cierre del POA {options['anio']} completado."))
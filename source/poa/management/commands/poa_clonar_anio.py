@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Empresa
+from poa.services.intercambio_service import ImportacionPOAInvalida, IntercambioPOAService
+
+
+class Command(BaseCommand):
+    help = (
+        "Copia el POA de un año al siguiente (o al indicado): mismas metas y "
+        "actividades con fechas desplazadas y avance reiniciado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("origen", type=int, help="Año fiscal a copiar.")
+        parser.add_argument("--destino", type=int, help="Año destino (por defecto: origen + 1).")
+        parser.add_argument("--empresa", type=int, help="ID de la empresa (por defecto: todas las activas).")
+        parser.add_argument("--sin-equipos", action="store_true", help="No copia las asignaciones de equipo.")
+
+    def handle(self, *args, **options):
+        origen = options["origen"]
+        destino = options["destino"] or origen + 1
+
+        if options["empresa"]:
+            empresas = Empresa.objects.filter(pk=options["empresa"])
+            if not empresas.exists():
+                raise CommandError(f"No existe la empresa {options['empresa']}.")
+        else:
+            empresas = Empresa.objects.filter(estado=True)
+
+        for empresa in empresas:
+            try:
+                resumen = IntercambioPOAService.clonar_anio(
+                    empresa, origen, destino, incluir_equipos=not options["sin_equipos"]
+                )
+            except ImportacionPOAInvalida as exc:
+                self.stderr.write(f"{empresa}: {exc}")
+                continue
+            self.stdout.write(
+                f"{empresa}: {resumen['objetivos']} objetivos, {resumen['metas']} metas, "
+                f"{resumen['actividades']} actividades copiadas."
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Clonación del POA {origen} → {destino} completada."))
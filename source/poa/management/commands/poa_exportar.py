@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Empresa
+from poa.services.intercambio_service import IntercambioPOAService
+
+
+class Command(BaseCommand):
+    help = "Exporta el POA de un año (objetivos, metas, actividades y equipos) en JSON o CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("anio", type=int, help="Año fiscal a exportar.")
+        parser.add_argument("--empresa", type=int, required=True, help="ID de la empresa.")
+        parser.add_argument("--formato", choices=IntercambioPOAService.FORMATOS, default="json")
+        parser.add_argument("--salida", help="Archivo de salida (por defecto: salida estándar).")
+
+    def handle(self, *args, **options):
+        empresa = Empresa.objects.filter(pk=options["empresa"]).first()
+        if empresa is None:
+            raise CommandError(f"No existe la empresa {options['empresa']}.")
+
+        arbol = IntercambioPOAService.exportar(empresa, options["anio"])
+        contenido = IntercambioPOAService.serializar(arbol, options["formato"])
+
+        if not options["salida"]:
+            self.stdout.write(contenido)
+            return
+
+        with open(options["salida"], "w", encoding="utf-8", newline="") as archivo:
+            archivo.write(contenido)
+        self.stdout.write(
+            self.style.SUCCESS(f"POA {options['anio']} exportado: {len(arbol['objetivos'])} objetivos.")
+        )
@@ -0,0 +1,48 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Empresa
+from poa.services.intercambio_service import ImportacionPOAInvalida, IntercambioPOAService
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa un POA completo (JSON o CSV) en el año indicado. Valida todo antes "
+        "de escribir: si hay errores no se inserta nada."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("archivo", help="Ruta del archivo a importar.")
+        parser.add_argument("--empresa", type=int, required=True, help="ID de la empresa.")
+        parser.add_argument("--anio", type=int, required=True, help="Año fiscal destino.")
+        parser.add_argument(
+            "--formato",
+            choices=IntercambioPOAService.FORMATOS,
+            help="Formato del archivo (por defecto: según la extensión).",
+        )
+
+    def handle(self, *args, **options):
+        empresa = Empresa.objects.filter(pk=options["empresa"]).first()
+        if empresa is None:
+            raise CommandError(f"No existe la empresa {options['empresa']}.")
+
+        formato = options["formato"] or os.path.splitext(options["archivo"])[1].lstrip(".").lower()
+        try:
+            with open(options["archivo"], "rb") as archivo:
+                objetivos = IntercambioPOAService.leer(archivo.read(), formato)
+        except (OSError, ImportacionPOAInvalida) as exc:
+            raise CommandError(str(exc))
+
+        resumen = IntercambioPOAService.importar(empresa, options["anio"], objetivos)
+        if resumen["errores"]:
+            for error in resumen["errores"]:
+                self.stderr.write(error)
+            raise CommandError(f"Importación cancelada: {len(resumen['errores'])} errores.")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Importados {resumen['objetivos']} objetivos, {resumen['metas']} metas, "
+                f"{resumen['actividades']} actividades y {resumen['asignaciones']} asignaciones."
+            )
+        )
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Empresa
+from poa.models import Objetivo
+from poa.services.avance_service import AvanceService
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye el avance almacenado del POA (contadores y valor_actual de las "
+        "metas, totales de los objetivos) a partir de las actividades."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--empresa", type=int, help="ID de la empresa (por defecto: todas).")
+        parser.add_argument("--anio", type=int, help="Año fiscal de los objetivos (por defecto: todos).")
+
+    def handle(self, *args, **options):
+        objetivos = Objetivo.objects.all()
+
+        if options["empresa"]:
+            if not Empresa.objects.filter(pk=options["empresa"]).exists():
+                raise CommandError(f"No existe la empresa {options['empresa']}.")
+            objetivos = objetivos.filter(empresa_id=options["empresa"])
+        if options["anio"]:
+            objetivos = objetivos.filter(anio=options["anio"])
+
+        resumen = AvanceService.reconstruir(objetivos)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Avance reconstruido: {resumen['objetivos']} objetivos, {resumen['metas']} metas."
+            )
+        )
@@ -0,0 +1,63 @@
+# Generated by Django 5.0.3 on 2026-10-18 13:09
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def rellenar_avance(apps, schema_editor):
+    """Contadores de actividades por meta y totales por objetivo (valor_actual no se toca)."""
+    MetaTactico = apps.get_model("poa", "MetaTactico")
+    Objetivo = apps.get_model("poa", "Objetivo")
+
+    metas = list(
+        MetaTactico.objects.annotate(
+            n_total=Count("actividades"),
+            n_completadas=Count("actividades", filter=Q(actividades__estado="completada")),
+        ).only("id")
+    )
+    for meta in metas:
+        meta.total_actividades = meta.n_total
+        meta.actividades_completadas = meta.n_completadas
+    MetaTactico.objects.bulk_update(metas, ["total_actividades", "actividades_completadas"], batch_size=500)
+
+    objetivos = list(
+        Objetivo.objects.annotate(
+            esperado=Sum("metas_tacticas__valor_esperado"),
+            actual=Sum("metas_tacticas__valor_actual"),
+        ).only("id")
+    )
+    for objetivo in objetivos:
+        objetivo.total_esperado = objetivo.esperado or 0
+        objetivo.total_actual = objetivo.actual or 0
+    Objetivo.objects.bulk_update(objetivos, ["total_esperado", "total_actual"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('poa', '0003_alter_metatactico_valor_actual_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='metatactico',
+            name='actividades_completadas',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='metatactico',
+            name='total_actividades',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='objetivo',
+            name='total_actual',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='objetivo',
+            name='total_esperado',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.RunPython(rellenar_avance, migrations.RunPython.noop),
+    ]
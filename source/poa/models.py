@@ -1,7 +1,6 @@
 from decimal import Decimal
 
 from django.db import models
-from django.db.models import Sum
 from django.utils.translation import gettext_lazy as _
 
 """
@@ -32,6 +31,10 @@ class Objetivo(models.Model):
 
     fecha_creacion = models.DateTimeField(auto_now_add=True)
 
+    # Totales de sus metas, mantenidos por AvanceService (no editar a mano)
+    total_esperado = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    total_actual = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+
     equipo = models.ManyToManyField(
         "empleados.Empleado", through="ObjetivoEmpleado", related_name="objetivos"
     )
@@ -47,13 +50,10 @@ class Objetivo(models.Model):
         """
         Avance consolidado del objetivo en porcentaje (0 a 100),
         calculado como: sum(valor_actual) / sum(valor_esperado).
+        Se lee de los totales almacenados, sin consultar las metas.
         """
-        agg = self.metas_tacticas.aggregate(
-            total_esperado=Sum("valor_esperado"),
-            total_actual=Sum("valor_actual"),
-        )
-        total_esperado = agg["total_esperado"] or Decimal("0")
-        total_actual = agg["total_actual"] or Decimal("0")
+        total_esperado = self.total_esperado or Decimal("0")
+        total_actual = self.total_actual or Decimal("0")
 
         if total_esperado <= 0:
             return 0
@@ -108,6 +108,10 @@ class MetaTactico(models.Model):
     fecha_inicio = models.DateField()
     fecha_fin = models.DateField()
 
+    # Contadores de actividades, mantenidos por AvanceService (no editar a mano)
+    total_actividades = models.PositiveIntegerField(default=0, editable=False)
+    actividades_completadas = models.PositiveIntegerField(default=0, editable=False)
+
     # Estado de la meta (controla ciclo de vida)
     estado = models.CharField(
         max_length=20, choices=ESTADO_CHOICES, default="pendiente"
@@ -0,0 +1,218 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.db.models import (
+    Case, Count, DecimalField, F, FloatField, OuterRef, Q, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Cast, Coalesce, Round
+from django.db.models.lookups import GreaterThan
+
+from poa.models import Actividad, MetaTactico, Objetivo
+from poa.services.cache_service import CachePOAService
+
+CENTESIMO = Decimal("0.01")
+
+
+class AvanceService:
+    """
+    Mantenimiento del avance almacenado del POA.
+
+    Cada meta guarda cuántas actividades tiene y cuántas están completadas, y su
+    valor_actual = valor_esperado * completadas / total. Cada objetivo guarda la
+    suma de valor_esperado y valor_actual de sus metas, de modo que
+    `Objetivo.avance` se lee sin consultas.
+
+    Los cambios de una actividad se aplican de forma incremental (deltas sobre la
+    meta bloqueada y diferencia sobre el objetivo, en una transacción). Los cambios
+    de una meta recalculan los totales de su objetivo. Los cambios masivos
+    (`cambiar_estado_actividades`, `cerrar_meta`, `cierre_anual`) y `reconstruir`
+    recalculan por conjunto con `recalcular_metas`.
+    """
+
+    @staticmethod
+    def valor_meta(valor_esperado, completadas, total) -> Decimal:
+        """valor_actual de una meta con `completadas` de `total` actividades."""
+        if not total:
+            return Decimal("0.00")
+        valor = Decimal(str(valor_esperado)) * Decimal(completadas) / Decimal(total)
+        return valor.quantize(CENTESIMO, rounding=ROUND_HALF_UP)
+
+    @staticmethod
+    def ajustar_meta(meta_id, delta_total=0, delta_completadas=0):
+        """
+        Aplica a la meta el alta, baja o cambio de estado de una actividad y
+        propaga la diferencia de valor_actual al objetivo.
+        """
+        if not (delta_total or delta_completadas):
+            return
+
+        with transaction.atomic():
+            meta = (
+                MetaTactico.objects.select_for_update()
+                .filter(pk=meta_id)
+                .only("objetivo_id", "valor_esperado", "valor_actual", "total_actividades", "actividades_completadas")
+                .first()
+            )
+            if meta is None:
+                return  # la meta se está eliminando (borrado en cascada)
+
+            total = max(0, meta.total_actividades + delta_total)
+            completadas = min(total, max(0, meta.actividades_completadas + delta_completadas))
+            valor = AvanceService.valor_meta(meta.valor_esperado, completadas, total)
+
+            MetaTactico.objects.filter(pk=meta_id).update(
+                total_actividades=total,
+                actividades_completadas=completadas,
+                valor_actual=valor,
+            )
+
+            diferencia = valor - meta.valor_actual
+            if diferencia:
+                Objetivo.objects.filter(pk=meta.objetivo_id).update(total_actual=F("total_actual") + diferencia)
+
+    @staticmethod
+    def recalcular_metas(metas):
+        """
+        Recalcula contadores y valor_actual de las metas `metas` (queryset) con un
+        único UPDATE: cada columna sale de un agregado condicional correlacionado
+        sobre sus actividades, sin traer filas a Python. Después recalcula los
+        totales de los objetivos afectados. Devuelve el número de metas.
+
+        Las metas sin actividades conservan el valor_actual cargado a mano.
+        """
+        actividades = Actividad.objects.filter(meta=OuterRef("pk")).order_by().values("meta")
+        total = Coalesce(Subquery(actividades.annotate(n=Count("pk")).values("n")), 0)
+        completadas = Coalesce(
+            Subquery(actividades.annotate(n=Count("pk", filter=Q(estado="completada"))).values("n")), 0
+        )
+        # Aritmética en coma flotante redondeada a centésimos: evita la división
+        # entera de SQLite; en PostgreSQL Round opera sobre numeric.
+        valor = Round(
+            Cast("valor_esperado", FloatField()) * Cast(completadas, FloatField()) / Cast(total, FloatField()),
+            2,
+        )
+
+        with transaction.atomic():
+            objetivo_ids = list(metas.order_by().values_list("objetivo_id", flat=True).distinct())
+            actualizadas = MetaTactico.objects.filter(pk__in=metas.order_by().values("pk")).update(
+                total_actividades=total,
+                actividades_completadas=completadas,
+                valor_actual=Case(
+                    When(GreaterThan(total, 0), then=valor),
+                    default=F("valor_actual"),
+                    output_field=DecimalField(max_digits=5, decimal_places=2),
+                ),
+            )
+            AvanceService.recalcular_objetivos(objetivo_ids)
+        return actualizadas
+
+    @staticmethod
+    def recalcular_objetivos(objetivo_ids):
+        """Recalcula en un UPDATE los totales de los objetivos a partir de sus metas."""
+        metas = MetaTactico.objects.filter(objetivo=OuterRef("pk")).order_by().values("objetivo")
+        decimal = DecimalField(max_digits=12, decimal_places=2)
+        actualizados = Objetivo.objects.filter(pk__in=objetivo_ids).update(
+            total_esperado=Coalesce(Subquery(metas.annotate(s=Sum("valor_esperado")).values("s")), 0, output_field=decimal),
+            total_actual=Coalesce(Subquery(metas.annotate(s=Sum("valor_actual")).values("s")), 0, output_field=decimal),
+        )
+        # Los UPDATE no disparan señales: los fragmentos cacheados se invalidan aquí
+        CachePOAService.invalidar_objetivos(objetivo_ids)
+        return actualizados
+
+    @staticmethod
+    def reconstruir(objetivos=None):
+        """
+        Recalcula contadores y valor_actual de las metas desde sus actividades, y
+        luego los totales de los objetivos. `objetivos`: queryset (por defecto todos).
+        Devuelve un resumen.
+        """
+        if objetivos is None:
+            objetivos = Objetivo.objects.all()
+
+        with transaction.atomic():
+            metas = AvanceService.recalcular_metas(MetaTactico.objects.filter(objetivo__in=objetivos.values("pk")))
+            # Objetivos sin metas quedan en cero
+            total_objetivos = AvanceService.recalcular_objetivos(objetivos.order_by().values("pk"))
+
+        return {"objetivos": total_objetivos, "metas": metas}
+
+    # --- Cambios masivos de estado ---
+
+    @staticmethod
+    def cambiar_estado_actividades(actividades, estado):
+        """
+        Cambia el estado de todas las `actividades` (queryset) con un UPDATE y
+        recalcula una sola vez el avance de sus metas. No dispara señales por
+        actividad. Devuelve el número de actividades cambiadas.
+        """
+        cambios = {"estado": estado}
+        if estado == "completada":
+            cambios["porcentaje_avance"] = 100
+        elif estado == "pendiente":
+            cambios["porcentaje_avance"] = 0
+
+        with transaction.atomic():
+            # Las metas se resuelven antes: el filtro puede depender del estado que cambia
+            meta_ids = list(actividades.order_by().values_list("meta_id", flat=True).distinct())
+            cambiadas = actividades.exclude(estado=estado).update(**cambios)
+            if cambiadas:
+                AvanceService.recalcular_metas(MetaTactico.objects.filter(pk__in=meta_ids))
+        return cambiadas
+
+    @staticmethod
+    def cerrar_meta(meta):
+        """Completa todas las actividades no canceladas de la meta y la marca como cumplida."""
+        with transaction.atomic():
+            cambiadas = AvanceService.cambiar_estado_actividades(
+                Actividad.objects.filter(meta=meta).exclude(estado="cancelada"), "completada"
+            )
+            MetaTactico.objects.filter(pk=meta.pk).update(estado="cumplida")
+        return cambiadas
+
+    @staticmethod
+    def cierre_anual(empresa, anio):
+        """
+        Cierre del año fiscal: cancela las actividades sin terminar, marca cada meta
+        como cumplida o vencida según su avance y cierra los objetivos activos.
+        Todo con UPDATEs por conjunto. Devuelve un resumen.
+        """
+        objetivos = Objetivo.objects.filter(empresa=empresa, anio=anio)
+        metas = MetaTactico.objects.filter(objetivo__in=objetivos.values("pk"))
+
+        with transaction.atomic():
+            canceladas = AvanceService.cambiar_estado_actividades(
+                Actividad.objects.filter(meta__in=metas.values("pk"), estado__in=["pendiente", "en_progreso"]),
+                "cancelada",
+            )
+            AvanceService.recalcular_metas(metas)
+            metas.update(
+                estado=Case(
+                    When(valor_actual__gte=F("valor_esperado"), then=Value("cumplida")),
+                    default=Value("vencida"),
+                )
+            )
+            cerrados = objetivos.filter(estado="activo").update(estado="cerrado")
+
+        return {"actividades_canceladas": canceladas, "objetivos_cerrados": cerrados}
+
+    # --- Eventos de actividades (llamados desde poa.signals) ---
+
+    @staticmethod
+    def actividad_guardada(actividad, previo):
+        """`previo`: (meta_id, estado) antes de guardar, o None si es nueva."""
+        completada = int(actividad.estado == "completada")
+        if previo is None:
+            AvanceService.ajustar_meta(actividad.meta_id, 1, completada)
+            return
+
+        meta_previa, estado_previo = previo
+        completada_previa = int(estado_previo == "completada")
+        if meta_previa != actividad.meta_id:
+            AvanceService.ajustar_meta(meta_previa, -1, -completada_previa)
+            AvanceService.ajustar_meta(actividad.meta_id, 1, completada)
+        else:
+            AvanceService.ajustar_meta(actividad.meta_id, 0, completada - completada_previa)
+
+    @staticmethod
+    def actividad_eliminada(actividad):
+        AvanceService.ajustar_meta(actividad.meta_id, -1, -int(actividad.estado == "completada"))
@@ -0,0 +1,107 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from poa.models import MetaTactico, Objetivo
+
+# Tiempo de vida (segundos) de los fragmentos HTML cacheados del POA
+POA_CACHE_TIMEOUT = getattr(settings, "POA_CACHE_TIMEOUT", 600)
+
+# Versión del dashboard cuando no hay empresa activa (vista de todas las empresas)
+TODAS = "todas"
+
+
+class CachePOAService:
+    """
+    Caché de fragmentos HTML del POA con invalidación por versión.
+
+    Cada objetivo tiene un contador de versión (lista de metas y header) y cada
+    empresa otro (dashboard). Cualquier cambio en un objetivo, sus metas, sus
+    actividades o sus equipos incrementa ambos, de modo que las claves anteriores
+    quedan obsoletas sin borrarlas. Las mismas versiones alimentan los ETag de
+    los partials HTMX para responder 304 sin consultar la base ni renderizar.
+    """
+
+    @staticmethod
+    def _clave_version(tipo, ident):
+        return f"poa:version:{tipo}:{ident}"
+
+    @staticmethod
+    def _version(clave):
+        version = cache.get(clave)
+        if version is None:
+            # add() evita pisar una versión creada por otro proceso
+            cache.add(clave, 1, timeout=None)
+            version = cache.get(clave, 1)
+        return version
+
+    @staticmethod
+    def _incrementar(clave):
+        try:
+            cache.incr(clave)
+        except ValueError:
+            # La clave no existía (caché reiniciada): cualquier valor nuevo sirve
+            cache.add(clave, 1, timeout=None)
+
+    @staticmethod
+    def version_objetivo(objetivo_id):
+        return CachePOAService._version(CachePOAService._clave_version("objetivo", objetivo_id))
+
+    @staticmethod
+    def version_empresa(empresa_id):
+        return CachePOAService._version(CachePOAService._clave_version("empresa", empresa_id or TODAS))
+
+    # --- Invalidación ---
+
+    @staticmethod
+    def invalidar(objetivo_id, empresa_id):
+        """
+        Incrementa las versiones del objetivo y de su empresa. Se hace de inmediato
+        (la propia petición renderiza ya con datos nuevos) y otra vez al confirmar
+        la transacción, para descartar fragmentos que otra petición haya generado
+        entre tanto con los datos aún sin confirmar.
+        """
+        claves = [
+            CachePOAService._clave_version("empresa", empresa_id),
+            CachePOAService._clave_version("empresa", TODAS),
+        ]
+        if objetivo_id is not None:
+            claves.append(CachePOAService._clave_version("objetivo", objetivo_id))
+
+        def incrementar():
+            for clave in claves:
+                CachePOAService._incrementar(clave)
+
+        incrementar()
+        transaction.on_commit(incrementar)
+
+    @staticmethod
+    def invalidar_objetivos(objetivo_ids):
+        """Invalida varios objetivos (lista o subconsulta de ids) con una consulta."""
+        for objetivo_id, empresa_id in Objetivo.objects.filter(pk__in=objetivo_ids).values_list("pk", "empresa_id"):
+            CachePOAService.invalidar(objetivo_id, empresa_id)
+
+    @staticmethod
+    def invalidar_meta(meta_id):
+        fila = MetaTactico.objects.filter(pk=meta_id).values_list("objetivo_id", "objetivo__empresa_id").first()
+        if fila:
+            CachePOAService.invalidar(*fila)
+
+    # --- Fragmentos ---
+
+    @staticmethod
+    def clave_fragmento(nombre, *partes):
+        """Clave estable (y apta para ETag) a partir de versión, filtros y perfil."""
+        resumen = hashlib.md5("|".join(str(parte) for parte in partes).encode()).hexdigest()
+        return f"poa:fragmento:{nombre}:{resumen}"
+
+    @staticmethod
+    def fragmento(clave, renderizar):
+        """Devuelve el HTML cacheado en `clave` o lo genera con `renderizar()` y lo guarda."""
+        html = cache.get(clave)
+        if html is None:
+            html = renderizar()
+            cache.set(clave, html, timeout=POA_CACHE_TIMEOUT)
+        return html
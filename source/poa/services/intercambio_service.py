@@ -0,0 +1,554 @@
+import csv
+import io
+import json
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from empleados.models import Empleado
+from poa.models import (
+    Actividad, ActividadEmpleado, MetaEmpleado, MetaTactico, Objetivo, ObjetivoEmpleado,
+)
+from poa.services.avance_service import AvanceService
+
+# Filas por INSERT en las inserciones masivas
+LOTE_INSERCION = 1000
+
+# Columnas del CSV: una fila por actividad (o por meta/objetivo sin hijos)
+COLUMNAS_CSV = (
+    "objetivo",
+    "objetivo_descripcion",
+    "objetivo_estado",
+    "objetivo_equipo",
+    "meta",
+    "meta_descripcion",
+    "meta_indicador",
+    "meta_valor_esperado",
+    "meta_valor_actual",
+    "meta_fecha_inicio",
+    "meta_fecha_fin",
+    "meta_estado",
+    "meta_equipo",
+    "actividad",
+    "actividad_descripcion",
+    "actividad_fecha_inicio",
+    "actividad_fecha_fin",
+    "actividad_estado",
+    "actividad_porcentaje_avance",
+    "actividad_ejecutores",
+)
+
+ESTADOS_OBJETIVO = {valor for valor, _ in Objetivo.ESTADO_CHOICES}
+ESTADOS_META = {valor for valor, _ in MetaTactico.ESTADO_CHOICES}
+ESTADOS_ACTIVIDAD = {valor for valor, _ in Actividad.ESTADO_CHOICES}
+
+
+class ImportacionPOAInvalida(ValueError):
+    """El contenido no se puede interpretar o el año destino no admite la operación."""
+
+
+class IntercambioPOAService:
+    """
+    Importación, exportación y clonación masiva del POA de un año.
+
+    El árbol Objetivo → MetaTactico → Actividad viaja con sus equipos
+    (ObjetivoEmpleado, MetaEmpleado, ActividadEmpleado) identificando a cada
+    empleado por cédula. Las escrituras usan bulk_create por nivel dentro de una
+    sola transacción (sin save() ni señales por fila) y el avance se recalcula al
+    final por conjunto con AvanceService.
+    """
+
+    FORMATOS = ("json", "csv")
+
+    # --- Exportación ---
+
+    @staticmethod
+    def exportar(empresa, anio):
+        """Árbol del año como dict serializable (ver `serializar`)."""
+        objetivos = IntercambioPOAService._leer_arbol(empresa, anio)
+        for objetivo in objetivos:
+            IntercambioPOAService._para_exportar(objetivo)
+            for meta in objetivo["metas"]:
+                IntercambioPOAService._para_exportar(meta)
+                for actividad in meta["actividades"]:
+                    IntercambioPOAService._para_exportar(actividad)
+        return {"anio": anio, "objetivos": objetivos}
+
+    @staticmethod
+    def serializar(arbol, formato="json"):
+        """Convierte el árbol de `exportar` en texto JSON o CSV."""
+        if formato == "json":
+            return json.dumps(arbol, cls=DjangoJSONEncoder, ensure_ascii=False, indent=2)
+
+        salida = io.StringIO()
+        escritor = csv.DictWriter(salida, fieldnames=COLUMNAS_CSV)
+        escritor.writeheader()
+        for objetivo in arbol["objetivos"]:
+            base_objetivo = {
+                "objetivo": objetivo["nombre"],
+                "objetivo_descripcion": objetivo["descripcion"] or "",
+                "objetivo_estado": objetivo["estado"],
+                "objetivo_equipo": _equipo_a_texto(objetivo["equipo"]),
+            }
+            if not objetivo["metas"]:
+                escritor.writerow(base_objetivo)
+            for meta in objetivo["metas"]:
+                base_meta = {
+                    **base_objetivo,
+                    "meta": meta["nombre"],
+                    "meta_descripcion": meta["descripcion"] or "",
+                    "meta_indicador": meta["indicador"] or "",
+                    "meta_valor_esperado": meta["valor_esperado"],
+                    "meta_valor_actual": meta["valor_actual"],
+                    "meta_fecha_inicio": meta["fecha_inicio"].isoformat(),
+                    "meta_fecha_fin": meta["fecha_fin"].isoformat(),
+                    "meta_estado": meta["estado"],
+                    "meta_equipo": _equipo_a_texto(meta["equipo"]),
+                }
+                if not meta["actividades"]:
+                    escritor.writerow(base_meta)
+                for actividad in meta["actividades"]:
+                    escritor.writerow({
+                        **base_meta,
+                        "actividad": actividad["nombre"],
+                        "actividad_descripcion": actividad["descripcion"] or "",
+                        "actividad_fecha_inicio": actividad["fecha_inicio"].isoformat(),
+                        "actividad_fecha_fin": actividad["fecha_fin"].isoformat(),
+                        "actividad_estado": actividad["estado"],
+                        "actividad_porcentaje_avance": actividad["porcentaje_avance"],
+                        "actividad_ejecutores": _equipo_a_texto(actividad["equipo"]),
+                    })
+        return salida.getvalue()
+
+    # --- Importación ---
+
+    @staticmethod
+    def leer(contenido, formato):
+        """Convierte el cuerpo (JSON o CSV) en la lista de objetivos del árbol."""
+        if isinstance(contenido, bytes):
+            contenido = contenido.decode("utf-8-sig")
+
+        if formato == "json":
+            try:
+                datos = json.loads(contenido)
+            except json.JSONDecodeError as exc:
+                raise ImportacionPOAInvalida(f"JSON inválido: {exc.msg}")
+            objetivos = datos.get("objetivos") if isinstance(datos, dict) else datos
+            if not isinstance(objetivos, list):
+                raise ImportacionPOAInvalida("Se esperaba una lista de objetivos.")
+            return objetivos
+
+        if formato == "csv":
+            lector = csv.DictReader(io.StringIO(contenido))
+            if not lector.fieldnames or "objetivo" not in lector.fieldnames:
+                raise ImportacionPOAInvalida("El CSV debe incluir al menos la columna 'objetivo'.")
+            return _arbol_desde_csv(lector)
+
+        raise ImportacionPOAInvalida(f"Formato no soportado: {formato}")
+
+    @staticmethod
+    def importar(empresa, anio, objetivos):
+        """
+        Crea el árbol `objetivos` en el año de la empresa. Valida todo antes de
+        escribir: si hay errores no se inserta nada. Devuelve un resumen.
+        """
+        errores = []
+        existentes = set(
+            Objetivo.objects.filter(empresa=empresa, anio=anio).values_list("nombre", flat=True)
+        )
+        nodos = IntercambioPOAService._validar(objetivos, existentes, errores)
+
+        cedulas = {
+            miembro["cedula"]
+            for nodo in _recorrer(nodos)
+            for miembro in nodo["equipo"]
+        }
+        por_cedula = dict(
+            Empleado.objects.filter(empresa=empresa, cedula__in=cedulas).values_list("cedula", "pk")
+        )
+        for nodo in _recorrer(nodos):
+            for miembro in nodo["equipo"]:
+                miembro["empleado_id"] = por_cedula.get(miembro["cedula"])
+                if miembro["empleado_id"] is None:
+                    errores.append(f"{nodo['ruta']}: empleado con cédula {miembro['cedula']} no encontrado.")
+
+        resumen = {"objetivos": 0, "metas": 0, "actividades": 0, "asignaciones": 0, "errores": errores}
+        if errores:
+            return resumen
+
+        resumen.update(IntercambioPOAService._crear_arbol(empresa, anio, nodos))
+        return resumen
+
+    # --- Clonación ---
+
+    @staticmethod
+    def clonar_anio(empresa, origen, destino, incluir_equipos=True):
+        """
+        Copia el POA del año `origen` al `destino` (que debe estar vacío): mismas
+        metas y actividades con fechas desplazadas, estados reiniciados y avance
+        en cero. Devuelve un resumen.
+        """
+        if origen == destino:
+            raise ImportacionPOAInvalida("El año de origen y el de destino coinciden.")
+        if Objetivo.objects.filter(empresa=empresa, anio=destino).exists():
+            raise ImportacionPOAInvalida(f"El año {destino} ya tiene objetivos registrados.")
+
+        desplazamiento = destino - origen
+        nodos = IntercambioPOAService._leer_arbol(empresa, origen)
+        for objetivo in nodos:
+            objetivo["estado"] = "activo"
+            for meta in objetivo["metas"]:
+                meta.update(
+                    estado="pendiente",
+                    valor_actual=Decimal("0"),
+                    fecha_inicio=_desplazar(meta["fecha_inicio"], desplazamiento),
+                    fecha_fin=_desplazar(meta["fecha_fin"], desplazamiento),
+                )
+                for actividad in meta["actividades"]:
+                    actividad.update(
+                        estado="pendiente",
+                        porcentaje_avance=0,
+                        fecha_inicio=_desplazar(actividad["fecha_inicio"], desplazamiento),
+                        fecha_fin=_desplazar(actividad["fecha_fin"], desplazamiento),
+                    )
+        if not incluir_equipos:
+            for nodo in _recorrer(nodos):
+                nodo["equipo"] = []
+
+        return IntercambioPOAService._crear_arbol(empresa, destino, nodos)
+
+    # --- Internos ---
+
+    @staticmethod
+    def _leer_arbol(empresa, anio):
+        """Árbol del año con seis consultas, sin importar su tamaño."""
+        objetivos = {
+            fila["id"]: {**fila, "metas": [], "equipo": []}
+            for fila in Objetivo.objects.filter(empresa=empresa, anio=anio)
+            .order_by("id")
+            .values("id", "nombre", "descripcion", "estado")
+        }
+        metas = {}
+        for fila in (
+            MetaTactico.objects.filter(objetivo_id__in=objetivos)
+            .order_by("id")
+            .values(
+                "id", "objetivo_id", "nombre", "descripcion", "indicador", "valor_esperado",
+                "valor_actual", "fecha_inicio", "fecha_fin", "estado",
+            )
+        ):
+            metas[fila["id"]] = nodo = {**fila, "actividades": [], "equipo": []}
+            objetivos[fila["objetivo_id"]]["metas"].append(nodo)
+
+        actividades = {}
+        for fila in (
+            Actividad.objects.filter(meta_id__in=metas)
+            .order_by("id")
+            .values("id", "meta_id", "nombre", "descripcion", "fecha_inicio", "fecha_fin", "estado", "porcentaje_avance")
+        ):
+            actividades[fila["id"]] = nodo = {**fila, "equipo": []}
+            metas[fila["meta_id"]]["actividades"].append(nodo)
+
+        for modelo, campo, nodos in (
+            (ObjetivoEmpleado, "objetivo_id", objetivos),
+            (MetaEmpleado, "meta_id", metas),
+            (ActividadEmpleado, "actividad_id", actividades),
+        ):
+            for padre_id, empleado_id, cedula, rol in (
+                modelo.objects.filter(**{f"{campo}__in": nodos})
+                .order_by("id")
+                .values_list(campo, "empleado_id", "empleado__cedula", "rol")
+            ):
+                nodos[padre_id]["equipo"].append({"empleado_id": empleado_id, "cedula": cedula, "rol": rol})
+
+        return list(objetivos.values())
+
+    @staticmethod
+    def _para_exportar(nodo):
+        # Fuera del sistema los ids internos no significan nada
+        for clave in ("id", "objetivo_id", "meta_id"):
+            nodo.pop(clave, None)
+        nodo["equipo"] = [{"cedula": m["cedula"], "rol": m["rol"]} for m in nodo["equipo"]]
+
+    @staticmethod
+    def _validar(objetivos, existentes, errores):
+        """Normaliza el árbol recibido; acumula los errores con la ruta del nodo."""
+        nodos = []
+        nombres = set(existentes)
+        for i, objetivo in enumerate(objetivos):
+            ruta = f"objetivos[{i}]"
+            if not isinstance(objetivo, dict):
+                errores.append(f"{ruta}: debe ser un objeto.")
+                continue
+            nombre = _texto(objetivo.get("nombre"), 150)
+            if not nombre:
+                errores.append(f"{ruta}: nombre obligatorio.")
+            elif nombre in nombres:
+                errores.append(f"{ruta}: el objetivo '{nombre}' ya existe en el año.")
+            nombres.add(nombre)
+
+            nodo = {
+                "ruta": ruta,
+                "nombre": nombre,
+                "descripcion": _texto(objetivo.get("descripcion")),
+                "estado": _opcion(objetivo.get("estado"), ESTADOS_OBJETIVO, "activo", ruta, errores),
+                "equipo": _equipo(objetivo.get("equipo"), "lider", ruta, errores),
+                "metas": [],
+            }
+            for j, meta in enumerate(objetivo.get("metas") or []):
+                nodo["metas"].append(IntercambioPOAService._validar_meta(meta, f"{ruta}.metas[{j}]", errores))
+            nodos.append(nodo)
+        return nodos
+
+    @staticmethod
+    def _validar_meta(meta, ruta, errores):
+        if not isinstance(meta, dict):
+            errores.append(f"{ruta}: debe ser un objeto.")
+            meta = {}
+        nodo = {
+            "ruta": ruta,
+            "nombre": _requerido(_texto(meta.get("nombre"), 150), "nombre", ruta, errores),
+            "descripcion": _texto(meta.get("descripcion")),
+            "indicador": _texto(meta.get("indicador"), 100),
+            "valor_esperado": _decimal(meta.get("valor_esperado"), Decimal("100"), "valor_esperado", ruta, errores),
+            "valor_actual": _decimal(meta.get("valor_actual"), Decimal("0"), "valor_actual", ruta, errores),
+            "fecha_inicio": _fecha(meta.get("fecha_inicio"), "fecha_inicio", ruta, errores),
+            "fecha_fin": _fecha(meta.get("fecha_fin"), "fecha_fin", ruta, errores),
+            "estado": _opcion(meta.get("estado"), ESTADOS_META, "pendiente", ruta, errores),
+            "equipo": _equipo(meta.get("equipo"), "colaborador", ruta, errores),
+            "actividades": [],
+        }
+        for k, actividad in enumerate(meta.get("actividades") or []):
+            ruta_actividad = f"{ruta}.actividades[{k}]"
+            if not isinstance(actividad, dict):
+                errores.append(f"{ruta_actividad}: debe ser un objeto.")
+                continue
+            try:
+                porcentaje = int(actividad.get("porcentaje_avance") or 0)
+            except (TypeError, ValueError):
+                errores.append(f"{ruta_actividad}: porcentaje_avance inválido.")
+                porcentaje = 0
+            nodo["actividades"].append({
+                "ruta": ruta_actividad,
+                "nombre": _requerido(_texto(actividad.get("nombre"), 150), "nombre", ruta_actividad, errores),
+                "descripcion": _texto(actividad.get("descripcion")),
+                "fecha_inicio": _fecha(actividad.get("fecha_inicio"), "fecha_inicio", ruta_actividad, errores),
+                "fecha_fin": _fecha(actividad.get("fecha_fin"), "fecha_fin", ruta_actividad, errores),
+                "estado": _opcion(actividad.get("estado"), ESTADOS_ACTIVIDAD, "pendiente", ruta_actividad, errores),
+                "porcentaje_avance": porcentaje,
+                "equipo": _equipo(
+                    actividad.get("ejecutores", actividad.get("equipo")), "ejecutor", ruta_actividad, errores
+                ),
+            })
+        return nodo
+
+    @staticmethod
+    def _crear_arbol(empresa, anio, nodos):
+        """
+        Inserta el árbol ya validado (equipos con empleado_id) con un bulk_create
+        por nivel en una transacción y recalcula el avance por conjunto.
+        """
+        with transaction.atomic():
+            objetivos = Objetivo.objects.bulk_create(
+                [
+                    Objetivo(
+                        empresa=empresa,
+                        anio=anio,
+                        nombre=nodo["nombre"],
+                        descripcion=nodo["descripcion"],
+                        estado=nodo["estado"],
+                    )
+                    for nodo in nodos
+                ],
+                batch_size=LOTE_INSERCION,
+            )
+
+            pares_metas = [(objetivo, meta) for objetivo, nodo in zip(objetivos, nodos) for meta in nodo["metas"]]
+            metas = MetaTactico.objects.bulk_create(
+                [
+                    MetaTactico(
+                        objetivo=objetivo,
+                        nombre=meta["nombre"],
+                        descripcion=meta["descripcion"],
+                        indicador=meta["indicador"],
+                        valor_esperado=meta["valor_esperado"],
+                        valor_actual=meta["valor_actual"],
+                        fecha_inicio=meta["fecha_inicio"],
+                        fecha_fin=meta["fecha_fin"],
+                        estado=meta["estado"],
+                    )
+                    for objetivo, meta in pares_metas
+                ],
+                batch_size=LOTE_INSERCION,
+            )
+
+            pares_actividades = [
+                (meta, actividad)
+                for meta, (_, nodo_meta) in zip(metas, pares_metas)
+                for actividad in nodo_meta["actividades"]
+            ]
+            actividades = Actividad.objects.bulk_create(
+                [
+                    Actividad(
+                        meta=meta,
+                        nombre=actividad["nombre"],
+                        descripcion=actividad["descripcion"],
+                        fecha_inicio=actividad["fecha_inicio"],
+                        fecha_fin=actividad["fecha_fin"],
+                        estado=actividad["estado"],
+                        porcentaje_avance=actividad["porcentaje_avance"],
+                    )
+                    for meta, actividad in pares_actividades
+                ],
+                batch_size=LOTE_INSERCION,
+            )
+
+            asignaciones = 0
+            for modelo, campo, creados, nodos_nivel in (
+                (ObjetivoEmpleado, "objetivo", objetivos, nodos),
+                (MetaEmpleado, "meta", metas, [nodo for _, nodo in pares_metas]),
+                (ActividadEmpleado, "actividad", actividades, [nodo for _, nodo in pares_actividades]),
+            ):
+                filas = {}
+                for creado, nodo in zip(creados, nodos_nivel):
+                    for miembro in nodo["equipo"]:
+                        # Un empleado por nodo (restricción única): prevalece el último rol
+                        filas[(creado.pk, miembro["empleado_id"])] = modelo(
+                            **{campo: creado}, empleado_id=miembro["empleado_id"], rol=miembro["rol"]
+                        )
+                modelo.objects.bulk_create(filas.values(), batch_size=LOTE_INSERCION)
+                asignaciones += len(filas)
+
+            # Contadores, valor_actual de metas con actividades y totales de objetivos
+            AvanceService.reconstruir(Objetivo.objects.filter(pk__in=[o.pk for o in objetivos]))
+
+        return {
+            "objetivos": len(objetivos),
+            "metas": len(metas),
+            "actividades": len(actividades),
+            "asignaciones": asignaciones,
+        }
+
+
+# --- Utilidades de conversión ---
+
+def _recorrer(nodos):
+    """Todos los nodos del árbol (objetivos, metas y actividades)."""
+    for objetivo in nodos:
+        yield objetivo
+        for meta in objetivo["metas"]:
+            yield meta
+            yield from meta["actividades"]
+
+
+def _desplazar(fecha, anios):
+    try:
+        return fecha.replace(year=fecha.year + anios)
+    except ValueError:
+        return fecha.replace(year=fecha.year + anios, day=28)  # 29 de febrero
+
+
+def _texto(valor, largo=None):
+    texto = str(valor).strip() if valor not in (None, "") else ""
+    return (texto[:largo] if largo else texto) or None
+
+
+def _requerido(valor, campo, ruta, errores):
+    if not valor:
+        errores.append(f"{ruta}: {campo} obligatorio.")
+    return valor
+
+
+def _opcion(valor, opciones, defecto, ruta, errores):
+    if valor in (None, ""):
+        return defecto
+    if valor not in opciones:
+        errores.append(f"{ruta}: estado inválido {valor!r}.")
+    return valor
+
+
+def _decimal(valor, defecto, campo, ruta, errores):
+    if valor in (None, ""):
+        return defecto
+    try:
+        return Decimal(str(valor))
+    except InvalidOperation:
+        errores.append(f"{ruta}: {campo} inválido.")
+        return defecto
+
+
+def _fecha(valor, campo, ruta, errores):
+    try:
+        return valor if isinstance(valor, date) else date.fromisoformat(str(valor or "").strip())
+    except ValueError:
+        errores.append(f"{ruta}: {campo} inválida (formato AAAA-MM-DD).")
+        return None
+
+
+def _equipo(valor, rol_defecto, ruta, errores):
+    """Acepta [{"cedula", "rol"}] (JSON) o "cedula:rol|cedula" (CSV)."""
+    if not valor:
+        return []
+    if isinstance(valor, str):
+        valor = [
+            dict(zip(("cedula", "rol"), parte.split(":", 1)))
+            for parte in valor.split("|")
+            if parte.strip()
+        ]
+    miembros = []
+    for miembro in valor:
+        cedula = str(miembro.get("cedula") or "").strip() if isinstance(miembro, dict) else ""
+        if not cedula:
+            errores.append(f"{ruta}: miembro de equipo sin cédula.")
+            continue
+        miembros.append({"cedula": cedula, "rol": (str(miembro.get("rol") or "").strip() or rol_defecto)[:50]})
+    return miembros
+
+
+def _equipo_a_texto(equipo):
+    return "|".join(f"{m['cedula']}:{m['rol']}" for m in equipo)
+
+
+def _arbol_desde_csv(lector):
+    """Agrupa las filas planas por objetivo y meta (en orden de aparición)."""
+    objetivos = {}
+    for fila in lector:
+        nombre = (fila.get("objetivo") or "").strip()
+        objetivo = objetivos.setdefault(nombre, {
+            "nombre": nombre,
+            "descripcion": fila.get("objetivo_descripcion"),
+            "estado": fila.get("objetivo_estado"),
+            "equipo": fila.get("objetivo_equipo"),
+            "metas": {},
+        })
+
+        nombre_meta = (fila.get("meta") or "").strip()
+        if not nombre_meta:
+            continue
+        meta = objetivo["metas"].setdefault(nombre_meta, {
+            "nombre": nombre_meta,
+            "descripcion": fila.get("meta_descripcion"),
+            "indicador": fila.get("meta_indicador"),
+            "valor_esperado": fila.get("meta_valor_esperado"),
+            "valor_actual": fila.get("meta_valor_actual"),
+            "fecha_inicio": fila.get("meta_fecha_inicio"),
+            "fecha_fin": fila.get("meta_fecha_fin"),
+            "estado": fila.get("meta_estado"),
+            "equipo": fila.get("meta_equipo"),
+            "actividades": [],
+        })
+
+        if (fila.get("actividad") or "").strip():
+            meta["actividades"].append({
+                "nombre": fila.get("actividad"),
+                "descripcion": fila.get("actividad_descripcion"),
+                "fecha_inicio": fila.get("actividad_fecha_inicio"),
+                "fecha_fin": fila.get("actividad_fecha_fin"),
+                "estado": fila.get("actividad_estado"),
+                "porcentaje_avance": fila.get("actividad_porcentaje_avance"),
+                "ejecutores": fila.get("actividad_ejecutores"),
+            })
+
+    return [{**objetivo, "metas": list(objetivo["metas"].values())} for objetivo in objetivos.values()]
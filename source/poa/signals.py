@@ -1,6 +1,8 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
 from django.dispatch import receiver
-from poa.models import ActividadEmpleado
+from poa.models import Actividad, ActividadEmpleado, MetaEmpleado, MetaTactico, Objetivo, ObjetivoEmpleado
+from poa.services.avance_service import AvanceService
+from poa.services.cache_service import CachePOAService
 from notificaciones.services.notificacion_service import NotificacionService
 from notificaciones.constants import TiposNotificacion
 
@@ -21,4 +23,74 @@ def notificar_asignacion_actividad(sender, instance, created, **kwargs):
             mensaje=f"Se te ha asignado la actividad: '{actividad.nombre}'. Fecha límite: {actividad.fecha_fin}.",
             tipo=TiposNotificacion.INFO,
             url=f"/poa/objetivos/"  # Ajusta si tienes una vista de detalle específica
-        )
\ No newline at end of file
+        )
+
+
+@receiver(pre_save, sender=Actividad)
+def recordar_estado_actividad(sender, instance, update_fields=None, **kwargs):
+    """Guarda (meta_id, estado) previos para calcular el delta de avance tras guardar."""
+    instance._avance_previo = None
+    if instance.pk is None:
+        return
+    if update_fields is not None and not {"estado", "meta", "meta_id"} & set(update_fields):
+        instance._avance_previo = False  # el cambio no afecta al avance
+        return
+    instance._avance_previo = (
+        Actividad.objects.filter(pk=instance.pk).values_list("meta_id", "estado").first()
+    )
+
+
+@receiver(post_save, sender=Actividad)
+def actualizar_avance_por_actividad(sender, instance, created, **kwargs):
+    previo = getattr(instance, "_avance_previo", None)
+    if previo is False:
+        return
+    AvanceService.actividad_guardada(instance, None if created else previo)
+
+
+@receiver(post_delete, sender=Actividad)
+def descontar_avance_por_actividad(sender, instance, **kwargs):
+    AvanceService.actividad_eliminada(instance)
+
+
+@receiver(post_save, sender=MetaTactico)
+@receiver(post_delete, sender=MetaTactico)
+def actualizar_totales_objetivo(sender, instance, **kwargs):
+    """Alta, edición o baja de una meta: recalcula los totales de su objetivo."""
+    AvanceService.recalcular_objetivos([instance.objetivo_id])
+
+
+# --- Invalidación de la caché de fragmentos ---
+# Los cambios de metas ya invalidan vía AvanceService.recalcular_objetivos.
+
+@receiver(post_save, sender=Objetivo)
+@receiver(post_delete, sender=Objetivo)
+def invalidar_cache_objetivo(sender, instance, **kwargs):
+    CachePOAService.invalidar(instance.pk, instance.empresa_id)
+
+
+@receiver(post_save, sender=ObjetivoEmpleado)
+@receiver(post_delete, sender=ObjetivoEmpleado)
+def invalidar_cache_equipo_objetivo(sender, instance, **kwargs):
+    CachePOAService.invalidar_objetivos([instance.objetivo_id])
+
+
+@receiver(post_save, sender=Actividad)
+@receiver(post_delete, sender=Actividad)
+@receiver(post_save, sender=MetaEmpleado)
+@receiver(post_delete, sender=MetaEmpleado)
+def invalidar_cache_meta(sender, instance, **kwargs):
+    CachePOAService.invalidar_meta(instance.meta_id)
+
+
+@receiver(post_save, sender=ActividadEmpleado)
+@receiver(post_delete, sender=ActividadEmpleado)
+def invalidar_cache_ejecutor(sender, instance, **kwargs):
+    CachePOAService.invalidar_meta(instance.actividad.meta_id)
+
+
+@receiver(m2m_changed, sender=Actividad.ejecutores.through)
+def invalidar_cache_ejecutores(sender, instance, action, reverse, **kwargs):
+    """ActividadForm asigna ejecutores con set(): no hay post_save del modelo intermedio."""
+    if action.startswith("post_") and not reverse:
+        CachePOAService.invalidar_meta(instance.meta_id)
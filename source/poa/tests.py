@@ -1,14 +1,22 @@
 from decimal import Decimal
-from django.test import TestCase, Client
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
 from core.models import Empresa, UnidadOrganizacional
 from empleados.models import Empleado, Puesto
 
-from poa.models import Objetivo, MetaTactico, Actividad
+from poa.models import Objetivo, MetaTactico, Actividad, ActividadEmpleado, MetaEmpleado, ObjetivoEmpleado
 from poa.forms import ActividadForm
-from poa.views.poa_view import _recalcular_avance_meta
+from poa.services.avance_service import AvanceService
+from poa.services.intercambio_service import IntercambioPOAService
+from poa.views.poa_view import _build_dashboard_context
 
 User = get_user_model()
 
@@ -54,14 +62,15 @@ class PoaCalculationWhiteBoxTests(TestCase):
         )
 
         # Estado inicial
-        _recalcular_avance_meta(self.meta)
+        AvanceService.recalcular_metas(MetaTactico.objects.filter(pk=self.meta.pk))
+        self.meta.refresh_from_db()
         self.assertEqual(self.meta.valor_actual, Decimal("0.00"))
 
         # Completa una actividad (avance: 50%)
         act1.estado = "completada"
         act1.save()
 
-        _recalcular_avance_meta(self.meta)
+        AvanceService.recalcular_metas(MetaTactico.objects.filter(pk=self.meta.pk))
 
         self.meta.refresh_from_db()
         print(f"   ↳ Valor Meta tras 1/2 actividades: {self.meta.valor_actual}")
@@ -70,7 +79,7 @@ class PoaCalculationWhiteBoxTests(TestCase):
         # Completa la segunda actividad (avance: 100%)
         act2.estado = "completada"
         act2.save()
-        _recalcular_avance_meta(self.meta)
+        AvanceService.recalcular_metas(MetaTactico.objects.filter(pk=self.meta.pk))
 
         self.meta.refresh_from_db()
         self.assertEqual(self.meta.valor_actual, Decimal("100.00"))
@@ -91,6 +100,8 @@ class PoaCalculationWhiteBoxTests(TestCase):
             fecha_inicio="2025-01-01", fecha_fin="2025-12-31"
         )
 
+        # El avance se almacena en el objetivo: se relee tras cambiar sus metas
+        self.objetivo.refresh_from_db()
         avance_real = self.objetivo.avance
 
         print(f"   ↳ Avance Objetivo calculado: {avance_real}%")
@@ -98,6 +109,418 @@ class PoaCalculationWhiteBoxTests(TestCase):
         print("     ✅ Éxito: El Objetivo consolida correctamente el avance de sus metas.")
 
 
+class PoaAvanceAlmacenadoWhiteBoxTests(TestCase):
+    """
+    Tests del avance almacenado: contadores de la meta y totales del objetivo
+    mantenidos de forma incremental, dashboard sin consultas por objetivo y
+    reconstrucción desde las actividades.
+    """
+
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nombre_comercial="Avance Corp", ruc="404")
+        self.objetivo = Objetivo.objects.create(empresa=self.empresa, nombre="Crecer", anio=2025)
+        self.meta = MetaTactico.objects.create(
+            objetivo=self.objetivo, nombre="Meta A", valor_esperado=Decimal("100.00"),
+            fecha_inicio="2025-01-01", fecha_fin="2025-12-31"
+        )
+
+    def _actividad(self, meta, estado="pendiente"):
+        return Actividad.objects.create(
+            meta=meta, nombre="Act", fecha_inicio="2025-01-01", fecha_fin="2025-01-02", estado=estado
+        )
+
+    def test_mantenimiento_incremental(self):
+        print("\n🧮 [TEST] Iniciando: test_mantenimiento_incremental")
+        print("   ↳ Objetivo: Altas, cambios de estado y bajas de actividades actualizan meta y objetivo.")
+
+        actividades = [self._actividad(self.meta) for _ in range(3)]
+        self._actividad(self.meta, estado="completada")
+        MetaTactico.objects.create(
+            objetivo=self.objetivo, nombre="Meta B", valor_esperado=Decimal("100.00"),
+            valor_actual=Decimal("20.00"), fecha_inicio="2025-01-01", fecha_fin="2025-12-31"
+        )
+
+        actividades[0].estado = "completada"
+        actividades[0].save(update_fields=["estado"])
+        actividades[1].delete()
+
+        self.meta.refresh_from_db()
+        self.objetivo.refresh_from_db()
+        print(f"   ↳ Meta: {self.meta.actividades_completadas}/{self.meta.total_actividades} -> {self.meta.valor_actual}")
+        self.assertEqual((self.meta.total_actividades, self.meta.actividades_completadas), (3, 2))
+        self.assertEqual(self.meta.valor_actual, Decimal("66.67"))
+        self.assertEqual(self.objetivo.total_esperado, Decimal("200.00"))
+        self.assertEqual(self.objetivo.total_actual, Decimal("86.67"))
+        self.assertEqual(self.objetivo.avance, 43)
+
+        # Lo incremental coincide con la reconstrucción completa
+        AvanceService.reconstruir()
+        reconstruido = Objetivo.objects.get(pk=self.objetivo.pk)
+        self.assertEqual(reconstruido.total_actual, self.objetivo.total_actual)
+        print("     ✅ Éxito: El avance almacenado coincide con el recalculado desde cero.")
+
+    def test_dashboard_consultas_constantes(self):
+        print("\n⚡ [TEST] Iniciando: test_dashboard_consultas_constantes")
+        print("   ↳ Objetivo: El dashboard no consulta las metas de cada objetivo.")
+
+        for numero in range(10):
+            objetivo = Objetivo.objects.create(empresa=self.empresa, nombre=f"Obj {numero}", anio=2025)
+            meta = MetaTactico.objects.create(
+                objetivo=objetivo, nombre="M", fecha_inicio="2025-01-01", fecha_fin="2025-12-31"
+            )
+            self._actividad(meta, estado="completada")
+            self._actividad(meta)
+
+        request = RequestFactory().get("/poa/", {"anio": 2025})
+        request.empresa_actual = self.empresa
+
+        # 1 consulta de objetivos + 1 agregado de metas/actividades
+        with self.assertNumQueries(2):
+            contexto = _build_dashboard_context(request, 2025)
+
+        print(f"   ↳ Stats: {contexto['stats']}")
+        self.assertEqual(contexto["stats"]["objetivos"], 11)
+        self.assertEqual(contexto["stats"]["metas"], 11)
+        self.assertEqual(contexto["stats"]["actividades"], 20)
+        self.assertEqual(contexto["stats"]["avance_global"], 45)
+        print("     ✅ Éxito: El costo del dashboard no depende del número de objetivos.")
+
+    def test_comando_reconstruir_corrige_desvios(self):
+        print("\n🛠️ [TEST] Iniciando: test_comando_reconstruir_corrige_desvios")
+        print("   ↳ Objetivo: poa_reconstruir_avance recalcula contadores y totales.")
+
+        self._actividad(self.meta, estado="completada")
+        self._actividad(self.meta)
+
+        # Desvío simulado (p. ej. cargas directas en la base)
+        MetaTactico.objects.filter(pk=self.meta.pk).update(total_actividades=9, actividades_completadas=0)
+        Objetivo.objects.filter(pk=self.objetivo.pk).update(total_esperado=0, total_actual=0)
+
+        salida = StringIO()
+        call_command("poa_reconstruir_avance", "--empresa", str(self.empresa.pk), stdout=salida)
+        print(f"   ↳ {salida.getvalue().strip()}")
+
+        self.meta.refresh_from_db()
+        self.objetivo.refresh_from_db()
+        self.assertEqual((self.meta.total_actividades, self.meta.actividades_completadas), (2, 1))
+        self.assertEqual(self.meta.valor_actual, Decimal("50.00"))
+        self.assertEqual(self.objetivo.avance, 50)
+        print("     ✅ Éxito: El comando restaura el avance almacenado.")
+
+
+class PoaAvanceMasivoWhiteBoxTests(TestCase):
+    """
+    Tests del recálculo por conjunto: un UPDATE por nivel sin importar cuántas
+    metas, cambios masivos de estado y cierre anual.
+    """
+
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nombre_comercial="Masivo Corp", ruc="505")
+        self.objetivos = [
+            Objetivo.objects.create(empresa=self.empresa, nombre=f"Obj {n}", anio=2025) for n in range(3)
+        ]
+        self.metas = []
+        for objetivo in self.objetivos:
+            for _ in range(2):
+                meta = MetaTactico.objects.create(
+                    objetivo=objetivo, nombre="M", fecha_inicio="2025-01-01", fecha_fin="2025-12-31"
+                )
+                Actividad.objects.create(
+                    meta=meta, nombre="Hecha", fecha_inicio="2025-01-01", fecha_fin="2025-01-02", estado="completada"
+                )
+                for _ in range(2):
+                    Actividad.objects.create(
+                        meta=meta, nombre="Abierta", fecha_inicio="2025-01-01", fecha_fin="2025-01-02"
+                    )
+                self.metas.append(meta)
+
+    def test_recalculo_por_conjunto_consultas_constantes(self):
+        print("\n⚡ [TEST] Iniciando: test_recalculo_por_conjunto_consultas_constantes")
+        print("   ↳ Objetivo: Recalcular todas las metas con un UPDATE y los objetivos con otro.")
+
+        MetaTactico.objects.update(total_actividades=0, actividades_completadas=0, valor_actual=0)
+
+        # savepoint + objetivos afectados + UPDATE de metas + UPDATE de objetivos
+        # + ids/empresas a invalidar en caché + release
+        with self.assertNumQueries(6):
+            actualizadas = AvanceService.recalcular_metas(MetaTactico.objects.filter(objetivo__empresa=self.empresa))
+
+        meta = MetaTactico.objects.get(pk=self.metas[0].pk)
+        objetivo = Objetivo.objects.get(pk=self.objetivos[0].pk)
+        print(f"   ↳ Metas: {actualizadas} | Meta 1: {meta.actividades_completadas}/{meta.total_actividades} -> {meta.valor_actual}")
+        self.assertEqual(actualizadas, 6)
+        self.assertEqual((meta.total_actividades, meta.actividades_completadas), (3, 1))
+        self.assertEqual(meta.valor_actual, Decimal("33.33"))
+        self.assertEqual(objetivo.total_actual, Decimal("66.66"))
+        self.assertEqual(objetivo.avance, 33)
+        print("     ✅ Éxito: El recálculo no depende del número de metas.")
+
+    def test_cerrar_meta_completa_actividades(self):
+        print("\n✅ [TEST] Iniciando: test_cerrar_meta_completa_actividades")
+        print("   ↳ Objetivo: Cerrar una meta completa sus actividades y actualiza el avance.")
+
+        meta = self.metas[0]
+        cambiadas = AvanceService.cerrar_meta(meta)
+
+        meta.refresh_from_db()
+        objetivo = Objetivo.objects.get(pk=meta.objetivo_id)
+        print(f"   ↳ Actividades completadas: {cambiadas} | Avance objetivo: {objetivo.avance}%")
+        self.assertEqual(cambiadas, 2)
+        self.assertEqual(meta.estado, "cumplida")
+        self.assertEqual(meta.valor_actual, Decimal("100.00"))
+        self.assertEqual(objetivo.avance, 66)
+        self.assertFalse(meta.actividades.exclude(estado="completada").exists())
+        print("     ✅ Éxito: La meta queda cumplida al 100%.")
+
+    def test_cierre_anual(self):
+        print("\n📅 [TEST] Iniciando: test_cierre_anual")
+        print("   ↳ Objetivo: Cancelar pendientes, clasificar metas y cerrar objetivos del año.")
+
+        AvanceService.cerrar_meta(self.metas[0])
+
+        salida = StringIO()
+        call_command("poa_cierre_anual", "2025", "--empresa", str(self.empresa.pk), stdout=salida)
+        print(f"   ↳ {salida.getvalue().strip().splitlines()[0]}")
+
+        self.assertFalse(Actividad.objects.filter(estado__in=["pendiente", "en_progreso"]).exists())
+        self.assertEqual(MetaTactico.objects.filter(estado="cumplida").count(), 1)
+        self.assertEqual(MetaTactico.objects.filter(estado="vencida").count(), 5)
+        self.assertFalse(Objetivo.objects.filter(estado="activo").exists())
+        # Cancelar no altera el avance ya logrado
+        self.assertEqual(MetaTactico.objects.get(pk=self.metas[1].pk).valor_actual, Decimal("33.33"))
+        print("     ✅ Éxito: El año queda cerrado con su avance consolidado.")
+
+    def test_toggle_actividad_refresca_solo_su_meta(self):
+        print("\n🔁 [TEST] Iniciando: test_toggle_actividad_refresca_solo_su_meta")
+        print("   ↳ Objetivo: El cambio de estado responde solo con la tarjeta de la meta afectada.")
+
+        admin = User.objects.create_user(email="admin@masivo.com", password="123", is_superuser=True)
+        client = Client()
+        client.force_login(admin)
+
+        meta = self.metas[0]
+        actividad = meta.actividades.filter(estado="pendiente").first()
+        response = client.post(reverse("poa:actividad_estado", args=[actividad.pk]))
+        contenido = response.content.decode()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f"#meta-{meta.pk}", contenido)
+        self.assertNotIn("#metas-container", contenido)
+        self.assertNotIn(f"#meta-{self.metas[1].pk}", contenido)
+        self.assertIn("Avance 50%", contenido)
+        print("     ✅ Éxito: Solo se re-renderiza la meta tocada y el header del objetivo.")
+
+
+class PoaCacheFragmentosWhiteBoxTests(TestCase):
+    """
+    Tests de la caché de fragmentos HTMX: ETag/304, fragmentos servidos sin
+    consultar el POA e invalidación por versión al modificar metas/actividades.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.empresa = Empresa.objects.create(nombre_comercial="Cache Corp", ruc="606")
+        self.admin = User.objects.create_user(email="admin@cache.com", password="123", is_superuser=True)
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+        self.objetivo = Objetivo.objects.create(empresa=self.empresa, nombre="Digitalizar", anio=2025)
+        self.meta = MetaTactico.objects.create(
+            objetivo=self.objetivo, nombre="Meta Cache", fecha_inicio="2025-01-01", fecha_fin="2025-12-31"
+        )
+
+    def _consultas_poa(self, contexto):
+        tablas = ('"objetivo"', '"meta"', '"actividad"')
+        return [q["sql"] for q in contexto.captured_queries if any(tabla in q["sql"] for tabla in tablas)]
+
+    def test_dashboard_etag_y_304(self):
+        print("\n🗂️ [TEST] Iniciando: test_dashboard_etag_y_304")
+        print("   ↳ Objetivo: Filtros repetidos responden 304 o desde caché, sin consultar el POA.")
+
+        url = reverse("poa:dashboard")
+        primera = self.client.get(url, {"anio": 2025, "q": "Digi"})
+        etag = primera["ETag"]
+        self.assertEqual(primera.status_code, 200)
+        self.assertIn("Digitalizar", primera.content.decode())
+
+        with CaptureQueriesContext(connection) as contexto:
+            condicional = self.client.get(url, {"anio": 2025, "q": "Digi"}, HTTP_IF_NONE_MATCH=etag)
+            cacheada = self.client.get(url, {"anio": 2025, "q": "Digi"})
+
+        print(f"   ↳ Condicional: {condicional.status_code} | Consultas al POA: {len(self._consultas_poa(contexto))}")
+        self.assertEqual(condicional.status_code, 304)
+        self.assertEqual(cacheada.status_code, 200)
+        self.assertEqual(cacheada.content, primera.content)
+        self.assertEqual(self._consultas_poa(contexto), [])
+
+        # Otro filtro es otro fragmento
+        self.assertNotEqual(self.client.get(url, {"anio": 2025, "q": "Otro"})["ETag"], etag)
+        print("     ✅ Éxito: El dashboard repetido no toca la base ni renderiza.")
+
+    def test_mutacion_invalida_metas_y_dashboard(self):
+        print("\n♻️ [TEST] Iniciando: test_mutacion_invalida_metas_y_dashboard")
+        print("   ↳ Objetivo: Un cambio en actividades incrementa la versión del objetivo.")
+
+        url_metas = reverse("poa:objetivo_metas", args=[self.objetivo.pk])
+        url_dashboard = reverse("poa:dashboard")
+        etag_metas = self.client.get(url_metas)["ETag"]
+        etag_dashboard = self.client.get(url_dashboard, {"anio": 2025})["ETag"]
+        self.assertEqual(self.client.get(url_metas, HTTP_IF_NONE_MATCH=etag_metas).status_code, 304)
+
+        Actividad.objects.create(
+            meta=self.meta, nombre="Migrar servidores", fecha_inicio="2025-01-01",
+            fecha_fin="2025-01-02", estado="completada"
+        )
+
+        metas = self.client.get(url_metas, HTTP_IF_NONE_MATCH=etag_metas)
+        dashboard = self.client.get(url_dashboard, {"anio": 2025}, HTTP_IF_NONE_MATCH=etag_dashboard)
+        print(f"   ↳ Tras el cambio -> metas: {metas.status_code} | dashboard: {dashboard.status_code}")
+        self.assertEqual(metas.status_code, 200)
+        self.assertIn("Migrar servidores", metas.content.decode())
+        self.assertEqual(dashboard.status_code, 200)
+        self.assertIn("100%", dashboard.content.decode())
+        print("     ✅ Éxito: Los fragmentos obsoletos no vuelven a servirse.")
+
+    def test_fragmento_distingue_perfil(self):
+        print("\n👥 [TEST] Iniciando: test_fragmento_distingue_perfil")
+        print("   ↳ Objetivo: Admin y empleado no comparten el fragmento de metas.")
+
+        url = reverse("poa:objetivo_metas", args=[self.objetivo.pk])
+        etag_admin = self.client.get(url)["ETag"]
+
+        empleado = User.objects.create_user(email="emp@cache.com", password="123")
+        cliente_empleado = Client()
+        cliente_empleado.force_login(empleado)
+        respuesta = cliente_empleado.get(url, HTTP_IF_NONE_MATCH=etag_admin)
+
+        print(f"   ↳ Empleado con ETag de admin: {respuesta.status_code}")
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta["ETag"], etag_admin)
+        self.assertNotIn("Eliminar meta", respuesta.content.decode())
+        print("     ✅ Éxito: Las acciones de administración no se filtran a otros perfiles.")
+
+
+class PoaIntercambioWhiteBoxTests(TestCase):
+    """
+    Tests de importación/exportación masiva (JSON y CSV) y clonación de año.
+    """
+
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nombre_comercial="Intercambio Corp", ruc="707")
+        unidad = UnidadOrganizacional.objects.create(nombre="Planificación", empresa=self.empresa)
+        puesto = Puesto.objects.create(nombre="Analista", empresa=self.empresa)
+        self.ana, self.luis = [
+            Empleado.objects.create(
+                nombres=nombre, apellidos="POA", cedula=cedula, email=f"{cedula}@intercambio.com", empresa=self.empresa,
+                unidad_org=unidad, puesto=puesto, fecha_ingreso="2024-01-01"
+            )
+            for nombre, cedula in (("Ana", "0101"), ("Luis", "0202"))
+        ]
+        self._crear_objetivo("Expandir mercado", metas=2, actividades=2)
+
+    def _crear_objetivo(self, nombre, metas, actividades, anio=2024):
+        objetivo = Objetivo.objects.create(empresa=self.empresa, nombre=nombre, anio=anio)
+        ObjetivoEmpleado.objects.create(objetivo=objetivo, empleado=self.ana, rol="lider")
+        for m in range(metas):
+            meta = MetaTactico.objects.create(
+                objetivo=objetivo, nombre=f"{nombre} / Meta {m}", indicador="% ventas",
+                fecha_inicio="2024-02-29", fecha_fin="2024-12-31", estado="en_progreso"
+            )
+            MetaEmpleado.objects.create(meta=meta, empleado=self.luis)
+            for a in range(actividades):
+                actividad = Actividad.objects.create(
+                    meta=meta, nombre=f"Actividad {a}", fecha_inicio="2024-03-01", fecha_fin="2024-03-31",
+                    estado="completada" if a == 0 else "pendiente"
+                )
+                ActividadEmpleado.objects.create(actividad=actividad, empleado=self.luis)
+        return objetivo
+
+    def _contar(self, anio):
+        return (
+            Objetivo.objects.filter(empresa=self.empresa, anio=anio).count(),
+            MetaTactico.objects.filter(objetivo__anio=anio).count(),
+            Actividad.objects.filter(meta__objetivo__anio=anio).count(),
+            ActividadEmpleado.objects.filter(actividad__meta__objetivo__anio=anio).count(),
+        )
+
+    def test_json_ida_y_vuelta(self):
+        print("\n📦 [TEST] Iniciando: test_json_ida_y_vuelta")
+        print("   ↳ Objetivo: Exportar a JSON e importar en otro año reproduce el árbol y equipos.")
+
+        contenido = IntercambioPOAService.serializar(IntercambioPOAService.exportar(self.empresa, 2024), "json")
+        objetivos = IntercambioPOAService.leer(contenido.encode(), "json")
+        resumen = IntercambioPOAService.importar(self.empresa, 2030, objetivos)
+
+        print(f"   ↳ Resumen: {resumen}")
+        self.assertEqual(resumen["errores"], [])
+        self.assertEqual(self._contar(2030), self._contar(2024))
+        self.assertEqual(resumen["asignaciones"], 1 + 2 + 4)
+
+        importado = Objetivo.objects.get(empresa=self.empresa, anio=2030)
+        meta = importado.metas_tacticas.order_by("id").first()
+        self.assertEqual((meta.total_actividades, meta.actividades_completadas), (2, 1))
+        self.assertEqual(importado.avance, 50)
+        self.assertEqual(list(importado.equipo.values_list("cedula", flat=True)), ["0101"])
+        print("     ✅ Éxito: El árbol importado es equivalente y con avance calculado.")
+
+    def test_csv_ida_y_vuelta(self):
+        print("\n🧾 [TEST] Iniciando: test_csv_ida_y_vuelta")
+        print("   ↳ Objetivo: El CSV plano (una fila por actividad) se reagrupa al importar.")
+
+        self._crear_objetivo("Sin metas", metas=0, actividades=0)
+        contenido = IntercambioPOAService.serializar(IntercambioPOAService.exportar(self.empresa, 2024), "csv")
+        print(f"   ↳ Filas CSV: {len(contenido.splitlines()) - 1}")
+
+        resumen = IntercambioPOAService.importar(
+            self.empresa, 2031, IntercambioPOAService.leer(contenido, "csv")
+        )
+        self.assertEqual(resumen["errores"], [])
+        self.assertEqual(self._contar(2031), self._contar(2024))
+        print("     ✅ Éxito: El CSV conserva objetivos, metas, actividades y ejecutores.")
+
+    def test_importacion_con_errores_no_escribe(self):
+        print("\n🚫 [TEST] Iniciando: test_importacion_con_errores_no_escribe")
+        print("   ↳ Objetivo: Un árbol con errores se rechaza completo.")
+
+        objetivos = [
+            {"nombre": "Válido", "metas": [{"nombre": "M", "fecha_inicio": "2032-01-01", "fecha_fin": "2032-12-31"}]},
+            {
+                "nombre": "Inválido",
+                "equipo": [{"cedula": "9999"}],
+                "metas": [{"nombre": "M", "fecha_inicio": "31/01/2032", "fecha_fin": "2032-12-31"}],
+            },
+        ]
+        resumen = IntercambioPOAService.importar(self.empresa, 2032, objetivos)
+
+        print(f"   ↳ Errores: {resumen['errores']}")
+        self.assertEqual(len(resumen["errores"]), 2)
+        self.assertFalse(Objetivo.objects.filter(anio=2032).exists())
+        print("     ✅ Éxito: No se insertó nada.")
+
+    def test_clonar_anio_por_conjunto(self):
+        print("\n🧬 [TEST] Iniciando: test_clonar_anio_por_conjunto")
+        print("   ↳ Objetivo: Clonar el año usa las mismas consultas sin importar el volumen.")
+
+        with CaptureQueriesContext(connection) as pequeno:
+            IntercambioPOAService.clonar_anio(self.empresa, 2024, 2025)
+
+        for n in range(4):
+            self._crear_objetivo(f"Extra {n}", metas=3, actividades=5)
+        with CaptureQueriesContext(connection) as grande:
+            resumen = IntercambioPOAService.clonar_anio(self.empresa, 2024, 2026)
+
+        print(f"   ↳ Consultas: {len(pequeno)} (1 objetivo) vs {len(grande)} ({resumen['actividades']} actividades)")
+        self.assertEqual(len(pequeno), len(grande))
+        self.assertEqual(self._contar(2026), self._contar(2024))
+
+        meta = MetaTactico.objects.filter(objetivo__anio=2026).order_by("id").first()
+        self.assertEqual(str(meta.fecha_inicio), "2026-02-28")
+        self.assertEqual((meta.estado, meta.valor_actual, meta.total_actividades), ("pendiente", Decimal("0.00"), 2))
+        self.assertFalse(Actividad.objects.filter(meta__objetivo__anio=2026, estado="completada").exists())
+        self.assertEqual(MetaEmpleado.objects.filter(meta__objetivo__anio=2026).count(), 2 + 4 * 3)
+        print("     ✅ Éxito: La copia es masiva, con fechas desplazadas y avance reiniciado.")
+
+
 class PoaSecurityWhiteBoxTests(TestCase):
     """
     Tests de seguridad: aislamiento de datos entre empresas (multitenancy).
@@ -15,6 +15,9 @@ from .views.poa_view import (
     objetivo_editar_view,
     objetivo_eliminar_view,
     cambiar_estado_objetivo,
+    poa_exportar_view,
+    poa_importar_view,
+    poa_clonar_anio_view,
 )
 
 app_name = "poa"
@@ -24,6 +27,11 @@ urlpatterns = [
     path("", poa_view, name="poa"),
     path("dashboard/", poa_dashboard_partial, name="dashboard"),
 
+    # Intercambio masivo
+    path("exportar/", poa_exportar_view, name="exportar"),
+    path("importar/", poa_importar_view, name="importar"),
+    path("clonar/", poa_clonar_anio_view, name="clonar_anio"),
+
     # Objetivos
     path("objetivos/crear/", objetivo_crear_view, name="objetivo_crear"),
     path("objetivos/<int:pk>/", objetivo_detalle_view, name="objetivo_detalle"),
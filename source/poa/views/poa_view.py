@@ -1,17 +1,21 @@
 from datetime import date
-from decimal import Decimal
 import json
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponseBadRequest, HttpResponse, HttpResponseForbidden
+from django.db.models import Count, Sum
+from django.http import HttpResponseBadRequest, HttpResponse, HttpResponseForbidden, JsonResponse
 from django.shortcuts import get_object_or_404, render, redirect
 from django.template.loader import render_to_string
 from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
 
 from usuarios.decorators import solo_superusuario_o_admin_rrhh
 from poa.forms import ObjetivoForm, MetaTacticoForm, ActividadForm
 from poa.models import Objetivo, MetaTactico, Actividad
+from poa.services.cache_service import CachePOAService
+from poa.services.intercambio_service import ImportacionPOAInvalida, IntercambioPOAService
 
 
 # -------------------------
@@ -54,31 +58,6 @@ def _verificar_permiso_empresa(request, objetivo):
     return True
 
 
-def _recalcular_avance_meta(meta: MetaTactico):
-    """
-    Recalcula valor_actual de la meta a partir del porcentaje de actividades completadas.
-    Regla del proyecto: valor_esperado=100, valor_actual en rango 0..100.
-    """
-    total_actividades = meta.actividades.count()
-
-    if total_actividades == 0:
-        meta.valor_actual = Decimal("0.00")
-    else:
-        completadas = meta.actividades.filter(estado="completada").count()
-
-        # Cálculo estable en Decimal para evitar problemas de precisión.
-        numerador = Decimal(completadas)
-        denominador = Decimal(total_actividades)
-        ratio = numerador / denominador
-
-        # Asegura Decimal aunque el valor venga representado como string/float.
-        valor_base = Decimal(str(meta.valor_esperado))
-
-        meta.valor_actual = valor_base * ratio
-
-    meta.save(update_fields=["valor_actual"])
-
-
 def _build_dashboard_context(request, anio: int):
     """Construye el contexto del dashboard: filtros, objetivos y estadísticas."""
     q = (request.GET.get("q") or "").strip()
@@ -94,14 +73,17 @@ def _build_dashboard_context(request, anio: int):
     if estado:
         qs = qs.filter(estado=estado)
 
-    objetivos_qs = qs.prefetch_related("metas_tacticas").order_by("-fecha_creacion")
-
-    metas_count = MetaTactico.objects.filter(objetivo__in=objetivos_qs).count()
-    actividades_count = Actividad.objects.filter(meta__objetivo__in=objetivos_qs).count()
+    objetivos_list = list(qs.order_by("-fecha_creacion"))
 
-    objetivos_list = list(objetivos_qs)
+    # Conteos en una sola consulta sobre los contadores almacenados de las metas
+    conteos = MetaTactico.objects.filter(objetivo__in=qs.values("pk")).aggregate(
+        metas=Count("id"), actividades=Sum("total_actividades")
+    )
+    metas_count = conteos["metas"]
+    actividades_count = conteos["actividades"] or 0
 
     # Promedio de avance (evita división por cero cuando no hay objetivos).
+    # `avance` se lee de los totales almacenados: no consulta las metas.
     if objetivos_list:
         total_avance = sum(o.avance for o in objetivos_list)
         avance_global = int(total_avance / len(objetivos_list))
@@ -124,34 +106,103 @@ def _build_dashboard_context(request, anio: int):
     }
 
 
+def _perfil_cache(request) -> str:
+    """Parte de la clave de caché que distingue qué acciones ve el usuario en los partials."""
+    user = request.user
+    if user.is_superuser or getattr(user, "puede_ver_modulo_usuarios", False):
+        return "admin"
+    return f"empleado:{getattr(user, 'empleado_id', None)}"
+
+
+def _clave_dashboard(request, anio: int) -> str:
+    """Clave (y ETag) del dashboard: empresa + versión + año + filtros."""
+    empresa_id = getattr(_empresa_actual(request), "id", None)
+    return CachePOAService.clave_fragmento(
+        "dashboard",
+        empresa_id,
+        CachePOAService.version_empresa(empresa_id),
+        anio,
+        (request.GET.get("q") or "").strip(),
+        (request.GET.get("estado") or "").strip(),
+    )
+
+
+def _clave_objetivo(request, nombre: str, objetivo_id: int) -> str:
+    """Clave (y ETag) de un partial de objetivo: id + versión + perfil del usuario."""
+    return CachePOAService.clave_fragmento(
+        nombre, objetivo_id, CachePOAService.version_objetivo(objetivo_id), _perfil_cache(request)
+    )
+
+
+def _etag_dashboard(request):
+    return _clave_dashboard(request, _anio_actual_from_request(request))
+
+
+def _etag_metas(request, pk):
+    return _clave_objetivo(request, "metas", pk)
+
+
+def _html_dashboard(request, anio: int) -> str:
+    """Tarjetas del dashboard desde caché; en un fallo se consulta y renderiza."""
+    return CachePOAService.fragmento(
+        _clave_dashboard(request, anio),
+        lambda: render_to_string(
+            "poa/partials/dashboard_cards.html", _build_dashboard_context(request, anio), request
+        ),
+    )
+
+
+def _html_metas(request, objetivo, metas_qs) -> str:
+    """Lista de metas del objetivo desde caché (`metas_qs` solo se evalúa en un fallo)."""
+    return CachePOAService.fragmento(
+        _clave_objetivo(request, "metas", objetivo.pk),
+        lambda: render_to_string(
+            "poa/partials/meta_list.html",
+            {
+                "objetivo": objetivo,
+                "metas": metas_qs,
+                # Se pasa al template para habilitar/ocultar acciones según permisos del usuario.
+                "empleado_actual": getattr(request.user, "empleado", None),
+            },
+            request,
+        ),
+    )
+
+
+def _html_header(request, objetivo) -> str:
+    """Header del objetivo desde caché; en un fallo relee los totales de avance."""
+
+    def renderizar():
+        objetivo.refresh_from_db(fields=["estado", "total_esperado", "total_actual"])
+        return render_to_string("poa/partials/objetivo_header.html", {"objetivo": objetivo}, request)
+
+    return CachePOAService.fragmento(_clave_objetivo(request, "header", objetivo.pk), renderizar)
+
+
+def _sin_cache_http(response):
+    """El navegador guarda el partial pero lo revalida siempre con su ETag."""
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
 def _render_oob_response(request, objetivo=None, metas_qs=None, toast_msg="Operación exitosa"):
     """
     Genera una respuesta con HTMX Out-Of-Band swaps para refrescar UI sin recargar.
     - Si metas_qs viene, actualiza el contenedor de metas.
     - Si objetivo viene, actualiza el header del objetivo.
     - Dispara evento para cerrar modal y mostrar toast.
+    Los fragmentos salen de la caché versionada (la mutación ya incrementó la versión).
     """
     response_content = ""
 
-    # Se pasa al template para habilitar/ocultar acciones según permisos del usuario.
-    empleado_actual = getattr(request.user, "empleado", None)
-
     # 1) Refresco de la lista de metas
     if metas_qs is not None:
-        lista_html = render_to_string(
-            "poa/partials/meta_list.html",
-            {"metas": metas_qs, "empleado_actual": empleado_actual},
-            request,
-        )
+        lista_html = _html_metas(request, objetivo, metas_qs)
         response_content += f'<div hx-swap-oob="innerHTML:#metas-container">{lista_html}</div>'
 
-    # 2) Refresco del header del objetivo
+    # 2) Refresco del header del objetivo (totales recién actualizados por AvanceService)
     if objetivo is not None:
-        header_html = render_to_string(
-            "poa/partials/objetivo_header.html",
-            {"objetivo": objetivo},
-            request,
-        )
+        header_html = _html_header(request, objetivo)
         response_content += f'<div hx-swap-oob="innerHTML:#objetivo-header">{header_html}</div>'
 
     response = HttpResponse(response_content)
@@ -162,6 +213,31 @@ def _render_oob_response(request, objetivo=None, metas_qs=None, toast_msg="Opera
     return response
 
 
+def _render_meta_oob(request, meta, toast_msg="Operación exitosa"):
+    """
+    Respuesta OOB para cambios de actividades: solo se vuelve a renderizar la
+    tarjeta de la meta afectada (y el header del objetivo), no la lista completa.
+    """
+    meta = MetaTactico.objects.select_related("objetivo").prefetch_related(
+        "actividades", "actividades__ejecutores"
+    ).get(pk=meta.pk)
+
+    tarjeta_html = render_to_string(
+        "poa/partials/meta_card.html",
+        {"m": meta, "empleado_actual": getattr(request.user, "empleado", None)},
+        request,
+    )
+    header_html = _html_header(request, meta.objetivo)
+
+    response = HttpResponse(
+        f'<div hx-swap-oob="innerHTML:#meta-{meta.pk}">{tarjeta_html}</div>'
+        f'<div hx-swap-oob="innerHTML:#objetivo-header">{header_html}</div>'
+    )
+    response["HX-Trigger"] = json.dumps({"close-modal": toast_msg})
+    response["HX-Reswap"] = "none"
+    return response
+
+
 # -------------------------
 # Vistas principales
 # -------------------------
@@ -177,11 +253,14 @@ def poa_view(request):
 
 
 @login_required
+@condition(etag_func=_etag_dashboard)
 def poa_dashboard_partial(request):
-    """Partial HTMX: tarjetas/estadísticas del dashboard según filtros."""
+    """
+    Partial HTMX: tarjetas/estadísticas del dashboard según filtros.
+    Con ETag vigente responde 304; si no, sirve el fragmento cacheado.
+    """
     anio = _anio_actual_from_request(request)
-    context = _build_dashboard_context(request, anio)
-    return render(request, "poa/partials/dashboard_cards.html", context)
+    return _sin_cache_http(HttpResponse(_html_dashboard(request, anio)))
 
 
 @login_required
@@ -205,8 +284,7 @@ def objetivo_crear_view(request):
             objetivo.save()
             form.save_m2m()
 
-            context_dash = _build_dashboard_context(request, anio)
-            dashboard_html = render_to_string("poa/partials/dashboard_cards.html", context_dash, request)
+            dashboard_html = _html_dashboard(request, anio)
 
             response = HttpResponse(f'<div hx-swap-oob="innerHTML:#poa-dashboard">{dashboard_html}</div>')
             response["HX-Trigger"] = json.dumps({"close-modal": "Objetivo creado"})
@@ -238,8 +316,12 @@ def objetivo_detalle_view(request, pk: int):
 
 
 @login_required
+@condition(etag_func=_etag_metas)
 def objetivo_metas_partial(request, pk: int):
-    """Partial HTMX: lista de metas del objetivo (incluye ejecutores)."""
+    """
+    Partial HTMX: lista de metas del objetivo (incluye ejecutores).
+    Con ETag vigente responde 304; si no, sirve el fragmento cacheado.
+    """
     objetivo = get_object_or_404(Objetivo, pk=pk)
     if not _verificar_permiso_empresa(request, objetivo):
         return HttpResponseBadRequest("Objetivo no pertenece a la empresa actual.")
@@ -249,13 +331,7 @@ def objetivo_metas_partial(request, pk: int):
         "actividades__ejecutores",
     ).order_by("-fecha_fin", "-id")
 
-    empleado_actual = getattr(request.user, "empleado", None)
-
-    return render(request, "poa/partials/meta_list.html", {
-        "objetivo": objetivo,
-        "metas": metas,
-        "empleado_actual": empleado_actual,
-    })
+    return _sin_cache_http(HttpResponse(_html_metas(request, objetivo, metas)))
 
 
 # -------------------------
@@ -280,12 +356,11 @@ def objetivo_editar_view(request, pk: int):
 
             # Si estamos en detalle, refresca el header; si estamos en dashboard, refresca tarjetas.
             if "objetivos/" in referer and "dashboard" not in referer:
-                header_html = render_to_string("poa/partials/objetivo_header.html", {"objetivo": obj}, request)
+                header_html = _html_header(request, obj)
                 response_content = f'<div hx-swap-oob="innerHTML:#objetivo-header">{header_html}</div>'
             else:
                 anio = obj.anio
-                context_dash = _build_dashboard_context(request, anio)
-                dashboard_html = render_to_string("poa/partials/dashboard_cards.html", context_dash, request)
+                dashboard_html = _html_dashboard(request, anio)
                 response_content = f'<div hx-swap-oob="innerHTML:#poa-dashboard">{dashboard_html}</div>'
 
             response = HttpResponse(response_content)
@@ -320,8 +395,7 @@ def objetivo_eliminar_view(request, pk: int):
         return HttpResponse(status=200, headers={"HX-Redirect": reverse("poa:poa")})
 
     anio = _anio_actual_from_request(request)
-    context_dash = _build_dashboard_context(request, anio)
-    dashboard_html = render_to_string("poa/partials/dashboard_cards.html", context_dash, request)
+    dashboard_html = _html_dashboard(request, anio)
 
     return HttpResponse(
         f'<div hx-swap-oob="innerHTML:#poa-dashboard">{dashboard_html}</div>'
@@ -435,7 +509,7 @@ def meta_eliminar_view(request, pk: int):
 @login_required
 @solo_superusuario_o_admin_rrhh
 def actividad_crear_view(request, pk: int):
-    """Crea una actividad dentro de una meta, recalcula avance y refresca lista."""
+    """Crea una actividad dentro de una meta y refresca su tarjeta."""
     meta = get_object_or_404(MetaTactico, pk=pk)
     if not _verificar_permiso_empresa(request, meta.objetivo):
         return HttpResponseBadRequest("No tiene permiso.")
@@ -448,12 +522,8 @@ def actividad_crear_view(request, pk: int):
             actividad.save()
             form.save_m2m()  # guarda ejecutores
 
-            _recalcular_avance_meta(meta)
-
-            metas = MetaTactico.objects.filter(objetivo=meta.objetivo).prefetch_related(
-                "actividades", "actividades__ejecutores"
-            ).order_by("-fecha_fin", "-id")
-            return _render_oob_response(request, meta.objetivo, metas, "Actividad creada")
+            # El avance de la meta lo actualiza AvanceService vía poa.signals
+            return _render_meta_oob(request, meta, "Actividad creada")
 
         return render(request, "poa/partials/modal_actividad.html", {"form": form, "meta_id": pk, "meta_nombre": meta.nombre})
 
@@ -467,7 +537,7 @@ def actividad_crear_view(request, pk: int):
 @login_required
 @solo_superusuario_o_admin_rrhh
 def actividad_editar_view(request, pk: int):
-    """Edita una actividad, recalcula avance de su meta y refresca lista."""
+    """Edita una actividad y refresca la tarjeta de su meta."""
     act = get_object_or_404(Actividad, pk=pk)
     if not _verificar_permiso_empresa(request, act.meta.objetivo):
         return HttpResponseBadRequest("No tiene permiso.")
@@ -476,12 +546,7 @@ def actividad_editar_view(request, pk: int):
         form = ActividadForm(request.POST, instance=act)
         if form.is_valid():
             form.save()
-            _recalcular_avance_meta(act.meta)
-
-            metas = MetaTactico.objects.filter(objetivo=act.meta.objetivo).prefetch_related(
-                "actividades", "actividades__ejecutores"
-            ).order_by("-fecha_fin", "-id")
-            return _render_oob_response(request, act.meta.objetivo, metas, "Actividad actualizada")
+            return _render_meta_oob(request, act.meta, "Actividad actualizada")
     else:
         form = ActividadForm(instance=act)
 
@@ -497,7 +562,7 @@ def actividad_editar_view(request, pk: int):
 @login_required
 @solo_superusuario_o_admin_rrhh
 def actividad_eliminar_view(request, pk: int):
-    """Elimina una actividad, recalcula avance de su meta y refresca lista."""
+    """Elimina una actividad y refresca la tarjeta de su meta."""
     act = get_object_or_404(Actividad, pk=pk)
     meta = act.meta
     objetivo = meta.objetivo
@@ -509,12 +574,7 @@ def actividad_eliminar_view(request, pk: int):
         return HttpResponseBadRequest("Método no permitido")
 
     act.delete()
-    _recalcular_avance_meta(meta)
-
-    metas = MetaTactico.objects.filter(objetivo=objetivo).prefetch_related(
-        "actividades", "actividades__ejecutores"
-    ).order_by("-fecha_fin", "-id")
-    return _render_oob_response(request, objetivo, metas, "Actividad eliminada")
+    return _render_meta_oob(request, meta, "Actividad eliminada")
 
 
 @login_required
@@ -550,12 +610,73 @@ def actividad_estado_view(request, pk: int):
 
     act.save(update_fields=["estado", "porcentaje_avance"])
 
-    # Recalcular meta padre
-    _recalcular_avance_meta(act.meta)
+    # Refrescar UI (tarjeta de la meta + header)
+    return _render_meta_oob(request, act.meta, "Estado actualizado")
 
-    # Refrescar UI (metas + header)
-    metas = MetaTactico.objects.filter(objetivo=act.meta.objetivo).prefetch_related(
-        "actividades", "actividades__ejecutores"
-    ).order_by("-fecha_fin", "-id")
 
-    return _render_oob_response(request, act.meta.objetivo, metas, "Estado actualizado")
+# -------------------------
+# Intercambio masivo
+# -------------------------
+
+@login_required
+@solo_superusuario_o_admin_rrhh
+def poa_exportar_view(request):
+    """Descarga el POA del año (objetivos, metas, actividades y equipos) en JSON o CSV."""
+    empresa = _empresa_actual(request)
+    if not empresa:
+        return HttpResponseBadRequest("No tienes una empresa asignada.")
+
+    formato = request.GET.get("formato", "json")
+    if formato not in IntercambioPOAService.FORMATOS:
+        return HttpResponseBadRequest("Formato no soportado.")
+
+    anio = _anio_actual_from_request(request)
+    contenido = IntercambioPOAService.serializar(IntercambioPOAService.exportar(empresa, anio), formato)
+
+    tipo = "application/json" if formato == "json" else "text/csv"
+    response = HttpResponse(contenido, content_type=f"{tipo}; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="poa_{anio}.{formato}"'
+    return response
+
+
+@login_required
+@solo_superusuario_o_admin_rrhh
+def poa_importar_view(request):
+    """Importa un archivo JSON/CSV en el año indicado. Responde el resumen en JSON."""
+    if request.method != "POST":
+        return HttpResponseBadRequest("Método no permitido")
+
+    empresa = _empresa_actual(request)
+    archivo = request.FILES.get("archivo")
+    if not empresa or archivo is None:
+        return JsonResponse({"errores": ["Se requiere una empresa y un archivo."]}, status=400)
+
+    formato = request.POST.get("formato") or archivo.name.rsplit(".", 1)[-1].lower()
+    try:
+        objetivos = IntercambioPOAService.leer(archivo.read(), formato)
+    except ImportacionPOAInvalida as exc:
+        return JsonResponse({"errores": [str(exc)]}, status=400)
+
+    resumen = IntercambioPOAService.importar(empresa, _anio_actual_from_request(request), objetivos)
+    return JsonResponse(resumen, status=400 if resumen["errores"] else 201)
+
+
+@login_required
+@solo_superusuario_o_admin_rrhh
+def poa_clonar_anio_view(request):
+    """Copia el POA del año `origen` al `destino` (por defecto el siguiente)."""
+    if request.method != "POST":
+        return HttpResponseBadRequest("Método no permitido")
+
+    empresa = _empresa_actual(request)
+    if not empresa:
+        return JsonResponse({"errores": ["No tienes una empresa asignada."]}, status=400)
+
+    try:
+        origen = int(request.POST.get("origen") or date.today().year)
+        destino = int(request.POST.get("destino") or origen + 1)
+        resumen = IntercambioPOAService.clonar_anio(empresa, origen, destino)
+    except (ValueError, ImportacionPOAInvalida) as exc:
+        return JsonResponse({"errores": [str(exc)]}, status=400)
+
+    return JsonResponse(resumen, status=201)
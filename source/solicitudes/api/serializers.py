@@ -22,7 +22,8 @@ class SolicitudAusenciaSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = SolicitudAusencia
-        fields = '__all__'
+        # Columnas internas de búsqueda fuera de la API
+        exclude = ['texto_busqueda', 'busqueda']
 
         # Se asignan desde el backend (seguridad / consistencia)
         read_only_fields = ['empleado', 'empresa', 'estado']
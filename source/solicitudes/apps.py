@@ -3,3 +3,6 @@ from django.apps import AppConfig
 class SolicitudesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'solicitudes'
+
+    def ready(self):
+        import solicitudes.signals
@@ -0,0 +1,96 @@
+# Generated by Django 5.0.3 on 2026-10-18 12:46
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Concat
+
+# SQL fijo al momento de esta migración (no se importan servicios de la app,
+# cuyo contenido puede cambiar después). Solo PostgreSQL: trigger que mantiene el
+# tsvector, relleno de las filas existentes e índices GIN (tsvector y pg_trgm).
+SQL_INSTALAR = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE OR REPLACE FUNCTION sol_aus_texto_busqueda_trg() RETURNS trigger AS $$
+    BEGIN
+        NEW.busqueda := to_tsvector('spanish', coalesce(NEW.texto_busqueda, ''));
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS sol_aus_texto_busqueda_trg ON solicitudes_solicitudausencia",
+    "CREATE TRIGGER sol_aus_texto_busqueda_trg BEFORE INSERT OR UPDATE OF texto_busqueda "
+    "ON solicitudes_solicitudausencia "
+    "FOR EACH ROW EXECUTE FUNCTION sol_aus_texto_busqueda_trg()",
+    "UPDATE solicitudes_solicitudausencia SET busqueda = to_tsvector('spanish', coalesce(texto_busqueda, ''))",
+    "CREATE INDEX IF NOT EXISTS sol_aus_texto_vector_gin ON solicitudes_solicitudausencia USING gin (busqueda)",
+    "CREATE INDEX IF NOT EXISTS sol_aus_texto_trgm_gin ON solicitudes_solicitudausencia "
+    "USING gin (UPPER(texto_busqueda::text) gin_trgm_ops)",
+]
+
+SQL_DESINSTALAR = [
+    "DROP INDEX IF EXISTS sol_aus_texto_trgm_gin",
+    "DROP INDEX IF EXISTS sol_aus_texto_vector_gin",
+    "DROP TRIGGER IF EXISTS sol_aus_texto_busqueda_trg ON solicitudes_solicitudausencia",
+    "DROP FUNCTION IF EXISTS sol_aus_texto_busqueda_trg()",
+]
+
+
+def rellenar_texto_busqueda(apps, schema_editor):
+    SolicitudAusencia = apps.get_model("solicitudes", "SolicitudAusencia")
+    Empleado = apps.get_model("empleados", "Empleado")
+    TipoAusencia = apps.get_model("solicitudes", "TipoAusencia")
+
+    empleado = Empleado.objects.filter(pk=OuterRef("empleado_id"))
+    ausencia = TipoAusencia.objects.filter(pk=OuterRef("ausencia_id"))
+    SolicitudAusencia.objects.update(
+        texto_busqueda=Concat(
+            Coalesce(Subquery(empleado.values("nombres")[:1]), Value("")),
+            Value(" "),
+            Coalesce(Subquery(empleado.values("apellidos")[:1]), Value("")),
+            Value(" "),
+            Coalesce(Subquery(ausencia.values("nombre")[:1]), Value("")),
+            Value(" "),
+            "motivo",
+            output_field=models.TextField(),
+        )
+    )
+
+
+def _ejecutar(schema_editor, sentencias):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for sql in sentencias:
+        schema_editor.execute(sql, params=None)
+
+
+def instalar_busqueda(apps, schema_editor):
+    _ejecutar(schema_editor, SQL_INSTALAR)
+
+
+def desinstalar_busqueda(apps, schema_editor):
+    _ejecutar(schema_editor, SQL_DESINSTALAR)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solicitudes', '0006_remove_solicitudausencia_archivo_adjunto_and_more'),
+        ('empleados', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solicitudausencia',
+            name='busqueda',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='solicitudausencia',
+            name='texto_busqueda',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(rellenar_texto_busqueda, migrations.RunPython.noop),
+        # PostgreSQL: trigger tsvector + índices GIN (tsvector y pg_trgm sobre texto_busqueda)
+        migrations.RunPython(instalar_busqueda, desinstalar_busqueda),
+    ]
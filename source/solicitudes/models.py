@@ -1,5 +1,8 @@
 import os
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Concat
 from empleados.models import Empleado
 from core.models import Empresa
 from core.storage import private_storage
@@ -65,9 +68,30 @@ class SolicitudAusencia(models.Model):
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
 
+    # Texto desnormalizado para búsqueda (empleado, tipo de ausencia y motivo), mantenido
+    # por señales; en PostgreSQL un trigger deriva `busqueda` (tsvector) de este campo.
+    texto_busqueda = models.TextField(blank=True, default="", editable=False)
+    busqueda = SearchVectorField(null=True, editable=False)
+
     def __str__(self):
         return f"{self.empleado} - {self.ausencia}"
 
+    @staticmethod
+    def expresion_texto_busqueda():
+        """Expresión SQL que compone `texto_busqueda` sin cargar instancias (apta para update())."""
+        empleado = Empleado.objects.filter(pk=OuterRef("empleado_id"))
+        ausencia = TipoAusencia.objects.filter(pk=OuterRef("ausencia_id"))
+        return Concat(
+            Coalesce(Subquery(empleado.values("nombres")[:1]), Value("")),
+            Value(" "),
+            Coalesce(Subquery(empleado.values("apellidos")[:1]), Value("")),
+            Value(" "),
+            Coalesce(Subquery(ausencia.values("nombre")[:1]), Value("")),
+            Value(" "),
+            "motivo",
+            output_field=models.TextField(),
+        )
+
 class AdjuntoSolicitud(models.Model):
     """
     Adjuntos asociados a una solicitud (permite múltiples archivos por solicitud).
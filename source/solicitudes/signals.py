@@ -0,0 +1,39 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from empleados.models import Empleado
+from solicitudes.models import SolicitudAusencia, TipoAusencia
+
+# Campos de la solicitud que forman parte del texto de búsqueda
+CAMPOS_BUSQUEDA = {"empleado", "ausencia", "motivo"}
+# Campos del empleado que forman parte del texto de búsqueda de sus solicitudes
+CAMPOS_BUSQUEDA_EMPLEADO = {"nombres", "apellidos"}
+
+
+def actualizar_texto_busqueda(queryset):
+    """Recalcula `texto_busqueda` con un único UPDATE (sin señales ni instancias)."""
+    return queryset.update(texto_busqueda=SolicitudAusencia.expresion_texto_busqueda())
+
+
+@receiver(post_save, sender=SolicitudAusencia)
+def indexar_solicitud(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not CAMPOS_BUSQUEDA.intersection(update_fields):
+        return
+    actualizar_texto_busqueda(SolicitudAusencia.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Empleado)
+def reindexar_solicitudes_empleado(sender, instance, created, update_fields=None, **kwargs):
+    """Los nombres del empleado forman parte del texto de búsqueda de sus solicitudes."""
+    if created:
+        return
+    if update_fields is not None and not CAMPOS_BUSQUEDA_EMPLEADO.intersection(update_fields):
+        return
+    actualizar_texto_busqueda(SolicitudAusencia.objects.filter(empleado_id=instance.pk))
+
+
+@receiver(post_save, sender=TipoAusencia)
+def reindexar_solicitudes_tipo(sender, instance, created, **kwargs):
+    if created:
+        return
+    actualizar_texto_busqueda(SolicitudAusencia.objects.filter(ausencia_id=instance.pk))
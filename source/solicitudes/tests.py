@@ -1,5 +1,7 @@
+import shutil
+import tempfile
 from datetime import date
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
@@ -61,6 +63,11 @@ class SolicitudesLogicWhiteBoxTests(TestCase):
         print("     Exito: El cálculo de saldo de vacaciones es correcto.")
 
 
+# Los adjuntos de prueba van a un directorio temporal, no a private_media/ del proyecto
+PRIVATE_MEDIA_TEST = tempfile.mkdtemp(prefix="talenttrack_private_")
+
+
+@override_settings(PRIVATE_MEDIA_ROOT=PRIVATE_MEDIA_TEST)
 class SolicitudesViewWhiteBoxTests(TestCase):
     """
     Tests de vistas y flujo:
@@ -69,6 +76,11 @@ class SolicitudesViewWhiteBoxTests(TestCase):
     - restricción de edición por estado
     """
 
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(PRIVATE_MEDIA_TEST, ignore_errors=True)
+
     def setUp(self):
         self.empresa = Empresa.objects.create(nombre_comercial="Mango Corp", ruc="999")
         self.u = UnidadOrganizacional.objects.create(nombre="U", empresa=self.empresa)
@@ -163,3 +175,80 @@ class SolicitudesViewWhiteBoxTests(TestCase):
         self.assertEqual(response.status_code, 302)
         print("   ↳ El sistema bloqueó la edición de una solicitud aprobada.")
         print("     ✅ Éxito: Las reglas de integridad de estados están activas.")
+
+
+class SolicitudesBusquedaWhiteBoxTests(TestCase):
+    """
+    Tests de la búsqueda desnormalizada:
+    - mantenimiento de texto_busqueda por señales
+    - búsqueda por relevancia en la lista de administración
+    """
+
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nombre_comercial="Mango Search", ruc="777")
+        self.u = UnidadOrganizacional.objects.create(nombre="U", empresa=self.empresa)
+        self.p = Puesto.objects.create(nombre="P", empresa=self.empresa)
+        self.empleado = Empleado.objects.create(
+            nombres="Lucía", apellidos="Andrade", email="lucia@test.com", cedula="222",
+            empresa=self.empresa, unidad_org=self.u, puesto=self.p, fecha_ingreso="2024-01-01"
+        )
+        self.tipo = TipoAusencia.objects.create(empresa=self.empresa, nombre="Calamidad doméstica")
+        self.jefe = User.objects.create_superuser(email='jefe.busqueda@test.com', password='123')
+
+    def _crear(self, motivo, empleado=None):
+        return SolicitudAusencia.objects.create(
+            empresa=self.empresa, empleado=empleado or self.empleado, ausencia=self.tipo,
+            fecha_inicio="2025-06-01", fecha_fin="2025-06-02", motivo=motivo
+        )
+
+    def test_texto_busqueda_se_mantiene_por_senales(self):
+        print("\n🔎 [TEST] Iniciando: test_texto_busqueda_se_mantiene_por_senales")
+        solicitud = self._crear("Cita médica")
+        solicitud.refresh_from_db()
+        self.assertEqual(solicitud.texto_busqueda, "Lucía Andrade Calamidad doméstica Cita médica")
+
+        # Renombrar al empleado o al tipo reindexa sus solicitudes
+        self.empleado.apellidos = "Benítez"
+        self.empleado.save()
+        self.tipo.nombre = "Permiso"
+        self.tipo.save()
+        solicitud.refresh_from_db()
+        self.assertEqual(solicitud.texto_busqueda, "Lucía Benítez Permiso Cita médica")
+        print("     ✅ Éxito: El texto de búsqueda sigue a empleado, tipo y motivo.")
+
+    def test_guardado_parcial_sin_nombres_no_reindexa(self):
+        print("\n🔎 [TEST] Iniciando: test_guardado_parcial_sin_nombres_no_reindexa")
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self._crear("Cita médica")
+        self.empleado.estado = Empleado.Estado.LICENCIA
+        with CaptureQueriesContext(connection) as consultas:
+            self.empleado.save(update_fields=["estado"])
+
+        reindexados = [q["sql"] for q in consultas if 'UPDATE "solicitudes_solicitudausencia"' in q["sql"]]
+        print(f"   ↳ UPDATE de solicitudes: {len(reindexados)}")
+        self.assertEqual(reindexados, [])
+        print("     ✅ Éxito: solo los cambios de nombre reindexan las solicitudes.")
+
+    def test_lista_solicitudes_busqueda_por_relevancia(self):
+        print("\n🔎 [TEST] Iniciando: test_lista_solicitudes_busqueda_por_relevancia")
+        otro = Empleado.objects.create(
+            nombres="Mario", apellidos="Lucio", email="mario@test.com", cedula="333",
+            empresa=self.empresa, unidad_org=self.u, puesto=self.p, fecha_ingreso="2024-01-01"
+        )
+        exacta = self._crear("Trámite notarial")
+        self._crear("Trámite en el registro notarial", empleado=otro)
+        self._crear("Vacaciones")
+
+        self.client.force_login(self.jefe)
+        response = self.client.get(reverse('solicitudes:lista_solicitudes'), {'q': 'trámite notarial'})
+        solicitudes = list(response.context['solicitudes'])
+
+        self.assertEqual(len(solicitudes), 2)
+        self.assertEqual(solicitudes[0].id, exacta.id, "La frase exacta debe encabezar los resultados")
+
+        # Búsqueda por nombre del empleado sin JOINs (columna desnormalizada)
+        response = self.client.get(reverse('solicitudes:lista_solicitudes'), {'q': 'Mario'})
+        self.assertEqual(len(response.context['solicitudes']), 1)
+        print("     ✅ Éxito: La búsqueda filtra y ordena por relevancia.")
@@ -5,6 +5,7 @@ from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST, require_safe, require_http_methods
 from django.http import FileResponse, JsonResponse
 
+from core.services.busqueda_service import BusquedaService
 from .models import SolicitudAusencia, AprobacionAusencia, AdjuntoSolicitud
 from .forms import SolicitudAusenciaForm
 
@@ -193,16 +194,14 @@ def lista_solicitudes_view(request):
     if not es_jefe:
         return redirect('solicitudes:vista_empleado')
 
-    solicitudes = SolicitudAusencia.objects.all().order_by('-fecha_creacion')
+    solicitudes = SolicitudAusencia.objects.select_related('empleado', 'ausencia').order_by('-fecha_creacion')
     query = request.GET.get('q')
 
     if query:
-        solicitudes = solicitudes.filter(
-            Q(empleado__nombres__icontains=query) | 
-            Q(empleado__apellidos__icontains=query) |
-            Q(ausencia__nombre__icontains=query) |
-            Q(motivo__icontains=query)
-        ).distinct()
+        # Una sola columna desnormalizada e indexada: sin JOINs ni DISTINCT, ordenada por relevancia
+        solicitudes = BusquedaService.buscar(
+            solicitudes, query, campo_texto='texto_busqueda'
+        ).order_by('-rango', '-fecha_creacion')
 
     return render(request, 'solicitudes/lista_solicitudes.html', {'solicitudes': solicitudes, 'query': query})
 
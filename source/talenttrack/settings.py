@@ -44,7 +44,6 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "auditoria.middleware.AuditoriaMiddleware",
     "core.middleware.EmpresaContextMiddleware",
-    "usuarios.middleware.EmpresaActualMiddleware",
 ]
 
 ROOT_URLCONF = "talenttrack.urls"
@@ -90,6 +89,17 @@ DATABASES = {
     }
 }
 
+# Caché compartida (roles, etc.). En producción se recomienda Redis/Memcached vía CACHE_URL.
+CACHES = {
+    "default": env.cache("CACHE_URL", default="locmemcache://"),
+}
+
+# Campana en tiempo real por SSE (notificaciones:stream). Solo funciona sirviendo el
+# proyecto por ASGI (p. ej. uvicorn talenttrack.asgi:application); con WSGI
+# (runserver, gunicorn síncrono) debe quedar desactivada y la campana consulta
+# periódicamente el endpoint badge-count.
+NOTIFICACIONES_SSE = env.bool("NOTIFICACIONES_SSE", default=False)
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
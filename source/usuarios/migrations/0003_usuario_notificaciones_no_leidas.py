@@ -0,0 +1,35 @@
+# Generated by Django 5.0.3 on 2026-10-18 13:22
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def rellenar_no_leidas(apps, schema_editor):
+    """Contador inicial de notificaciones no leídas por usuario (un UPDATE)."""
+    Usuario = apps.get_model("usuarios", "Usuario")
+    Notificacion = apps.get_model("notificaciones", "Notificacion")
+
+    no_leidas = (
+        Notificacion.objects.filter(usuario=OuterRef("pk"), leido=False)
+        .order_by().values("usuario")
+        .annotate(n=Count("pk")).values("n")
+    )
+    Usuario.objects.update(notificaciones_no_leidas=Coalesce(Subquery(no_leidas), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0002_usuario_foto_perfil_usuario_telefono'),
+        ('notificaciones', '0002_remove_notificacion_link_notificacion_url_destino_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='notificaciones_no_leidas',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(rellenar_no_leidas, migrations.RunPython.noop),
+    ]
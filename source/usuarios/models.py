@@ -108,6 +108,9 @@ class Usuario(AbstractBaseUser, PermissionsMixin):
     mfa_secret = models.CharField(max_length=100, blank=True, null=True)
     ultimo_login = models.DateTimeField(null=True, blank=True)
 
+    # Contador desnormalizado de notificaciones no leídas (lo mantiene NotificacionService)
+    notificaciones_no_leidas = models.PositiveIntegerField(default=0, editable=False)
+
     # Auditoría básica
     fecha_creacion = models.DateTimeField(auto_now_add=True)
 
@@ -119,15 +122,21 @@ class Usuario(AbstractBaseUser, PermissionsMixin):
         # Django utiliza is_active en múltiples lugares; aquí se deriva desde "estado"
         return self.estado
 
+    @property
+    def roles_activos(self) -> frozenset:
+        # Nombres (en minúsculas) de los roles activos, resueltos vía caché (ver RolService)
+        from usuarios.services.rol_service import RolService
+        return RolService.roles_activos(self)
+
     @property
     def es_superadmin_negocio(self) -> bool:
         # Determina si el usuario tiene un rol de negocio con nombre tipo "super" o "gerente"
-        return self.roles_asignados.filter(models.Q(nombre__icontains="super") | models.Q(nombre__icontains="gerente"), estado=True).exists()
+        return any("super" in nombre or "gerente" in nombre for nombre in self.roles_activos)
 
     @property
     def es_admin_rrhh(self) -> bool:
         # Determina si el usuario tiene un rol de negocio relacionado a RRHH
-        return self.roles_asignados.filter(nombre__icontains="rrhh", estado=True).exists()
+        return any("rrhh" in nombre for nombre in self.roles_activos)
 
     @property
     def puede_ver_modulo_usuarios(self) -> bool:
@@ -138,8 +147,18 @@ class Usuario(AbstractBaseUser, PermissionsMixin):
         # Normaliza email antes de persistir
         if self.email:
             self.email = self.email.strip().lower()
+
         super().save(*args, **kwargs)
 
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        # El contador de notificaciones solo se modifica con UPDATEs atómicos: el
+        # UPDATE de un save() no lo incluye (salvo que se pida en update_fields),
+        # así una instancia cargada no lo pisa con un valor viejo. El resto de la
+        # semántica de save() (campos diferidos, INSERT si la fila no existe) no cambia.
+        if update_fields is None or "notificaciones_no_leidas" not in update_fields:
+            values = [valor for valor in values if valor[0].name != "notificaciones_no_leidas"]
+        return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+
     @property
     def empresa(self):
         # Acceso directo a la empresa vía el empleado asociado
@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from usuarios.models import UsuarioRol
+
+# Clave del contador de versión global de roles (se incrementa al cambiar un Rol)
+CLAVE_VERSION_ROLES = "usuarios:roles:version"
+
+# Tiempo de vida (segundos) de los roles cacheados por usuario
+ROLES_CACHE_TIMEOUT = getattr(settings, "ROLES_CACHE_TIMEOUT", 300)
+
+# Atributo donde se memoizan los roles en la instancia del usuario (una vez por petición)
+_ATRIBUTO_INSTANCIA = "_roles_activos_cache"
+
+
+class RolService:
+    """
+    Resolución de roles de negocio con caché en dos niveles:
+
+    1. Instancia del usuario (request.user): los roles se resuelven una sola vez
+       por petición, sin importar cuántas veces se lean las propiedades.
+    2. Caché compartida de Django versionada: una petición "caliente" no consulta
+       la base de datos. Un cambio en UsuarioRol invalida la entrada del usuario y
+       un cambio en Rol incrementa la versión global (invalida a todos).
+    """
+
+    @staticmethod
+    def _version():
+        version = cache.get(CLAVE_VERSION_ROLES)
+        if version is None:
+            # add() evita pisar una versión creada por otro proceso
+            cache.add(CLAVE_VERSION_ROLES, 1, timeout=None)
+            version = cache.get(CLAVE_VERSION_ROLES, 1)
+        return version
+
+    @staticmethod
+    def _clave_usuario(usuario_id):
+        return f"usuarios:roles:{usuario_id}"
+
+    @staticmethod
+    def roles_activos(usuario):
+        """
+        Devuelve un frozenset con los nombres (en minúsculas) de los roles
+        activos del usuario.
+        """
+        if usuario is None or usuario.pk is None:
+            return frozenset()
+
+        roles = usuario.__dict__.get(_ATRIBUTO_INSTANCIA)
+        if roles is not None:
+            return roles
+
+        version = RolService._version()
+        clave = RolService._clave_usuario(usuario.pk)
+        roles = cache.get(clave, version=version)
+
+        if roles is None:
+            nombres = (
+                UsuarioRol.objects
+                .filter(usuario_id=usuario.pk, rol__estado=True)
+                .values_list("rol__nombre", flat=True)
+            )
+            roles = frozenset(nombre.lower() for nombre in nombres)
+            cache.set(clave, roles, timeout=ROLES_CACHE_TIMEOUT, version=version)
+
+        usuario.__dict__[_ATRIBUTO_INSTANCIA] = roles
+        return roles
+
+    @staticmethod
+    def invalidar_usuario(usuario_id):
+        # Elimina la entrada cacheada de un usuario (p. ej. al asignar o quitar roles)
+        if usuario_id is None:
+            return
+        cache.delete(RolService._clave_usuario(usuario_id), version=RolService._version())
+
+    @staticmethod
+    def invalidar_todos():
+        # Incrementa la versión global: todas las entradas previas quedan obsoletas
+        try:
+            cache.incr(CLAVE_VERSION_ROLES)
+        except ValueError:
+            cache.set(CLAVE_VERSION_ROLES, RolService._version() + 1, timeout=None)
+
+    @staticmethod
+    def limpiar_instancia(usuario):
+        # Descarta la memoización en la instancia (útil tras modificar roles en la misma petición)
+        if usuario is not None:
+            usuario.__dict__.pop(_ATRIBUTO_INSTANCIA, None)
@@ -1,11 +1,12 @@
 import logging
 from django.contrib.auth.signals import user_logged_in, user_login_failed
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from empleados.models import Empleado
 from .models import Rol, UsuarioRol, Usuario
 from .constants import NombresRoles 
+from .services.rol_service import RolService
 
 from notificaciones.services.notificacion_service import NotificacionService
 from notificaciones.constants import TiposNotificacion
@@ -100,4 +101,46 @@ def notificar_asignacion_rol(sender, instance, created, **kwargs):
             mensaje=f"Se te ha asignado el rol de: {instance.rol.nombre}.",
             tipo=TiposNotificacion.INFO,
             url="/core/dashboard/"
-        )
\ No newline at end of file
+        )
+
+
+# --- Invalidación de la caché de roles (RolService) ---
+
+@receiver(post_save, sender=Usuario)
+def invalidar_roles_usuario_nuevo(sender, instance, created, **kwargs):
+    """Un usuario nuevo nunca debe heredar roles cacheados bajo el mismo ID."""
+    if created:
+        RolService.invalidar_usuario(instance.pk)
+
+
+@receiver(post_save, sender=UsuarioRol)
+@receiver(post_delete, sender=UsuarioRol)
+def invalidar_roles_por_asignacion(sender, instance, **kwargs):
+    """Asignar o quitar un rol invalida solo la entrada del usuario afectado."""
+    RolService.invalidar_usuario(instance.usuario_id)
+
+    # Si la instancia del usuario viene cargada, se descarta también su memoización
+    RolService.limpiar_instancia(instance._state.fields_cache.get("usuario"))
+
+
+@receiver(m2m_changed, sender=Rol.usuarios.through)
+def invalidar_roles_por_m2m(sender, instance, action, pk_set, **kwargs):
+    """Cubre asignaciones hechas con rol.usuarios.add()/remove()/clear()."""
+    if not action.startswith("post_"):
+        return
+
+    if isinstance(instance, Usuario):
+        RolService.invalidar_usuario(instance.pk)
+        RolService.limpiar_instancia(instance)
+    elif pk_set:
+        for usuario_id in pk_set:
+            RolService.invalidar_usuario(usuario_id)
+    else:
+        RolService.invalidar_todos()
+
+
+@receiver(post_save, sender=Rol)
+@receiver(post_delete, sender=Rol)
+def invalidar_roles_por_cambio_rol(sender, instance, **kwargs):
+    """Renombrar, activar/desactivar o eliminar un rol afecta a todos sus usuarios."""
+    RolService.invalidar_todos()
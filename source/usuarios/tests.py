@@ -2,6 +2,7 @@ from django.test import TestCase, RequestFactory
 from django.contrib.auth import get_user_model
 from django.core.exceptions import PermissionDenied
 from django.http import HttpResponse
+from django.core.cache import cache
 
 from core.models import Empresa, UnidadOrganizacional
 from empleados.models import Empleado, Puesto
@@ -9,6 +10,7 @@ from usuarios.models import Rol, UsuarioRol
 from usuarios.services.usuario_service import UsuarioService
 from usuarios.constants import NombresRoles
 from usuarios.decorators import solo_superusuario_o_admin_rrhh
+from usuarios.services.rol_service import RolService
 
 User = get_user_model()
 
@@ -167,3 +169,55 @@ class UsuarioDecoratorWhiteBoxTests(TestCase):
         response = vista_protegida(request)
         self.assertEqual(response.status_code, 200)
         print("     ✅ Éxito: Permitido correctamente.")
+
+
+class RolServiceCacheWhiteBoxTests(TestCase):
+    """
+    Tests de caja blanca para la caché de roles (RolService).
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = User.objects.create_user(email="cache@test.com", password="123")
+        self.rol_rrhh, _ = Rol.objects.get_or_create(nombre=NombresRoles.ADMIN_RRHH)
+        UsuarioRol.objects.create(usuario=self.usuario, rol=self.rol_rrhh)
+
+    def test_peticion_caliente_sin_consultas_de_roles(self):
+        # Una vez resueltos los roles, una nueva "petición" no debe consultar la BD
+        print("\n🧠 [TEST] Iniciando: test_peticion_caliente_sin_consultas_de_roles")
+
+        # Petición fría: resuelve los roles una sola vez aunque se lean varias propiedades
+        usuario_frio = User.objects.get(pk=self.usuario.pk)
+        with self.assertNumQueries(1):
+            self.assertTrue(usuario_frio.es_admin_rrhh)
+            self.assertFalse(usuario_frio.es_superadmin_negocio)
+            self.assertTrue(usuario_frio.puede_ver_modulo_usuarios)
+
+        # Petición caliente: nueva instancia, cero consultas de roles
+        usuario_caliente = User.objects.get(pk=self.usuario.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(usuario_caliente.es_admin_rrhh)
+            self.assertFalse(usuario_caliente.es_superadmin_negocio)
+            self.assertTrue(usuario_caliente.puede_ver_modulo_usuarios)
+        print("     ✅ Éxito: Roles servidos desde la caché.")
+
+    def test_invalidacion_por_cambios_en_usuariorol_y_rol(self):
+        # Cambios en asignaciones o en el propio Rol deben reflejarse inmediatamente
+        print("\n♻️ [TEST] Iniciando: test_invalidacion_por_cambios_en_usuariorol_y_rol")
+
+        self.assertTrue(User.objects.get(pk=self.usuario.pk).es_admin_rrhh)
+
+        # Desactivar el rol incrementa la versión global
+        self.rol_rrhh.estado = False
+        self.rol_rrhh.save()
+        self.assertFalse(User.objects.get(pk=self.usuario.pk).es_admin_rrhh)
+
+        # Asignar un rol nuevo invalida solo la entrada del usuario
+        rol_gerente = Rol.objects.create(nombre="Gerente General")
+        UsuarioRol.objects.create(usuario=self.usuario, rol=rol_gerente)
+        self.assertTrue(User.objects.get(pk=self.usuario.pk).es_superadmin_negocio)
+
+        # Quitar la asignación también invalida
+        UsuarioRol.objects.filter(usuario=self.usuario, rol=rol_gerente).delete()
+        self.assertFalse(User.objects.get(pk=self.usuario.pk).es_superadmin_negocio)
+        print("     ✅ Éxito: La caché se invalida correctamente.")